@@ -0,0 +1,49 @@
+"""Minimal GeoSite/GeoIP DAT (protobuf) encoder for geodat tests."""
+
+from __future__ import annotations
+
+import ipaddress
+
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+
+def _bytes_field(fn: int, payload: bytes) -> bytes:
+    return _varint(fn << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _varint_field(fn: int, value: int) -> bytes:
+    return _varint(fn << 3) + _varint(value)
+
+
+def geosite_dat(entries) -> bytes:
+    out = b""
+    for tag, domains in entries:
+        body = _bytes_field(1, tag.encode())
+        for dtype, value in domains:
+            dom = (_varint_field(1, dtype) if dtype else b"") + _bytes_field(2, value.encode())
+            dom += _bytes_field(3, _bytes_field(1, b"attr"))  # attributes are ignored
+            body += _bytes_field(2, dom)
+        out += _bytes_field(1, body)
+    return out
+
+
+def geoip_dat(entries) -> bytes:
+    out = b""
+    for tag, nets in entries:
+        body = _bytes_field(1, tag.encode())
+        for net in nets:
+            n = ipaddress.ip_network(net)
+            body += _bytes_field(2, _bytes_field(1, n.network_address.packed) + _varint_field(2, n.prefixlen))
+        body += _varint_field(3, 1)  # reverse_match
+        out += _bytes_field(1, body)
+    return out
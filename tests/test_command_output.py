@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from services import command_jobs
+from services.command_output import TRUNCATED_MARKER, OutputBuffer
+
+
+def test_offsets_resume_and_spill_to_disk(tmp_path, monkeypatch):
+    monkeypatch.setenv("XKEEN_COMMAND_SPILL_DIR", str(tmp_path))
+    buf = OutputBuffer(mem_cap=64, max_total=0)
+    lines = ["line %03d\n" % i for i in range(40)]
+    for ln in lines:
+        buf.append(ln)
+
+    assert buf.size == sum(len(ln) for ln in lines)
+    assert buf._spilled > 0 and buf._mem_bytes <= 64
+    assert buf.text() == "".join(lines)
+
+    mid = len(lines[0]) * 17 + 3
+    data, end = buf.read(mid, 20)
+    assert data == "".join(lines).encode()[mid:mid + 20] and end == mid + 20
+    assert buf.read(buf.size) == (b"", buf.size)
+
+    buf.discard()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_total_cap_truncates_once_on_char_boundary():
+    buf = OutputBuffer(mem_cap=0, max_total=10)
+    buf.append("abcdefgh")
+    buf.append("жжж")
+    buf.append("more")
+    assert buf.truncated
+    assert buf.read(0)[0] == "abcdefghж".encode() + TRUNCATED_MARKER
+
+
+def test_read_text_never_splits_characters():
+    buf = OutputBuffer(mem_cap=0, max_total=0)
+    buf.append("aж")
+    text, end = buf.read_text(0, 2)
+    assert (text, end) == ("a", 1)
+    assert buf.read_text(end, 2) == ("ж", 3)
+
+
+def test_wait_wakes_on_append_and_close():
+    buf = OutputBuffer(mem_cap=0, max_total=0)
+    assert buf.wait(0, timeout=0.01) is False
+    threading.Timer(0.05, buf.append, args=("x",)).start()
+    t0 = time.time()
+    assert buf.wait(0, timeout=2) is True
+    assert time.time() - t0 < 1.5
+    threading.Timer(0.05, buf.close).start()
+    assert buf.wait(1, timeout=2) is True
+
+
+def test_command_job_streams_into_buffer(monkeypatch):
+    monkeypatch.setattr(command_jobs, "SHELL_BIN", "/bin/sh")
+    job = command_jobs.create_command_job(None, None, cmd="printf 'one\\ntwo\\n'")
+    offset = 0
+    seen = ""
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        text, offset = job.buffer.read_text(offset)
+        seen += text
+        if job.status in ("finished", "error") and offset >= job.buffer.size:
+            break
+        job.buffer.wait(offset, timeout=1)
+    assert job.status == "finished" and job.buffer.closed
+    assert seen == job.output == "one\ntwo\n"
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+import services.mihomo_hwid_sub as hwid
+from services import device_identity
+from services.device_identity import DeviceIdentityCache
+
+
+def _fake_bin(path, body: str = "#!/bin/sh\necho v1\n"):
+    path.write_text(body, encoding="utf-8")
+    os.chmod(path, 0o755)
+    return str(path)
+
+
+@pytest.fixture
+def fake_env(monkeypatch, tmp_path):
+    bindir = tmp_path / "bin"
+    bindir.mkdir()
+    ndmc = _fake_bin(bindir / "ndmc")
+    mihomo = _fake_bin(bindir / "mihomo")
+    monkeypatch.setenv("PATH", str(bindir))
+    monkeypatch.setattr(device_identity, "MIHOMO_BINARIES", ("mihomo",))
+    cache = DeviceIdentityCache(str(tmp_path / "state" / device_identity.STATE_FILENAME))
+    monkeypatch.setattr(device_identity, "_CACHE", cache)
+    monkeypatch.setattr(hwid, "get_device_identity_cache", lambda: cache)
+    monkeypatch.setattr(hwid, "_pick_mac_address_keenetic", lambda: "aa:bb:cc:dd:ee:ff")
+    monkeypatch.delenv("XKEEN_MIHOMO_HWID", raising=False)
+    monkeypatch.delenv("XKEEN_HWID", raising=False)
+
+    calls = {"ndmc": 0, "mihomo": 0}
+
+    def fake_ndmc():
+        calls["ndmc"] += 1
+        return "  model: Keenetic Giga (KN-1011)\n  title: 4.2.1\n  serial: S123\n"
+
+    def fake_mihomo():
+        calls["mihomo"] += 1
+        return "v1.19.25"
+
+    monkeypatch.setattr(hwid, "_ndmc_show_version", fake_ndmc)
+    monkeypatch.setattr(hwid, "_detect_mihomo_version", fake_mihomo)
+    return {"cache": cache, "calls": calls, "ndmc": ndmc, "mihomo": mihomo}
+
+
+def test_device_info_probes_once_and_persists(fake_env):
+    first = hwid.get_device_info()
+    second = hwid.get_device_info()
+
+    assert fake_env["calls"] == {"ndmc": 1, "mihomo": 1}
+    assert first == second
+    assert first["device_model"] == "Keenetic-Giga--KN-1011-"
+    assert first["os_release"] == "4.2.1"
+    assert first["mihomo_version"] == "1.19.25"
+
+    reloaded = DeviceIdentityCache(fake_env["cache"].path)
+    assert reloaded.get("mihomo_version", device_identity.mihomo_fingerprint(), lambda: "other") == "v1.19.25"
+    with open(fake_env["cache"].path, encoding="utf-8") as f:
+        assert "S123" not in f.read()
+
+
+def test_binary_change_and_refresh_invalidate(fake_env):
+    hwid.get_device_info()
+    _fake_bin(Path(fake_env["mihomo"]), "#!/bin/sh\necho v2 upgraded\n")
+    hwid.get_device_info()
+    assert fake_env["calls"] == {"ndmc": 1, "mihomo": 2}
+
+    hwid.get_device_info(refresh=True)
+    assert fake_env["calls"] == {"ndmc": 2, "mihomo": 3}
+
+    device_identity.refresh_device_identity()
+    hwid.get_device_info()
+    assert fake_env["calls"] == {"ndmc": 3, "mihomo": 4}
+
+
+def test_missing_binary_or_empty_result_is_not_cached(tmp_path):
+    cache = DeviceIdentityCache(str(tmp_path / "c.json"))
+    seen = []
+    assert cache.get("k", None, lambda: seen.append(1) or "x") == "x"
+    assert cache.get("k", ["fp"], lambda: seen.append(2) or None) is None
+    assert cache.get("k", ["fp"], lambda: seen.append(3) or "y") == "y"
+    assert cache.get("k", ["fp"], lambda: seen.append(4) or "z") == "y"
+    assert seen == [1, 2, 3]
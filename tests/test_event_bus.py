@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+import threading
+
+import pytest
+
+from services import events
+
+
+class StalledWS:
+    """A socket whose send() blocks until released."""
+
+    def __init__(self) -> None:
+        self.release = threading.Event()
+        self.sent = []
+
+    def send(self, data: str) -> None:
+        self.release.wait(5)
+        self.sent.append(json.loads(data))
+
+
+class FastWS:
+    def __init__(self) -> None:
+        self.sent = []
+
+    def send(self, data: str) -> None:
+        self.sent.append(json.loads(data))
+
+
+@pytest.fixture(autouse=True)
+def _fresh_bus(monkeypatch):
+    monkeypatch.setattr(events, "EVENT_SUBSCRIBERS", [])
+    monkeypatch.setattr(events, "_STATS", {"published": 0, "dropped": 0, "coalesced": 0})
+    monkeypatch.setenv("XKEEN_EVENTS_QUEUE_MAX", "3")
+
+
+def test_broadcast_only_queues_and_drops_oldest():
+    ws = StalledWS()
+    sub = events.subscribe(ws)
+    for i in range(5):
+        events.broadcast_event({"event": "job", "n": i})
+    assert ws.sent == []
+
+    ws.release.set()
+    assert sub.drain() == 3
+    assert [e["n"] for e in ws.sent] == [2, 3, 4]
+    stats = events.event_bus_stats()
+    assert stats["published"] == 5 and stats["dropped"] == 2
+    assert stats["subscribers"][0]["dropped"] == 2
+
+
+def test_coalesced_topics_keep_only_latest():
+    ws = FastWS()
+    sub = events.subscribe(ws)
+    events.broadcast_event({"event": "restart_log_appended", "ok": False})
+    events.broadcast_event({"event": "job", "n": 1})
+    events.broadcast_event({"event": "restart_log_appended", "ok": True})
+    events.broadcast_event({"event": "status", "v": 1}, coalesce_key="status")
+    events.broadcast_event({"event": "status", "v": 2}, coalesce_key="status")
+    sub.drain()
+    assert ws.sent == [
+        {"type": "event", "event": "restart_log_appended", "ok": True},
+        {"type": "event", "event": "job", "n": 1},
+        {"type": "event", "event": "status", "v": 2},
+    ]
+    assert events.event_bus_stats()["coalesced"] == 2
+
+
+def test_topic_filters_and_unsubscribe():
+    ws_all, ws_some = FastWS(), FastWS()
+    sub_all = events.subscribe(ws_all)
+    sub_some = events.subscribe(ws_some, ["xkeen_*", "core_changed"], client="10.0.0.2")
+    for name in ("xkeen_restarted", "core_changed", "job"):
+        events.broadcast_event({"event": name})
+    sub_all.drain()
+    sub_some.drain()
+    assert [e["event"] for e in ws_all.sent] == ["xkeen_restarted", "core_changed", "job"]
+    assert [e["event"] for e in ws_some.sent] == ["xkeen_restarted", "core_changed"]
+
+    events.unsubscribe(ws_some)
+    assert sub_some.closed and events.EVENT_SUBSCRIBERS == [sub_all]
+    events.broadcast_event({"event": "core_changed"})
+    assert sub_some.pending() == 0
+
+
+def test_serve_writes_from_subscriber_thread_until_unsubscribed():
+    ws = FastWS()
+    sub = events.subscribe(ws)
+    t = threading.Thread(target=sub.serve, kwargs={"idle_timeout": 0.05}, daemon=True)
+    t.start()
+    events.broadcast_event({"event": "job", "n": 1})
+    for _ in range(100):
+        if ws.sent:
+            break
+        threading.Event().wait(0.01)
+    events.unsubscribe(ws)
+    t.join(1)
+    assert not t.is_alive()
+    assert ws.sent == [{"type": "event", "event": "job", "n": 1}]
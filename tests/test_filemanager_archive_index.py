@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import io
+import os
+import tarfile
+import time
+import zipfile
+
+import pytest
+
+from services.filemanager import archive_index
+from services.filemanager.archive import list_archive_contents
+from services.filemanager.archive_index import build_archive_index, list_archive_page, open_archive_member
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache(monkeypatch):
+    monkeypatch.setattr(archive_index, "_CACHE", archive_index.OrderedDict())
+    monkeypatch.setattr(archive_index, "_build_in_background", lambda path: None)
+
+
+def _tar(path, mode: str, n: int = 30):
+    with tarfile.open(path, mode) as tf:
+        for i in range(n):
+            data = f"file {i}".encode()
+            ti = tarfile.TarInfo(f"backup/etc/f{i:02d}.conf")
+            ti.size = len(data)
+            tf.addfile(ti, io.BytesIO(data))
+        ti = tarfile.TarInfo("backup/README")
+        ti.size = 2
+        tf.addfile(ti, io.BytesIO(b"hi"))
+    return str(path)
+
+
+def test_first_page_stops_early_then_index_is_cached(tmp_path, monkeypatch):
+    arch = _tar(tmp_path / "backup.tar.gz", "w:gz")
+    read = []
+    real_iter = archive_index.iter_archive_members
+
+    def counting_iter(p):
+        for m in real_iter(p):
+            read.append(m.name)
+            yield m
+
+    monkeypatch.setattr(archive_index, "iter_archive_members", counting_iter)
+
+    page = list_archive_page(arch, offset=0, limit=5)
+    assert [it["name"] for it in page["items"]] == [f"backup/etc/f{i:02d}.conf" for i in range(5)]
+    assert page["complete"] is False and page["total"] is None and page["next_offset"] == 5
+    assert len(read) == 6
+
+    build_archive_index(arch)
+    read.clear()
+    page = list_archive_page(arch, offset=28, limit=5)
+    assert read == []
+    assert page["total"] == 31 and page["next_offset"] is None
+    assert [it["name"] for it in page["items"]] == ["backup/etc/f28.conf", "backup/etc/f29.conf", "backup/README"]
+
+    items, truncated = list_archive_contents(arch, max_items=10)
+    assert len(items) == 10 and truncated is True
+
+
+def test_paging_past_the_member_cap_ends_the_listing(tmp_path, monkeypatch):
+    arch = _tar(tmp_path / "big.tar.gz", "w:gz")
+    monkeypatch.setattr(archive_index, "MAX_INDEX_MEMBERS", 10)
+
+    page = list_archive_page(arch, offset=10, limit=5)
+    assert page["items"] == []
+    assert page["next_offset"] is None and page["truncated"] is True
+
+    page = list_archive_page(arch, offset=8, limit=5)
+    assert len(page["items"]) == 2
+    assert page["next_offset"] is None and page["truncated"] is True and page["total"] == 10
+
+
+def test_index_scan_yields_periodically(tmp_path, monkeypatch):
+    arch = _tar(tmp_path / "many.tar", "w")
+    sleeps = []
+    monkeypatch.setattr(archive_index, "_YIELD_EVERY", 8)
+    monkeypatch.setattr(archive_index.time, "sleep", lambda s: sleeps.append(s))
+
+    assert len(build_archive_index(arch).members) == 31
+    assert sleeps == [0, 0, 0]
+
+
+def test_directory_scoped_listing_synthesizes_parent_dirs(tmp_path):
+    arch = _tar(tmp_path / "b.tar", "w", n=3)
+
+    top = list_archive_page(arch, directory="")
+    assert [(it["name"], it["is_dir"]) for it in top["items"]] == [("backup", True)]
+    inside = list_archive_page(arch, directory="backup")
+    assert [it["name"] for it in inside["items"]] == ["backup/etc", "backup/README"]
+    assert list_archive_page(arch, directory="backup/etc", limit=2)["next_offset"] == 2
+
+
+def test_index_is_invalidated_when_archive_changes(tmp_path):
+    arch = _tar(tmp_path / "b.tar", "w", n=2)
+    assert list_archive_page(arch)["total"] == 3
+    ts = time.time() + 5
+    _tar(tmp_path / "b.tar", "w", n=4)
+    os.utime(arch, (ts, ts))
+    assert list_archive_page(arch)["total"] == 5
+
+
+def test_open_single_member_from_zip_and_tar(tmp_path):
+    zpath = tmp_path / "a.zip"
+    with zipfile.ZipFile(zpath, "w") as zf:
+        zf.writestr("dir/", b"")
+        zf.writestr("dir/x.txt", b"x" * 100)
+    fobj, size = open_archive_member(str(zpath), "dir/x.txt")
+    with fobj:
+        assert (fobj.read(), size) == (b"x" * 100, 100)
+    with pytest.raises(KeyError):
+        open_archive_member(str(zpath), "dir/")
+
+    for name, mode in (("b.tar", "w"), ("b.tar.gz", "w:gz")):
+        arch = _tar(tmp_path / name, mode, n=3)
+        build_archive_index(arch)
+        fobj, size = open_archive_member(arch, "backup/etc/f01.conf")
+        try:
+            assert fobj.read() == b"file 1" and size == 6
+        finally:
+            fobj.close()
+        with pytest.raises(KeyError):
+            open_archive_member(arch, "backup/missing")
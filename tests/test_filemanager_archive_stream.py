@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from services.filemanager import archive_stream
+from services.filemanager.archive_stream import (
+    ArchiveStream,
+    iter_local_selection,
+    iter_remote_entries,
+    stream_archive,
+    stream_tar_gz,
+    stream_zip,
+)
+
+
+def _tree(tmp_path):
+    root = tmp_path / "data"
+    (root / "sub" / "empty").mkdir(parents=True)
+    (root / "a.txt").write_bytes(b"alpha" * 1000)
+    (root / "sub" / "b.bin").write_bytes(bytes(range(256)) * 600)
+    other = tmp_path / "x" / "a.txt"
+    other.parent.mkdir()
+    other.write_bytes(b"second a.txt")
+    return root, other
+
+
+def test_zip_stream_round_trips_selection(tmp_path):
+    root, other = _tree(tmp_path)
+    entries = iter_local_selection([(str(root), "data"), (str(root / "a.txt"), "a.txt"), (str(other), "a.txt")], root_name="sel")
+    st, body, mimetype = stream_archive(entries, fmt="zip", name="sel.zip", target="local")
+    chunks = list(body)
+
+    assert mimetype == "application/zip"
+    assert len(chunks) > 1
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        assert zf.testzip() is None
+        names = set(zf.namelist())
+        assert {"sel/", "sel/data/", "sel/data/sub/", "sel/data/sub/empty/", "sel/a.txt", "sel/a.txt_2"} <= names
+        assert zf.read("sel/data/sub/b.bin") == (root / "sub" / "b.bin").read_bytes()
+        assert zf.read("sel/a.txt_2") == b"second a.txt"
+        # Written without seeking: sizes/CRC follow the data in a descriptor.
+        assert zf.getinfo("sel/data/a.txt").flag_bits & 0x08
+
+    assert st.state == "done"
+    assert st.files_done == 4
+    assert st.bytes_out == sum(len(c) for c in chunks)
+    assert any(s["id"] == st.id and s["state"] == "done" for s in archive_stream.archive_streams())
+
+
+def test_tar_gz_stream_round_trips_tree(tmp_path):
+    root, _other = _tree(tmp_path)
+    st, body, mimetype = stream_archive(iter_local_selection([(str(root), "data")], root_name="t"), fmt="tgz", name="t.tar.gz", target="local")
+    data = b"".join(body)
+
+    assert mimetype == "application/gzip"
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tf:
+        members = {m.name: m for m in tf.getmembers()}
+        assert members["t/data/sub/empty"].isdir()
+        assert tf.extractfile("t/data/a.txt").read() == b"alpha" * 1000
+    assert st.state == "done" and st.fmt == "tar.gz"
+
+
+class _FakeProc:
+    def __init__(self, data: bytes, rc: int = 0) -> None:
+        self.stdout = io.BytesIO(data)
+        self.stderr = io.BytesIO()
+        self.terminated = False
+        self.rc = rc
+
+    def poll(self):
+        return None if not self.terminated else 0
+
+    def terminate(self):
+        self.terminated = True
+
+    def wait(self, timeout=None):
+        return self.rc
+
+
+def test_remote_tree_is_read_from_cat_streams(tmp_path):
+    files = {"/r/dir/one.txt": b"1" * 10, "/r/dir/deep/two.txt": b"22"}
+    listing = {
+        "/r/dir": [{"name": "one.txt", "type": "file", "size": 10}, {"name": "deep", "type": "dir"}],
+        "/r/dir/deep": [{"name": "two.txt", "type": "file", "size": 2}],
+    }
+    procs = []
+
+    def popen_cat(path):
+        procs.append(_FakeProc(files[path]))
+        return procs[-1]
+
+    entries = iter_remote_entries("/r/dir", "dir", is_dir=True, size=None, list_dir=lambda p: listing[p], popen_cat=popen_cat)
+    data = b"".join(stream_tar_gz(entries, ArchiveStream(fmt="tar.gz", name="dir.tar.gz", target="remote")))
+
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tf:
+        assert tf.extractfile("dir/deep/two.txt").read() == b"22"
+        assert tf.extractfile("dir/one.txt").read() == b"1" * 10
+    assert len(procs) == 2 and all(p.terminated for p in procs)
+
+
+@pytest.mark.parametrize("fmt", ["zip", "tgz"])
+def test_failed_remote_read_aborts_the_stream(fmt):
+    entries = iter_remote_entries(
+        "/r/gone.bin", "gone.bin", is_dir=False, size=4, list_dir=lambda p: [], popen_cat=lambda p: _FakeProc(b"", rc=1)
+    )
+    st, body, _mimetype = stream_archive(entries, fmt=fmt, name="gone", target="remote")
+
+    with pytest.raises(RuntimeError, match="read_failed"):
+        list(body)
+    assert st.state == "error" and st.error == "read_failed"
+
+
+def test_archive_names_keep_dots_and_neutralize_parent_segments():
+    assert archive_stream._safe_arc("file..txt") == "file..txt"
+    assert archive_stream._safe_arc("../a/./..\\b/") == "_/a/_/b"
+    assert archive_stream._safe_arc("..") == "_"
+    assert archive_stream._safe_arc("/") == "item"
+
+
+def test_closing_or_canceling_the_stream_stops_reading(tmp_path):
+    root, _other = _tree(tmp_path)
+
+    st = ArchiveStream(fmt="zip", name="x.zip", target="local")
+    body = stream_zip(iter_local_selection([(str(root), "data")], root_name="x"), st, chunk_bytes=1024)
+    next(body)
+    body.close()  # what the WSGI server does when the client goes away
+    assert st.state == "canceled" and st.error == "client_disconnected"
+
+    st2 = ArchiveStream(fmt="zip", name="y.zip", target="local")
+    body2 = stream_zip(iter_local_selection([(str(root), "data")], root_name="y"), st2, chunk_bytes=1024)
+    next(body2)
+    assert archive_stream.cancel_archive_stream(st2.id) is True
+    with pytest.raises(RuntimeError):
+        list(body2)
+    assert st2.state == "canceled"
+    assert archive_stream.cancel_archive_stream(st2.id) is False
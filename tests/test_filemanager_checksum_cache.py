@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import os
+import threading
+import time
+
+from services.fileops.job_models import FileOpJob
+from services.fileops.ops_checksum import normalize_checksum, run_job_checksum
+from services.fileops.runtime import FileOpsRuntime
+from services.filemanager import checksum_cache
+from services.filemanager.checksum import hash_file_cached
+from services.filemanager.checksum_cache import ChecksumCache
+
+
+def _old_file(path, data: bytes):
+    path.write_bytes(data)
+    ts = time.time() - 60
+    os.utime(path, (ts, ts))
+    return path
+
+
+def _use_cache(monkeypatch, cache: ChecksumCache) -> ChecksumCache:
+    monkeypatch.setattr(checksum_cache, "_CACHE", cache)
+    return cache
+
+
+def test_hash_file_cached_reuses_digests_until_file_changes(tmp_path, monkeypatch):
+    cache = _use_cache(monkeypatch, ChecksumCache(str(tmp_path / "cache.json")))
+    f = _old_file(tmp_path / "fw.bin", b"firmware" * 1000)
+
+    first = hash_file_cached(str(f))
+    assert first[:3] == (hashlib.md5(f.read_bytes()).hexdigest(), hashlib.sha256(f.read_bytes()).hexdigest(), 8000)
+    assert first[3] is False
+    assert hash_file_cached(str(f))[3] is True
+
+    # Persisted: a fresh cache instance (e.g. after restart) still hits.
+    cache.flush(force=True)
+    _use_cache(monkeypatch, ChecksumCache(str(tmp_path / "cache.json")))
+    assert hash_file_cached(str(f))[3] is True
+
+    _old_file(f, b"patched" * 1000)
+    again = hash_file_cached(str(f))
+    assert again[3] is False
+    assert again[1] == hashlib.sha256(b"patched" * 1000).hexdigest()
+
+
+def test_recently_modified_files_are_not_cached_from_reads(tmp_path, monkeypatch):
+    _use_cache(monkeypatch, ChecksumCache(""))
+    f = tmp_path / "fresh.dat"
+    f.write_bytes(b"abc")
+
+    assert hash_file_cached(str(f))[3] is False
+    assert hash_file_cached(str(f))[3] is False
+
+    # Writers that produced the content may record it directly.
+    checksum_cache.get_checksum_cache().remember(str(f), hashlib.md5(b"abc").hexdigest(), hashlib.sha256(b"abc").hexdigest())
+    assert hash_file_cached(str(f))[3] is True
+
+
+def _runtime():
+    def progress_set(job, **kwargs):
+        job.progress.update(kwargs)
+
+    def job_set_state(job, state, error=None):
+        job.state = state
+        job.error = error
+
+    return FileOpsRuntime(
+        mgr=None,
+        local_roots=["/"],
+        now_fn=lambda: 1.0,
+        job_set_state=job_set_state,
+        progress_set=progress_set,
+        ensure_local_follow=lambda p: os.path.realpath(p),
+    )
+
+
+def test_selection_checksum_job_hashes_every_file(tmp_path, monkeypatch):
+    _use_cache(monkeypatch, ChecksumCache(""))
+    monkeypatch.setenv("XKEEN_FILEOPS_CHECKSUM_PARALLEL", "4")
+    names = []
+    for i in range(5):
+        _old_file(tmp_path / f"f{i}.bin", bytes([i]) * (1000 + i))
+        names.append(f"f{i}.bin")
+
+    rt = _runtime()
+    spec = normalize_checksum({"op": "checksum", "src": {"target": "local", "cwd": str(tmp_path), "paths": names}}, rt)
+    assert len(spec["items"]) == 5
+    assert spec["size_total"] == sum(1000 + i for i in range(5))
+
+    def _run():
+        job = FileOpJob(job_id="j", op="checksum", created_ts=0.0, progress={}, cancel_flag=threading.Event())
+        run_job_checksum(job, spec, rt)
+        return job
+
+    job = _run()
+    assert job.state == "done"
+    result = job.progress["result"]
+    assert [os.path.basename(r["path"]) for r in result["items"]] == names
+    for i, r in enumerate(result["items"]):
+        assert r["sha256"] == hashlib.sha256(bytes([i]) * (1000 + i)).hexdigest()
+    assert result["errors"] == 0
+    assert job.progress["files_done"] == 5
+
+    assert _run().progress["result"]["cached"] == 5
+
+
+def test_selection_checksum_answers_cached_files_before_reading_any(tmp_path, monkeypatch):
+    from services.fileops import ops_checksum
+
+    _use_cache(monkeypatch, ChecksumCache(""))
+    cached = _old_file(tmp_path / "cached.bin", b"c" * 100)
+    fresh = _old_file(tmp_path / "fresh.bin", b"f" * 50)
+    hash_file_cached(str(cached))
+
+    rt = _runtime()
+    spec = normalize_checksum({"op": "checksum", "src": {"target": "local", "cwd": str(tmp_path), "paths": ["fresh.bin", "cached.bin"]}}, rt)
+    read = []
+
+    def _hash(path, **kwargs):
+        read.append(os.path.basename(path))
+        return hash_file_cached(path, **kwargs)
+
+    monkeypatch.setattr(ops_checksum, "hash_file_cached", _hash)
+    job = FileOpJob(job_id="j", op="checksum", created_ts=0.0, progress={}, cancel_flag=threading.Event())
+    run_job_checksum(job, spec, rt)
+
+    assert job.state == "done"
+    assert read == ["fresh.bin"]
+    items = job.progress["result"]["items"]
+    assert [os.path.basename(r["path"]) for r in items] == ["fresh.bin", "cached.bin"]
+    assert items[1] == {"path": str(cached), "size": 100, "md5": hashlib.md5(b"c" * 100).hexdigest(), "sha256": hashlib.sha256(b"c" * 100).hexdigest(), "cached": True}
+    assert job.progress["bytes_done"] == 150
+
+
+def test_selection_checksum_hashes_off_the_hub_and_reports_from_the_caller(tmp_path, monkeypatch):
+    from services.filemanager import checksum
+    from services.fileops import ops_checksum
+
+    _use_cache(monkeypatch, ChecksumCache(""))
+    data = b"q" * (3 * 1024 * 1024)
+    _old_file(tmp_path / "big.bin", data)
+    hashed_on = []
+    waits = []
+
+    def fake_call_off_hub(fn, *args, on_wait=None, **kwargs):
+        # Stand-in for gevent's native thread pool.
+        out = {}
+
+        def _run():
+            hashed_on.append(threading.current_thread().name)
+            out["value"] = fn(*args, **kwargs)
+
+        worker = threading.Thread(target=_run, name="native-hash")
+        worker.start()
+        worker.join()
+        on_wait()
+        waits.append(1)
+        return out["value"]
+
+    monkeypatch.setattr(checksum, "call_off_hub", fake_call_off_hub)
+    monkeypatch.setattr(ops_checksum, "gevent_active", lambda: True)
+    reports = []
+    rt = _runtime()
+    progress_set = rt.progress_set
+
+    def recording_progress_set(job, **kwargs):
+        reports.append((threading.current_thread().name, kwargs.get("bytes_done")))
+        progress_set(job, **kwargs)
+
+    rt = dataclasses.replace(rt, progress_set=recording_progress_set)
+    spec = normalize_checksum({"op": "checksum", "src": {"target": "local", "cwd": str(tmp_path), "paths": ["big.bin"]}}, rt)
+    job = FileOpJob(job_id="j", op="checksum", created_ts=0.0, progress={}, cancel_flag=threading.Event())
+    run_job_checksum(job, spec, rt)
+
+    assert job.state == "done"
+    assert job.progress["result"]["items"][0]["sha256"] == hashlib.sha256(data).hexdigest()
+    assert hashed_on == ["native-hash"] and waits == [1]
+    # Job state is only touched from the calling thread; on_wait saw the full read.
+    assert {name for name, _ in reports} == {threading.current_thread().name}
+    assert (threading.current_thread().name, len(data)) in reports
+
+
+def test_call_off_hub_is_a_plain_call_without_gevent():
+    from services.utils.offload import call_off_hub, gevent_active
+
+    assert gevent_active() is False
+    assert call_off_hub(lambda a, b=0: a + b, 2, b=3, on_wait=lambda: None) == 5
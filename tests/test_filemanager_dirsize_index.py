@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+
+from services.filemanager.dirsize_index import DirSizeIndex, DirSizeResult
+
+
+def _write(path, size: int) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+
+
+def _age_tree(root, seconds: float = 60.0) -> None:
+    """Move directory mtimes into the past so records are not 'racy'."""
+    ts = time.time() - seconds
+    for dirpath, _dirs, _files in os.walk(root):
+        os.utime(dirpath, (ts, ts))
+
+
+def test_index_reuses_unchanged_directories_and_rescans_modified_ones(tmp_path):
+    root = tmp_path / "data"
+    _write(root / "a" / "one.bin", 100)
+    _write(root / "a" / "deep" / "two.bin", 20)
+    _write(root / "b" / "three.bin", 3)
+    _write(root / "top.bin", 7)
+    _age_tree(root)
+
+    index = DirSizeIndex(str(tmp_path / "index.json"))
+    first = index.measure(str(root))
+    assert (first.bytes, first.items, first.truncated) == (130, 7, False)
+    assert first.scanned_dirs == 4 and first.reused_dirs == 0
+
+    second = index.measure(str(root))
+    assert (second.bytes, second.items) == (130, 7)
+    assert second.scanned_dirs == 0 and second.reused_dirs == 4
+
+    # Adding a file bumps only b's mtime; everything else stays cached.
+    _write(root / "b" / "four.bin", 1000)
+    ts = time.time() - 30
+    os.utime(root / "b", (ts, ts))
+    third = index.measure(str(root))
+    assert (third.bytes, third.items) == (1130, 8)
+    assert third.scanned_dirs == 1 and third.reused_dirs == 3
+
+
+def test_index_persists_and_reloads_records(tmp_path):
+    root = tmp_path / "data"
+    _write(root / "sub" / "f.bin", 42)
+    _age_tree(root)
+    state = tmp_path / "index.json"
+
+    DirSizeIndex(str(state)).measure(str(root))
+    raw = json.loads(state.read_text(encoding="utf-8"))
+    assert raw["v"] == 1 and str(root) in raw["dirs"]
+
+    res = DirSizeIndex(str(state)).measure(str(root))
+    assert res.bytes == 42
+    assert res.scanned_dirs == 0 and res.reused_dirs == 2
+
+
+def test_index_distrusts_racy_and_expired_records(tmp_path):
+    root = tmp_path / "data"
+    _write(root / "f.bin", 5)
+
+    index = DirSizeIndex("", max_age=600)
+    index.measure(str(root))
+    # Directory modified "just now": the record may miss same-tick changes.
+    assert index.measure(str(root)).scanned_dirs == 1
+
+    _age_tree(root)
+    index.measure(str(root))
+    assert index.measure(str(root)).reused_dirs == 1
+    assert index.measure(str(root), max_age=0).scanned_dirs == 1
+
+
+def _grow_in_place(path, size: int) -> None:
+    parent = os.stat(path.parent)
+    path.write_bytes(b"x" * size)
+    os.utime(path.parent, ns=(parent.st_atime_ns, parent.st_mtime_ns))
+
+
+def test_records_expire_after_the_default_max_age(tmp_path, monkeypatch):
+    monkeypatch.delenv("XKEEN_FM_DIRSIZE_MAX_AGE", raising=False)
+    root = tmp_path / "data"
+    _write(root / "f.bin", 5)
+    _age_tree(root)
+    path = str(tmp_path / "index.json")
+
+    index = DirSizeIndex(path)
+    assert index.max_age == 300
+    index.measure(str(root))
+    # A file growing in place leaves the directory mtime alone.
+    _grow_in_place(root / "f.bin", 50)
+
+    assert DirSizeIndex(path).measure(str(root)).bytes == 5
+    later = time.time_ns() + 301 * 1_000_000_000
+    monkeypatch.setattr(time, "time_ns", lambda: later)
+    assert DirSizeIndex(path).measure(str(root)).bytes == 50
+
+
+def test_trash_size_check_revalidates_grown_files(tmp_path, monkeypatch):
+    from services.filemanager import dirsize_index
+    from services.fs_common import local as localfs
+
+    index = DirSizeIndex("")
+    monkeypatch.setattr(dirsize_index, "_INDEX", index)
+    root = tmp_path / "download"
+    _write(root / "part.bin", 10)
+    _age_tree(root)
+    assert index.measure(str(root)).bytes == 10
+
+    _grow_in_place(root / "part.bin", 1000)
+    assert index.measure(str(root)).bytes == 10
+    assert localfs._tree_size_bytes(str(root)) == (1000, False)
+
+
+def test_best_effort_size_falls_back_to_du_after_index_timeout(tmp_path, monkeypatch):
+    import subprocess
+
+    from services.filemanager import dirsize_index, local_ops
+
+    class _TimedOut:
+        def measure(self, *_args, **_kwargs):
+            return DirSizeResult(None, 0, True, aborted="timeout")
+
+    monkeypatch.setattr(dirsize_index, "get_dirsize_index", lambda: _TimedOut())
+    calls = []
+
+    def fake_run(argv, **_kwargs):
+        calls.append(argv[:2])
+        return subprocess.CompletedProcess(argv, 0, stdout=f"4242\t{argv[-1]}\n", stderr="")
+
+    monkeypatch.setattr(local_ops.subprocess, "run", fake_run)
+    assert local_ops.dir_size_bytes_best_effort(str(tmp_path)) == (4242, None)
+    assert calls == [["du", "-sb"]]
+
+    def failing_run(argv, **_kwargs):
+        raise subprocess.TimeoutExpired(argv, 1)
+
+    monkeypatch.setattr(local_ops.subprocess, "run", failing_run)
+    assert local_ops.dir_size_bytes_best_effort(str(tmp_path)) == (None, "timeout")
+
+
+def test_index_skip_names_limits_and_cancel(tmp_path):
+    root = tmp_path / "trash"
+    _write(root / "item" / "f.bin", 10)
+    _write(root / ".meta" / "item.json", 999)
+    _age_tree(root)
+
+    index = DirSizeIndex("")
+    res = index.measure(str(root), skip_names=(".meta",))
+    assert (res.bytes, res.items) == (10, 2)
+
+    assert index.measure(str(root), max_items=1).truncated is True
+
+    canceled = index.measure(str(root), cancel=lambda: True)
+    assert canceled.aborted == "canceled" and canceled.truncated is True
+
+
+def test_local_size_helpers_share_the_index(tmp_path, monkeypatch):
+    from services.filemanager import dirsize_index
+    from services.filemanager.local_ops import dir_size_bytes_best_effort, dir_walk_sum_bytes
+    from services.fs_common import local as localfs
+
+    index = DirSizeIndex("")
+    monkeypatch.setattr(dirsize_index, "_INDEX", index)
+
+    root = tmp_path / "data"
+    _write(root / "x" / "f.bin", 11)
+    _write(root / "g.bin", 4)
+    _age_tree(root)
+
+    assert dir_walk_sum_bytes(str(root)) == (15, 3, False)
+    assert dir_size_bytes_best_effort(str(root)) == (15, None)
+    assert localfs._tree_size_bytes(str(root)) == (15, False)
+    assert localfs._tree_size_bytes(str(root), max_items=1) == (None, True)
+    # The trash-size check (_tree_size_bytes) re-validates instead of reusing.
+    assert index.stats()["hits"] >= 2
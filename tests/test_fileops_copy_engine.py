@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import errno
+import os
+import threading
+
+import pytest
+
+from services.fileops import copy_engine
+from services.fileops.copy_engine import JOURNAL_SUFFIX, PART_SUFFIX, LocalCopier, ThroughputMeter, plan_tree
+from services.fileops.job_models import FileOpJob
+from services.fileops.ops_copy_move import run_job_copy_move
+from services.fileops.runtime import FileOpsRuntime
+
+
+def _tree(root):
+    (root / "sub" / "deep").mkdir(parents=True)
+    (root / "big.bin").write_bytes(os.urandom(3 * 1024 * 1024 + 17))
+    (root / "sub" / "a.txt").write_bytes(b"a" * 1000)
+    (root / "sub" / "deep" / "b.txt").write_bytes(b"b")
+    os.symlink("a.txt", root / "sub" / "link")
+    return root
+
+
+def _same_tree(a, b):
+    for dirpath, _dirs, files in os.walk(a):
+        rel = os.path.relpath(dirpath, a)
+        for fn in files:
+            sa, sb = os.path.join(dirpath, fn), os.path.join(b, rel, fn)
+            if os.path.islink(sa):
+                assert os.readlink(sa) == os.readlink(sb)
+            else:
+                with open(sa, "rb") as fa, open(sb, "rb") as fb:
+                    assert fa.read() == fb.read(), sa
+
+
+def test_plan_and_copy_tree_reports_bytes(tmp_path):
+    src = _tree(tmp_path / "src")
+    plan = plan_tree(str(src))
+    assert (plan.files, plan.dirs, plan.links) == (3, 3, 1)
+    assert plan.bytes == 3 * 1024 * 1024 + 17 + 1001
+
+    reports = []
+    meter = ThroughputMeter(plan.bytes, report=lambda **kw: reports.append(kw), interval=0)
+    copier = LocalCopier(meter=meter, verify="sha256", chunk_bytes=256 * 1024)
+    assert copier.copy(str(src), str(tmp_path / "dst")) == 0
+
+    _same_tree(str(src), str(tmp_path / "dst"))
+    assert reports[-1]["bytes_done"] == plan.bytes
+    assert not os.path.exists(str(tmp_path / "dst") + JOURNAL_SUFFIX)
+    assert not list((tmp_path / "dst").rglob("*" + PART_SUFFIX))
+
+
+def test_canceled_copy_resumes_from_part_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(copy_engine, "JOURNAL_MIN_BYTES", 1024 * 1024)
+    src = _tree(tmp_path / "src")
+    dst = tmp_path / "dst"
+    cancel = threading.Event()
+    seen = []
+
+    def report(**kw):
+        seen.append(kw["bytes_done"])
+        if kw["bytes_done"] >= 1024 * 1024:
+            cancel.set()
+
+    copier = LocalCopier(cancel=cancel, meter=ThroughputMeter(0, report=report, interval=0), chunk_bytes=256 * 1024)
+    with pytest.raises(RuntimeError, match="canceled"):
+        copier.copy(str(src), str(dst))
+    assert (dst / ("big.bin" + PART_SUFFIX)).exists()
+    assert copier.is_partial(str(dst))
+
+    resumed = LocalCopier(chunk_bytes=256 * 1024)
+    assert resumed.copy(str(src), str(dst)) == 0
+    assert resumed.resumed_bytes >= 1024 * 1024
+    _same_tree(str(src), str(dst))
+    assert not resumed.is_partial(str(dst))
+
+
+def test_changed_source_restarts_partial_file(tmp_path):
+    src = tmp_path / "f.bin"
+    src.write_bytes(b"x" * 5000)
+    dst = tmp_path / "out.bin"
+    (tmp_path / ("out.bin" + PART_SUFFIX)).write_bytes(b"y" * 100)
+    copy_engine._write_journal(str(dst), {"v": 1, "src": str(src), "size": 5000, "mtime_ns": 1})
+
+    copier = LocalCopier()
+    copier.copy_file(str(src), str(dst))
+    assert dst.read_bytes() == b"x" * 5000 and copier.resumed_bytes == 0
+    assert not os.path.exists(str(dst) + JOURNAL_SUFFIX)
+
+
+def test_small_files_are_copied_without_a_journal(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    for i in range(20):
+        (src / f"d{i % 2}").mkdir(parents=True, exist_ok=True)
+        (src / f"d{i % 2}" / f"f{i}.txt").write_bytes(b"z" * i)
+    (src / "big.bin").write_bytes(b"b" * 4096)
+    monkeypatch.setattr(copy_engine, "JOURNAL_MIN_BYTES", 4096)
+    written = []
+    real_write = copy_engine._write_journal
+    monkeypatch.setattr(copy_engine, "_write_journal", lambda dst, data: (written.append(os.path.basename(dst)), real_write(dst, data)))
+
+    assert LocalCopier().copy(str(src), str(tmp_path / "dst")) == 0
+
+    # One journal for the tree and one for the large file, none per small file.
+    assert sorted(written) == ["big.bin", "dst"]
+    _same_tree(str(src), str(tmp_path / "dst"))
+    assert not list(tmp_path.rglob("*" + JOURNAL_SUFFIX))
+
+
+def _runtime():
+    def progress_set(job, **kwargs):
+        job.progress.update(kwargs)
+
+    def job_set_state(job, state, error=None):
+        job.state = state
+        job.error = error
+
+    return FileOpsRuntime(
+        mgr=None,
+        local_roots=["/"],
+        now_fn=lambda: 1.0,
+        job_set_state=job_set_state,
+        progress_set=progress_set,
+        ensure_local_follow=lambda p: os.path.realpath(p),
+        ensure_local_nofollow=lambda p: os.path.abspath(p),
+        local_is_protected_entry_abs=lambda p: False,
+        local_remove_entry=lambda *a, **k: None,
+    )
+
+
+def test_cross_device_move_job_copies_then_deletes_source(tmp_path, monkeypatch):
+    src = _tree(tmp_path / "src")
+    (tmp_path / "usb").mkdir()
+
+    def no_rename(a, b):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(copy_engine.os, "rename", no_rename)
+    expected = plan_tree(str(src)).bytes
+    spec = {
+        "src": {"target": "local"},
+        "dst": {"target": "local", "path": str(tmp_path / "usb"), "is_dir": True},
+        "sources": [{"path": str(src), "name": "src", "is_dir": True}],
+        "options": {"verify": "size"},
+    }
+    job = FileOpJob(job_id="m", op="move", created_ts=0.0, progress={}, cancel_flag=threading.Event())
+    run_job_copy_move(job, spec, _runtime())
+
+    assert job.state == "done", job.error
+    assert not src.exists()
+    assert (tmp_path / "usb" / "src" / "big.bin").stat().st_size == 3 * 1024 * 1024 + 17
+    assert job.progress["bytes_done"] == job.progress["bytes_total"] == expected
+    assert "speed_bps" in job.progress and "eta_s" in job.progress
+    assert "current_file" not in job.progress
+    assert job.progress["current"]["phase"] == "copy"
+    assert job.progress["current"]["name"] in {"big.bin", "a.txt", "b.txt"}
+
+
+def _copy_spec(src, dst_dir, overwrite):
+    return {
+        "src": {"target": "local"},
+        "dst": {"target": "local", "path": str(dst_dir), "is_dir": True},
+        "sources": [{"path": str(src), "name": os.path.basename(str(src)), "is_dir": True}],
+        "options": {"verify": "size", "overwrite": overwrite},
+    }
+
+
+def test_partial_copy_of_another_source_is_a_conflict(tmp_path):
+    first = tmp_path / "a" / "photos"
+    first.mkdir(parents=True)
+    (first / "old.jpg").write_bytes(b"old")
+    dst = tmp_path / "usb" / "photos"
+    dst.mkdir(parents=True)
+    (dst / "old.jpg").write_bytes(b"old")
+    copy_engine._write_journal(str(dst), {"v": 1, "src": str(first), "kind": "dir"})
+
+    copier = LocalCopier()
+    assert copier.is_partial(str(dst), str(first))
+    second = tmp_path / "b" / "photos"
+    second.mkdir(parents=True)
+    (second / "new.jpg").write_bytes(b"new")
+    assert not copier.is_partial(str(dst), str(second))
+
+    job = FileOpJob(job_id="c", op="copy", created_ts=0.0, progress={}, cancel_flag=threading.Event())
+    run_job_copy_move(job, _copy_spec(second, tmp_path / "usb", "skip"), _runtime())
+
+    # Not merged into the other source's leftovers.
+    assert job.state == "done", job.error
+    assert sorted(os.listdir(dst)) == ["old.jpg"]
+
+
+def test_replace_and_cancel_discard_partial_destinations(tmp_path, monkeypatch):
+    src = _tree(tmp_path / "src")
+    usb = tmp_path / "usb"
+    stale = usb / "src"
+    stale.mkdir(parents=True)
+    (stale / "junk").write_bytes(b"x")
+    copy_engine._write_journal(str(stale), {"v": 1, "src": "/elsewhere/src", "kind": "dir"})
+
+    job = FileOpJob(job_id="r", op="copy", created_ts=0.0, progress={}, cancel_flag=threading.Event())
+    run_job_copy_move(job, _copy_spec(src, usb, "replace"), _runtime())
+    assert job.state == "done", job.error
+    assert not (stale / "junk").exists()
+    _same_tree(str(src), str(stale))
+
+    cancel = threading.Event()
+    real_copy_range = LocalCopier._copy_range
+
+    def copy_range(self, *args):
+        cancel.set()
+        return real_copy_range(self, *args)
+
+    monkeypatch.setattr(LocalCopier, "_copy_range", copy_range)
+    job = FileOpJob(job_id="x", op="copy", created_ts=0.0, progress={}, cancel_flag=cancel)
+    run_job_copy_move(job, _copy_spec(src, tmp_path / "other", "replace"), _runtime())
+
+    assert job.state == "canceled"
+    assert not (tmp_path / "other" / "src").exists()
+    assert not list((tmp_path / "other").rglob("*" + PART_SUFFIX))
+    assert not list((tmp_path / "other").rglob("*" + JOURNAL_SUFFIX))
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import pytest
+
+from services.geodat import match_index, reader
+from services.geodat.match_index import get_match_index, regex_required_literal
+from tests.support.dat_builder import geoip_dat, geosite_dat
+
+
+@pytest.fixture(autouse=True)
+def _fresh(monkeypatch, tmp_path):
+    monkeypatch.setattr(reader, "_CACHE", reader.OrderedDict())
+    monkeypatch.setattr(match_index, "_CACHE", match_index.OrderedDict())
+    monkeypatch.setenv("XKEEN_GEODAT_INDEX_DIR", str(tmp_path / "idx"))
+
+
+def _geosite(tmp_path):
+    path = tmp_path / "geosite.dat"
+    path.write_bytes(geosite_dat([
+        ("google", [(2, "google.com"), (3, "www.google.com"), (0, "goog")]),
+        ("ads", [(1, r"^ads\d*\.example\.(com|net)$"), (1, r"(bad"), (0, "ad")]),
+        ("CN", [(2, "cn"), (2, "baidu.com")]),
+        ("dup", [(2, "google.com"), (2, "google.com")]),
+    ]))
+    return str(path)
+
+
+def test_domain_lookup_matches_all_rule_types(tmp_path):
+    idx = get_match_index("geosite", _geosite(tmp_path))
+
+    assert idx.lookup("www.google.com") == [
+        {"tag": "google", "count": 3},
+        {"tag": "dup", "count": 2},
+    ]
+    assert idx.lookup("maps.google.com.") == [{"tag": "dup", "count": 2}, {"tag": "google", "count": 2}]
+    assert idx.lookup("ads7.example.net") == [{"tag": "ads", "count": 2}]
+    assert idx.lookup("www.baidu.com") == [{"tag": "CN", "count": 1}]
+    assert idx.lookup("x.gov.cn") == [{"tag": "CN", "count": 1}]
+    assert idx.lookup("notgoogle.com") == [{"tag": "google", "count": 1}]
+    assert idx.lookup("example.org") == []
+
+
+def test_ip_lookup_and_batch(tmp_path):
+    path = tmp_path / "geoip.dat"
+    path.write_bytes(geoip_dat([
+        ("private", ["10.0.0.0/8", "192.168.0.0/16", "fc00::/7"]),
+        ("lan", ["192.168.1.0/24"]),
+        ("any6", ["::/0"]),
+        # v4-mapped base with a v6 prefix is skipped, as in xk-geodat.
+        ("mapped", ["::ffff:0:0/96"]),
+    ]))
+    idx = get_match_index("geoip", str(path))
+
+    assert idx.lookup("192.168.1.5") == [
+        {"tag": "any6", "count": 1},
+        {"tag": "lan", "count": 1},
+        {"tag": "private", "count": 1},
+    ]
+    assert idx.lookup("fd00::1") == [{"tag": "any6", "count": 1}, {"tag": "private", "count": 1}]
+    assert [r["matches"] for r in match_index.lookup_many(idx, ["8.8.8.8", "bad"])] == [
+        [{"tag": "any6", "count": 1}],
+        [],
+    ]
+
+
+def test_sidecar_is_reused_and_invalidated(tmp_path, monkeypatch):
+    dat = _geosite(tmp_path)
+    first = get_match_index("geosite", dat)
+    sidecar = match_index.sidecar_path("geosite", dat)
+    assert sidecar.startswith(str(tmp_path / "idx"))
+
+    monkeypatch.setattr(match_index, "_CACHE", match_index.OrderedDict())
+    monkeypatch.setattr(match_index, "compile_match_index", lambda k, p: pytest.fail("recompiled"))
+    again = get_match_index("geosite", dat)
+    assert again.lookup("www.google.com") == first.lookup("www.google.com")
+
+    monkeypatch.setattr(match_index, "_CACHE", match_index.OrderedDict())
+    started = []
+    monkeypatch.setattr(match_index, "_build_in_background", lambda k, p: started.append(p))
+    with open(dat, "ab") as f:
+        f.write(geosite_dat([("new", [(2, "new.example")])]))
+    assert get_match_index("geosite", dat, build=False) is None
+    assert started
+
+
+def test_compile_yields_and_background_build_is_reported(tmp_path, monkeypatch):
+    dat = _geosite(tmp_path)
+    yields = []
+    monkeypatch.setattr(match_index, "_YIELD_EVERY", 4)
+    monkeypatch.setattr(match_index.time, "sleep", lambda s: yields.append(s))
+    assert match_index.compile_match_index("geosite", dat).lookup("www.baidu.com") == [{"tag": "CN", "count": 1}]
+    assert yields == [0, 0]
+
+    monkeypatch.setattr(match_index, "_BUILDING", set())
+    monkeypatch.setattr(match_index.threading.Thread, "start", lambda self: None)
+    assert get_match_index("geosite", dat, build=False) is None
+    assert match_index.index_building("geosite", dat)
+
+
+@pytest.mark.parametrize(
+    "pattern, literal",
+    [
+        (r"^ads\d*\.example\.(com|net)$", ".example."),
+        (r"a|b", ""),
+        (r"(?i)tracker", ""),
+        (r"^track(er)?s?\.io$", "track"),
+        (r"[a-z]+metrics\.", "metrics."),
+        (r"x{2}yz", "yz"),
+        (r"^[a-z]{10,20}\.com$", ".com"),
+        (r"^x{2,3}\.io$", ".io"),
+        (r"abc\d{1,16}", "abc"),
+        (r"^cdn{1,}\d{2,}$", "cd"),
+    ],
+)
+def test_regex_required_literal(pattern, literal):
+    assert regex_required_literal(pattern) == literal
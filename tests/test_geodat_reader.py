@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import os
+import time
+
+import pytest
+
+from services.geodat import reader
+from services.geodat.reader import CHECKPOINT_EVERY, GeodatFormatError, build_dat_index, get_dat_index
+from tests.support.dat_builder import geoip_dat, geosite_dat
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache(monkeypatch):
+    monkeypatch.setattr(reader, "_CACHE", reader.OrderedDict())
+
+
+def test_geosite_tags_and_paged_dump(tmp_path):
+    many = [(2, f"d{i}.example") for i in range(CHECKPOINT_EVERY * 3 + 7)]
+    path = tmp_path / "geosite.dat"
+    path.write_bytes(geosite_dat([
+        ("google", [(2, "google.com"), (3, "www.google.com"), (1, r"^ads\."), (0, "goog")]),
+        ("CN", many),
+    ]))
+
+    idx = get_dat_index("geosite", str(path))
+    assert idx.tags() == [{"tag": "CN", "count": len(many)}, {"tag": "google", "count": 4}]
+
+    items, total = idx.dump("GOOGLE", 1, 2)
+    assert total == 4
+    assert items == [{"t": "full", "v": "www.google.com"}, {"t": "regex", "v": r"^ads\."}]
+
+    deep = CHECKPOINT_EVERY * 2 + 5
+    items, total = idx.dump("cn", deep, 3)
+    assert [it["v"] for it in items] == [f"d{i}.example" for i in range(deep, deep + 3)]
+    assert idx.dump("cn", len(many) - 1, 10)[0] == [{"t": "domain", "v": f"d{len(many) - 1}.example"}]
+    assert idx.dump("cn", len(many), 10) == ([], len(many))
+    with pytest.raises(KeyError):
+        idx.dump("missing")
+
+
+def test_geoip_dump_matches_xk_geodat_shape(tmp_path):
+    path = tmp_path / "geoip.dat"
+    path.write_bytes(geoip_dat([("private", ["10.0.0.0/8", "fc00::/7", "0.0.0.0/0"])]))
+
+    items, total = get_dat_index("geoip", str(path)).dump("private", 0, 10)
+    assert total == 3
+    assert items[0] == {"t": "cidr", "v": "10.0.0.0/8", "ip": "10.0.0.0", "cidr": "10.0.0.0/8", "prefix": 8}
+    assert items[1]["v"] == "fc00::/7"
+    assert "prefix" not in items[2]
+
+
+def test_index_is_cached_per_file_identity(tmp_path, monkeypatch):
+    path = tmp_path / "geosite.dat"
+    path.write_bytes(geosite_dat([("a", [(2, "a.com")])]))
+    builds = []
+    real = reader.build_dat_index
+    monkeypatch.setattr(reader, "build_dat_index", lambda k, p: builds.append(p) or real(k, p))
+
+    get_dat_index("geosite", str(path))
+    get_dat_index("geosite", str(path))
+    assert len(builds) == 1
+
+    path.write_bytes(geosite_dat([("a", [(2, "a.com")]), ("b", [(2, "b.com")])]))
+    ts = time.time() + 5
+    os.utime(path, (ts, ts))
+    assert [t["tag"] for t in get_dat_index("geosite", str(path)).tags()] == ["a", "b"]
+    assert len(builds) == 2
+
+
+def test_truncated_file_is_rejected(tmp_path):
+    path = tmp_path / "bad.dat"
+    path.write_bytes(geosite_dat([("a", [(2, "a.com")])])[:-3])
+    with pytest.raises(GeodatFormatError):
+        build_dat_index("geosite", str(path))
+    empty = tmp_path / "empty.dat"
+    empty.write_bytes(b"")
+    assert build_dat_index("geoip", str(empty)).tags() == []
+
+
+def test_scans_yield_to_other_greenlets(tmp_path, monkeypatch):
+    n = reader._YIELD_EVERY * 2 + 3
+    path = tmp_path / "geosite.dat"
+    path.write_bytes(geosite_dat([("cn", [(2, f"d{i}.example") for i in range(n)])]))
+    yields = []
+    monkeypatch.setattr(reader.time, "sleep", lambda s: yields.append(s))
+
+    idx = build_dat_index("geosite", str(path))
+    assert yields == [0, 0]
+    yields.clear()
+    items, total = idx.dump("cn", n - 1, 1)
+    assert total == n and items[0]["v"] == f"d{n - 1}.example"
+    # Deep pages start at a checkpoint, so they only yield for what they decode.
+    assert len(yields) <= 1
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import hashlib
+import time
+
+import pytest
+
+from services.geodat import match_index, reader, updates
+from services.url_policy import NotModifiedError
+from tests.support.dat_builder import geosite_dat
+
+
+class FakeMirror:
+    """Serves one DAT with an ETag and an optional ``.sha256sum``."""
+
+    def __init__(self, body: bytes, *, publish_sum: bool = True) -> None:
+        self.body = body
+        self.publish_sum = publish_sum
+        self.sum_override = ""
+        self.requests = []
+
+    @property
+    def etag(self) -> str:
+        return '"%s"' % hashlib.sha256(self.body).hexdigest()[:16]
+
+    def __call__(self, url, tmp_path, max_bytes, *, policy, headers=None, response_meta=None, **kwargs):
+        self.requests.append((url, dict(headers or {})))
+        if url.endswith(".sha256sum"):
+            if not self.publish_sum:
+                raise OSError("404")
+            digest = self.sum_override or hashlib.sha256(self.body).hexdigest()
+            data = ("%s  geosite.dat\n" % digest).encode()
+        else:
+            if (headers or {}).get("If-None-Match") == self.etag:
+                raise NotModifiedError("not_modified")
+            data = self.body
+            if response_meta is not None:
+                response_meta.update(etag=self.etag, last_modified="Mon, 19 Oct 2026 03:00:00 GMT")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        return len(data)
+
+
+@pytest.fixture(autouse=True)
+def _isolated(monkeypatch, tmp_path):
+    monkeypatch.setattr(updates, "state_path", lambda: str(tmp_path / "dat-updates.json"))
+    monkeypatch.setattr(updates, "_sync_xray_assets", lambda path, log: None)
+    monkeypatch.setattr(reader, "_CACHE", reader.OrderedDict())
+    monkeypatch.delenv("XKEEN_DAT_VERIFY_SHA256", raising=False)
+    monkeypatch.setenv("XKEEN_GEODAT_INDEX_DIR", "off")
+    monkeypatch.setattr(match_index, "_CACHE", match_index.OrderedDict())
+    monkeypatch.setattr(match_index, "_build_in_background", lambda kind, path: None)
+
+
+URL = "https://github.com/x/releases/latest/download/geosite.dat"
+
+
+def test_second_update_is_conditional_and_not_modified(tmp_path):
+    path = str(tmp_path / "geosite.dat")
+    mirror = FakeMirror(geosite_dat([("cn", [(2, "a.cn")])]))
+
+    first = updates.update_dat_file(path, URL, download=mirror)
+    assert first["unchanged"] is False and first["verified"] == "ok" and first["prewarmed"] is True
+    assert [t["tag"] for t in reader.get_dat_index("geosite", path).tags()] == ["cn"]
+    assert mirror.requests[0][1] == {}
+
+    second = updates.update_dat_file(path, URL, download=mirror)
+    assert second["not_modified"] is True
+    assert mirror.requests[-1][1]["If-None-Match"] == mirror.etag
+    assert updates.get_source(path)["status"] == "not_modified"
+
+    mirror.body = geosite_dat([("cn", [(2, "a.cn")]), ("ru", [(2, "a.ru")])])
+    third = updates.update_dat_file(path, URL, download=mirror)
+    assert third["unchanged"] is False
+    assert [t["tag"] for t in reader.get_dat_index("geosite", path).tags()] == ["cn", "ru"]
+
+
+def test_swapped_file_schedules_a_match_index_build(tmp_path, monkeypatch):
+    path = str(tmp_path / "geosite.dat")
+    started = []
+    monkeypatch.setattr(match_index, "_build_in_background", lambda kind, p: started.append((kind, p)))
+    mirror = FakeMirror(geosite_dat([("cn", [(2, "a.cn")])]))
+
+    updates.update_dat_file(path, URL, download=mirror)
+    assert started == [("geosite", path)]
+
+    updates.update_dat_file(path, URL, download=mirror)
+    assert len(started) == 1
+
+
+def test_checksum_mismatch_keeps_installed_file(tmp_path):
+    path = tmp_path / "geosite.dat"
+    path.write_bytes(b"old")
+    mirror = FakeMirror(geosite_dat([("cn", [(2, "a.cn")])]))
+    mirror.sum_override = "0" * 64
+
+    with pytest.raises(RuntimeError, match="checksum_mismatch"):
+        updates.update_dat_file(str(path), URL, download=mirror)
+    assert path.read_bytes() == b"old"
+    assert not (tmp_path / "geosite.dat.tmp").exists()
+    assert updates.get_source(str(path))["status"] == "error"
+
+
+def test_external_replacement_disables_validators(tmp_path):
+    path = tmp_path / "geosite.dat"
+    mirror = FakeMirror(geosite_dat([("cn", [(2, "a.cn")])]), publish_sum=False)
+    assert updates.update_dat_file(str(path), URL, download=mirror)["verified"] == "unavailable"
+
+    path.write_bytes(b"replaced by hand")
+    res = updates.update_dat_file(str(path), URL, download=mirror)
+    assert mirror.requests[-1][1] == {}
+    assert res["unchanged"] is False
+
+
+def test_parse_sha256sum_formats():
+    digest = "ab" * 32
+    assert updates.parse_sha256sum(digest + "\n", "geoip.dat") == digest
+    text = "%s  geoip.dat\n%s *geosite.dat\n" % ("cd" * 32, digest.upper())
+    assert updates.parse_sha256sum(text, "geosite.dat") == digest
+    assert updates.parse_sha256sum("not a sum", "geosite.dat") == ""
+
+
+def test_scheduler_runs_due_sources_only_in_window(tmp_path, monkeypatch):
+    path = str(tmp_path / "geosite.dat")
+    mirror = FakeMirror(geosite_dat([("cn", [(2, "a.cn")])]))
+    updates.update_dat_file(path, URL, download=mirror)
+    updates.set_auto_update(path, True)
+    calls = []
+    monkeypatch.setattr(updates, "update_dat_file", lambda p, u, **kw: calls.append(p) or {"path": p})
+
+    now = time.time()
+    lt = time.localtime(now)
+    here = "%02d:%02d" % (lt.tm_hour, lt.tm_min)
+    monkeypatch.setenv("XKEEN_DAT_UPDATE_WINDOW", "%s-%02d:%02d" % (here, (lt.tm_hour + 1) % 24, lt.tm_min))
+    assert updates.run_due_updates(now) == []
+
+    later = now + 24 * 3600
+    assert [r["path"] for r in updates.run_due_updates(later)] == [path]
+    assert calls == [path]
+
+    monkeypatch.setenv("XKEEN_DAT_UPDATE_WINDOW", "00:00-00:00")
+    assert updates.run_due_updates(later) == []
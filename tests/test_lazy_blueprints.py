@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import importlib
+import sys
+
+import pytest
+
+
+def _create_app(lazy: bool):
+    app_factory = importlib.import_module("app_factory")
+    app = app_factory.create_app(ws_runtime=False, lazy_blueprints=lazy)
+    app.config["TESTING"] = True
+    return app
+
+
+def _blueprint_names(app):
+    return set(app.blueprints.keys())
+
+
+@pytest.mark.linux_only
+def test_eager_mode_registers_every_blueprint(isolated_runtime_env):
+    app = _create_app(False)
+
+    names = _blueprint_names(app)
+    assert {"utils", "capabilities", "startup_report", "mihomo", "routing", "devtools"} <= names
+    assert "xkeen.lazy_blueprints" not in app.extensions
+
+
+@pytest.mark.linux_only
+def test_lazy_mode_defers_heavy_blueprints_until_api_request(isolated_runtime_env):
+    app = _create_app(True)
+    client = app.test_client()
+
+    names = _blueprint_names(app)
+    assert "capabilities" in names
+    assert "mihomo" not in names
+    assert "devtools" not in names
+
+    # Boot paths are served without loading the deferred blueprints.
+    response = client.get("/login", follow_redirects=False)
+    assert response.status_code in (200, 301, 302, 303, 307, 308)
+    assert "mihomo" not in _blueprint_names(app)
+
+    # The startup report is served eagerly: reading it must not trigger the load.
+    endpoints = {rule.rule: rule.endpoint for rule in app.url_map.iter_rules()}
+    assert endpoints["/api/devtools/startup"] == "startup_report.api_devtools_startup"
+    client.get("/api/devtools/startup")
+    assert "mihomo" not in _blueprint_names(app)
+
+    # Any other request loads them once, even after the first request was handled.
+    client.get("/api/devtools/events")
+    assert {"mihomo", "routing", "devtools", "fs"} <= _blueprint_names(app)
+
+    lazy = app.extensions["xkeen.lazy_blueprints"]
+    assert lazy.state == "loaded"
+    assert lazy.trigger == "request:/api/devtools/events"
+    assert lazy.ensure_loaded() is True
+
+
+@pytest.mark.linux_only
+def test_boot_request_served_during_load_does_not_break_registration(isolated_runtime_env):
+    app = _create_app(True)
+    client = app.test_client()
+    lazy = app.extensions["xkeen.lazy_blueprints"]
+    prepare = lazy._prepare
+
+    def prepare_with_concurrent_login():
+        prepare()
+        # A /login request dispatched while the loader is busy marks the app
+        # as having handled a request; registration must still succeed.
+        assert client.get("/login").status_code in (200, 301, 302, 303, 307, 308)
+
+    lazy._prepare = prepare_with_concurrent_login
+    assert lazy.ensure_loaded(trigger="test") is True
+    assert "mihomo" in _blueprint_names(app)
+
+
+@pytest.mark.linux_only
+def test_failed_load_is_retried_by_a_later_trigger(isolated_runtime_env, monkeypatch):
+    from core import lazy_blueprints
+
+    monkeypatch.setattr(lazy_blueprints, "RETRY_AFTER_SECONDS", 0.0)
+    app = _create_app(True)
+    lazy = app.extensions["xkeen.lazy_blueprints"]
+    loader = lazy._loader
+    calls = []
+
+    def flaky_loader(target):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("transient")
+        loader(target)
+
+    lazy._loader = flaky_loader
+    assert lazy.ensure_loaded() is False
+    assert lazy.state == "failed" and lazy.pending
+
+    app.test_client().get("/api/devtools/events")
+    assert lazy.state == "loaded"
+    assert "devtools" in _blueprint_names(app)
+
+
+@pytest.mark.linux_only
+def test_lazy_warmup_loads_in_background(isolated_runtime_env):
+    from core.lazy_blueprints import get_lazy_blueprints
+
+    app = _create_app(True)
+    lazy = get_lazy_blueprints(app)
+    assert lazy is not None and lazy.pending
+
+    assert lazy.start_warmup(delay=0) is True
+    for _ in range(200):
+        if not lazy.pending:
+            break
+        import time
+
+        time.sleep(0.05)
+
+    assert lazy.state == "loaded"
+    assert lazy.trigger == "warmup"
+    assert "mihomo" in _blueprint_names(app)
+
+
+def test_startup_report_records_phases_and_imports():
+    from core import startup_profile
+
+    startup_profile._reset_for_tests()
+    try:
+        assert startup_profile.install_import_profiler(force=True) is True
+        with startup_profile.phase("outer"):
+            with startup_profile.phase("inner"):
+                sys.modules.pop("colorsys", None)
+                importlib.import_module("colorsys")
+        startup_profile.mark("first_request")
+        startup_profile.mark("first_request")
+    finally:
+        startup_profile.uninstall_import_profiler()
+
+    report = startup_profile.startup_report(top=10)
+
+    phases = {p["name"]: p for p in report["phases"]}
+    assert phases["outer"]["depth"] == 0
+    assert phases["inner"]["depth"] == 1
+    assert phases["outer"]["duration_ms"] >= phases["inner"]["duration_ms"]
+    assert list(report["marks"]) == ["first_request"]
+
+    modules = [r["module"] for r in report["imports"]["top_cumulative"]]
+    assert "colorsys" in modules
+    assert report["imports"]["active"] is False
+
+    # The loader proxy is removed from the module after execution.
+    assert type(sys.modules["colorsys"].__loader__).__name__ != "_TimedLoader"
@@ -13,6 +13,7 @@ from pathlib import Path
 import pytest
 
 from services.mihomo_clash_client import (
+    CONNECTION_POOL,
     MihomoClashClient,
     MihomoClashClientError,
     MihomoClashEndpoint,
@@ -122,6 +123,7 @@ def tcp_server(responses):
     try:
         yield server.server_port, handler
     finally:
+        CONNECTION_POOL.clear()
         server.shutdown()
         server.server_close()
         thread.join(timeout=2)
@@ -149,7 +151,7 @@ def test_tcp_client_uses_allowlisted_operation_and_injects_bearer_header():
         {
             "path": "/version",
             "authorization": "Bearer backend-only",
-            "connection": "close",
+            "connection": "keep-alive",
         }
     ]
 
@@ -226,6 +228,7 @@ def test_client_maps_socket_timeout_to_retryable_safe_error():
         with pytest.raises(MihomoClashClientError) as captured:
             client.request_json("slow")
     finally:
+        CONNECTION_POOL.clear()
         server.shutdown()
         server.server_close()
         thread.join(timeout=2)
@@ -462,6 +465,7 @@ def test_unix_socket_client_uses_same_http_contract():
             )
             response = client.request_json("probe")
         finally:
+            CONNECTION_POOL.clear()
             server.shutdown()
             server.server_close()
             thread.join(timeout=2)
@@ -504,3 +508,26 @@ def test_structured_logs_stream_uses_static_debug_format_query():
 
     assert frames == [{"time": "fixture", "level": "info", "message": "one"}]
     assert handler.seen[0]["path"] == "/logs?level=debug&format=structured"
+
+
+def test_keep_alive_connections_are_pooled_and_health_checked():
+    endpoints = {"probe": MihomoClashEndpoint("GET", "/version", 2, 1024)}
+    responses = {"/version": (200, "application/json", b'{"version":"pooled"}')}
+    with tcp_server(responses) as (port, _handler):
+        client = client_for_port(port, endpoints)
+        key = ("tcp", "127.0.0.1", port)
+        created = CONNECTION_POOL.stats["created"]
+        reused = CONNECTION_POOL.stats["reused"]
+
+        for _ in range(3):
+            assert client.request_json("probe").payload == {"version": "pooled"}
+        assert CONNECTION_POOL.stats["created"] - created == 1
+        assert CONNECTION_POOL.stats["reused"] - reused == 2
+        assert CONNECTION_POOL.idle_count(key) == 1
+
+        # A half-closed idle socket fails the health check and is replaced.
+        stale = CONNECTION_POOL._idle[key][0][0]
+        stale.sock.shutdown(socket.SHUT_RD)
+        assert client.request_json("probe").payload == {"version": "pooled"}
+        assert CONNECTION_POOL.stats["created"] - created == 2
+        CONNECTION_POOL.clear()
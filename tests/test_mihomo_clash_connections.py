@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from services.mihomo_clash_connections import (
+    MAX_TRACKED_CONNECTIONS,
+    ConnectionsDeltaTracker,
+    ConnectionsView,
+)
+
+
+def connection(connection_id: str, *, upload=0, download=0, start="", **extra):
+    metadata = {
+        "sourceIP": extra.pop("source_ip", "192.0.2.10"),
+        "host": extra.pop("host", f"{connection_id}.example.test"),
+    }
+    return {
+        "id": connection_id,
+        "upload": upload,
+        "download": download,
+        "start": start or f"2026-01-01T00:00:{connection_id[-1]}0Z",
+        "metadata": metadata,
+        "chains": extra.pop("chains", ["DIRECT"]),
+        "rule": extra.pop("rule", "MATCH"),
+        **extra,
+    }
+
+
+def tracker(view=None):
+    clock = [0.0]
+    return ConnectionsDeltaTracker(view, clock=lambda: clock[0]), clock
+
+
+def test_view_from_query_params_is_bounded_and_falls_back_to_defaults():
+    view = ConnectionsView.from_params(
+        {"sort": ["SPEED"], "dir": ["asc"], "limit": ["5000"], "host": ["video"], "token": ["secret"]}
+    )
+    assert view == ConnectionsView(host="video", sort="speed", direction="asc", limit=1000)
+    assert ConnectionsView.from_params({"sort": "weird", "dir": "up", "limit": "x"}) == ConnectionsView()
+
+
+def test_first_frame_is_snapshot_then_only_changes_are_sent():
+    stream, clock = tracker()
+    first = stream.frame({"connections": [connection("a1"), connection("b2")], "downloadTotal": 7})
+
+    assert first["mode"] == "snapshot"
+    assert first["download_total"] == 7
+    assert [row["id"] for row in first["connections"]] == ["b2", "a1"]
+    assert first["connections"][0]["download_speed"] == 0
+
+    clock[0] = 2.0
+    second = stream.frame({"connections": [connection("a1"), connection("b2", download=4000)]})
+    assert second["mode"] == "delta"
+    assert "connections" not in second
+    assert second["added"] == []
+    assert second["updated"] == [
+        {"id": "b2", "upload": 0, "download": 4000, "upload_speed": 0, "download_speed": 2000}
+    ]
+    assert second["removed"] == [] and second["closed"] == []
+    assert "order" not in second
+
+    clock[0] = 3.0
+    third = stream.frame({"connections": [connection("b2", download=4000), connection("c3", upload=9)]})
+    assert [row["id"] for row in third["added"]] == ["c3"]
+    assert third["closed"] == ["a1"]
+    # b2 stopped transferring, so its derived speed dropped to zero.
+    assert third["updated"] == [
+        {"id": "b2", "upload": 0, "download": 4000, "upload_speed": 0, "download_speed": 0}
+    ]
+    assert third["order"] == ["b2", "c3"]
+
+
+def test_filters_apply_to_every_connection_not_just_the_first_page():
+    connections = [connection(f"n{index}", host="cdn.example.test") for index in range(600)]
+    connections.append(connection("v9", host="video.example.test", download=1))
+    stream, _clock = tracker(ConnectionsView(host="VIDEO"))
+
+    frame = stream.frame({"connections": connections})
+
+    assert [row["id"] for row in frame["connections"]] == ["v9"]
+    assert frame["total_connections"] == 601
+    assert frame["matched_connections"] == 1
+    assert frame["truncated"] is False
+
+
+def test_device_rule_and_chain_filters_match_normalized_fields():
+    rows = [
+        connection("a1", source_ip="192.0.2.10", rule="GEOSITE", rulePayload="youtube", chains=["Auto", "NL"]),
+        connection("b2", source_ip="192.0.2.11", rule="MATCH", chains=["DIRECT"]),
+    ]
+    devices = {"192.0.2.10": {"name": "Laptop"}}
+
+    def visible(view):
+        stream, _clock = tracker(view)
+        return [row["id"] for row in stream.frame({"connections": rows}, device_map=devices)["connections"]]
+
+    assert visible(ConnectionsView(device="laptop")) == ["a1"]
+    assert visible(ConnectionsView(device="192.0.2.11")) == ["b2"]
+    assert visible(ConnectionsView(rule="YouTube")) == ["a1"]
+    assert visible(ConnectionsView(chain="nl")) == ["a1"]
+    assert visible(ConnectionsView(chain="Auto", rule="MATCH")) == []
+
+
+def test_top_n_by_speed_moves_rows_in_and_out_of_the_view():
+    stream, clock = tracker(ConnectionsView(sort="speed", limit=1))
+    first = stream.frame({"connections": [connection("a1"), connection("b2")]})
+    assert [row["id"] for row in first["connections"]] == ["b2"]
+
+    clock[0] = 1.0
+    frame = stream.frame({"connections": [connection("a1", download=500), connection("b2", download=10)]})
+
+    assert [row["id"] for row in frame["added"]] == ["a1"]
+    assert frame["added"][0]["download_speed"] == 500
+    assert frame["removed"] == ["b2"]
+    assert frame["closed"] == []
+    assert frame["order"] == ["a1"]
+    assert frame["matched_connections"] == 2
+    assert frame["truncated"] is True
+
+
+def test_age_sort_descending_lists_the_oldest_connection_first():
+    stream, _clock = tracker(ConnectionsView(sort="age"))
+    frame = stream.frame(
+        {
+            "connections": [
+                connection("a1", start="2026-01-01T10:00:00Z"),
+                connection("b2", start="2026-01-01T08:00:00Z"),
+                connection("c3", start="2026-01-01T09:00:00Z"),
+            ]
+        }
+    )
+    assert [row["id"] for row in frame["connections"]] == ["b2", "c3", "a1"]
+
+
+def test_view_change_resets_to_snapshot_and_device_rename_resends_row():
+    stream, clock = tracker()
+    stream.frame({"connections": [connection("a1")]}, device_map={})
+
+    clock[0] = 1.0
+    renamed = stream.frame({"connections": [connection("a1")]}, device_map={"192.0.2.10": "Phone"})
+    assert renamed["added"][0]["metadata"]["source_name"] == "Phone"
+
+    stream.set_view(ConnectionsView(sort="age"))
+    clock[0] = 2.0
+    frame = stream.frame({"connections": [connection("a1")]}, device_map={"192.0.2.10": "Phone"})
+    assert frame["mode"] == "snapshot"
+    assert frame["view"]["sort"] == "age"
+
+
+def test_tracked_connections_are_bounded():
+    connections = [connection(f"c{index}") for index in range(MAX_TRACKED_CONNECTIONS + 5)]
+    stream, _clock = tracker(ConnectionsView(limit=1))
+
+    frame = stream.frame({"connections": connections})
+
+    assert frame["total_connections"] == MAX_TRACKED_CONNECTIONS + 5
+    assert frame["matched_connections"] == MAX_TRACKED_CONNECTIONS
+    assert frame["truncated"] is True
@@ -517,6 +517,24 @@ def test_connections_ui_has_live_fallback_overview_and_guarded_actions():
     assert "Строка исчезнет после подтверждённого snapshot" in connections
 
 
+def test_connections_stream_uses_server_view_and_delta_frames():
+    markup = _mihomo_markup()
+    client = _text(CLIENT)
+    connections = _text(CONNECTIONS)
+
+    assert "url.searchParams.set('delta', '1');" in client
+    for fragment in (
+        "mihomoClashConnectionsWsUrl(token, streamView())",
+        "next?.mode === 'delta' ? applyDelta(next, receivedAt) : applySnapshot(next, receivedAt)",
+        "ws.send(JSON.stringify({ type: 'view', ...streamView() }))",
+        "SERVER_FILTER_KINDS = new Set(['device', 'rule', 'chain', 'host'])",
+        "data-mihomo-connection-filter-kind",
+        "next.truncated !== true && !next.view",
+    ):
+        assert fragment in connections
+    assert 'data-mihomo-connection-sort="speed"' in markup
+
+
 def test_connections_lifecycle_stops_socket_polling_and_requests_when_hidden():
     feature = _text(FEATURE)
     connections = _text(CONNECTIONS)
@@ -508,6 +508,43 @@ def test_proxy_transport_index_has_router_fallback_without_pyyaml(tmp_path: Path
     assert node["host"] == "cdn.router.test"
 
 
+def test_proxy_transport_index_reparses_only_changed_files(tmp_path: Path, monkeypatch):
+    provider_dir = tmp_path / "proxy_providers"
+    provider_dir.mkdir()
+    for name in ("a", "b"):
+        (provider_dir / f"{name}.yaml").write_text(
+            f"proxies:\n  - name: {name}-node\n    server: 203.0.113.1\n    port: 443\n",
+            encoding="utf-8",
+        )
+    config = tmp_path / "config.yaml"
+    config.write_text(
+        "proxy-providers:\n  a: {type: http, path: ./proxy_providers/a.yaml}\n"
+        "  b: {type: http, path: ./proxy_providers/b.yaml}\n",
+        encoding="utf-8",
+    )
+    parsed = []
+    for name in ("_index_config_text", "_index_provider_text"):
+        real = getattr(mihomo_clash_routes, name)
+        monkeypatch.setattr(
+            mihomo_clash_routes, name, lambda text, _real=real, _name=name: parsed.append(_name) or _real(text)
+        )
+
+    first = _load_proxy_transport_index(str(config), str(tmp_path))
+    assert sorted(first["providers"]) == ["a", "b"]
+    assert len(parsed) == 3
+    assert _load_proxy_transport_index(str(config), str(tmp_path)) == first
+    assert len(parsed) == 3
+
+    (provider_dir / "b.yaml").write_text(
+        "proxies:\n  - name: b-node-2\n    server: 203.0.113.2\n    port: 8443\n",
+        encoding="utf-8",
+    )
+    refreshed = _load_proxy_transport_index(str(config), str(tmp_path))
+    assert parsed[3:] == ["_index_provider_text"]
+    assert list(refreshed["providers"]["b"]) == ["b-node-2"]
+    assert refreshed["providers"]["a"] is first["providers"]["a"]
+
+
 def test_proxy_groups_route_returns_versioned_normalized_payload():
     client = StubClient(
         responses={
@@ -120,3 +120,57 @@ def test_ambiguous_yaml_returns_safe_parse_diagnostic(tmp_path: Path):
     assert result.target is None
     assert diagnostic_codes(result) == {"config_parse_failed"}
     assert "test-secret" not in repr(result)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "port: 7890\nexternal-controller: 127.0.0.1:9090 # tcp\nsecret: 12345\nrules:\n- MATCH,DIRECT\n",
+        "---\n# head\nsecret: 'a''b'\nexternal-controller-unix: run/mihomo.sock\n",
+        "secret: |\n  multi\n  line\nexternal-controller: 127.0.0.1:9090\n",
+        "secret: &s value\nother: *s\nexternal-controller: :9090\n",
+        "secret: true\n",
+        "- not\n- a mapping\n",
+    ],
+)
+def test_top_level_scan_matches_full_yaml_parse(text: str):
+    yaml = pytest.importorskip("yaml")
+    try:
+        expected = yaml.safe_load(text)
+    except Exception:
+        expected = None
+    if not isinstance(expected, dict):
+        with pytest.raises(ValueError):
+            parse_mihomo_clash_config(text)
+        return
+    wanted = {k: v for k, v in expected.items() if k in ("secret", "external-controller", "external-controller-unix")}
+    assert parse_mihomo_clash_config(text) == wanted
+
+
+def test_large_config_is_not_fully_parsed(monkeypatch):
+    yaml = pytest.importorskip("yaml")
+    seen = []
+    real = yaml.safe_load
+    monkeypatch.setattr(target_module._yaml, "safe_load", lambda text: seen.append(len(text)) or real(text))
+    rules = "".join("  - DOMAIN-SUFFIX,site%d.example,PROXY\n" % i for i in range(20000))
+    text = "mixed-port: 7890\nrules:\n" + rules + "external-controller: 127.0.0.1:9090\nsecret: s3\n"
+
+    assert parse_mihomo_clash_config(text) == {"external-controller": "127.0.0.1:9090", "secret": "s3"}
+    assert seen and max(seen) < 100
+
+
+def test_discovery_is_memoized_until_config_changes(tmp_path: Path, monkeypatch):
+    root = tmp_path / "mihomo"
+    config = write_config(root, "external-controller: 127.0.0.1:9090\n")
+    calls = []
+    real = target_module._discover
+    monkeypatch.setattr(target_module, "_discover", lambda *a, **kw: calls.append(1) or real(*a, **kw))
+
+    first = discover_mihomo_clash_target(config, root)
+    assert discover_mihomo_clash_target(config, root) is first
+    assert len(calls) == 1
+
+    config.write_text("external-controller: 127.0.0.1:9191\n", encoding="utf-8")
+    second = discover_mihomo_clash_target(config, root, environ={"XKEEN_CLASH_API_ALLOWED_PORTS": "9191"})
+    assert second.target is not None and second.target.port == 9191
+    assert len(calls) == 2
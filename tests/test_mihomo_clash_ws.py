@@ -265,3 +265,63 @@ def test_ws_global_limit_is_race_safe():
     assert len(accepted) == clash_ws.MAX_ACTIVE_STREAMS
     for key in accepted:
         clash_ws._release_stream(key)
+
+
+def test_ws_delta_mode_sends_snapshot_then_changes_for_requested_view(monkeypatch):
+    ws = StubWebSocket(fail_after=2)
+    client = StubClient(
+        [
+            {"connections": [{"id": "one", "download": 1, "metadata": {"host": "video.test"}}, {"id": "two", "metadata": {"host": "other.test"}}]},
+            {"connections": [{"id": "one", "download": 9, "metadata": {"host": "video.test"}}]},
+        ]
+    )
+    monkeypatch.setattr("services.mihomo_clash_ws._cooperative_sleep", lambda _seconds: None)
+    handle_mihomo_clash_connections_request(
+        environ(ws, QUERY_STRING="token=one-time-secret&delta=1&host=video&sort=speed"),
+        lambda *_args: None,
+        fallback_app=lambda *_args: [],
+        validate_ws_token=lambda _token, scope: scope == "mihomo-clash",
+        ws_debug=lambda *_args, **_kwargs: None,
+        mihomo_config_file="/safe/config.yaml",
+        mihomo_root="/safe",
+        discovery_factory=lambda *_args: discovery(),
+        client_factory=lambda _target: client,
+        device_map_factory=lambda: {},
+    )
+
+    snapshot, delta = (message["payload"] for message in ws.messages)
+    assert snapshot["mode"] == "snapshot"
+    assert snapshot["view"]["sort"] == "speed"
+    assert [row["id"] for row in snapshot["connections"]] == ["one"]
+    assert snapshot["total_connections"] == 2
+    assert delta["mode"] == "delta"
+    assert delta["updated"][0]["id"] == "one"
+    assert delta["updated"][0]["download"] == 9
+    assert delta["added"] == [] and delta["closed"] == []
+
+
+def test_view_messages_update_inbox_and_ignore_noise():
+    class ReceivingWebSocket:
+        def __init__(self, messages):
+            self.messages = list(messages)
+
+        def receive(self):
+            return self.messages.pop(0) if self.messages else None
+
+    inbox = clash_ws._ViewInbox()
+    clash_ws._read_view_messages(
+        ReceivingWebSocket(
+            [
+                "not json",
+                json.dumps({"type": "other", "sort": "age"}),
+                json.dumps({"type": "view", "sort": "age", "chain": "NL", "padding": "x" * 5000}),
+                json.dumps({"type": "view", "sort": "speed", "limit": 50}).encode(),
+            ]
+        ),
+        inbox,
+    )
+
+    view = inbox.take()
+    assert view.sort == "speed" and view.limit == 50 and view.chain == ""
+    assert inbox.take() is None
+    assert inbox.closed.is_set() is True
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from services import mihomo_subscriptions as subs
+from services.mihomo_config_index import ConfigDocument, ConfigIndex, config_index
+from services.mihomo_proxy_config import apply_proxy_insert, rename_proxy_in_config
+
+
+CONFIG = (
+    "mixed-port: 7890\n"
+    "proxies:\n"
+    "  - name: \"A one\"\n"
+    "    type: ss\n"
+    "\n"
+    "  - name: 'B''s'\n"
+    "    type: ss\n"
+    "proxy-groups:\n"
+    "  - name: Main\n"
+    "    type: select\n"
+    "    proxies:\n"
+    "      - \"A one\"\n"
+    "      - DIRECT  # fallback\n"
+    "  - name: Inline\n"
+    "    proxies: [\"B's\", DIRECT]\n"
+    "  - name: Auto\n"
+    "    include-all: false\n"
+    "  - name: All\n"
+    "    include-all: true\n"
+    "rules:\n"
+    "  - MATCH,Main\n"
+)
+
+
+def _shape(index: ConfigIndex):
+    return (
+        [(s.key, s.start, s.end) for s in index.sections],
+        [(b.name, b.start, b.end) for b in index.proxies],
+        [
+            (g.name, g.start, g.end, g.include_all, g.proxies_line, g.inline, g.members)
+            for g in index.groups
+        ],
+    )
+
+
+def test_index_records_sections_proxies_and_group_members():
+    index = config_index(CONFIG)
+    assert config_index(CONFIG) is index
+    assert [(s.key, s.start, s.end) for s in index.sections] == [
+        ("mixed-port", 0, 1),
+        ("proxies", 1, 7),
+        ("proxy-groups", 7, 19),
+        ("rules", 19, 21),
+    ]
+    assert [(b.name, b.start, b.end) for b in index.proxies] == [("A one", 2, 5), ("B's", 5, 7)]
+    main = index.group("Main")
+    assert main.members == [(11, "A one"), (12, "DIRECT")]
+    assert index.group("Inline").inline is True
+    assert index.group("Auto").include_all is False and index.group("All").include_all is True
+
+
+def test_incremental_updates_match_a_fresh_index():
+    doc = ConfigDocument(CONFIG)
+    doc.rename_proxy("B's", "Bee")
+    doc.remove_group_references(["A one"])
+    doc.remove_proxies(["A one"])
+    doc.insert_proxies([["- name: C", "  type: ss"], ["- name: D", "  type: ss"]])
+    doc.add_to_groups(["C", "D"], ["Main", "Inline", "Auto", "All"])
+    assert _shape(doc.index) == _shape(ConfigIndex.build(doc.lines))
+
+    text = doc.text()
+    assert '      - DIRECT  # fallback\n      - "C"\n      - "D"\n' in text
+    assert 'proxies: ["Bee", DIRECT, C, D]' in text
+    assert '  - name: Auto\n    include-all: false\n    proxies:\n      - "C"\n      - "D"\n' in text
+    assert "A one" not in text
+    assert _shape(config_index(text)) == _shape(doc.index)
+
+
+def test_patch_helpers_keep_their_text_contract():
+    patched = apply_proxy_insert(CONFIG, "- name: New\n  type: ss\n", "New", ["Main"])
+    assert '  - name: \'B\'\'s\'\n    type: ss\n\n  - name: New\n    type: ss\n\nproxy-groups:' in patched
+    assert '      - "New"' in patched
+
+    renamed = rename_proxy_in_config(CONFIG, "A one", "Renamed")
+    assert '  - name: "Renamed"' in renamed
+    assert '      - "Renamed"' in renamed
+
+
+def test_subscription_refresh_replaces_hundreds_of_proxies_in_one_pass():
+    old = ["old-%03d" % i for i in range(300)]
+    config = (
+        "proxies:\n"
+        + "".join(f"  - name: {n}\n    type: ss\n    server: 1.1.1.1\n\n" for n in old)
+        + "proxy-groups:\n  - name: Main\n    type: select\n    proxies:\n"
+        + "".join(f"      - {n}\n" for n in old)
+        + "      - DIRECT\n"
+    )
+    new_blocks = [f"- name: new-{i:03d}\n  type: ss\n  server: 2.2.2.2" for i in range(300)]
+
+    patched = subs._replace_config_subscription_blocks(
+        config, old_proxy_names=old, new_proxy_blocks=new_blocks, groups=["Main"]
+    )
+
+    index = config_index(patched)
+    assert index.proxy_names() == ["new-%03d" % i for i in range(300)]
+    assert [name for _pos, name in index.group("Main").members] == ["DIRECT"] + ["new-%03d" % i for i in range(300)]
+    assert "old-" not in patched
+
+
+def _safe_dumped_config() -> str:
+    import yaml
+
+    return yaml.safe_dump(
+        {
+            "mixed-port": 7890,
+            "proxies": [
+                {"name": "x", "type": "ss", "server": "1.1.1.1"},
+                {"name": "y", "type": "ss", "server": "1.1.1.2"},
+            ],
+            "proxy-groups": [
+                {"name": "Main", "type": "select", "proxies": ["x", "DIRECT"]},
+                {"name": "Auto", "proxies": ["y"], "type": "url-test"},
+            ],
+            "rules": ["MATCH,Main"],
+        },
+        sort_keys=False,
+        allow_unicode=True,
+    )
+
+
+def test_safe_dump_layout_members_are_indexed_and_patched():
+    import yaml
+
+    config = _safe_dumped_config()
+    # safe_dump writes list items at the indent of their key.
+    assert "  proxies:\n  - x\n  - DIRECT\n" in config
+
+    index = config_index(config)
+    assert [name for _pos, name in index.group("Main").members] == ["x", "DIRECT"]
+    assert [name for _pos, name in index.group("Auto").members] == ["y"]
+
+    renamed = yaml.safe_load(rename_proxy_in_config(config, "x", "z"))
+    assert [p["name"] for p in renamed["proxies"]] == ["z", "y"]
+    assert renamed["proxy-groups"][0]["proxies"] == ["z", "DIRECT"]
+
+    inserted = yaml.safe_load(apply_proxy_insert(config, "- name: z\n  type: ss\n", "z", ["Main", "Auto"]))
+    assert [p["name"] for p in inserted["proxies"]] == ["x", "y", "z"]
+    assert inserted["proxy-groups"][0] == {"name": "Main", "type": "select", "proxies": ["x", "DIRECT", "z"]}
+    assert inserted["proxy-groups"][1]["proxies"] == ["y", "z"]
+
+
+def test_subscription_refresh_of_a_safe_dumped_config_stays_valid_yaml():
+    import yaml
+
+    patched = subs._replace_config_subscription_blocks(
+        _safe_dumped_config(),
+        old_proxy_names=["x", "y"],
+        new_proxy_blocks=["- name: n1\n  type: ss", "- name: n2\n  type: ss"],
+        groups=["Main"],
+    )
+
+    data = yaml.safe_load(patched)
+    assert [p["name"] for p in data["proxies"]] == ["n1", "n2"]
+    assert data["proxy-groups"][0]["proxies"] == ["DIRECT", "n1", "n2"]
+    # Removed members leave an empty list behind, as in the indented layout.
+    assert data["proxy-groups"][1] == {"name": "Auto", "proxies": None, "type": "url-test"}
@@ -10,6 +10,7 @@ from routes import mihomo
 
 @pytest.fixture()
 def client(tmp_path):
+    mihomo._mh_provider_cache.clear()
     cfg = tmp_path / "config.yaml"
     cfg.write_text("proxy-providers: {}\n", encoding="utf-8")
     bp = mihomo.create_mihomo_blueprint(
@@ -525,6 +526,32 @@ def test_regular_provider_adapter_route_fetches_without_hwid_headers(monkeypatch
     assert denied.status_code == 403
 
 
+def test_provider_adapter_serves_cached_payload_when_upstream_fails(monkeypatch, client):
+    calls = []
+
+    def fake_fetch(url, *, headers, insecure, timeout, policy):
+        calls.append(dict(headers))
+        if len(calls) > 1:
+            raise OSError("upstream down")
+        return "proxies: []\n", {"etag": '"v1"'}
+
+    monkeypatch.setattr(mihomo, "_mh_hwid_fetch_provider_payload", fake_fetch)
+    url = "/mihomo/provider.yaml?url=https%3A%2F%2Fprovider.example%2Fcached"
+
+    first = client.get(url)
+    assert first.headers["X-Xkeen-Provider-Cache"] == "miss"
+    second = client.get(url)
+    assert second.headers["X-Xkeen-Provider-Cache"] == "hit"
+    assert second.get_data(as_text=True) == "proxies: []\n"
+    assert len(calls) == 1
+
+    monkeypatch.setattr(mihomo._mh_provider_cache, "ttl", 0.0)
+    stale = client.get(url)
+    assert stale.status_code == 200
+    assert stale.headers["X-Xkeen-Provider-Cache"] == "stale"
+    assert stale.get_data(as_text=True) == "proxies: []\n"
+
+
 def test_regular_provider_probe_fetches_without_hwid_headers(monkeypatch, client):
     probe_calls = []
     fetch_calls = []
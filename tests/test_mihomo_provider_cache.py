@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from services.mihomo_provider_cache import ProviderPayloadCache, cache_key
+from services.url_policy import NotModifiedError
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _wait_idle(cache: ProviderPayloadCache) -> None:
+    deadline = time.time() + 5
+    while cache._inflight and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_stale_entries_are_served_while_revalidating():
+    clock = _Clock()
+    cache = ProviderPayloadCache(ttl=60, stale_if_error=600, clock=clock)
+    sent = []
+
+    def fetch(conditional):
+        sent.append(conditional)
+        if conditional:
+            raise NotModifiedError("not_modified")
+        return "payload-1", {"etag": '"abc"', "last_modified": "Tue, 01 Oct 2026 00:00:00 GMT"}
+
+    assert cache.get("k", fetch)[::2] == ("payload-1", "miss")
+    assert cache.get("k", fetch)[::2] == ("payload-1", "hit")
+
+    clock.now += 61
+    assert cache.get("k", fetch)[::2] == ("payload-1", "stale")
+    _wait_idle(cache)
+    assert sent[-1] == {"If-None-Match": '"abc"', "If-Modified-Since": "Tue, 01 Oct 2026 00:00:00 GMT"}
+    assert cache.stats["revalidated"] == 1
+    assert cache.get("k", fetch)[2] == "hit"
+
+
+def test_errors_serve_stale_until_the_window_ends():
+    clock = _Clock()
+    cache = ProviderPayloadCache(ttl=60, stale_if_error=600, clock=clock)
+    cache.get("k", lambda _c: ("good", {}))
+
+    def broken(_conditional):
+        raise OSError("upstream down")
+
+    clock.now += 300
+    assert cache.get("k", broken)[::2] == ("good", "stale")
+    _wait_idle(cache)
+    assert cache.stats["refresh_errors"] == 1
+
+    clock.now += 600
+    with pytest.raises(OSError):
+        cache.get("k", broken)
+
+
+def test_old_entries_are_refetched_inline_with_a_bounded_wait():
+    clock = _Clock()
+    cache = ProviderPayloadCache(ttl=60, stale_while_revalidate=30, revalidate_timeout=0.2, stale_if_error=600, clock=clock)
+    cache.get("k", lambda _c: ("v1", {}))
+
+    # Past the stale-while-revalidate window a healthy upstream wins.
+    clock.now += 120
+    assert cache.get("k", lambda _c: ("v2", {}))[::2] == ("v2", "miss")
+
+    release = threading.Event()
+
+    def slow(_conditional):
+        release.wait(5)
+        return "v3", {}
+
+    clock.now += 120
+    started = time.monotonic()
+    assert cache.get("k", slow)[::2] == ("v2", "stale")
+    assert time.monotonic() - started < 2
+    release.set()
+    _wait_idle(cache)
+    assert cache.get("k", slow)[::2] == ("v3", "hit")
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = ProviderPayloadCache()
+    calls = []
+
+    def slow(_conditional):
+        calls.append(1)
+        time.sleep(0.2)
+        return "payload", {}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("k", slow)[0])) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert calls == [1] and results == ["payload"] * 4
+
+
+def test_total_bytes_are_bounded_lru():
+    cache = ProviderPayloadCache(max_bytes=10)
+    for key in "abc":
+        cache.get(key, lambda _c: ("x" * 4, {}))
+    assert list(cache._entries) == ["b", "c"] and cache._bytes == 8
+    assert cache.get("big", lambda _c: ("y" * 50, {}))[0] == "y" * 50
+    assert "big" not in cache._entries
+
+
+def test_cache_key_depends_on_request_headers():
+    base = cache_key("https://p.example/sub", insecure=False, headers={"x-hwid": "A"})
+    assert base == cache_key("https://p.example/sub", insecure=False, headers={"X-HWID": "A"})
+    assert base != cache_key("https://p.example/sub", insecure=False, headers={"x-hwid": "B"})
+    assert base != cache_key("https://p.example/sub", insecure=True, headers={"x-hwid": "A"})
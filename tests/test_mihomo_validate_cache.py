@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+import pytest
+
+from services import mihomo_runtime as runtime
+
+
+@pytest.fixture
+def mihomo_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(runtime, "MIHOMO_ROOT", tmp_path)
+    monkeypatch.setattr(runtime, "CONFIG_PATH", tmp_path / "config.yaml")
+    monkeypatch.setattr(runtime, "PROFILES_DIR", tmp_path / "profiles")
+    monkeypatch.setattr(runtime, "BACKUP_DIR", tmp_path / "backup")
+    monkeypatch.setenv("MIHOMO_VALIDATE_CMD", "echo run >> {root}/runs; cat {config} > /dev/null")
+    runtime.clear_validation_cache()
+    yield tmp_path
+    runtime.clear_validation_cache()
+
+
+def _runs(root) -> int:
+    try:
+        return len((root / "runs").read_text().splitlines())
+    except FileNotFoundError:
+        return 0
+
+
+def test_validation_is_memoized_by_content_and_referenced_files(mihomo_root):
+    provider = mihomo_root / "providers" / "sub.yaml"
+    provider.parent.mkdir()
+    provider.write_text("proxies: []\n")
+    config = "proxy-providers:\n  sub:\n    type: file\n    path: ./providers/sub.yaml\n"
+
+    first = runtime.validate_config(new_content=config)
+    assert "[exit code: 0]" in first
+    assert runtime.validate_config(new_content=config) == first
+    assert _runs(mihomo_root) == 1
+    assert not (mihomo_root / "config-validate.yaml").exists()
+
+    provider.write_text("proxies: [a]\n")
+    os.utime(provider, ns=(time.time_ns(), time.time_ns() + 10**9))
+    runtime.validate_config(new_content=config)
+    assert _runs(mihomo_root) == 2
+
+    runtime.validate_config(new_content=config + "mode: rule\n")
+    assert _runs(mihomo_root) == 3
+
+
+def test_failed_runner_is_not_cached(mihomo_root, monkeypatch):
+    monkeypatch.delenv("MIHOMO_VALIDATE_CMD")
+    assert "MIHOMO_VALIDATE_CMD is not set" in runtime.validate_config(new_content="mode: rule\n")
+    monkeypatch.setenv("MIHOMO_VALIDATE_CMD", "echo run >> {root}/runs")
+    assert "[exit code: 0]" in runtime.validate_config(new_content="mode: rule\n")
+    assert _runs(mihomo_root) == 1
+
+
+def test_concurrent_validations_share_one_run(mihomo_root, monkeypatch):
+    calls = []
+
+    def slow_run(new_content):
+        calls.append(new_content)
+        time.sleep(0.2)
+        return "$ mihomo -t\n\n[exit code: 0]\n"
+
+    monkeypatch.setattr(runtime, "_run_validation", slow_run)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(runtime.validate_config(new_content="mode: rule\n")))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    assert len(calls) == 1
+    assert results == ["$ mihomo -t\n\n[exit code: 0]\n"] * 4
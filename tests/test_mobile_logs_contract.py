@@ -212,3 +212,142 @@ def test_mobile_logs_can_include_large_one_shot_domain_seed(tmp_path, monkeypatc
         "2026/07/16 18:04:00 [Info] [12345] sniffed domain: example.com",
         "2026/07/16 18:04:00 [Info] [12345] dialing tcp to tcp:203.0.113.7:443",
     ]
+
+
+def _fast_notifier(monkeypatch, mobile_routes):
+    from services.file_change_notifier import FileChangeNotifier
+
+    notifier = FileChangeNotifier(interval=0.02)
+    monkeypatch.setattr(mobile_routes, "_mobile_log_notifier", lambda: notifier)
+    monkeypatch.setattr(mobile_routes, "_MOBILE_LOG_COALESCE_SECONDS", 0.0)
+    return notifier
+
+
+def test_mobile_logs_long_poll_times_out_without_new_bytes(tmp_path, monkeypatch):
+    client, _error_log, _access_log = _build_client(tmp_path, monkeypatch)
+    import routes.mobile as mobile_routes
+
+    notifier = _fast_notifier(monkeypatch, mobile_routes)
+    _login(client)
+    initial = client.get("/api/mobile/v1/logs").get_json()
+
+    response = client.get(
+        "/api/mobile/v1/logs",
+        query_string={
+            "error-cursor": _stream(initial, "error")["cursor"],
+            "access-cursor": _stream(initial, "access")["cursor"],
+            "wait": "0.2",
+        },
+    )
+
+    data = response.get_json()["data"]
+    assert data["poll"]["timed_out"] is True
+    assert data["poll"]["waited_ms"] >= 150
+    assert all(stream["mode"] == "append" and stream["entries"] == [] for stream in data["streams"])
+    assert list(notifier.watched_paths()) == []
+
+
+def test_mobile_logs_long_poll_wakes_on_append(tmp_path, monkeypatch):
+    import threading
+    import time
+
+    client, error_log, _access_log = _build_client(tmp_path, monkeypatch)
+    import routes.mobile as mobile_routes
+
+    _fast_notifier(monkeypatch, mobile_routes)
+    _login(client)
+    initial = client.get("/api/mobile/v1/logs").get_json()
+
+    def _append_later():
+        time.sleep(0.1)
+        with error_log.open("a", encoding="utf-8") as handle:
+            handle.write("2026/07/16 18:07:00 [Info] late line\n")
+
+    writer = threading.Thread(target=_append_later)
+    writer.start()
+    started = time.monotonic()
+    response = client.get(
+        "/api/mobile/v1/logs",
+        query_string={
+            "error-cursor": _stream(initial, "error")["cursor"],
+            "access-cursor": _stream(initial, "access")["cursor"],
+            "wait": "10",
+        },
+    )
+    writer.join()
+
+    data = response.get_json()["data"]
+    assert time.monotonic() - started < 5
+    assert data["poll"]["timed_out"] is False
+    assert [entry["message"] for entry in _stream({"data": data}, "error")["entries"]] == [
+        "2026/07/16 18:07:00 [Info] late line"
+    ]
+
+
+def test_mobile_logs_long_poll_answers_snapshots_immediately(tmp_path, monkeypatch):
+    import time
+
+    client, _error_log, _access_log = _build_client(tmp_path, monkeypatch)
+    import routes.mobile as mobile_routes
+
+    _fast_notifier(monkeypatch, mobile_routes)
+    _login(client)
+
+    started = time.monotonic()
+    data = client.get("/api/mobile/v1/logs", query_string={"wait": "10"}).get_json()["data"]
+
+    assert time.monotonic() - started < 2
+    assert data["poll"]["timed_out"] is False
+    assert _stream({"data": data}, "error")["mode"] == "snapshot"
+
+
+def test_mobile_logs_long_poll_waits_when_one_log_is_missing(tmp_path, monkeypatch):
+    import threading
+    import time
+
+    client, _error_log, access_log = _build_client(tmp_path, monkeypatch)
+    import routes.mobile as mobile_routes
+
+    _fast_notifier(monkeypatch, mobile_routes)
+    access_log.unlink()
+    _login(client)
+    initial = client.get("/api/mobile/v1/logs").get_json()
+    assert _stream(initial, "access")["cursor"] == ""
+    query = {"error-cursor": _stream(initial, "error")["cursor"], "access-cursor": ""}
+
+    timed_out = client.get("/api/mobile/v1/logs", query_string={**query, "wait": "0.2"}).get_json()["data"]
+    assert timed_out["poll"]["timed_out"] is True
+    assert timed_out["poll"]["waited_ms"] >= 150
+
+    def _create_later():
+        time.sleep(0.1)
+        access_log.write_text("2026/07/16 18:08:00 from 192.0.2.5 accepted\n", encoding="utf-8")
+
+    writer = threading.Thread(target=_create_later)
+    writer.start()
+    started = time.monotonic()
+    woken = client.get("/api/mobile/v1/logs", query_string={**query, "wait": "10"}).get_json()["data"]
+    writer.join()
+
+    assert time.monotonic() - started < 5
+    assert woken["poll"]["timed_out"] is False
+    assert _stream({"data": woken}, "access")["mode"] == "snapshot"
+    assert _stream({"data": woken}, "access")["available"] is True
+
+
+def test_mobile_logs_domain_map_uses_incremental_index(tmp_path, monkeypatch):
+    import services.xray_domain_index as domain_index
+
+    client, error_log, _access_log = _build_client(tmp_path, monkeypatch)
+    monkeypatch.setattr(domain_index, "_INDEX", None)
+    error_log.write_text(
+        "2026/07/16 18:04:00 [Info] [12345] app/dispatcher: sniffed domain: example.com\n"
+        "2026/07/16 18:04:00 [Info] [12345] transport/internet/tcp: dialing TCP to tcp:203.0.113.7:443\n",
+        encoding="utf-8",
+    )
+    _login(client)
+
+    data = client.get("/api/mobile/v1/logs", query_string={"include-domain-map": "1"}).get_json()["data"]
+
+    assert data["domain_map"] == {"203.0.113.7": "example.com"}
+    assert "domain_seed" not in data
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import pytest
+
+from services.geodat import match_index
+from services.routing import simulator
+from services.routing.simulator import RoutingSimulator
+from tests.support.dat_builder import geoip_dat, geosite_dat
+
+
+@pytest.fixture(autouse=True)
+def _fresh_caches(monkeypatch, tmp_path):
+    monkeypatch.setattr(simulator, "_RULE_CACHE", simulator.OrderedDict())
+    monkeypatch.setattr(match_index, "_CACHE", match_index.OrderedDict())
+    monkeypatch.setenv("XKEEN_GEODAT_INDEX_DIR", "off")
+
+
+@pytest.fixture
+def asset_dir(tmp_path):
+    (tmp_path / "geosite.dat").write_bytes(geosite_dat([
+        ("google", [(2, "google.com"), (3, "www.youtube.com")]),
+        ("category-ads", [(1, r"^ads\.")]),
+    ]))
+    (tmp_path / "geoip.dat").write_bytes(geoip_dat([("ru", ["5.0.0.0/8"]), ("private", ["10.0.0.0/8"])]))
+    # The simulator never compiles inside a request; warm the indexes first.
+    match_index.get_match_index("geosite", str(tmp_path / "geosite.dat"))
+    match_index.get_match_index("geoip", str(tmp_path / "geoip.dat"))
+    return str(tmp_path)
+
+
+ROUTING = {
+    "domainStrategy": "IPIfNonMatch",
+    "balancers": [{"tag": "auto", "selector": ["vless-"]}],
+    "rules": [
+        {"inboundTag": ["api"], "outboundTag": "api"},
+        {"domain": ["geosite:category-ads"], "outboundTag": "block", "ruleTag": "ads"},
+        {"domain": ["geosite:google", "domain:example.org"], "balancerTag": "auto"},
+        {"ip": ["10.0.0.0/8", "geoip:ru"], "outboundTag": "direct"},
+        {"network": "udp", "port": "443", "outboundTag": "block"},
+        {"domain": ["full:mail.example.org"], "outboundTag": "direct"},
+        {"ip": ["10.1.0.0/16"], "port": "80,443", "outboundTag": "direct"},
+        {"ip": ["geoip:!ru"], "port": "1000-2000", "outboundTag": "vless-b"},
+    ],
+}
+
+
+def _pick(results):
+    return [(r["rule_index"], r["outbound"] or r["balancer"]) for r in results]
+
+
+def test_queries_resolve_to_first_matching_rule(asset_dir):
+    sim = RoutingSimulator(ROUTING, asset_dir=asset_dir, outbound_tags=["vless-a", "direct", "block", "vless-b"])
+    results = sim.simulate([
+        {"domain": "ads.site.net", "port": 443},
+        {"domain": "Maps.Google.com.", "port": 443},
+        {"domain": "x.com", "ip": "5.6.7.8"},
+        {"domain": "x.com", "ip": "1.1.1.1", "port": 443, "network": "udp"},
+        {"ip": "8.8.8.8", "port": 1500},
+        {"domain": "x.com", "inbound": "api"},
+        {"domain": "unknown.net", "port": 80},
+        {"port": 80},
+    ])
+    assert _pick(results[:7]) == [
+        (1, "block"), (2, "auto"), (3, "direct"), (4, "block"), (7, "vless-b"), (0, "api"), (None, "vless-a"),
+    ]
+    assert results[0]["rule_tag"] == "ads"
+    assert results[1]["candidates"] == ["vless-a", "vless-b"]
+    assert results[6]["default"] is True
+    assert results[7]["ok"] is False
+    assert all(r["elapsed_us"] >= 0 for r in results[:7])
+
+
+def test_shadowed_rules_are_reported(asset_dir):
+    sim = RoutingSimulator(ROUTING, asset_dir=asset_dir)
+    assert sim.shadows() == [
+        {"rule_index": 2, "shadows": [5], "count": 1},
+        {"rule_index": 3, "shadows": [6], "count": 1},
+    ]
+
+
+def test_recompile_reuses_unchanged_rules(asset_dir):
+    first = RoutingSimulator(ROUTING, asset_dir=asset_dir)
+    assert first.reused == 0
+    edited = dict(ROUTING, rules=ROUTING["rules"][:-1] + [{"port": "22", "outboundTag": "direct"}])
+    second = RoutingSimulator(edited, asset_dir=asset_dir)
+    assert second.reused == len(ROUTING["rules"]) - 1
+    assert second.rules[0] is first.rules[0]
+
+
+def test_unsupported_fields_and_missing_dat_warn(tmp_path):
+    sim = RoutingSimulator(
+        {"rules": [
+            {"attrs": {":method": "GET"}, "outboundTag": "a"},
+            {"domain": ["ext:missing.dat:foo"], "outboundTag": "b"},
+            {"outboundTag": "c"},
+        ]},
+        asset_dir=str(tmp_path),
+        outbound_tags=["d"],
+    )
+    res = sim.simulate([{"domain": "foo.com"}])
+    assert _pick(res) == [(None, "d")]
+    messages = [w["message"] for w in sim.warnings()]
+    assert "attrs: field is not simulated" in messages
+    assert "rule has no conditions" in messages
+    assert "DAT not available: missing.dat" in messages
+
+
+def test_rules_are_not_simulated_while_the_index_builds(asset_dir, monkeypatch):
+    monkeypatch.setattr(match_index, "_CACHE", match_index.OrderedDict())
+    monkeypatch.setattr(match_index, "_BUILDING", set())
+    monkeypatch.setattr(match_index.threading.Thread, "start", lambda self: None)
+    monkeypatch.setattr(match_index, "compile_match_index", lambda k, p: pytest.fail("compiled inline"))
+    sim = RoutingSimulator(ROUTING, asset_dir=asset_dir, outbound_tags=["vless-a", "direct"])
+
+    res = sim.simulate([{"domain": "www.google.com", "port": 443}, {"domain": "mail.example.org"}])
+    assert res[0]["rule_index"] is None and res[0]["not_simulated"] == [1, 2]
+    assert res[1]["rule_index"] == 2 and res[1]["not_simulated"] == [1]
+    messages = [w["message"] for w in sim.warnings()]
+    assert "DAT index building, rules using geosite.dat are not simulated yet" in messages
+    assert not any(m.startswith("DAT not available") for m in messages)
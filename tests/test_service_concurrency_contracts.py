@@ -9,7 +9,7 @@ def test_events_service_exposes_locked_subscriber_helpers_and_run_server_uses_th
 
     assert 'import threading' in events_text
     assert '_EVENT_SUBSCRIBERS_LOCK: threading.Lock = threading.Lock()' in events_text
-    assert 'def subscribe(ws: Any) -> None:' in events_text
+    assert 'def subscribe(ws: Any, topics: Optional[Iterable[str]] = None, *, client: str = "") -> EventSubscriber:' in events_text
     assert 'def unsubscribe(ws: Any) -> None:' in events_text
     assert 'with _EVENT_SUBSCRIBERS_LOCK:' in events_text
     assert 'snapshot = list(EVENT_SUBSCRIBERS)' in events_text
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+
+from services import ui_settings, xray_device_names
+from services.io.state_store import JsonStateStore
+
+
+def test_load_caches_until_file_identity_changes(tmp_path):
+    calls = []
+    store = JsonStateStore(lambda raw: calls.append(raw) or {"items": sorted(raw.get("items", []))})
+    path = tmp_path / "state.json"
+    path.write_text('{"items": [2, 1]}')
+
+    first = store.load(str(path), {})
+    first["items"].append(99)
+    assert store.load(str(path), {}) == {"items": [1, 2]}
+    assert len(calls) == 1 and store.stats["hits"] == 1
+
+    path.write_text('{"items": [3, 2, 1]}')
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+    assert store.load(str(path), {}) == {"items": [1, 2, 3]}
+    assert len(calls) == 2
+
+
+def test_missing_and_invalid_files_use_default(tmp_path):
+    store = JsonStateStore()
+    path = tmp_path / "state.json"
+    assert store.load(str(path), {"a": 1}) == {"a": 1}
+    path.write_text("{broken")
+    assert store.load(str(path), {"a": 2}) == {"a": 2}
+
+
+def test_deferred_writes_coalesce_into_one_atomic_write(tmp_path):
+    store = JsonStateStore()
+    path = str(tmp_path / "state.json")
+    for i in range(5):
+        store.write(path, {"n": i}, delay=30)
+    assert not os.path.exists(path)
+    assert store.load(path, {}) == {"n": 4}
+    assert store.stats["coalesced"] == 4
+
+    store.flush()
+    assert json.loads(open(path).read()) == {"n": 4}
+    assert store.stats["writes"] == 1
+    assert store.load(path, {}) == {"n": 4} and store.stats["misses"] == 0
+
+
+def test_immediate_write_supersedes_pending(tmp_path):
+    store = JsonStateStore()
+    path = str(tmp_path / "state.json")
+    store.write(path, {"n": 1}, delay=30)
+    store.write(path, {"n": 2}, mode=0o600)
+    store.flush()
+    assert json.loads(open(path).read()) == {"n": 2}
+    assert store.stats["writes"] == 1
+    assert os.stat(path).st_mode & 0o777 == 0o600
+
+
+def test_services_share_cached_documents(tmp_path):
+    saved = ui_settings.patch_settings({"logs": {"view": {"loadLimit": 500}}}, str(tmp_path))[0]
+    assert ui_settings.load_settings(str(tmp_path)) == saved
+
+    xray_device_names.set_manual_device_name(str(tmp_path), "192.168.1.5", "NAS")
+    names = xray_device_names.load_manual_device_names(str(tmp_path))
+    names.clear()
+    assert list(xray_device_names.load_manual_device_names(str(tmp_path))) == ["192.168.1.5"]
+    on_disk = json.loads((tmp_path / "device-names.json").read_text())
+    assert on_disk["items"]["192.168.1.5"]["name"] == "NAS"
@@ -2,11 +2,18 @@ from __future__ import annotations
 
 from pathlib import Path
 
+import pytest
 from flask import Flask
 
 import routes.system_resources as resource_routes
+import services.system_resources as resources
 from routes.system_resources import create_system_resources_blueprint
-from services.system_resources import reset_system_resource_sampler, sample_system_resources
+from services.system_resources import ResourceSampler, reset_system_resource_sampler, sample_system_resources
+
+
+@pytest.fixture(autouse=True)
+def _no_background_sampler(monkeypatch):
+    monkeypatch.setattr(resources, "_SAMPLER", None)
 
 
 def test_resource_sampler_returns_cpu_memory_load_and_uptime():
@@ -141,3 +148,105 @@ def test_process_route_is_separate_and_no_store(monkeypatch):
     assert response.status_code == 200
     assert response.get_json()["ok"] is True
     assert response.headers["Cache-Control"] == "no-store"
+
+
+def _fake_sample(values):
+    def sample():
+        cpu, rx = values.pop(0)
+        return {
+            "cpu": {"percent": cpu, "load_1m": 0.5},
+            "memory": {"percent": 40.0, "used_bytes": 400},
+            "network": {
+                "receive_bytes_per_second": rx,
+                "send_bytes_per_second": 1.0,
+                "interfaces": [{"name": "eth0", "receive_bytes_per_second": rx, "send_bytes_per_second": 1.0}],
+            },
+        }
+
+    return sample
+
+
+def test_sampler_keeps_fine_and_minute_history():
+    clock = {"now": 600.0}
+    values = [(float(i), 10.0 * i) for i in range(36)]
+    sampler = ResourceSampler(interval=5, sample=_fake_sample(values), clock=lambda: clock["now"])
+    for _ in range(36):
+        sampler.sample_once()
+        clock["now"] += 5
+
+    fine = sampler.history(window_seconds=3600, metrics=["cpu_percent", "interfaces"])
+    assert fine["resolution_seconds"] == 5
+    assert fine["timestamps"][0] == 600 and len(fine["timestamps"]) == 36
+    assert fine["series"]["cpu_percent"][-1] == 35.0
+    assert sorted(fine["series"]) == ["cpu_percent", "rx:eth0", "tx:eth0"]
+
+    down = sampler.history(window_seconds=3600, points=6, metrics=["cpu_percent"])
+    assert down["step_seconds"] == 30
+    assert down["series"]["cpu_percent"] == [2.5, 8.5, 14.5, 20.5, 26.5, 32.5]
+
+    day = sampler.history(window_seconds=6 * 3600, metrics=["cpu_percent"])
+    assert day["resolution_seconds"] == 60
+    assert day["timestamps"] == [600, 660]
+    assert day["series"]["cpu_percent"] == [5.5, 17.5]
+
+
+def test_sampler_snapshot_is_a_copy_and_expires():
+    clock = {"now": 100.0}
+    sampler = ResourceSampler(interval=5, sample=_fake_sample([(1.0, 0.0)]), clock=lambda: clock["now"])
+    assert sampler.snapshot() is None
+    sampler.sample_once()
+    snap = sampler.snapshot()
+    snap["cpu"]["percent"] = 99
+    assert sampler.snapshot()["cpu"]["percent"] == 1.0
+    clock["now"] += 16
+    assert sampler.snapshot() is None
+
+
+def test_resources_route_prefers_background_sample_and_serves_history(monkeypatch):
+    clock = {"now": 100.0}
+    sampler = ResourceSampler(interval=5, sample=_fake_sample([(7.0, 0.0)]), clock=lambda: clock["now"])
+    sampler.sample_once()
+    monkeypatch.setattr(resources, "_SAMPLER", sampler)
+    monkeypatch.setattr(resource_routes, "sample_system_resources", lambda: 1 / 0)
+    monkeypatch.setattr(resource_routes, "cached_router_diagnostics", lambda: {})
+    app = Flask(__name__)
+    app.register_blueprint(create_system_resources_blueprint())
+    client = app.test_client()
+
+    assert client.get("/api/system/resources").get_json()["cpu"]["percent"] == 7.0
+    history = client.get("/api/system/resources/history?window=600&metrics=cpu_percent").get_json()
+    assert history["ok"] is True and history["series"] == {"cpu_percent": [7.0]}
+
+
+def test_stale_or_missing_background_sample_does_not_move_the_cpu_baseline(monkeypatch, tmp_path):
+    files = {"PROC_STAT": "cpu 100 0 0 900\n", "PROC_MEMINFO": "MemTotal: 100 kB\nMemAvailable: 50 kB\n", "PROC_LOADAVG": "0 0 0\n", "PROC_UPTIME": "1 0\n"}
+    for name, text in files.items():
+        (tmp_path / name).write_text(text)
+        monkeypatch.setattr(resources, name, tmp_path / name)
+    for name in ("PROC_NET_DEV", "THERMAL_ZONE"):
+        monkeypatch.setattr(resources, name, tmp_path / "missing")
+    clock = {"now": 100.0}
+    sampler = ResourceSampler(interval=5, sample=sample_system_resources, clock=lambda: clock["now"])
+    monkeypatch.setattr(resources, "_SAMPLER", sampler)
+    reset_system_resource_sampler()
+
+    # No sample yet: answered read-only.
+    assert resources.latest_system_resources()["cpu"]["percent"] == 10.0
+    assert resources._previous_cpu is None
+
+    sampler.sample_once()
+    (tmp_path / "PROC_STAT").write_text("cpu 180 0 0 920\n")
+    clock["now"] += 60
+    stale = resources.latest_system_resources()
+    assert stale["stale"] is True and stale["cpu"]["percent"] == 10.0
+    assert sampler.sample_once()["cpu"]["percent"] == 80.0
+
+
+def test_history_route_reports_disabled_sampler():
+    app = Flask(__name__)
+    app.register_blueprint(create_system_resources_blueprint())
+
+    response = app.test_client().get("/api/system/resources/history")
+
+    assert response.status_code == 503
+    assert response.get_json()["code"] == "system_resources_history_unavailable"
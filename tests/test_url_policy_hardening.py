@@ -226,9 +226,13 @@ def test_dat_update_opt_in_allows_custom_public_url(monkeypatch, tmp_path: Path)
 
     monkeypatch.setattr(dat, "_local_allowed_roots", lambda: [str(tmp_path)])
     monkeypatch.setattr(dat, "_local_resolve", lambda path, roots: str(target))
-    monkeypatch.setattr(dat, "_apply_local_metadata_best_effort", lambda *args, **kwargs: None)
+    dat_updates = sys.modules[dat.update_dat_file.__module__]
+    monkeypatch.setattr(dat_updates, "_apply_local_metadata_best_effort", lambda *args, **kwargs: None)
+    monkeypatch.setattr(dat_updates, "state_path", lambda: str(tmp_path / "dat-updates.json"))
 
-    def fake_download(url, tmp_file, max_bytes, *, policy, user_agent="Xkeen-UI", timeout=45):
+    def fake_download(url, tmp_file, max_bytes, *, policy, user_agent="Xkeen-UI", timeout=45, **kwargs):
+        if url.endswith(".sha256sum"):
+            raise OSError("not published")
         Path(tmp_file).write_bytes(b"dat")
         return 3
 
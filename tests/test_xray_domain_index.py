@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from services.xray_domain_index import (
+    XrayDomainIndex,
+    collect_destination_ips,
+    collect_domain_candidates,
+    normalize_domain,
+)
+
+
+SNIFFED = "2026/06/08 15:08:01 [INFO] [3868264735] app/dispatcher: sniffed domain: ab.chatgpt.com"
+DIAL = "2026/06/08 15:08:01 [Info] [3868264735] transport/internet/tcp: dialing TCP to tcp:104.18.32.47:443"
+ENDPOINT_DIAL = (
+    "2026/06/10 09:24:27 [Info] [2779876993] transport/internet/tcp: dialing TCP to "
+    "tcp:cp.landing-lv.rfid-technologies.org:443"
+)
+TUNNEL = (
+    "2026/06/10 09:24:27 [Info] [2779876993] proxy/vless/outbound: tunneling request to "
+    "tcp:149.154.167.51:80 via cp.landing-lv.rfid-technologies.org:443"
+)
+
+
+def test_line_parsers_match_client_helpers():
+    assert collect_domain_candidates(SNIFFED) == ["ab.chatgpt.com"]
+    assert collect_destination_ips(DIAL) == ["104.18.32.47"]
+    assert collect_domain_candidates(ENDPOINT_DIAL) == []
+    assert collect_destination_ips(TUNNEL) == ["149.154.167.51"]
+    assert normalize_domain("https://Ab.ChatGPT.com:443/path") == "ab.chatgpt.com"
+    assert normalize_domain("8.8.8.8") == ""
+
+
+def test_index_pairs_domains_and_ips_by_connection_id():
+    index = XrayDomainIndex()
+    index.ingest_lines([SNIFFED, DIAL, ENDPOINT_DIAL, TUNNEL], ts=100.0)
+
+    assert index.domains_for_ip("104.18.32.47") == [{"domain": "ab.chatgpt.com", "seen": 100.0}]
+    assert index.ips_for_domain("AB.chatgpt.com") == [{"ip": "104.18.32.47", "seen": 100.0}]
+    # The proxy endpoint is never recorded as the requested destination domain.
+    assert index.domains_for_ip("149.154.167.51") == []
+    assert index.annotate_lines([DIAL, TUNNEL]) == {"104.18.32.47": "ab.chatgpt.com"}
+
+
+def test_index_is_bounded_lru():
+    index = XrayDomainIndex(max_ips=3)
+    for n in range(5):
+        index.ingest_line(
+            f"2026/06/08 15:08:0{n} [Info] [10{n}00] for [tcp:site{n}.example.com:443] "
+            f"dialing tcp to tcp:10.0.0.{n + 1}:443"
+        )
+
+    assert list(index.snapshot()) == ["10.0.0.3", "10.0.0.4", "10.0.0.5"]
+    assert index.stats()["ips"] == 3
+
+
+def test_refresh_seeds_then_resumes_from_last_offset(tmp_path):
+    log = tmp_path / "error.log"
+    log.write_text(SNIFFED + "\n" + DIAL + "\n", encoding="utf-8")
+    index = XrayDomainIndex(resolve_path=lambda: str(log))
+
+    assert index.refresh()["mode"] == "seed"
+    assert index.latest_domain("104.18.32.47") == "ab.chatgpt.com"
+    assert index.refresh()["mode"] == "idle"
+
+    before = index.stats()["bytes_read"]
+    with log.open("a", encoding="utf-8") as handle:
+        handle.write("2026/06/08 15:09:00 [Info] [4000] app/dispatcher: sniffed domain: example.org\n")
+        handle.write("2026/06/08 15:09:00 [Info] [4000] dialing TCP to tcp:93.184.216.34:443\n")
+    appended = index.refresh()
+
+    assert appended == {"available": True, "mode": "append", "lines": 2}
+    assert index.latest_domain("93.184.216.34") == "example.org"
+    assert index.stats()["bytes_read"] - before < 200
+
+    log.write_text(DIAL + "\n", encoding="utf-8")
+    assert index.refresh()["mode"] == "seed"
+
+
+def test_refresh_reseeds_from_tail_when_backlog_exceeds_seed_window(tmp_path, monkeypatch):
+    import services.xray_domain_index as domain_index
+
+    monkeypatch.setattr(domain_index, "SEED_MAX_BYTES", 4096)
+    log = tmp_path / "error.log"
+    log.write_text(SNIFFED + "\n" + DIAL + "\n", encoding="utf-8")
+    index = XrayDomainIndex(resolve_path=lambda: str(log))
+    assert index.refresh()["mode"] == "seed"
+
+    before = index.stats()["bytes_read"]
+    with log.open("a", encoding="utf-8") as handle:
+        for _ in range(200):
+            handle.write("2026/06/08 15:10:00 [Debug] unrelated noise line for the backlog\n")
+        handle.write("2026/06/08 15:11:00 [Info] [5000] app/dispatcher: sniffed domain: example.net\n")
+        handle.write("2026/06/08 15:11:00 [Info] [5000] dialing TCP to tcp:198.51.100.9:443\n")
+
+    assert index.refresh()["mode"] == "seed"
+    assert index.latest_domain("198.51.100.9") == "example.net"
+    assert index.stats()["bytes_read"] - before <= 4096
+    assert index.refresh()["mode"] == "idle"
+
+
+def test_domains_endpoints_lookup_and_annotate(tmp_path, monkeypatch):
+    from flask import Flask
+
+    import routes.xray_logs as xray_logs_routes
+    import services.xray_domain_index as domain_index
+
+    log = tmp_path / "error.log"
+    log.write_text(SNIFFED + "\n" + DIAL + "\n", encoding="utf-8")
+    monkeypatch.setattr(
+        domain_index,
+        "_INDEX",
+        XrayDomainIndex(resolve_path=lambda: str(log)),
+    )
+    app = Flask("xray-domain-index-test")
+    app.register_blueprint(
+        xray_logs_routes.create_xray_logs_blueprint(ws_debug=None, restart_xray_core=None)
+    )
+    client = app.test_client()
+
+    listing = client.get("/api/xray-logs/domains").get_json()
+    lookup = client.get(
+        "/api/xray-logs/domains",
+        query_string=[("ip", "104.18.32.47"), ("domain", "ab.chatgpt.com")],
+    ).get_json()
+    annotated = client.post("/api/xray-logs/domains/annotate", json={"lines": [DIAL]}).get_json()
+
+    assert listing["domains"] == {"104.18.32.47": "ab.chatgpt.com"}
+    assert lookup["by_ip"]["104.18.32.47"][0]["domain"] == "ab.chatgpt.com"
+    assert lookup["by_domain"]["ab.chatgpt.com"][0]["ip"] == "104.18.32.47"
+    assert annotated["domains"] == {"104.18.32.47": "ab.chatgpt.com"}
+    assert client.post("/api/xray-logs/domains/annotate", json={"lines": "x"}).status_code == 400
@@ -53,6 +53,37 @@ def test_parse_subscription_links_accepts_plain_and_base64_payloads():
     assert parse_subscription_links(encoded) == [_vless("Plain"), _vless("Second")]
 
 
+def test_parse_subscription_links_scans_lines_and_embedded_links_once():
+    from services.xray_subscriptions import iter_subscription_links, parse_subscription_links
+
+    body = "\r\n".join(
+        [
+            "  " + _vless("Line") + "  ",
+            _vless("Line"),
+            "note: " + _trojan("Embedded") + " (see above)",
+            '{"links": ["' + _vless("Json").replace("/", "\\/") + '", "' + _vless("Line") + '"]}',
+        ]
+    )
+    assert parse_subscription_links(body) == [_vless("Line"), _trojan("Embedded"), _vless("Json")]
+
+    links = iter_subscription_links(_vless("A") + "\n" + _vless("B"))
+    assert next(links) == _vless("A")
+
+
+def test_parse_subscription_links_stays_linear_on_large_bodies():
+    import json
+    import time
+
+    from services.xray_subscriptions import parse_subscription_links
+
+    links = [_vless(f"node-{i}") for i in range(5000)]
+    started = time.perf_counter()
+    assert parse_subscription_links("\n".join(links)) == links
+    assert parse_subscription_links(json.dumps([{"link": link} for link in links])) == links
+    # The previous quadratic substring scan needed several seconds here.
+    assert time.perf_counter() - started < 2.0
+
+
 def test_subscription_url_policy_allows_public_http_and_blocks_private_redirects(monkeypatch):
     from services import xray_subscriptions as subs
 
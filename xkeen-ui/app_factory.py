@@ -10,7 +10,7 @@ from __future__ import annotations
 
 import os
 import time
-from typing import TYPE_CHECKING, Any, Dict, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
 
 if TYPE_CHECKING:
     from core.context import AppContext
@@ -342,11 +342,13 @@ def _init_access_log_middleware(app):
     _init_access_log(app, _access_enabled, _get_access_logger, skip_prefixes=("/static/", "/ws/"))
 
 
-def _register_api_blueprints(app, ctx: "AppContext"):
+def _register_api_blueprints(app, ctx: "AppContext", *, deferred: bool = True):
     # Centralized blueprint registration (see routes.register_blueprints).
-    from routes import register_blueprints
+    from routes import register_core_blueprints, register_deferred_blueprints
 
-    register_blueprints(app, ctx)
+    register_core_blueprints(app, ctx)
+    if deferred:
+        register_deferred_blueprints(app, ctx)
 
 
 def _check_keenetic_rci_access() -> Dict[str, Any]:
@@ -384,21 +386,33 @@ def _check_keenetic_rci_access() -> Dict[str, Any]:
     }
 
 
-def create_app(*, ws_runtime: bool = False):
+def create_app(*, ws_runtime: bool = False, lazy_blueprints: Optional[bool] = None):
     """Create and configure the Flask application.
 
     Args:
         ws_runtime: Whether WebSocket runtime is *actually* active. In practice,
             run_server.py sets this later via app.set_ws_runtime(True), but we
             still accept the flag for testability.
+        lazy_blueprints: Defer heavy API blueprints, subscription schedulers and
+            the RCI probe until the first API request or the warm-up started by
+            run_server.py (see :mod:`core.lazy_blueprints`). ``None`` reads
+            ``XKEEN_UI_LAZY_BLUEPRINTS``.
     """
 
+    from core import startup_profile
+    from core.lazy_blueprints import LazyBlueprints, lazy_mode_requested
+
+    lazy = lazy_mode_requested() if lazy_blueprints is None else bool(lazy_blueprints)
+    startup_profile.install_import_profiler()
+
     # Local imports to reduce side-effects on module import.
-    settings, env = _init_settings_and_logging(ws_runtime=ws_runtime)
+    with startup_profile.phase("settings_logging"):
+        settings, env = _init_settings_and_logging(ws_runtime=ws_runtime)
 
     # Importing mihomo_server_core can be early; do it after logging is ready so best-effort
     # failures leave a trace.
-    CONFIG_PATH = _ensure_runtime_env()
+    with startup_profile.phase("runtime_env"):
+        CONFIG_PATH = _ensure_runtime_env()
     UI_STATE_DIR = env["UI_STATE_DIR"]
     BASE_ETC_DIR = env["BASE_ETC_DIR"]
     BASE_VAR_DIR = env["BASE_VAR_DIR"]
@@ -406,16 +420,19 @@ def create_app(*, ws_runtime: bool = False):
 
     _cleanup_legacy_global_theme_files(ui_state_dir=UI_STATE_DIR)
 
-    try:
-        _check_keenetic_rci_access()
-    except Exception:  # noqa: BLE001 - diagnostics must never block startup
-        pass
+    if not lazy:
+        with startup_profile.phase("rci_probe"):
+            try:
+                _check_keenetic_rci_access()
+            except Exception:  # noqa: BLE001 - diagnostics must never block startup
+                pass
 
-    xray_ctx = _init_xray_startup_migrations(
-        base_etc_dir=BASE_ETC_DIR,
-        base_var_dir=BASE_VAR_DIR,
-        ui_state_dir=UI_STATE_DIR,
-    )
+    with startup_profile.phase("xray_migrations"):
+        xray_ctx = _init_xray_startup_migrations(
+            base_etc_dir=BASE_ETC_DIR,
+            base_var_dir=BASE_VAR_DIR,
+            ui_state_dir=UI_STATE_DIR,
+        )
 
     XRAY_CONFIGS_DIR = xray_ctx["XRAY_CONFIGS_DIR"]
     XRAY_CONFIGS_DIR_REAL = xray_ctx["XRAY_CONFIGS_DIR_REAL"]
@@ -474,20 +491,22 @@ def create_app(*, ws_runtime: bool = False):
     )
 
     # -------- Flask app
-    app = _create_flask_app()
-    _register_favicon(app)
+    with startup_profile.phase("flask_app"):
+        app = _create_flask_app()
+        _register_favicon(app)
 
-    _init_auth_and_pages(
-        app,
-        ui_state_dir=UI_STATE_DIR,
-        routing_file=ROUTING_FILE,
-        mihomo_config_file=MIHOMO_CONFIG_FILE,
-        inbounds_file=INBOUNDS_FILE,
-        outbounds_file=OUTBOUNDS_FILE,
-        backup_dir=BACKUP_DIR,
-        command_groups=COMMAND_GROUPS,
-        github_repo_url=GITHUB_REPO_URL,
-    )
+    with startup_profile.phase("auth_pages"):
+        _init_auth_and_pages(
+            app,
+            ui_state_dir=UI_STATE_DIR,
+            routing_file=ROUTING_FILE,
+            mihomo_config_file=MIHOMO_CONFIG_FILE,
+            inbounds_file=INBOUNDS_FILE,
+            outbounds_file=OUTBOUNDS_FILE,
+            backup_dir=BACKUP_DIR,
+            command_groups=COMMAND_GROUPS,
+            github_repo_url=GITHUB_REPO_URL,
+        )
 
     _init_ws_debug_logger(ui_ws_log=UI_WS_LOG)
 
@@ -646,71 +665,133 @@ def create_app(*, ws_runtime: bool = False):
         restart_xray_core=restart_xray_core,
     )
 
-    from routes.mobile import configure_mobile_routing_service
-    from routes.routing.config import _run_xray_preflight
-    from services.mobile_routing import MobileRoutingService
-    from services.routing.templates import _paths_for_routing
+    def _prepare_deferred() -> None:
+        """Slow, app-independent part of the lazy load (runs before registration)."""
 
-    configure_mobile_routing_service(
-        app,
-        MobileRoutingService(
-            ui_state_dir=UI_STATE_DIR,
-            routing_file=ROUTING_FILE,
-            routing_file_raw=ROUTING_FILE_RAW,
-            xray_configs_dir=XRAY_CONFIGS_DIR,
-            xray_configs_dir_real=XRAY_CONFIGS_DIR_REAL,
-            paths_for_routing=_paths_for_routing,
-            run_preflight=_run_xray_preflight,
-            snapshot_before_overwrite=snapshot_xray_config_before_overwrite,
-            restart_xkeen=restart_xkeen,
-        ),
-    )
+        try:
+            _check_keenetic_rci_access()
+        except Exception:  # noqa: BLE001 - diagnostics must never block startup
+            pass
 
-    _register_api_blueprints(app, ctx)
+        from routes import import_deferred_blueprints
 
-    try:
-        from services.xray_subscriptions import start_subscription_scheduler
+        import_deferred_blueprints()
 
-        start_subscription_scheduler(
-            UI_STATE_DIR,
-            xray_configs_dir=XRAY_CONFIGS_DIR,
-            snapshot=snapshot_xray_config_before_overwrite,
-            restart_xkeen=restart_xkeen,
+    def _load_deferred(app) -> None:
+        """Heavy part of composition: Xray/Mihomo blueprints and schedulers."""
+
+        from routes.mobile import configure_mobile_routing_service
+        from routes.routing.config import _run_xray_preflight
+        from services.mobile_routing import MobileRoutingService
+        from services.routing.templates import _paths_for_routing
+
+        configure_mobile_routing_service(
+            app,
+            MobileRoutingService(
+                ui_state_dir=UI_STATE_DIR,
+                routing_file=ROUTING_FILE,
+                routing_file_raw=ROUTING_FILE_RAW,
+                xray_configs_dir=XRAY_CONFIGS_DIR,
+                xray_configs_dir_real=XRAY_CONFIGS_DIR_REAL,
+                paths_for_routing=_paths_for_routing,
+                run_preflight=_run_xray_preflight,
+                snapshot_before_overwrite=snapshot_xray_config_before_overwrite,
+                restart_xkeen=restart_xkeen,
+            ),
         )
-    except Exception as e:  # noqa: BLE001
+
+        from routes import register_deferred_blueprints
+
+        register_deferred_blueprints(app, ctx)
+
         try:
-            from core.logging import core_log_once
+            from services.xray_subscriptions import start_subscription_scheduler
 
-            core_log_once(
-                "warning",
-                "xray_subscriptions_scheduler_failed",
-                "xray subscriptions scheduler init failed (non-fatal)",
-                error=str(e),
+            start_subscription_scheduler(
+                UI_STATE_DIR,
+                xray_configs_dir=XRAY_CONFIGS_DIR,
+                snapshot=snapshot_xray_config_before_overwrite,
+                restart_xkeen=restart_xkeen,
             )
-        except Exception:
-            pass
+        except Exception as e:  # noqa: BLE001
+            try:
+                from core.logging import core_log_once
 
-    try:
-        from mihomo_server_core import save_config as _mihomo_save_config
-        from services.mihomo_subscriptions import start_subscription_scheduler as start_mihomo_subscription_scheduler
+                core_log_once(
+                    "warning",
+                    "xray_subscriptions_scheduler_failed",
+                    "xray subscriptions scheduler init failed (non-fatal)",
+                    error=str(e),
+                )
+            except Exception:
+                pass
 
-        start_mihomo_subscription_scheduler(
-            UI_STATE_DIR,
-            mihomo_config_file=MIHOMO_CONFIG_FILE,
-            restart_xkeen=restart_xkeen,
-            save_callback=_mihomo_save_config,
-        )
-    except Exception as e:  # noqa: BLE001
         try:
-            from core.logging import core_log_once
-
-            core_log_once(
-                "warning",
-                "mihomo_subscriptions_scheduler_failed",
-                "mihomo subscriptions scheduler init failed (non-fatal)",
-                error=str(e),
+            from mihomo_server_core import save_config as _mihomo_save_config
+            from services.mihomo_subscriptions import start_subscription_scheduler as start_mihomo_subscription_scheduler
+
+            start_mihomo_subscription_scheduler(
+                UI_STATE_DIR,
+                mihomo_config_file=MIHOMO_CONFIG_FILE,
+                restart_xkeen=restart_xkeen,
+                save_callback=_mihomo_save_config,
             )
-        except Exception:
-            pass
+        except Exception as e:  # noqa: BLE001
+            try:
+                from core.logging import core_log_once
+
+                core_log_once(
+                    "warning",
+                    "mihomo_subscriptions_scheduler_failed",
+                    "mihomo subscriptions scheduler init failed (non-fatal)",
+                    error=str(e),
+                )
+            except Exception:
+                pass
+
+        try:
+            from services.system_resources import start_resource_sampler
+
+            start_resource_sampler()
+        except Exception as e:  # noqa: BLE001
+            try:
+                from core.logging import core_log_once
+
+                core_log_once(
+                    "warning",
+                    "resource_sampler_start_failed",
+                    "resource sampler init failed (non-fatal)",
+                    error=str(e),
+                )
+            except Exception:
+                pass
+
+        try:
+            from services.geodat.updates import start_dat_update_scheduler
+
+            start_dat_update_scheduler()
+        except Exception as e:  # noqa: BLE001
+            try:
+                from core.logging import core_log_once
+
+                core_log_once(
+                    "warning",
+                    "dat_update_scheduler_failed",
+                    "dat update scheduler init failed (non-fatal)",
+                    error=str(e),
+                )
+            except Exception:
+                pass
+
+    with startup_profile.phase("core_blueprints"):
+        _register_api_blueprints(app, ctx, deferred=False)
+
+    if lazy:
+        LazyBlueprints(app, _load_deferred, prepare=_prepare_deferred)
+    else:
+        with startup_profile.phase("deferred_blueprints"):
+            _load_deferred(app)
+        startup_profile.uninstall_import_profiler()
 
+    startup_profile.mark("app_ready")
     return app
@@ -0,0 +1,234 @@
+"""Deferred (lazy) registration of heavy API blueprints.
+
+Importing the Xray/Mihomo/file-manager route modules pulls in several
+thousand lines of services plus YAML/HTTP client stacks. On router CPUs this
+delays the first byte after ``run_server.py`` starts by seconds, although the
+login page and static assets need none of it.
+
+In lazy mode ``create_app`` registers only the boot-critical blueprints and
+hands a loader callable to :class:`LazyBlueprints`. The loader runs exactly
+once, either:
+
+- on the first request whose path is not on the boot allow-list
+  (login/setup/static/…); the request waits for the load and is then routed
+  normally, or
+- from a background warm-up started by ``run_server.py`` once the server is
+  listening, so that usually nobody waits at all.
+
+Loading has two steps. ``prepare`` does the slow, app-independent work
+(route module imports, the RCI probe) while boot-path requests keep being
+served. The loader then registers the blueprints in a short window in which
+every incoming request waits on the loader lock, so no request is matched
+against a half-built url_map. Flask forbids setup methods after the first
+request; that check is lifted on this app instance for the window only,
+leaving the shared ``_got_first_request`` flag alone (concurrent requests
+set it on every dispatch). A failed load is retried by a later trigger,
+at most once every ``RETRY_AFTER_SECONDS``.
+
+Enable with env ``XKEEN_UI_LAZY_BLUEPRINTS=1`` (``run_server.py`` defaults to
+it); tests and ``create_app()`` callers keep eager registration by default.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from core import startup_profile
+
+
+EXTENSION_KEY = "xkeen.lazy_blueprints"
+
+# Paths that never need the deferred blueprints. Everything else triggers the
+# one-time load before dispatch.
+BOOT_PATH_PREFIXES: Tuple[str, ...] = (
+    "/static/",
+    "/favicon.ico",
+    "/login",
+    "/logout",
+    "/setup",
+    "/api/auth/",
+    "/ui/",
+    "/api/devtools/startup",
+)
+
+RETRY_AFTER_SECONDS = 10.0
+
+
+def lazy_mode_requested(default: bool = False) -> bool:
+    raw = str(os.environ.get("XKEEN_UI_LAZY_BLUEPRINTS", "") or "").strip().lower()
+    if not raw:
+        return default
+    return raw in ("1", "true", "yes", "on")
+
+
+def _warmup_delay_seconds() -> float:
+    raw = str(os.environ.get("XKEEN_UI_LAZY_WARMUP_DELAY", "") or "").strip()
+    try:
+        value = float(raw) if raw else 1.5
+    except Exception:
+        value = 1.5
+    return max(0.0, min(300.0, value))
+
+
+class LazyBlueprints:
+    """One-shot deferred loader wired in front of ``app.wsgi_app``."""
+
+    def __init__(
+        self,
+        app: Any,
+        loader: Callable[[Any], None],
+        *,
+        prepare: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.app = app
+        self._loader: Optional[Callable[[Any], None]] = loader
+        self._prepare = prepare
+        self._lock = threading.RLock()
+        # Set while the url_map is being extended (read without the lock).
+        self._registering = threading.Event()
+        self._retry_at = 0.0
+        self.state = "pending"
+        self.trigger = ""
+        self.error = ""
+        self.duration_ms: Optional[float] = None
+        self._wrapped_wsgi = app.wsgi_app
+        app.wsgi_app = self._wsgi_app
+        app.extensions[EXTENSION_KEY] = self
+
+    @property
+    def pending(self) -> bool:
+        return self._loader is not None
+
+    def _needs_load(self, path: str) -> bool:
+        if not path or path == "/":
+            return False
+        return not any(path.startswith(p) for p in BOOT_PATH_PREFIXES)
+
+    def ensure_loaded(self, trigger: str = "explicit") -> bool:
+        """Run the deferred loader once. Returns True when routes are complete."""
+
+        if self._loader is None:
+            return self.state == "loaded"
+        with self._lock:
+            loader = self._loader
+            if loader is None:
+                return self.state == "loaded"
+            if self.state == "failed" and time.monotonic() < self._retry_at:
+                return False
+            self.state = "loading"
+            self.trigger = str(trigger or "")
+            self.error = ""
+            started = time.monotonic()
+            try:
+                with startup_profile.phase("lazy_blueprints"):
+                    if self._prepare is not None:
+                        self._prepare()
+                    self._registering.set()
+                    with _setup_window(self.app):
+                        loader(self.app)
+                self.state = "loaded"
+                self._loader = None
+            except Exception as e:  # noqa: BLE001
+                self.state = "failed"
+                self.error = str(e)
+                self._retry_at = time.monotonic() + RETRY_AFTER_SECONDS
+                try:
+                    from core.logging import core_log
+
+                    core_log(
+                        "warning",
+                        "deferred blueprint registration failed",
+                        error=str(e),
+                        trigger=self.trigger,
+                    )
+                except Exception:
+                    pass
+            finally:
+                self._registering.clear()
+                self.duration_ms = (time.monotonic() - started) * 1000.0
+                startup_profile.mark("lazy_blueprints_done")
+                if self.state == "loaded":
+                    startup_profile.uninstall_import_profiler()
+        return self.state == "loaded"
+
+    def _wsgi_app(self, environ, start_response):  # noqa: ANN001
+        startup_profile.mark("first_request")
+        if self._loader is not None:
+            path = str(environ.get("PATH_INFO") or "")
+            if self._needs_load(path):
+                self.ensure_loaded(trigger=f"request:{path[:120]}")
+            elif self._registering.is_set():
+                # Boot paths do not need the deferred routes, but must not be
+                # matched while the url_map is being extended.
+                with self._lock:
+                    pass
+        return self._wrapped_wsgi(environ, start_response)
+
+    def start_warmup(self, delay: Optional[float] = None) -> bool:
+        """Load deferred blueprints in the background after ``delay`` seconds.
+
+        Uses a daemon thread; under ``gevent.monkey.patch_all()`` (run_server.py)
+        this is a greenlet, so the server keeps serving while imports run.
+        """
+
+        if self._loader is None:
+            return False
+        wait = _warmup_delay_seconds() if delay is None else max(0.0, float(delay))
+
+        def _run() -> None:
+            if wait:
+                time.sleep(wait)
+            self.ensure_loaded(trigger="warmup")
+
+        t = threading.Thread(target=_run, name="xkeen-lazy-blueprints", daemon=True)
+        t.start()
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": True,
+            "state": self.state,
+            "trigger": self.trigger,
+            "error": self.error,
+            "duration_ms": round(self.duration_ms, 1) if self.duration_ms is not None else None,
+        }
+
+
+@contextmanager
+def _setup_window(app: Any) -> Iterator[None]:
+    """Allow Flask setup methods on ``app`` for the duration of the block."""
+
+    app._check_setup_finished = lambda f_name: None
+    try:
+        yield
+    finally:
+        try:
+            del app._check_setup_finished
+        except AttributeError:
+            pass
+
+
+def get_lazy_blueprints(app: Any) -> Optional[LazyBlueprints]:
+    try:
+        obj = app.extensions.get(EXTENSION_KEY)
+    except Exception:
+        return None
+    return obj if isinstance(obj, LazyBlueprints) else None
+
+
+def lazy_status(app: Any) -> Dict[str, Any]:
+    lazy = get_lazy_blueprints(app)
+    if lazy is None:
+        return {"enabled": False, "state": "eager"}
+    return lazy.status()
+
+
+def start_warmup(app: Any, delay: Optional[float] = None) -> bool:
+    lazy = get_lazy_blueprints(app)
+    if lazy is None:
+        return False
+    return lazy.start_warmup(delay)
@@ -0,0 +1,239 @@
+"""Startup-time profiler for the panel boot sequence.
+
+The router runs the UI on slow MIPS/ARM CPUs where the import graph alone can
+take seconds. This module keeps a tiny, process-wide record of:
+
+- init phases (``with phase("flask_app"): ...``) measured by ``create_app``;
+- optional per-module import timings in the spirit of ``python -X importtime``
+  (enable with env ``XKEEN_UI_STARTUP_PROFILE=1``);
+- lazy blueprint loading milestones and time to the first served request.
+
+The report is exposed read-only through ``GET /api/devtools/startup``.
+Everything here is best-effort: profiling must never block startup.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+
+# Process-relative zero point. ``run_server.py`` imports this module as early
+# as possible so the timeline starts before Flask/gevent imports.
+_T0 = time.monotonic()
+_WALL_T0 = time.time()
+
+_LOCK = threading.Lock()
+_PHASES: List[Dict[str, Any]] = []
+_MARKS: Dict[str, float] = {}
+_IMPORTS: Dict[str, Dict[str, Any]] = {}
+_IMPORT_STACK: List[List[Any]] = []
+_IMPORT_HOOK: Optional["_TimingFinder"] = None
+
+# Hard cap to keep the report small even if a profiler is left enabled.
+_MAX_IMPORT_RECORDS = 4000
+
+
+def _now_ms() -> float:
+    return (time.monotonic() - _T0) * 1000.0
+
+
+def _env_enabled(name: str, default: bool = False) -> bool:
+    raw = str(os.environ.get(name, "") or "").strip().lower()
+    if not raw:
+        return default
+    return raw in ("1", "true", "yes", "on")
+
+
+def import_profile_requested() -> bool:
+    """Return True when per-module import timings were requested via env."""
+
+    return _env_enabled("XKEEN_UI_STARTUP_PROFILE", False)
+
+
+@contextlib.contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Measure a named init phase (nested phases are recorded with depth)."""
+
+    with _LOCK:
+        depth = sum(1 for p in _PHASES if p.get("_open"))
+        rec: Dict[str, Any] = {"name": str(name), "start_ms": _now_ms(), "depth": depth, "_open": True}
+        _PHASES.append(rec)
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        with _LOCK:
+            rec["duration_ms"] = _now_ms() - rec["start_ms"]
+            rec["ok"] = ok
+            rec.pop("_open", None)
+
+
+def mark(name: str, *, once: bool = True) -> None:
+    """Record a timeline milestone (e.g. ``first_request``)."""
+
+    with _LOCK:
+        if once and name in _MARKS:
+            return
+        _MARKS[str(name)] = _now_ms()
+
+
+class _TimedLoader:
+    """Loader proxy that times ``exec_module`` and delegates everything else."""
+
+    def __init__(self, loader: Any, fullname: str) -> None:
+        self._xk_loader = loader
+        self._xk_fullname = fullname
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._xk_loader, item)
+
+    def create_module(self, spec):  # noqa: ANN001
+        fn = getattr(self._xk_loader, "create_module", None)
+        return fn(spec) if callable(fn) else None
+
+    def exec_module(self, module) -> None:  # noqa: ANN001
+        frame = [self._xk_fullname, time.perf_counter(), 0.0]
+        _IMPORT_STACK.append(frame)
+        try:
+            self._xk_loader.exec_module(module)
+        finally:
+            try:
+                _IMPORT_STACK.pop()
+            except IndexError:
+                pass
+            cumulative = (time.perf_counter() - frame[1]) * 1000.0
+            if _IMPORT_STACK:
+                _IMPORT_STACK[-1][2] += cumulative
+            if len(_IMPORTS) < _MAX_IMPORT_RECORDS:
+                _IMPORTS[self._xk_fullname] = {
+                    "module": self._xk_fullname,
+                    "self_ms": round(max(0.0, cumulative - frame[2]), 3),
+                    "cumulative_ms": round(cumulative, 3),
+                    "depth": len(_IMPORT_STACK),
+                    "at_ms": round(_now_ms(), 1),
+                }
+            try:
+                module.__loader__ = self._xk_loader
+                if getattr(module, "__spec__", None) is not None:
+                    module.__spec__.loader = self._xk_loader
+            except Exception:
+                pass
+
+
+class _TimingFinder:
+    """Meta-path finder that wraps the loaders found by the remaining finders."""
+
+    def find_spec(self, fullname, path=None, target=None):  # noqa: ANN001
+        for finder in sys.meta_path:
+            if finder is self:
+                continue
+            find = getattr(finder, "find_spec", None)
+            if not callable(find):
+                continue
+            try:
+                spec = find(fullname, path, target)
+            except Exception:
+                continue
+            if spec is None:
+                continue
+            loader = getattr(spec, "loader", None)
+            if loader is not None and callable(getattr(loader, "exec_module", None)):
+                spec.loader = _TimedLoader(loader, fullname)
+            return spec
+        return None
+
+
+def install_import_profiler(*, force: bool = False) -> bool:
+    """Install the import timing hook (only when requested via env, unless forced)."""
+
+    global _IMPORT_HOOK
+    if not force and not import_profile_requested():
+        return False
+    with _LOCK:
+        if _IMPORT_HOOK is not None:
+            return True
+        _IMPORT_HOOK = _TimingFinder()
+        sys.meta_path.insert(0, _IMPORT_HOOK)
+    return True
+
+
+def uninstall_import_profiler() -> None:
+    """Remove the import timing hook; collected records are kept."""
+
+    global _IMPORT_HOOK
+    with _LOCK:
+        hook = _IMPORT_HOOK
+        _IMPORT_HOOK = None
+    if hook is None:
+        return
+    try:
+        sys.meta_path.remove(hook)
+    except ValueError:
+        pass
+
+
+def startup_report(*, top: int = 40) -> Dict[str, Any]:
+    """Return a JSON-serializable snapshot of the startup timeline."""
+
+    try:
+        top = max(1, min(500, int(top)))
+    except Exception:
+        top = 40
+
+    with _LOCK:
+        phases = []
+        for p in _PHASES:
+            item = {
+                "name": p.get("name"),
+                "start_ms": round(float(p.get("start_ms") or 0.0), 1),
+                "depth": int(p.get("depth") or 0),
+            }
+            if "duration_ms" in p:
+                item["duration_ms"] = round(float(p["duration_ms"]), 1)
+                item["ok"] = bool(p.get("ok", True))
+            else:
+                item["running"] = True
+            phases.append(item)
+        marks = {k: round(v, 1) for k, v in _MARKS.items()}
+        imports = list(_IMPORTS.values())
+        profiler_active = _IMPORT_HOOK is not None
+
+    by_self = sorted(imports, key=lambda r: r["self_ms"], reverse=True)[:top]
+    by_cumulative = sorted(imports, key=lambda r: r["cumulative_ms"], reverse=True)[:top]
+    roots_total = sum(r["cumulative_ms"] for r in imports if r.get("depth") == 0)
+
+    return {
+        "pid": os.getpid(),
+        "started_at": _WALL_T0,
+        "uptime_ms": round(_now_ms(), 1),
+        "phases": phases,
+        "marks": marks,
+        "imports": {
+            "enabled": bool(imports) or profiler_active,
+            "active": profiler_active,
+            "env": "XKEEN_UI_STARTUP_PROFILE",
+            "count": len(imports),
+            "total_ms": round(roots_total, 1),
+            "top_self": by_self,
+            "top_cumulative": by_cumulative,
+        },
+    }
+
+
+def _reset_for_tests() -> None:
+    global _T0
+    uninstall_import_profiler()
+    with _LOCK:
+        _PHASES.clear()
+        _MARKS.clear()
+        _IMPORTS.clear()
+        _IMPORT_STACK.clear()
+        _T0 = time.monotonic()
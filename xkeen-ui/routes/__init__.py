@@ -19,9 +19,11 @@ def register_blueprints(app, ctx: Optional[AppContext] = None):
     Single entry-point for blueprint registration.
     Keeps behavior compatible with the historical registration code in `app_factory.py`.
     """
-    if ctx is None:
-        raise ValueError("ctx is required for blueprint registration during refactor")
+    register_core_blueprints(app, ctx)
+    register_deferred_blueprints(app, ctx)
+
 
+def _init_warner(ctx: AppContext):
     # Controlled init warnings: avoid silent failures for optional blueprints.
     def _warn_init(key: str, msg: str, exc: Exception) -> None:
         err = str(exc)
@@ -36,11 +38,84 @@ def register_blueprints(app, ctx: Optional[AppContext] = None):
         except Exception:
             pass
 
+    return _warn_init
+
+
+def register_core_blueprints(app, ctx: Optional[AppContext] = None):
+    """Register light blueprints needed right after boot (WS, UI settings, capabilities)."""
+    if ctx is None:
+        raise ValueError("ctx is required for blueprint registration during refactor")
+
     from .utils import create_utils_blueprint
     from .ui_settings import create_ui_settings_blueprint
     from .ws_support import create_ws_support_blueprint
     from .ws_streams import create_ws_streams_blueprint
     from .capabilities import create_capabilities_blueprint
+    from .system_resources import create_system_resources_blueprint
+    from .startup_report import create_startup_report_blueprint
+
+    # Keep registration order stable.
+    app.register_blueprint(create_utils_blueprint())
+    app.register_blueprint(create_ui_settings_blueprint())
+    app.register_blueprint(create_ws_support_blueprint())
+    app.register_blueprint(create_ws_streams_blueprint())
+    app.register_blueprint(create_capabilities_blueprint())
+    app.register_blueprint(create_system_resources_blueprint())
+    # Served without the deferred blueprints: it reports on their load.
+    app.register_blueprint(create_startup_report_blueprint())
+
+
+DEFERRED_BLUEPRINT_MODULES = (
+    "routes.xkeen_lists",
+    "routes.config_exchange",
+    "routes.routing",
+    "routes.xray_configs",
+    "routes.xray_subscriptions",
+    "routes.mihomo",
+    "routes.mihomo_clash",
+    "routes.backups",
+    "routes.service",
+    "routes.xray_logs",
+    "routes.commands",
+    "routes.cores_status",
+    "routes.devtools",
+    "routes.fs",
+    "routes.remotefs.blueprint",
+    "routes.fileops",
+    "routes.storage_usb",
+)
+
+
+def import_deferred_blueprints() -> None:
+    """Import the heavy route modules without touching the app.
+
+    The lazy loader runs this before its registration window so slow imports
+    never hold up requests that wait for the url_map to be complete.
+    """
+    import importlib
+
+    for module in DEFERRED_BLUEPRINT_MODULES:
+        importlib.import_module(module)
+
+
+def register_deferred_blueprints(app, ctx: Optional[AppContext] = None):
+    """Register heavy API blueprints (Xray/Mihomo/backups/file manager).
+
+    Called right after :func:`register_core_blueprints` in eager mode, or on
+    demand by :mod:`core.lazy_blueprints` when lazy registration is enabled.
+    """
+    if ctx is None:
+        raise ValueError("ctx is required for blueprint registration during refactor")
+
+    _warn_init = _init_warner(ctx)
+
+    def _register(blueprint) -> None:
+        # A retried lazy load must not re-register what a failed attempt added.
+        if blueprint.name not in app.blueprints:
+            app.register_blueprint(blueprint)
+
+    import_deferred_blueprints()
+
     from .xkeen_lists import create_xkeen_lists_blueprint
     from .config_exchange import create_config_exchange_blueprint
     from .routing import create_routing_blueprint
@@ -58,25 +133,16 @@ def register_blueprints(app, ctx: Optional[AppContext] = None):
     from .remotefs.blueprint import create_remotefs_blueprint
     from .fileops import create_fileops_blueprint
     from .storage_usb import create_storage_usb_blueprint
-    from .system_resources import create_system_resources_blueprint
-
-    # Keep registration order stable.
-    app.register_blueprint(create_utils_blueprint())
-    app.register_blueprint(create_ui_settings_blueprint())
-    app.register_blueprint(create_ws_support_blueprint())
-    app.register_blueprint(create_ws_streams_blueprint())
-    app.register_blueprint(create_capabilities_blueprint())
-    app.register_blueprint(create_system_resources_blueprint())
 
-    app.register_blueprint(create_xkeen_lists_blueprint(restart_xkeen=ctx.restart_xkeen))
-    app.register_blueprint(
+    _register(create_xkeen_lists_blueprint(restart_xkeen=ctx.restart_xkeen))
+    _register(
         create_config_exchange_blueprint(
             github_owner=ctx.github_owner,
             github_repo=ctx.github_repo,
         )
     )
 
-    app.register_blueprint(
+    _register(
         create_routing_blueprint(
             ROUTING_FILE=ctx.routing_file,
             ROUTING_FILE_RAW=ctx.routing_file_raw,
@@ -92,7 +158,7 @@ def register_blueprints(app, ctx: Optional[AppContext] = None):
         )
     )
 
-    app.register_blueprint(
+    _register(
         create_xray_configs_blueprint(
             restart_xkeen=ctx.restart_xkeen,
             load_json=ctx.load_json,
@@ -103,7 +169,7 @@ def register_blueprints(app, ctx: Optional[AppContext] = None):
         )
     )
 
-    app.register_blueprint(
+    _register(
         create_xray_subscriptions_blueprint(
             ui_state_dir=ctx.ui_state_dir,
             xray_configs_dir=ctx.xray_configs_dir,
@@ -112,7 +178,7 @@ def register_blueprints(app, ctx: Optional[AppContext] = None):
         )
     )
 
-    app.register_blueprint(
+    _register(
         create_mihomo_blueprint(
             MIHOMO_CONFIG_FILE=ctx.mihomo_config_file,
             MIHOMO_TEMPLATES_DIR=ctx.mihomo_templates_dir,
@@ -121,7 +187,7 @@ def register_blueprints(app, ctx: Optional[AppContext] = None):
             restart_xkeen=ctx.restart_xkeen,
         )
     )
-    app.register_blueprint(
+    _register(
         create_mihomo_clash_blueprint(
             mihomo_config_file=ctx.mihomo_config_file,
             mihomo_root=os.path.dirname(ctx.mihomo_config_file),
@@ -129,7 +195,7 @@ def register_blueprints(app, ctx: Optional[AppContext] = None):
         )
     )
 
-    app.register_blueprint(
+    _register(
         create_backups_blueprint(
             BACKUP_DIR=ctx.backup_dir,
             ROUTING_FILE=ctx.routing_file,
@@ -146,7 +212,7 @@ def register_blueprints(app, ctx: Optional[AppContext] = None):
         )
     )
 
-    app.register_blueprint(
+    _register(
         create_service_blueprint(
             restart_xkeen=ctx.restart_xkeen,
             append_restart_log=ctx.append_restart_log,
@@ -158,7 +224,7 @@ def register_blueprints(app, ctx: Optional[AppContext] = None):
         )
     )
 
-    app.register_blueprint(
+    _register(
         create_xray_logs_blueprint(
             ws_debug=ctx.ws_debug,
             restart_xray_core=ctx.restart_xray_core,
@@ -167,12 +233,12 @@ def register_blueprints(app, ctx: Optional[AppContext] = None):
         )
     )
 
-    app.register_blueprint(create_commands_blueprint())
+    _register(create_commands_blueprint())
     # Cores version/update hints (Commands tab header)
-    app.register_blueprint(create_cores_status_blueprint(ctx.ui_state_dir))
+    _register(create_cores_status_blueprint(ctx.ui_state_dir))
     # USB storage helper API (list + mount/unmount). Safe to register even if ndmc is missing.
-    app.register_blueprint(create_storage_usb_blueprint())
-    app.register_blueprint(create_devtools_blueprint(ctx.ui_state_dir))
+    _register(create_storage_usb_blueprint())
+    _register(create_devtools_blueprint(ctx.ui_state_dir))
 
     # FS / RemoteFS / FileOps are optional and should never block UI start.
     remotefs_mgr = None
@@ -183,7 +249,7 @@ def register_blueprints(app, ctx: Optional[AppContext] = None):
             xray_configs_dir=ctx.xray_configs_dir,
             backup_dir=ctx.backup_dir,
         )
-        app.register_blueprint(fs_bp)
+        _register(fs_bp)
     except Exception as _e:  # noqa: BLE001
         _warn_init("fs_blueprint_init_failed", "fs blueprint init failed", _e)
 
@@ -211,7 +277,7 @@ def register_blueprints(app, ctx: Optional[AppContext] = None):
                 return_mgr=True,
             )
             app.extensions["xkeen.remotefs_mgr"] = remotefs_mgr
-            app.register_blueprint(remotefs_bp)
+            _register(remotefs_bp)
         except Exception as _e:  # noqa: BLE001
             _warn_init("remotefs_init_failed", "remotefs init failed (non-fatal)", _e)
 
@@ -221,6 +287,6 @@ def register_blueprints(app, ctx: Optional[AppContext] = None):
             tmp_dir=str(os.getenv("XKEEN_REMOTEFM_TMP_DIR", "/tmp") or "/tmp"),
             max_upload_mb=int(os.getenv("XKEEN_REMOTEFM_MAX_UPLOAD_MB", "200")),
         )
-        app.register_blueprint(fileops_bp)
+        _register(fileops_bp)
     except Exception as _e:  # noqa: BLE001
         _warn_init("fileops_init_failed", "fileops init failed (non-fatal)", _e)
@@ -93,6 +93,14 @@ def create_commands_blueprint() -> Blueprint:
         if job is None:
             return error_response("job not found", 404, ok=False)
 
+        # ?offset=N returns only output after byte N (resume after the last
+        # "offset" seen); without it the whole output is returned as before.
+        try:
+            offset = max(0, int(request.args.get("offset", "0") or 0))
+        except Exception:
+            offset = 0
+        output, next_offset = job.buffer.read_text(offset)
+
         return (
             jsonify(
                 {
@@ -101,7 +109,9 @@ def create_commands_blueprint() -> Blueprint:
                     "flag": job.flag,
                     "status": job.status,
                     "exit_code": job.exit_code,
-                    "output": job.output,
+                    "output": output,
+                    "offset": next_offset,
+                    "truncated": job.buffer.truncated,
                     "created_at": job.created_at,
                     "finished_at": job.finished_at,
                     "error": job.error,
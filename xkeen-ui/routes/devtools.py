@@ -855,6 +855,12 @@ def create_devtools_blueprint(ui_state_dir: str) -> Blueprint:
             return jsonify({"ok": False, "error": "unknown_log"}), 404
         return jsonify({"ok": True, "name": name, "path": path})
 
+    @bp.get("/api/devtools/events")
+    def api_devtools_events() -> Any:
+        from services.events import event_bus_stats
+
+        return jsonify({"ok": True, **event_bus_stats()})
+
     @bp.get("/api/devtools/ui/status")
     def api_devtools_ui_status() -> Any:
         st = dt.ui_status()
@@ -127,7 +127,8 @@ def register_http_endpoints(bp: Blueprint, deps: Dict[str, Any]) -> None:
                 bt = int(data.get('size_total') or 0)
             except Exception:
                 bt = 0
-            _progress_set(job, files_total=1, bytes_total=bt)
+            files_total = len(data.get('items') or []) or 1
+            _progress_set(job, files_total=files_total, bytes_total=bt)
             jobmgr.submit(job, _run_job_checksum, data)
         elif op == "dirsize":
             if not callable(_run_job_dirsize):
@@ -28,6 +28,7 @@ from flask import Blueprint, request, jsonify, current_app, Response, send_file
 from werkzeug.local import LocalProxy
 
 from services.utils.env import _read_int_env
+from services.filemanager.archive_stream import stream_archive as _stream_archive
 from services.filemanager.metadata import _apply_local_metadata_best_effort as _apply_local_metadata_best_effort_impl
 from services.filemanager.local_ops import (
     tmp_free_bytes as _tmp_free_bytes_impl,
@@ -335,6 +336,33 @@ def create_fs_blueprint(
 
         return None
 
+    def _archive_stream_response(entries: Any, *, fmt: str, name: str, target: str) -> Response:
+        """Response that streams ``entries`` as an archive (no TMP_DIR staging)."""
+
+        def _on_finish(st: Any) -> None:
+            _core_log(
+                "info" if st.state == "done" else "warning",
+                "fs.archive.stream",
+                target=target,
+                name=name,
+                format=st.fmt,
+                state=st.state,
+                error=st.error or None,
+                files=st.files_done,
+                bytes_in=st.bytes_in,
+                bytes_out=st.bytes_out,
+            )
+
+        st, body, mimetype = _stream_archive(entries, fmt=fmt, name=name, target=target, on_finish=_on_finish)
+        headers = {
+            'Content-Disposition': _content_disposition_attachment(name),
+            'Cache-Control': 'no-store',
+            'X-Archive-Stream-Id': st.id,
+            # Keep reverse proxies from buffering so backpressure reaches the reader.
+            'X-Accel-Buffering': 'no',
+        }
+        return Response(body, mimetype=mimetype, headers=headers, direct_passthrough=True)
+
     def _run_lftp_mirror_with_tmp_cap(sess: Any, *, src: str, dst: str, hard_cap_bytes: int | None) -> None:
         """Run lftp mirror (remote->local) and abort if /tmp usage grows too much.
 
@@ -500,6 +528,7 @@ def create_fs_blueprint(
             "_run_lftp_mirror_with_tmp_cap": _run_lftp_mirror_with_tmp_cap,
             "MAX_ZIP_BYTES": MAX_ZIP_BYTES,
             "_apply_local_metadata_best_effort": _apply_local_metadata_best_effort,
+            "_archive_stream_response": _archive_stream_response,
         },
     )
 
@@ -553,6 +582,8 @@ def create_fs_blueprint(
             '_tmp_free_bytes': _tmp_free_bytes,
             '_remote_estimate_tree_bytes': _remote_estimate_tree_bytes,
             '_run_lftp_mirror_with_tmp_cap': _run_lftp_mirror_with_tmp_cap,
+            '_remote_stat_type_size': _remote_stat_type_size,
+            '_archive_stream_response': _archive_stream_response,
         },
     )
 
@@ -4,9 +4,12 @@ Split out of routes/fs/blueprint.py in Commit 6.
 
 Endpoints:
   - POST /api/fs/archive
+  - GET  /api/fs/archive/streams
+  - POST /api/fs/archive/streams/<stream_id>/cancel
   - POST /api/fs/archive/create
   - POST /api/fs/archive/extract
   - GET  /api/fs/archive/list
+  - GET  /api/fs/archive/member
 """
 
 from __future__ import annotations
@@ -29,13 +32,23 @@ from routes.common.errors import log_route_exception
 from services.filemanager.archive import (
     is_safe_extract_path,
     join_local_cwd,
-    list_archive_contents,
     normalize_selection_items,
     sanitize_archive_filename,
     sanitize_root_name,
     sanitize_zip_filename,
     zipinfo_is_symlink,
 )
+from services.filemanager.archive_index import list_archive_page, open_archive_member
+from services.filemanager.archive_stream import (
+    archive_streams,
+    cancel_archive_stream,
+    iter_local_selection,
+    iter_remote_selection,
+    normalize_stream_format,
+    remote_cat,
+    remote_list_dir,
+    stream_requested,
+)
 from services.filemanager.transfer import stream_file_then_cleanup
 
 
@@ -59,10 +72,32 @@ def register_archive_endpoints(bp: Blueprint, deps: Dict[str, Any]) -> None:
     _tmp_free_bytes = deps["_tmp_free_bytes"]
     _remote_estimate_tree_bytes = deps["_remote_estimate_tree_bytes"]
     _run_lftp_mirror_with_tmp_cap = deps["_run_lftp_mirror_with_tmp_cap"]
+    _remote_stat_type_size = deps["_remote_stat_type_size"]
+    _archive_stream_response = deps["_archive_stream_response"]
+
+    @bp.get("/api/fs/archive/streams")
+    def api_fs_archive_streams() -> Any:
+        """Progress of running (and recently finished) streamed archive downloads."""
+        if (resp := _require_enabled()) is not None:
+            return resp
+        return jsonify({"ok": True, "streams": archive_streams()})
+
+    @bp.post("/api/fs/archive/streams/<stream_id>/cancel")
+    def api_fs_archive_stream_cancel(stream_id: str) -> Any:
+        if (resp := _require_enabled()) is not None:
+            return resp
+        if not cancel_archive_stream(stream_id):
+            return error_response("not_found", 404, ok=False)
+        return jsonify({"ok": True, "id": stream_id})
 
     @bp.post("/api/fs/archive")
     def api_fs_archive() -> Any:
-        """Download multiple selected files/folders as a ZIP archive."""
+        """Download multiple selected files/folders as a ZIP (or tar.gz) archive.
+
+        By default the archive is streamed straight into the response
+        (see services.filemanager.archive_stream); ``?stream=0`` or
+        ``XKEEN_FS_ARCHIVE_STREAM=0`` selects the legacy staged ZIP in TMP_DIR.
+        """
         if (resp := _require_enabled()) is not None:
             return resp
 
@@ -93,6 +128,9 @@ def register_archive_endpoints(bp: Blueprint, deps: Dict[str, Any]) -> None:
         if not items:
             return error_response("items_required", 400, ok=False)
 
+        if stream_requested(request.args.get("stream", data.get("stream"))):
+            return _api_fs_archive_stream(target, items, data, dry_run=dry_run, zip_name=zip_name, root_name=root_name)
+
         os.makedirs(TMP_DIR, exist_ok=True)
         tmp_zip = os.path.join(TMP_DIR, f"xkeen_zip_selection_{uuid.uuid4().hex}.zip")
 
@@ -414,6 +452,131 @@ def register_archive_endpoints(bp: Blueprint, deps: Dict[str, Any]) -> None:
                 return error_response("not_found", 404, ok=False)
             return error_response("zip_failed", 400, ok=False)
 
+    def _api_fs_archive_stream(
+        target: str,
+        items: List[Dict[str, Any]],
+        data: Dict[str, Any],
+        *,
+        dry_run: bool,
+        zip_name: str,
+        root_name: str,
+    ) -> Any:
+        fmt = normalize_stream_format(request.args.get("format") or data.get("format") or "zip")
+        name = zip_name if fmt == "zip" else sanitize_archive_filename(zip_name, fmt)
+
+        if target == "local":
+            resolved: List[Tuple[str, str]] = []
+            for it in items:
+                try:
+                    rp = _local_resolve(it["path"], LOCALFS_ROOTS)
+                except PermissionError:
+                    return error_response("forbidden", 403, ok=False)
+                if not os.path.exists(rp):
+                    return error_response("not_found", 404, ok=False)
+                resolved.append((rp, str(it.get("name") or it["path"])))
+
+            if dry_run:
+                total_est: int | None = 0
+                total_items = 0
+                total_trunc = False
+                for rp, _name in resolved:
+                    est_b, est_n, est_t = _dir_walk_sum_bytes(rp)
+                    total_items += int(est_n or 0)
+                    total_est = None if (est_b is None or total_est is None) else total_est + int(est_b)
+                    total_trunc = total_trunc or bool(est_t)
+                return jsonify(
+                    {
+                        "ok": True,
+                        "dry_run": True,
+                        "kind": "archive_selection",
+                        "target": "local",
+                        "stream": True,
+                        "format": fmt,
+                        "zip_name": name,
+                        "root_name": root_name,
+                        "estimated_bytes": total_est,
+                        "estimate_items": total_items,
+                        "estimate_truncated": bool(total_trunc),
+                        "max_bytes": None,
+                        "tmp_need_bytes": 0,
+                        "confirm_required": False,
+                    }
+                )
+
+            return _archive_stream_response(
+                iter_local_selection(resolved, root_name=root_name),
+                fmt=fmt,
+                name=name,
+                target="local",
+            )
+
+        sid = str(request.args.get("sid") or "").strip()
+        if not sid:
+            return error_response("sid_required", 400, ok=False)
+        s, resp = _get_session_or_404(sid)
+        if resp is not None:
+            return resp
+
+        if dry_run:
+            total_est = 0
+            total_entries = 0
+            total_trunc = False
+            for it in items:
+                est_b, est_n, est_t = _remote_estimate_tree_bytes(s, it["path"], max_nodes=8000)
+                total_entries += int(est_n or 0)
+                total_est = None if (est_b is None or total_est is None) else total_est + int(est_b)
+                total_trunc = total_trunc or bool(est_t)
+            return jsonify(
+                {
+                    "ok": True,
+                    "dry_run": True,
+                    "kind": "archive_selection",
+                    "target": "remote",
+                    "sid": sid,
+                    "stream": True,
+                    "format": fmt,
+                    "zip_name": name,
+                    "root_name": root_name,
+                    "estimated_bytes": total_est,
+                    "estimate_items": total_entries,
+                    "estimate_truncated": bool(total_trunc),
+                    "max_bytes": None,
+                    "tmp_need_bytes": 0,
+                    "confirm_required": False,
+                }
+            )
+
+        # Type/size of each top-level item is resolved before the response
+        # starts so a missing path is still reported as a JSON error.
+        sel: List[Dict[str, Any]] = []
+        for it in items:
+            rpath = str(it.get("path") or "").strip()
+            if not rpath:
+                continue
+            rtype, rsize = _remote_stat_type_size(s, rpath)
+            if rtype is None:
+                return error_response("not_found", 404, ok=False)
+            sel.append(
+                {
+                    "path": rpath,
+                    "name": str(it.get("name") or os.path.basename(rpath.rstrip("/")) or "item"),
+                    "is_dir": rtype == "dir",
+                    "size": rsize,
+                }
+            )
+
+        return _archive_stream_response(
+            iter_remote_selection(
+                sel,
+                root_name=root_name,
+                list_dir=remote_list_dir(mgr, s, _lftp_quote, _parse_ls_line),
+                popen_cat=remote_cat(mgr, s, _lftp_quote),
+            ),
+            fmt=fmt,
+            name=name,
+            target="remote",
+        )
+
     # -------------------------- local archive create / extract / list --------------------------
 
     @bp.post("/api/fs/archive/create")
@@ -894,9 +1057,27 @@ def register_archive_endpoints(bp: Blueprint, deps: Dict[str, Any]) -> None:
             log_route_exception("fs.archive.extract_failed")
             return error_response("extract_failed", 400, ok=False)
 
+    def _resolve_local_archive(arch: str) -> Tuple[str | None, Any]:
+        if not arch:
+            return None, error_response("path_required", 400, ok=False)
+        try:
+            rp_arch = _local_resolve(arch, LOCALFS_ROOTS)
+        except PermissionError:
+            return None, error_response("Доступ к пути запрещён.", 403, ok=False, code="forbidden")
+        except Exception:
+            return None, error_response("bad_path", 400, ok=False)
+        if not os.path.isfile(rp_arch):
+            return None, error_response("not_found", 404, ok=False)
+        return rp_arch, None
+
     @bp.get("/api/fs/archive/list")
     def api_fs_archive_list() -> Any:
-        """List contents of an archive (.zip/.tar*). Local only."""
+        """List contents of an archive (.zip/.tar*). Local only.
+
+        Query params: ``max`` (page size), ``offset``, ``dir`` (only direct
+        children of this archive directory). ``next_offset`` is null on the
+        last page; ``total`` is null while the member index is still being built.
+        """
         if (resp := _require_enabled()) is not None:
             return resp
 
@@ -905,29 +1086,85 @@ def register_archive_endpoints(bp: Blueprint, deps: Dict[str, Any]) -> None:
             return error_response("only_local_supported", 400, ok=False)
 
         arch = str(request.args.get("path") or request.args.get("archive") or "").strip()
-        if not arch:
-            return error_response("path_required", 400, ok=False)
-
         try:
-            max_items = int(request.args.get("max") or 2000)
+            max_items = int(request.args.get("limit") or request.args.get("max") or 2000)
         except Exception:
             max_items = 2000
         max_items = max(1, min(max_items, 10000))
-
         try:
-            rp_arch = _local_resolve(arch, LOCALFS_ROOTS)
-        except PermissionError:
-            return error_response("Доступ к пути запрещён.", 403, ok=False, code="forbidden")
+            offset = max(0, int(request.args.get("offset") or 0))
         except Exception:
-            return error_response("bad_path", 400, ok=False)
-        if not os.path.isfile(rp_arch):
-            return error_response("not_found", 404, ok=False)
+            offset = 0
+        directory = request.args.get("dir")
+        if directory is not None:
+            directory = str(directory).replace("\\", "/").strip().strip("/")
+
+        rp_arch, resp = _resolve_local_archive(arch)
+        if resp is not None:
+            return resp
 
         try:
-            items, truncated = list_archive_contents(rp_arch, max_items=max_items)
-            return jsonify({"ok": True, "path": arch, "items": items, "truncated": bool(truncated)})
+            page = list_archive_page(rp_arch, offset=offset, limit=max_items, directory=directory)
+            return jsonify(
+                {
+                    "ok": True,
+                    "path": arch,
+                    "dir": directory,
+                    "items": page["items"],
+                    "offset": page["offset"],
+                    "next_offset": page["next_offset"],
+                    "total": page["total"],
+                    "complete": page["complete"],
+                    "truncated": bool(page["next_offset"] is not None or page["truncated"]),
+                }
+            )
         except ValueError:
             return error_response("unsupported_archive", 400, ok=False)
         except Exception as e:
             log_route_exception("fs.archive.list_failed")
             return error_response("archive_list_failed", 400, ok=False)
+
+    @bp.get("/api/fs/archive/member")
+    def api_fs_archive_member() -> Any:
+        """Download a single member of a local archive without extracting it."""
+        if (resp := _require_enabled()) is not None:
+            return resp
+
+        arch = str(request.args.get("path") or request.args.get("archive") or "").strip()
+        name = str(request.args.get("name") or "").strip()
+        if not name:
+            return error_response("name_required", 400, ok=False)
+        rp_arch, resp = _resolve_local_archive(arch)
+        if resp is not None:
+            return resp
+
+        try:
+            fobj, size = open_archive_member(rp_arch, name)
+        except KeyError:
+            return error_response("not_found", 404, ok=False)
+        except ValueError:
+            return error_response("unsupported_archive", 400, ok=False)
+        except Exception:
+            log_route_exception("fs.archive.member_failed")
+            return error_response("archive_read_failed", 400, ok=False)
+
+        def _gen():
+            try:
+                while True:
+                    chunk = fobj.read(64 * 1024)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                try:
+                    fobj.close()
+                except Exception:
+                    pass
+
+        leaf = os.path.basename(name.rstrip("/")) or "file"
+        headers = {
+            "Content-Disposition": _content_disposition_attachment(leaf),
+            "Cache-Control": "no-store",
+            "Content-Length": str(int(size)),
+        }
+        return Response(_gen(), mimetype="application/octet-stream", headers=headers)
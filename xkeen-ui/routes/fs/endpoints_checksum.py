@@ -5,7 +5,7 @@ from typing import Any, Dict
 
 from flask import Blueprint, jsonify, request
 
-from services.filemanager.checksum import hash_file, hash_stream
+from services.filemanager.checksum import hash_file_cached, hash_stream
 
 
 def register_checksum_endpoints(bp: Blueprint, deps: Dict[str, Any]) -> None:
@@ -49,22 +49,18 @@ def register_checksum_endpoints(bp: Blueprint, deps: Dict[str, Any]) -> None:
                 return error_response('not_found', 404, ok=False)
 
             try:
-                md5_hex, sha_hex, total = hash_file(rp, chunk_bytes=CHUNK)
+                md5_hex, sha_hex, total, cached = hash_file_cached(rp, chunk_bytes=CHUNK)
             except Exception:
                 return error_response('read_failed', 400, ok=False)
 
-            try:
-                size_bytes = int(os.path.getsize(rp))
-            except Exception:
-                size_bytes = int(total)
-
             return jsonify({
                 'ok': True,
                 'target': 'local',
                 'path': rp,
-                'size': size_bytes,
+                'size': int(total),
                 'md5': md5_hex,
                 'sha256': sha_hex,
+                'cached': bool(cached),
             })
 
         # remote
@@ -16,6 +16,17 @@ from typing import Any, Dict
 from flask import Response, jsonify, request, send_file
 
 from routes.common.errors import log_route_exception
+from services.filemanager.archive import sanitize_archive_filename
+from services.filemanager.archive_stream import (
+    iter_local_entries,
+    iter_remote_entries,
+    normalize_stream_format,
+    remote_cat,
+    remote_list_dir,
+    stream_requested,
+)
+from services.filemanager.checksum import StreamDigest
+from services.filemanager.checksum_cache import get_checksum_cache
 from services.filemanager.transfer import save_filestorage_to_tmp, stream_file_then_cleanup
 from services.xray_assets import ensure_xray_dat_assets
 
@@ -47,6 +58,25 @@ def _sync_uploaded_xray_dat_if_needed(path: str, *, core_log=None) -> None:
             core_log("warning", "fs.upload.xray_assets_failed", error=str(exc), path=uploaded_real)
 
 
+def _expected_upload_digests() -> Dict[str, str]:
+    """Optional ?sha256=/?md5= the client expects for the uploaded bytes."""
+    out: Dict[str, str] = {}
+    for name, length in (("sha256", 64), ("md5", 32)):
+        raw = str(request.args.get(name, "") or "").strip().lower()
+        if raw:
+            out[name] = raw if len(raw) == length else "invalid"
+    return out
+
+
+def _upload_digest_mismatch(expected: Dict[str, str], digest: StreamDigest) -> str:
+    md5_hex, sha_hex = digest.hexdigests()
+    actual = {"md5": md5_hex, "sha256": sha_hex}
+    for name, want in expected.items():
+        if want != actual[name]:
+            return name
+    return ""
+
+
 def register_transfer_endpoints(bp, deps: Dict[str, Any]) -> None:
     error_response = deps["error_response"]
     _require_enabled = deps["_require_enabled"]
@@ -76,6 +106,27 @@ def register_transfer_endpoints(bp, deps: Dict[str, Any]) -> None:
     MAX_ZIP_BYTES = deps.get("MAX_ZIP_BYTES")
 
     _apply_local_metadata_best_effort = deps.get("_apply_local_metadata_best_effort")
+    _archive_stream_response = deps["_archive_stream_response"]
+
+    def _stream_dry_run(kind_target: str, est: tuple, fmt: str, **extra: Any) -> Any:
+        est_bytes, est_items, est_trunc = est
+        return jsonify(
+            {
+                "ok": True,
+                "dry_run": True,
+                "kind": "download_dir_zip",
+                "target": kind_target,
+                **extra,
+                "stream": True,
+                "format": fmt,
+                "estimated_bytes": est_bytes,
+                "estimate_items": est_items,
+                "estimate_truncated": bool(est_trunc),
+                "max_bytes": None,
+                "tmp_need_bytes": 0,
+                "confirm_required": False,
+            }
+        )
 
     @bp.get("/api/fs/download")
     def api_fs_download() -> Any:
@@ -85,6 +136,7 @@ def register_transfer_endpoints(bp, deps: Dict[str, Any]) -> None:
           target=local|remote
           path=<full path>
           sid=<remote session id> (for target=remote)
+          archive=zip (directories), format=zip|tar.gz, stream=0|1
         """
         if (resp := _require_enabled()) is not None:
             return resp
@@ -103,6 +155,8 @@ def register_transfer_endpoints(bp, deps: Dict[str, Any]) -> None:
             return error_response("bad_target", 400, ok=False)
         if not path:
             return error_response("path_required", 400, ok=False)
+        stream = stream_requested(request.args.get("stream"))
+        fmt = normalize_stream_format(request.args.get("format") or "zip")
 
         if target == "local":
             try:
@@ -119,6 +173,16 @@ def register_transfer_endpoints(bp, deps: Dict[str, Any]) -> None:
                     return error_response("not_a_file", 400, ok=False)
 
                 base = os.path.basename(rp.rstrip("/")) or "download"
+                if stream:
+                    if dry_run:
+                        return _stream_dry_run("local", _dir_walk_sum_bytes(rp), fmt, path=rp)
+                    return _archive_stream_response(
+                        iter_local_entries(rp, base),
+                        fmt=fmt,
+                        name=sanitize_archive_filename(base, fmt),
+                        target="local",
+                    )
+
                 zip_name = base + ".zip"
                 tmp_zip = os.path.join(TMP_DIR, f"xkeen_zip_local_{uuid.uuid4().hex}.zip")
                 try:
@@ -235,6 +299,23 @@ def register_transfer_endpoints(bp, deps: Dict[str, Any]) -> None:
                 return error_response("not_a_file", 400, ok=False)
 
             base = os.path.basename(path.rstrip("/")) or "download"
+            if stream:
+                if dry_run:
+                    return _stream_dry_run("remote", _remote_estimate_tree_bytes(s, path), fmt, sid=sid, path=path)
+                return _archive_stream_response(
+                    iter_remote_entries(
+                        path,
+                        base,
+                        is_dir=True,
+                        size=None,
+                        list_dir=remote_list_dir(mgr, s, _lftp_quote, _parse_ls_line),
+                        popen_cat=remote_cat(mgr, s, _lftp_quote),
+                    ),
+                    fmt=fmt,
+                    name=sanitize_archive_filename(base, fmt),
+                    target="remote",
+                )
+
             zip_name = base + ".zip"
             tmp_root = os.path.join(TMP_DIR, f"xkeen_zip_remote_{sid}_{uuid.uuid4().hex}")
             tmp_dir = os.path.join(tmp_root, base)
@@ -395,6 +476,12 @@ def register_transfer_endpoints(bp, deps: Dict[str, Any]) -> None:
             safe_fn = "upload.bin"
 
         max_bytes = int(MAX_UPLOAD_MB) * 1024 * 1024
+        # Digests are computed while the upload is spooled, so verification
+        # and the checksum cache cost no extra read of the file.
+        expected = _expected_upload_digests()
+        if "invalid" in expected.values():
+            return error_response("bad_checksum", 400, ok=False)
+        digest = StreamDigest()
 
         if target == "local":
             dest = path
@@ -453,6 +540,7 @@ def register_transfer_endpoints(bp, deps: Dict[str, Any]) -> None:
                     tmp_dir=TMP_DIR,
                     prefix="xkeen_upload_local_",
                     max_bytes=max_bytes,
+                    on_chunk=digest.update,
                 )
             except ValueError as e:
                 if str(e) == "too_large":
@@ -461,6 +549,14 @@ def register_transfer_endpoints(bp, deps: Dict[str, Any]) -> None:
             except Exception:
                 return error_response("upload_failed", 400, ok=False)
 
+            bad = _upload_digest_mismatch(expected, digest)
+            if bad:
+                try:
+                    os.remove(tmp_path)
+                except Exception:
+                    pass
+                return error_response("checksum_mismatch", 400, ok=False, algo=bad)
+
             try:
                 os.replace(tmp_path, rp)
             except Exception:
@@ -479,9 +575,15 @@ def register_transfer_endpoints(bp, deps: Dict[str, Any]) -> None:
             if callable(_core_log):
                 _core_log("info", "fs.upload", target="local", path=str(rp), bytes=int(total), overwrite=bool(overwrite))
 
+            md5_hex, sha_hex = digest.hexdigests()
+            try:
+                get_checksum_cache().remember(rp, md5_hex, sha_hex)
+            except Exception:
+                pass
+
             _sync_uploaded_xray_dat_if_needed(rp, core_log=_core_log)
 
-            return jsonify({"ok": True, "bytes": total, "path": rp})
+            return jsonify({"ok": True, "bytes": total, "path": rp, "md5": md5_hex, "sha256": sha_hex})
 
         # remote
         sid = str(request.args.get("sid") or "").strip()
@@ -531,6 +633,7 @@ def register_transfer_endpoints(bp, deps: Dict[str, Any]) -> None:
                 tmp_dir=TMP_DIR,
                 prefix=f"xkeen_upload_{sid}_",
                 max_bytes=max_bytes,
+                on_chunk=digest.update,
             )
         except ValueError as e:
             if str(e) == "too_large":
@@ -540,6 +643,10 @@ def register_transfer_endpoints(bp, deps: Dict[str, Any]) -> None:
             return error_response("upload_failed", 400, ok=False)
 
         try:
+            bad = _upload_digest_mismatch(expected, digest)
+            if bad:
+                return error_response("checksum_mismatch", 400, ok=False, algo=bad)
+
             if create_parents:
                 parent = os.path.dirname(remote_path.rstrip("/"))
                 if parent and parent not in ("", "."):
@@ -554,7 +661,8 @@ def register_transfer_endpoints(bp, deps: Dict[str, Any]) -> None:
             if callable(_core_log):
                 _core_log("info", "fs.upload", target="remote", sid=sid, path=remote_path, bytes=int(total), overwrite=bool(overwrite))
 
-            return jsonify({"ok": True, "bytes": total})
+            md5_hex, sha_hex = digest.hexdigests()
+            return jsonify({"ok": True, "bytes": total, "md5": md5_hex, "sha256": sha_hex})
         finally:
             try:
                 if os.path.exists(tmp_path):
@@ -61,6 +61,10 @@ from mihomo_server_core import (
 from services.mihomo_proxy_parsers import parse_wireguard
 from services.mihomo_proxy_parsers import parse_openvpn, parse_tailscale
 from services.mihomo_node_import import build_mihomo_node_draft
+from services.mihomo_provider_cache import (
+    PROVIDER_PAYLOAD_CACHE as _mh_provider_cache,
+    cache_key as _mh_provider_cache_key,
+)
 from services.mihomo_proxy_config import (
     apply_proxy_insert,
     rename_proxy_in_config,
@@ -122,6 +126,7 @@ from services.mihomo_backups import (
     clean_backups_for_api as _mh_clean_backups_for_api,
 )
 
+from services.device_identity import refresh_device_identity as _refresh_device_identity
 from services.mihomo_hwid_sub import (
     get_device_info as _mh_hwid_get_device_info,
     probe_subscription_safe as _mh_hwid_probe_subscription_safe,
@@ -775,6 +780,22 @@ def create_mihomo_blueprint(
             # must not fail just because the sidecar state could not be updated.
             pass
 
+    def _provider_adapter_response(url: str, headers: Dict[str, str], *, insecure: bool, policy: URLPolicy):
+        def fetch(conditional: Dict[str, str]):
+            return _mh_hwid_fetch_provider_payload(
+                url,
+                headers={**headers, **conditional},
+                insecure=insecure,
+                timeout=20.0,
+                policy=policy,
+            )
+
+        key = _mh_provider_cache_key(url, insecure=insecure, headers=headers)
+        payload, _meta, state = _mh_provider_cache.get(key, fetch)
+        resp = current_app.response_class(payload, mimetype="text/yaml")
+        resp.headers["X-Xkeen-Provider-Cache"] = state
+        return resp
+
     @bp.get("/mihomo/provider.yaml")
     def public_mihomo_provider_yaml():
         """Loopback-only provider adapter for regular HTTP subscriptions."""
@@ -794,14 +815,7 @@ def create_mihomo_blueprint(
             )
 
         try:
-            payload, _meta = _mh_hwid_fetch_provider_payload(
-                url,
-                headers={},
-                insecure=insecure,
-                timeout=20.0,
-                policy=policy,
-            )
-            return current_app.response_class(payload, mimetype="text/yaml")
+            return _provider_adapter_response(url, {}, insecure=insecure, policy=policy)
         except ValueError as exc:
             msg = str(exc or "invalid_provider_payload")
             status = 400 if msg.startswith("url_blocked:") else 502
@@ -997,14 +1011,7 @@ def create_mihomo_blueprint(
         try:
             info = _mh_hwid_get_device_info()
             headers = _mihomo_hwid_profile_headers(info, _mihomo_hwid_profile_from_query())
-            payload, _meta = _mh_hwid_fetch_provider_payload(
-                url,
-                headers=headers,
-                insecure=insecure,
-                timeout=20.0,
-                policy=policy,
-            )
-            return current_app.response_class(payload, mimetype="text/yaml")
+            return _provider_adapter_response(url, headers, insecure=insecure, policy=policy)
         except ValueError as exc:
             msg = str(exc or "invalid_provider_payload")
             status = 400 if msg.startswith("url_blocked:") else 502
@@ -1508,8 +1515,13 @@ def create_mihomo_blueprint(
 
     @bp.get("/api/mihomo/hwid/device")
     def api_mihomo_hwid_device():
-        """Return best-effort device info + headers for HWID-bound subscriptions."""
+        """Return best-effort device info + headers for HWID-bound subscriptions.
+
+        ``?refresh=1`` drops the cached ndmc/mihomo identity and probes again.
+        """
         try:
+            if _bool_arg("refresh", False):
+                _refresh_device_identity()
             info = _mh_hwid_get_device_info()
         except Exception as exc:  # pragma: no cover - defensive
             return _mihomo_exception(
@@ -4,6 +4,8 @@ from __future__ import annotations
 
 import os
 import re
+import threading
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Callable, Mapping
@@ -50,6 +52,7 @@ MAX_AFFECTED_DISCONNECTS = 24
 MIHOMO_PROXY_UNFIX_MIN_VERSION = (1, 18, 9)
 AUTOMATIC_GROUP_TYPES = {"urltest", "fallback", "smart", "loadbalance", "load-balance"}
 MAX_PROXY_DETAIL_CONFIG_BYTES = 4 * 1024 * 1024
+PROXY_INDEX_CACHE_MAX = 32
 AuditLogger = Callable[..., Any]
 ActionGuard = MihomoClashActionGuard
 
@@ -387,21 +390,53 @@ def _healthcheck_interval(spec: Any) -> int | None:
     return _duration_seconds(spec.get("interval"))
 
 
-def _load_proxy_transport_index(config_file: str, mihomo_root: str) -> dict[str, Any]:
-    """Read only display-safe proxy fields from the active config/provider cache."""
-    try:
-        root_path = Path(mihomo_root).expanduser().resolve(strict=True)
-        config_path = Path(config_file).expanduser().resolve(strict=True)
-        config_path.relative_to(root_path)
-        if config_path.stat().st_size > MAX_PROXY_DETAIL_CONFIG_BYTES:
-            return {}
-        config_text = config_path.read_text(encoding="utf-8")
-        config = _yaml.safe_load(config_text) if _yaml is not None else None
-        config = config or {}
-    except Exception:
-        return {}
+_SNAPSHOT_EXECUTOR: ThreadPoolExecutor | None = None
+_SNAPSHOT_EXECUTOR_LOCK = threading.Lock()
+
+
+def _snapshot_executor() -> ThreadPoolExecutor:
+    """Shared workers for parallel read-only Mihomo snapshot requests."""
+
+    global _SNAPSHOT_EXECUTOR
+    with _SNAPSHOT_EXECUTOR_LOCK:
+        if _SNAPSHOT_EXECUTOR is None:
+            _SNAPSHOT_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="mihomo-snapshot")
+        return _SNAPSHOT_EXECUTOR
+
+
+# Parsed proxy metadata per file generation: (path, dev, ino, size,
+# mtime_ns, yaml available) -> value.  The config and each provider cache
+# file are keyed separately, so a refreshed provider only re-parses itself.
+_PROXY_INDEX_CACHE: "OrderedDict[tuple, Any]" = OrderedDict()
+_PROXY_INDEX_LOCK = threading.Lock()
+
+
+def _file_generation(path: Path) -> tuple:
+    st = path.stat()
+    return (str(path), st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, _yaml is not None)
+
+
+def _cached_file_index(kind: str, path: Path, build: Callable[[str], Any]) -> Any:
+    key = (kind, *_file_generation(path))
+    if key[4] > MAX_PROXY_DETAIL_CONFIG_BYTES:
+        return None
+    with _PROXY_INDEX_LOCK:
+        if key in _PROXY_INDEX_CACHE:
+            _PROXY_INDEX_CACHE.move_to_end(key)
+            return _PROXY_INDEX_CACHE[key]
+    value = build(path.read_text(encoding="utf-8"))
+    with _PROXY_INDEX_LOCK:
+        _PROXY_INDEX_CACHE[key] = value
+        while len(_PROXY_INDEX_CACHE) > PROXY_INDEX_CACHE_MAX:
+            _PROXY_INDEX_CACHE.popitem(last=False)
+    return value
+
+
+def _index_config_text(config_text: str) -> dict[str, Any] | None:
+    config = _yaml.safe_load(config_text) if _yaml is not None else None
+    config = config or {}
     if config and not isinstance(config, Mapping):
-        return {}
+        return None
 
     local: dict[str, Any] = _fallback_proxy_rows(config_text)
     if isinstance(config, Mapping):
@@ -409,63 +444,26 @@ def _load_proxy_transport_index(config_file: str, mihomo_root: str) -> dict[str,
             if isinstance(raw, Mapping) and str(raw.get("name") or "").strip():
                 local[str(raw.get("name")).strip()] = _proxy_transport_details(raw)
 
-    providers: dict[str, Any] = {}
-    provider_intervals: dict[str, int] = {}
     configured: Mapping[str, Any] = config.get("proxy-providers") if isinstance(config, Mapping) else {}
     if not isinstance(configured, Mapping):
         configured = {}
     fallback_specs = _fallback_provider_specs(config_text)
-    provider_names = list(dict.fromkeys([*configured.keys(), *fallback_specs.keys()]))
-    if provider_names:
-        for provider_name in provider_names:
-            spec = configured.get(provider_name, {})
-            if not isinstance(spec, Mapping):
-                spec = {}
-            provider_name_text = str(provider_name)
-            interval = _healthcheck_interval(spec)
-            if interval:
-                provider_intervals[provider_name_text] = interval
-            configured_path = str(spec.get("path") or fallback_specs.get(provider_name_text) or "").strip()
-            path_candidates = [configured_path] if configured_path else []
-            # Mihomo's default HTTP-provider cache location. It is also the
-            # path generated by Xkeen, but older/custom configs may omit path.
-            path_candidates.extend((
-                f"proxy_providers/{provider_name_text}.yaml",
-                f"providers/{provider_name_text}.yaml",
-            ))
-            try:
-                provider_path = None
-                for raw_path in path_candidates:
-                    candidate_path = Path(raw_path).expanduser()
-                    if not candidate_path.is_absolute():
-                        candidate_path = root_path / candidate_path
-                    try:
-                        candidate_path = candidate_path.resolve(strict=True)
-                        candidate_path.relative_to(root_path)
-                        provider_path = candidate_path
-                        break
-                    except (OSError, ValueError):
-                        continue
-                if provider_path is None:
-                    continue
-                provider_path.relative_to(root_path)
-                if provider_path.stat().st_size > MAX_PROXY_DETAIL_CONFIG_BYTES:
-                    continue
-                provider_text = provider_path.read_text(encoding="utf-8")
-                provider_rows = _fallback_proxy_rows(provider_text)
-                if _yaml is not None:
-                    content = _yaml.safe_load(provider_text) or {}
-                    rows = content.get("proxies") if isinstance(content, Mapping) else None
-                    if isinstance(rows, list):
-                        provider_rows.update({
-                            str(raw.get("name")).strip(): _proxy_transport_details(raw)
-                            for raw in rows
-                            if isinstance(raw, Mapping) and str(raw.get("name") or "").strip()
-                        })
-                if provider_rows:
-                    providers[provider_name_text] = provider_rows
-            except Exception:
-                continue
+    providers: list[tuple[str, int | None, list[str]]] = []
+    for provider_name in dict.fromkeys([*configured.keys(), *fallback_specs.keys()]):
+        spec = configured.get(provider_name, {})
+        if not isinstance(spec, Mapping):
+            spec = {}
+        provider_name_text = str(provider_name)
+        configured_path = str(spec.get("path") or fallback_specs.get(provider_name_text) or "").strip()
+        path_candidates = [configured_path] if configured_path else []
+        # Mihomo's default HTTP-provider cache location. It is also the
+        # path generated by Xkeen, but older/custom configs may omit path.
+        path_candidates.extend((
+            f"proxy_providers/{provider_name_text}.yaml",
+            f"providers/{provider_name_text}.yaml",
+        ))
+        providers.append((provider_name_text, _healthcheck_interval(spec), path_candidates))
+
     group_intervals: dict[str, int] = {}
     if isinstance(config, Mapping):
         raw_groups = config.get("proxy-groups")
@@ -477,11 +475,70 @@ def _load_proxy_transport_index(config_file: str, mihomo_root: str) -> dict[str,
                 interval = _healthcheck_interval(raw_group)
                 if group_name and interval:
                     group_intervals[group_name] = interval
+    return {"local": local, "providers": providers, "group_intervals": group_intervals}
+
+
+def _index_provider_text(provider_text: str) -> dict[str, Any]:
+    provider_rows = _fallback_proxy_rows(provider_text)
+    if _yaml is not None:
+        content = _yaml.safe_load(provider_text) or {}
+        rows = content.get("proxies") if isinstance(content, Mapping) else None
+        if isinstance(rows, list):
+            provider_rows.update({
+                str(raw.get("name")).strip(): _proxy_transport_details(raw)
+                for raw in rows
+                if isinstance(raw, Mapping) and str(raw.get("name") or "").strip()
+            })
+    return provider_rows
+
+
+def _load_proxy_transport_index(config_file: str, mihomo_root: str) -> dict[str, Any]:
+    """Read only display-safe proxy fields from the active config/provider cache.
+
+    Parsed results are cached per file generation (see ``_PROXY_INDEX_CACHE``),
+    so the groups/select/unfix endpoints only ``stat()`` unchanged files.
+    The returned mappings are shared and must be treated as read-only.
+    """
+    try:
+        root_path = Path(mihomo_root).expanduser().resolve(strict=True)
+        config_path = Path(config_file).expanduser().resolve(strict=True)
+        config_path.relative_to(root_path)
+        index = _cached_file_index("config", config_path, _index_config_text)
+    except Exception:
+        return {}
+    if index is None:
+        return {}
+
+    providers: dict[str, Any] = {}
+    provider_intervals: dict[str, int] = {}
+    for provider_name_text, interval, path_candidates in index["providers"]:
+        if interval:
+            provider_intervals[provider_name_text] = interval
+        try:
+            provider_path = None
+            for raw_path in path_candidates:
+                candidate_path = Path(raw_path).expanduser()
+                if not candidate_path.is_absolute():
+                    candidate_path = root_path / candidate_path
+                try:
+                    candidate_path = candidate_path.resolve(strict=True)
+                    candidate_path.relative_to(root_path)
+                    provider_path = candidate_path
+                    break
+                except (OSError, ValueError):
+                    continue
+            if provider_path is None:
+                continue
+            provider_rows = _cached_file_index("provider", provider_path, _index_provider_text)
+            if provider_rows:
+                providers[provider_name_text] = provider_rows
+        except Exception:
+            continue
     return {
-        "local": local,
+        "local": index["local"],
         "providers": providers,
         "provider_intervals": provider_intervals,
-        "group_intervals": group_intervals,
+        "group_intervals": index["group_intervals"],
     }
 
 
@@ -799,23 +856,13 @@ def create_mihomo_clash_blueprint(
         if unavailable:
             return unavailable
         try:
-            # These are independent read-only snapshots. Use separate clients
-            # so TCP/Unix connections are never shared across worker threads.
-            discovery = discovery_factory(mihomo_config_file, root)
-            if discovery.target is None:
-                return error_response(
-                    "Mihomo controller не настроен или заблокирован.",
-                    503,
-                    ok=False,
-                    code="mihomo_clash_target_unavailable",
-                    retryable=False,
-                )
-            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="mihomo-groups") as executor:
-                proxies_future = executor.submit(client.request_json, "proxies")
-                providers_client = client_factory(discovery.target)
-                providers_future = executor.submit(providers_client.request_json, "providers_proxies")
-                proxies = proxies_future.result()
-                providers = providers_future.result()
+            # These are independent read-only snapshots. Each request checks
+            # out its own pooled connection, so one client can run both.
+            executor = _snapshot_executor()
+            proxies_future = executor.submit(client.request_json, "proxies")
+            providers_future = executor.submit(client.request_json, "providers_proxies")
+            proxies = proxies_future.result()
+            providers = providers_future.result()
         except MihomoClashClientError as exc:
             return _safe_client_error(exc)
         except Exception:
@@ -12,6 +12,7 @@ import hashlib
 import json
 import os
 import re
+import time
 from typing import Any
 
 from flask import Flask, current_app, jsonify, request, session
@@ -48,6 +49,10 @@ _MOBILE_LOG_SOURCES = {
     "error": "xray-error",
     "access": "xray-access",
 }
+# Long-poll (`wait=<seconds>`) bounds. Keep the cap below common proxy/NAT idle
+# timeouts; the short coalescing window batches a burst of lines into one reply.
+_MOBILE_LOG_WAIT_MAX_SECONDS = 25.0
+_MOBILE_LOG_COALESCE_SECONDS = 0.15
 _MOBILE_LOG_TIME_RE = re.compile(r"\b\d{4}/\d{2}/\d{2}\s+(\d{2}:\d{2}:\d{2})\b")
 
 # Xray writes the record severity in a marker (normally ``[Info]``) near the
@@ -256,6 +261,67 @@ def _mobile_log_cursor_decode(value: str, source: str) -> dict[str, Any] | None:
         return None
 
 
+def _mobile_log_notifier() -> Any:
+    from services.file_change_notifier import get_file_change_notifier
+
+    return get_file_change_notifier()
+
+
+def _mobile_log_wait_targets(cursors: dict[str, str]) -> dict[str, tuple[int, int]] | None:
+    """Map each followed log path to the ``(inode, offset)`` its cursor already consumed.
+
+    A missing log answers without data, so it is watched for creation
+    (``(0, -1)``) instead of blocking the wait on the other streams. Returns
+    ``None`` when an existing log has no valid cursor: that stream answers
+    with a snapshot, which carries data and must not wait.
+    """
+
+    resolve_path = _mobile_xray_logs_dependencies()["resolve_path"]
+    targets: dict[str, tuple[int, int]] = {}
+    for source in _MOBILE_LOG_SOURCES:
+        path = resolve_path(source)
+        if not path:
+            continue
+        path = str(path)
+        if not os.path.isfile(path):
+            targets[path] = (0, -1)
+            continue
+        previous = _mobile_log_cursor_decode(cursors.get(source, ""), source)
+        if previous is None:
+            return None
+        targets[path] = (int(previous["inode"]), int(previous["offset"]))
+    return targets
+
+
+def _mobile_log_wait(cursors: dict[str, str], wait_seconds: float) -> dict[str, Any]:
+    """Park until a followed log changes or ``wait_seconds`` elapse."""
+
+    started = time.monotonic()
+    targets = _mobile_log_wait_targets(cursors)
+    changed = True
+    if targets:
+        changed = _mobile_log_notifier().wait(targets, wait_seconds) is not None
+        if changed and _MOBILE_LOG_COALESCE_SECONDS > 0:
+            time.sleep(_MOBILE_LOG_COALESCE_SECONDS)
+    return {
+        "waited_ms": int((time.monotonic() - started) * 1000),
+        "timed_out": not changed,
+        "max_seconds": _MOBILE_LOG_WAIT_MAX_SECONDS,
+    }
+
+
+def _mobile_domain_map(streams: list[dict[str, Any]]) -> dict[str, str]:
+    from services.xray_domain_index import refreshed_xray_domain_index
+
+    path = _mobile_xray_logs_dependencies()["resolve_path"]("error")
+    index, _info = refreshed_xray_domain_index(path or None)
+    return index.annotate_lines(
+        entry.get("message", "")
+        for stream in streams
+        for entry in stream.get("entries", [])
+    )
+
+
 def _mobile_log_level(line: str, source: str = "error") -> str:
     """Return the semantic level of one Xray log record.
 
@@ -462,10 +528,19 @@ def register_mobile_routes(app: Flask) -> None:
         except (TypeError, ValueError):
             limit = 200
         limit = min(500, max(50, limit))
+        cursors = {source: str(request.args.get(f"{source}-cursor") or "") for source in _MOBILE_LOG_SOURCES}
+        try:
+            wait_seconds = float(request.args.get("wait", 0) or 0)
+        except (TypeError, ValueError):
+            wait_seconds = 0.0
+        wait_seconds = min(_MOBILE_LOG_WAIT_MAX_SECONDS, max(0.0, wait_seconds))
+        # Long-poll: with valid cursors for every stream, park until one log gets
+        # new bytes (or rotates) instead of answering with empty append batches.
+        poll = _mobile_log_wait(cursors, wait_seconds) if wait_seconds > 0 else None
         streams = [
             _mobile_log_stream(
                 source=source,
-                cursor=str(request.args.get(f"{source}-cursor") or ""),
+                cursor=cursors[source],
                 limit=limit,
             )
             for source in _MOBILE_LOG_SOURCES
@@ -474,6 +549,13 @@ def register_mobile_routes(app: Flask) -> None:
             "contract_version": 1,
             "streams": streams,
         }
+        if poll is not None:
+            payload["poll"] = poll
+        include_domain_map = str(request.args.get("include-domain-map") or "").strip().lower()
+        if include_domain_map in {"1", "true", "yes", "on"}:
+            # {ip: domain} hints for destination IPs in this batch, served from the
+            # incremental server-side index instead of a one-shot history rescan.
+            payload["domain_map"] = _mobile_domain_map(streams)
         include_domain_seed = str(request.args.get("include-domain-seed") or "").strip().lower()
         if include_domain_seed in {"1", "true", "yes", "on"}:
             # Additive, one-shot history for correlating `sniffed domain` error lines with
@@ -15,6 +15,7 @@ from .dat import register_dat_routes
 from .geodat import register_geodat_routes
 from .fragments import register_fragments_routes
 from .config import register_config_routes
+from .simulate import register_simulate_routes
 from .templates import register_templates_routes
 
 
@@ -72,6 +73,14 @@ def create_routing_blueprint(
         append_restart_log=append_restart_log,
         save_operation_diagnostic=save_operation_diagnostic,
     )
+    register_simulate_routes(
+        bp,
+        routing_file=ROUTING_FILE,
+        routing_file_raw=ROUTING_FILE_RAW,
+        xray_configs_dir=XRAY_CONFIGS_DIR,
+        xray_configs_dir_real=XRAY_CONFIGS_DIR_REAL,
+        strip_json_comments_text=strip_json_comments_text,
+    )
     register_templates_routes(
         bp,
         routing_file=ROUTING_FILE,
@@ -34,8 +34,17 @@ from services.geodat.runner import (
     _run_xk_geodat_json,
 )
 from services.geodat.install import _is_elf_binary
-
-from services.filemanager.metadata import _apply_local_metadata_best_effort
+from services.geodat.match_index import MAX_BATCH, MatchIndex, get_match_index, index_building, lookup_many
+from services.geodat.reader import DatIndex, get_dat_index, native_enabled
+from services.geodat.updates import (
+    DEFAULT_WINDOW,
+    dat_max_mb,
+    get_source,
+    in_update_window,
+    list_sources,
+    set_auto_update,
+    update_dat_file,
+)
 
 from services.url_policy import (
     blocked_url_hint,
@@ -44,8 +53,6 @@ from services.url_policy import (
     is_url_allowed as is_url_allowed_for_policy,
 )
 
-from services.xray_assets import ensure_xray_dat_assets
-
 from .errors import _geodat_error_payload, _geodat_missing_bin_payload
 
 
@@ -78,6 +85,40 @@ def _core_log(level: str, msg: str, **extra) -> None:
         pass
 
 
+def _geodat_native_index(kind: str, path: str) -> DatIndex | None:
+    """Native DAT index, or None to fall back to xk-geodat."""
+    if not native_enabled():
+        return None
+    try:
+        return get_dat_index(kind, path)
+    except Exception as e:
+        _core_log("warning", "geodat.native_failed", kind=kind, path=path, error=str(e) or type(e).__name__)
+        return None
+
+
+def _geodat_match_index(kind: str, path: str, *, build: bool) -> MatchIndex | None:
+    """Compiled lookup index, or None to fall back to xk-geodat (see get_match_index)."""
+    if not native_enabled():
+        return None
+    try:
+        return get_match_index(kind, path, build=build)
+    except Exception as e:
+        _core_log("warning", "geodat.match_index_failed", kind=kind, path=path, error=str(e) or type(e).__name__)
+        return None
+
+
+def _geodat_native_dump(idx: DatIndex, tag: str, offset: int, limit: int) -> Dict[str, Any] | None:
+    """``{items, total}`` from the native index, an error payload, or None on decode failure."""
+    try:
+        items, total = idx.dump(tag, offset, limit)
+    except KeyError:
+        return _geodat_error_payload('tag_not_found', kind=idx.kind, path=idx.path)
+    except Exception as e:
+        _core_log("warning", "geodat.native_failed", kind=idx.kind, path=idx.path, error=str(e) or type(e).__name__)
+        return None
+    return {'items': items, 'total': total}
+
+
 def _dat_url_policy():
     return get_policy_from_env("XKEEN_DAT")
 
@@ -97,10 +138,14 @@ def _dat_url_block_response(reason: str):
     )
 
 
+def _dat_download(url: str, tmp_path: str, max_bytes: int | None, **kwargs: Any) -> int:
+    return download_to_file_with_policy(url, tmp_path, max_bytes, **kwargs)
+
+
 def register_dat_routes(bp: Blueprint) -> None:
     @bp.get('/api/routing/dat/tags')
     def api_dat_tags() -> Any:
-        """List tags inside geoip/geosite DAT via xk-geodat."""
+        """List tags inside geoip/geosite DAT (native reader, xk-geodat fallback)."""
         kind = request.args.get('kind', '')
         path = request.args.get('path', '')
 
@@ -135,6 +180,10 @@ def register_dat_routes(bp: Blueprint) -> None:
                 hint="Проверьте kind/path и попробуйте снова.",
             )
 
+        idx = _geodat_native_index(k, rp)
+        if idx is not None:
+            return jsonify({'ok': True, 'kind': k, 'path': rp, 'meta': meta, 'tags': idx.tags(), 'engine': 'native'}), 200
+
         ttl_s = _geodat_cache_ttl_s()
         key = ('tags', k, rp, meta.get('size'), meta.get('mtime'))
         cached = _geodat_cache_get(key, ttl_s)
@@ -242,7 +291,7 @@ def register_dat_routes(bp: Blueprint) -> None:
 
     @bp.get('/api/routing/dat/tag')
     def api_dat_tag_details() -> Any:
-        """Get items for a specific tag inside geoip/geosite DAT via xk-geodat (paged)."""
+        """Get items for a specific tag inside geoip/geosite DAT (paged; native reader, xk-geodat fallback)."""
         kind = request.args.get('kind', '')
         path = request.args.get('path', '')
         tag = (request.args.get('tag', '') or '').strip()
@@ -295,6 +344,24 @@ def register_dat_routes(bp: Blueprint) -> None:
                 hint="Проверьте kind/path и попробуйте снова.",
             )
 
+        idx = _geodat_native_index(k, rp)
+        page = _geodat_native_dump(idx, tag, offset, limit) if idx is not None else None
+        if page is not None:
+            if page.get('ok') is False:
+                return jsonify(page), 200
+            return jsonify({
+                'ok': True,
+                'kind': k,
+                'path': rp,
+                'meta': meta,
+                'tag': tag,
+                'offset': offset,
+                'limit': limit,
+                'items': page['items'],
+                'total': page['total'],
+                'engine': 'native',
+            }), 200
+
         ttl_s = _geodat_cache_ttl_s()
 
         bin_path = _geodat_bin_path()
@@ -494,8 +561,9 @@ def register_dat_routes(bp: Blueprint) -> None:
 
         ttl_s = _geodat_cache_ttl_s()
 
+        native_idx = _geodat_native_index(k, rp)
         bin_path = _geodat_bin_path()
-        if not os.path.isfile(bin_path):
+        if native_idx is None and not os.path.isfile(bin_path):
             payload, status = _geodat_missing_bin_payload()
             payload = _geodat_error_payload(payload.get('error', 'missing_xk_geodat'), kind=k, path=rp)
             _geodat_cache_set(('searcherr', k, rp, meta.get('size'), meta.get('mtime'), tag), payload, min(ttl_s, 10))
@@ -562,6 +630,13 @@ def register_dat_routes(bp: Blueprint) -> None:
         win_ttl = min(ttl_s, 15)
 
         def _get_window(off: int, lim: int) -> Dict[str, Any]:
+            if native_idx is not None:
+                page = _geodat_native_dump(native_idx, tag, off, lim)
+                if page is not None:
+                    if page.get('ok') is False:
+                        return page
+                    return {'ok': True, 'offset': int(off), 'limit': int(lim), **page}
+
             key_win = ('searchwin', k, rp, meta.get('size'), meta.get('mtime'), tag, int(off), int(lim))
             cached = _geodat_cache_get(key_win, win_ttl)
             if cached is not None:
@@ -743,23 +818,39 @@ def register_dat_routes(bp: Blueprint) -> None:
 
     @bp.post('/api/routing/dat/lookup')
     def api_dat_lookup() -> Any:
-        """Lookup tags by domain/IP inside geoip/geosite DAT via xk-geodat.
+        """Lookup tags by domain/IP inside geoip/geosite DAT.
+
+        Served from the compiled match index; xk-geodat is used while the
+        index is still being built or when the native reader is disabled.
 
         Input JSON:
           {kind:'geosite'|'geoip', path:'/path/file.dat', value:'example.com'|'1.2.3.4'}
+          or {kind, path, values:[...]} for a batch (native index only)
 
         Output:
           {ok:true, matches:[{tag:'...',count:null}]}
+          {ok:true, results:[{value:'...', matches:[...]}]} for a batch
         """
         data = request.get_json(silent=True) or {}
         kind = str(data.get('kind') or request.args.get('kind') or '').strip()
         path = str(data.get('path') or request.args.get('path') or '').strip()
+        values_in = data.get('values')
+        batch = isinstance(values_in, list)
         value_raw = str(data.get('value') or data.get('q') or request.args.get('value') or '').strip()
 
-        if not value_raw:
-            return error_response('value_required', 400, ok=False)
-        if len(value_raw) > 2048:
-            return error_response('value_too_long', 400, ok=False)
+        if batch:
+            batch_raw = [str(v or '').strip() for v in values_in]
+            if not any(batch_raw):
+                return error_response('value_required', 400, ok=False)
+            if len(batch_raw) > MAX_BATCH:
+                return error_response('too_many_values', 400, ok=False, max=MAX_BATCH)
+            if any(len(v) > 2048 for v in batch_raw):
+                return error_response('value_too_long', 400, ok=False)
+        else:
+            if not value_raw:
+                return error_response('value_required', 400, ok=False)
+            if len(value_raw) > 2048:
+                return error_response('value_too_long', 400, ok=False)
 
         try:
             k, rp, meta = _geodat_validate(kind, path)
@@ -831,17 +922,51 @@ def register_dat_routes(bp: Blueprint) -> None:
                     pass
             return s
 
+        bin_path = _geodat_bin_path()
+
+        if batch:
+            if not native_enabled():
+                return error_response('batch_not_supported', 400, ok=False)
+            # Never compile inline: a large DAT takes seconds of CPU.
+            idx = _geodat_match_index(k, rp, build=False)
+            if idx is None:
+                code = 'lookup_index_building' if index_building(k, rp) else 'lookup_index_failed'
+                return jsonify(_geodat_error_payload(code, kind=k, path=rp)), 200
+            values = [v for v in (_norm_value(k, x) for x in batch_raw) if v]
+            return jsonify({
+                'ok': True,
+                'kind': k,
+                'path': rp,
+                'meta': meta,
+                'results': lookup_many(idx, values),
+                'engine': 'native',
+            }), 200
+
         value = _norm_value(k, value_raw)
         if not value:
             return error_response('value_required', 400, ok=False)
 
+        # A missing index is built in the background; meanwhile xk-geodat answers.
+        idx = _geodat_match_index(k, rp, build=False)
+        if idx is not None:
+            return jsonify({
+                'ok': True,
+                'kind': k,
+                'path': rp,
+                'meta': meta,
+                'value': value,
+                'matches': idx.lookup(value),
+                'engine': 'native',
+            }), 200
+        if not os.path.isfile(bin_path) and index_building(k, rp):
+            return jsonify(_geodat_error_payload('lookup_index_building', kind=k, path=rp)), 200
+
         ttl_s = _geodat_cache_ttl_s()
         key = ('lookup', k, rp, meta.get('size'), meta.get('mtime'), value)
         cached = _geodat_cache_get(key, ttl_s)
         if cached is not None:
             return jsonify(cached), 200
 
-        bin_path = _geodat_bin_path()
         if not os.path.isfile(bin_path):
             payload, status = _geodat_missing_bin_payload()
             payload = _geodat_error_payload(payload.get('error', 'missing_xk_geodat'), kind=k, path=rp)
@@ -993,11 +1118,7 @@ def register_dat_routes(bp: Blueprint) -> None:
         except PermissionError:
             return error_response("Доступ к DAT-пути запрещён.", 403, ok=False, code="forbidden")
 
-        max_mb_raw = str(os.getenv("XKEEN_MAX_DAT_MB", "128") or "128").strip()
-        try:
-            max_mb = int(float(max_mb_raw))
-        except Exception:
-            max_mb = 128
+        max_mb = dat_max_mb()
         max_bytes = None if max_mb <= 0 else max_mb * 1024 * 1024
 
         parent = os.path.dirname(rp)
@@ -1013,29 +1134,31 @@ def register_dat_routes(bp: Blueprint) -> None:
                     hint="Подробности смотрите в server logs.",
                 )
 
-        st0 = None
-        try:
-            if os.path.exists(rp):
-                st0 = os.stat(rp)
-        except Exception:
-            st0 = None
-
-        tmp_path = rp + ".tmp"
         try:
-            size = download_to_file_with_policy(url, tmp_path, max_bytes, policy=policy)
-            os.replace(tmp_path, rp)
-            _apply_local_metadata_best_effort(rp, st0)
+            result = update_dat_file(
+                rp,
+                url,
+                kind=kind,
+                policy=policy,
+                max_bytes=max_bytes,
+                download=_dat_download,
+                force=bool(data.get("force")),
+                log=lambda line: _core_log("info", line),
+            )
         except RuntimeError as e:
-            try:
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
-            except Exception:
-                pass
             msg = str(e) or ""
             if msg == "size_limit":
                 return error_response("size_limit", 413, ok=False, max_mb=max_mb)
             if msg.startswith("url_blocked:"):
                 return _dat_url_block_response(msg.split(":", 1)[1])
+            if msg == "checksum_mismatch":
+                return error_response(
+                    "Контрольная сумма DAT-файла не совпала с опубликованной (.sha256sum).",
+                    400,
+                    ok=False,
+                    code="checksum_mismatch",
+                    hint="Текущий файл оставлен без изменений. Попробуйте обновить позже.",
+                )
             return error_response(
                 "Не удалось скачать DAT-файл.",
                 400,
@@ -1044,11 +1167,6 @@ def register_dat_routes(bp: Blueprint) -> None:
                 hint="Проверьте URL и попробуйте снова. Подробности смотрите в server logs.",
             )
         except (urllib.error.URLError, urllib.error.HTTPError):
-            try:
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
-            except Exception:
-                pass
             return error_response(
                 "Не удалось скачать DAT-файл.",
                 400,
@@ -1057,11 +1175,6 @@ def register_dat_routes(bp: Blueprint) -> None:
                 hint="Проверьте URL и попробуйте снова.",
             )
         except Exception:
-            try:
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
-            except Exception:
-                pass
             return error_response(
                 "Не удалось скачать DAT-файл.",
                 400,
@@ -1070,29 +1183,47 @@ def register_dat_routes(bp: Blueprint) -> None:
                 hint="Проверьте URL и попробуйте снова. Подробности смотрите в server logs.",
             )
 
+        if "auto" in data:
+            set_auto_update(rp, bool(data.get("auto")))
+
         _core_log(
             "info",
             "routing.dat_update",
             kind=kind,
             path=rp,
             url=url,
-            size=size,
+            size=result["size"],
+            unchanged=result["unchanged"],
+            not_modified=result["not_modified"],
             remote_addr=str(request.remote_addr or ""),
         )
 
-        # Keep Xray asset lookup working for `ext:*.dat:*` rules by ensuring
-        # DAT files from /opt/etc/xray/dat are reachable via /opt/sbin.
+        return jsonify(dict(result, ok=True, auto=bool(get_source(rp).get("auto")))), 200
+
+    @bp.get("/api/routing/dat/update/sources")
+    def api_dat_update_sources() -> Any:
+        """DAT files with remembered update URLs, validators and schedule."""
+        return jsonify(
+            {
+                "ok": True,
+                "sources": list_sources(),
+                "window": os.environ.get("XKEEN_DAT_UPDATE_WINDOW") or DEFAULT_WINDOW,
+                "in_window": in_update_window(),
+            }
+        ), 200
+
+    @bp.post("/api/routing/dat/update/schedule")
+    def api_dat_update_schedule() -> Any:
+        """Enable/disable off-peak auto updates for a DAT file (``{path, auto}``)."""
+        data = request.get_json(silent=True) or {}
+        path = str(data.get("path") or "").strip()
+        if not path:
+            return error_response("path_required", 400, ok=False)
         try:
-            dat_dir = os.environ.get("XRAY_DAT_DIR") or "/opt/etc/xray/dat"
-            # Only touch links when the updated file is in the Xray dat folder.
-            if rp.startswith(dat_dir.rstrip("/") + "/"):
-                asset_dir = os.environ.get("XRAY_ASSET_DIR") or "/opt/sbin"
-                ensure_xray_dat_assets(
-                    dat_dir=dat_dir,
-                    asset_dir=asset_dir,
-                    log=lambda line: _core_log("info", line),
-                )
-        except Exception as e:  # noqa: BLE001
-            _core_log("warning", "xray_assets_sync_failed", error=str(e), path=rp)
-
-        return jsonify({"ok": True, "path": rp, "size": size}), 200
+            rp = _local_resolve(path, _local_allowed_roots())
+        except PermissionError:
+            return error_response("Доступ к DAT-пути запрещён.", 403, ok=False, code="forbidden")
+        if not get_source(rp).get("url"):
+            return error_response("source_not_found", 404, ok=False, path=rp)
+        entry = set_auto_update(rp, bool(data.get("auto")))
+        return jsonify({"ok": True, "source": dict(entry, path=rp)}), 200
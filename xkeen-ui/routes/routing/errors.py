@@ -48,6 +48,9 @@ def _geodat_error_payload(
             "Не установлен xk-geodat. Нажмите «Установить xk-geodat» в карточке DAT "
             "или запустите scripts/install_xk_geodat.sh и обновите страницу."
         )
+    elif payload["error"] == "lookup_index_building":
+        payload["building"] = True
+        payload["hint"] = "Индекс DAT ещё строится. Повторите поиск через несколько секунд."
     elif payload["error"] == "missing_dat_file":
         payload["hint"] = "DAT-файл не найден. Проверьте путь и установку DAT (GeoSite/GeoIP)."
     elif payload["error"] == "xk_geodat_timeout":
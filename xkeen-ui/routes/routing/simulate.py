@@ -0,0 +1,104 @@
+"""/api/routing/simulate endpoint (offline routing decisions)."""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Callable, Dict
+
+from flask import Blueprint, jsonify, request
+
+from routes.common.errors import error_response
+from services.routing.simulator import MAX_QUERIES, RoutingSimulator, collect_outbound_tags
+from services.routing.templates import _paths_for_routing
+from utils.fs import load_text
+
+from .config import _xray_asset_lookup_dir
+
+
+def _load_selected_routing(
+    *,
+    routing_file: str,
+    routing_file_raw: str,
+    xray_configs_dir: str,
+    xray_configs_dir_real: str,
+    strip_json_comments_text: Callable[[str], str],
+    file_arg: str,
+) -> Dict[str, Any]:
+    sel_main, sel_raw, _legacy = _paths_for_routing(
+        routing_file,
+        routing_file_raw,
+        xray_configs_dir,
+        xray_configs_dir_real,
+        file_arg or None,
+    )
+    path = sel_raw if os.path.exists(sel_raw) else sel_main
+    text = load_text(path, default="") or ""
+    return json.loads(strip_json_comments_text(text) or "{}")
+
+
+def register_simulate_routes(
+    bp: Blueprint,
+    *,
+    routing_file: str,
+    routing_file_raw: str,
+    xray_configs_dir: str,
+    xray_configs_dir_real: str,
+    strip_json_comments_text: Callable[[str], str],
+) -> None:
+    @bp.post("/api/routing/simulate")
+    def api_routing_simulate() -> Any:
+        """Answer which rule/outbound Xray would pick for each query.
+
+        Body: ``{"queries": [{domain, ip, port, inbound, protocol, ...}],
+        "routing"?: object|text, "file"?: fragment name}``.  Without
+        ``routing`` the saved fragment is used.
+        """
+        data = request.get_json(silent=True) or {}
+        queries = data.get("queries")
+        if not isinstance(queries, list) or not queries:
+            return error_response("queries_required", 400, ok=False)
+        if len(queries) > MAX_QUERIES:
+            return error_response("too_many_queries", 400, ok=False, max=MAX_QUERIES)
+
+        routing = data.get("routing")
+        try:
+            if isinstance(routing, str):
+                routing = json.loads(strip_json_comments_text(routing) or "{}")
+            elif routing is None:
+                routing = _load_selected_routing(
+                    routing_file=routing_file,
+                    routing_file_raw=routing_file_raw,
+                    xray_configs_dir=xray_configs_dir,
+                    xray_configs_dir_real=xray_configs_dir_real,
+                    strip_json_comments_text=strip_json_comments_text,
+                    file_arg=str(data.get("file") or ""),
+                )
+        except Exception as e:
+            return error_response("routing_parse_failed", 400, ok=False, details=str(e))
+        if not isinstance(routing, dict):
+            return error_response("routing_parse_failed", 400, ok=False)
+        if isinstance(routing.get("routing"), dict):
+            routing = routing["routing"]
+
+        dat_dir = os.environ.get("XRAY_DAT_DIR") or "/opt/etc/xray/dat"
+        asset_dir = os.environ.get("XRAY_ASSET_DIR") or "/opt/sbin"
+        sim = RoutingSimulator(
+            routing,
+            asset_dir=_xray_asset_lookup_dir(dat_dir, asset_dir),
+            outbound_tags=collect_outbound_tags(xray_configs_dir),
+        )
+        results = sim.simulate(queries)
+        return jsonify(
+            {
+                "ok": True,
+                "results": results,
+                "rules": len(sim.rules),
+                "compiled": len(sim.rules) - sim.reused,
+                "reused": sim.reused,
+                "compile_ms": sim.compile_ms,
+                "domain_strategy": sim.domain_strategy,
+                "shadows": sim.shadows(),
+                "warnings": sim.warnings(),
+            }
+        )
@@ -0,0 +1,30 @@
+"""Startup report API (``GET /api/devtools/startup``).
+
+Registered with the boot-critical blueprints: the report measures the
+deferred blueprint load, so reading it must not be what triggers that load.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from flask import Blueprint, current_app, jsonify, request
+
+
+def create_startup_report_blueprint() -> Blueprint:
+    bp = Blueprint("startup_report", __name__)
+
+    @bp.get("/api/devtools/startup")
+    def api_devtools_startup() -> Any:
+        from core.lazy_blueprints import lazy_status
+        from core.startup_profile import startup_report
+
+        try:
+            top = int(request.args.get("top", "40") or "40")
+        except Exception:
+            top = 40
+        report = startup_report(top=top)
+        report["lazy_blueprints"] = lazy_status(current_app)
+        return jsonify({"ok": True, **report})
+
+    return bp
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 
 from routes.common.errors import error_response
 from services.router_diagnostics import (
@@ -8,7 +8,18 @@ from services.router_diagnostics import (
     cached_router_diagnostics,
     sample_router_processes,
 )
-from services.system_resources import sample_system_resources
+from services.system_resources import (
+    latest_system_resources,
+    sample_system_resources,
+    system_resource_history,
+)
+
+
+def _int_arg(name: str, default: int) -> int:
+    try:
+        return int(request.args.get(name, default))
+    except (TypeError, ValueError):
+        return default
 
 
 def create_system_resources_blueprint() -> Blueprint:
@@ -17,7 +28,9 @@ def create_system_resources_blueprint() -> Blueprint:
     @bp.get("/api/system/resources")
     def api_system_resources():
         try:
-            payload = sample_system_resources()
+            # The background sampler owns the CPU/network deltas; sample
+            # directly only when it is disabled.
+            payload = latest_system_resources() or sample_system_resources()
         except (OSError, ValueError):
             return error_response(
                 "Мониторинг ресурсов недоступен на этом устройстве.",
@@ -43,6 +56,27 @@ def create_system_resources_blueprint() -> Blueprint:
         response.headers["Cache-Control"] = "no-store"
         return response, 200
 
+    @bp.get("/api/system/resources/history")
+    def api_system_resources_history():
+        metrics = [item for item in str(request.args.get("metrics") or "").split(",") if item.strip()]
+        payload = system_resource_history(
+            window_seconds=_int_arg("window", 3600),
+            points=_int_arg("points", 180),
+            metrics=metrics or None,
+        )
+        if payload is None:
+            return error_response(
+                "История ресурсов недоступна: фоновый сбор отключён.",
+                503,
+                ok=False,
+                code="system_resources_history_unavailable",
+                retryable=False,
+            )
+        payload["ok"] = True
+        response = jsonify(payload)
+        response.headers["Cache-Control"] = "no-store"
+        return response, 200
+
     @bp.get("/api/system/processes")
     def api_system_processes():
         try:
@@ -7,6 +7,8 @@ Endpoints:
  - POST /api/xray-logs/clear
  - GET  /api/xray-logs/download
  - GET  /api/xray-logs/status
+ - GET  /api/xray-logs/domains
+ - POST /api/xray-logs/domains/annotate
  - POST /api/xray-logs/enable
  - POST /api/xray-logs/disable
 """
@@ -32,6 +34,7 @@ from services.xray_log_api import (
     get_status,
     resolve_xray_log_path_for_ws,
 )
+from services.xray_domain_index import refreshed_xray_domain_index
 from services.xray_device_names import (
     delete_manual_device_name,
     get_xray_device_names_state,
@@ -275,6 +278,35 @@ def create_xray_logs_blueprint(
         payload["deleted"] = bool(existed)
         return jsonify(payload), 200
 
+    @bp.get("/api/xray-logs/domains")
+    def api_xray_logs_domains():
+        """Look up sniffed domains by destination IP (and IPs by domain)."""
+        index, info = refreshed_xray_domain_index()
+        ips = [v for v in request.args.getlist("ip") if str(v or "").strip()][:200]
+        domains = [v for v in request.args.getlist("domain") if str(v or "").strip()][:200]
+        payload: Dict[str, Any] = {"ok": True, "index": {**info, **index.stats()}}
+        if ips or domains:
+            payload["by_ip"] = {ip: index.domains_for_ip(ip) for ip in ips}
+            payload["by_domain"] = {d: index.ips_for_domain(d) for d in domains}
+        else:
+            try:
+                limit = int(request.args.get("limit", "500") or "500")
+            except Exception:
+                limit = 500
+            payload["domains"] = index.snapshot(limit=max(1, min(2000, limit)))
+        return jsonify(payload), 200
+
+    @bp.post("/api/xray-logs/domains/annotate")
+    def api_xray_logs_domains_annotate():
+        """Return {ip: domain} hints for destination IPs found in the given log lines."""
+        data = request.get_json(silent=True) or {}
+        lines = data.get("lines")
+        if not isinstance(lines, list):
+            return jsonify({"ok": False, "error": "lines must be a list"}), 400
+        index, info = refreshed_xray_domain_index()
+        hints = index.annotate_lines(str(line) for line in lines[:5000])
+        return jsonify({"ok": True, "domains": hints, "index": info}), 200
+
     @bp.post("/api/xray-logs/enable")
     def api_xray_logs_enable():
         """Enable Xray logs by setting loglevel and restarting Xray core."""
@@ -12,6 +12,15 @@ except Exception:
 
 import os
 
+# Start the boot timeline before the Flask app and its imports (DevTools → startup report).
+from core import startup_profile
+
+startup_profile.install_import_profiler()
+
+# Serve the login page first; heavy API blueprints are imported on the first
+# API request or by the warm-up below (see core/lazy_blueprints.py).
+os.environ.setdefault("XKEEN_UI_LAZY_BLUEPRINTS", "1")
+
 GEVENT_AVAILABLE = True
 try:
     from gevent import pywsgi
@@ -45,6 +54,7 @@ from app import (
     _subscribe_ws,
     _unsubscribe_ws,
 )
+from core.lazy_blueprints import start_warmup as start_lazy_blueprints_warmup
 from services.ws_pty import handle_pty_request, start_cleanup_loop as start_pty_cleanup_loop
 from services.mihomo_clash_ws import (
     handle_mihomo_clash_connections_request,
@@ -176,6 +186,16 @@ if __name__ == "__main__":
             application,
             handler_class=WebSocketHandler,
         )
+        server.start()
+        startup_profile.mark("listening")
+        try:
+            start_lazy_blueprints_warmup(app)
+        except Exception:
+            pass
         server.serve_forever()
     else:
+        try:
+            start_lazy_blueprints_warmup(app)
+        except Exception:
+            pass
         app.run(host="0.0.0.0", port=server_port)
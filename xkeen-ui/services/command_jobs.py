@@ -18,6 +18,7 @@ import uuid
 from dataclasses import dataclass, field
 from typing import Dict
 
+from services.command_output import OutputBuffer
 from services.restart_log import write_restart_log
 
 try:
@@ -96,11 +97,16 @@ class CommandJob:
     use_pty: bool = False
     status: str = "queued"  # "queued" | "running" | "finished" | "error"
     exit_code: int | None = None
-    output: str = ""
+    buffer: OutputBuffer = field(default_factory=OutputBuffer, repr=False)
     created_at: float = field(default_factory=time.time)
     finished_at: float | None = None
     error: str | None = None
 
+    @property
+    def output(self) -> str:
+        """Full output as text (prefer ``buffer.read()`` for incremental reads)."""
+        return self.buffer.text()
+
 
 JOBS: Dict[str, CommandJob] = {}
 JOBS_LOCK = threading.Lock()
@@ -148,8 +154,9 @@ def cleanup_old_jobs() -> None:
             for job_id, job in JOBS.items()
             if job.finished_at is not None and (now - job.finished_at) > MAX_JOB_AGE
         ]
-        for job_id in old_ids:
-            JOBS.pop(job_id, None)
+        old_jobs = [JOBS.pop(job_id) for job_id in old_ids]
+    for job in old_jobs:
+        job.buffer.discard()
 
 
 def _run_command_job(job_id: str, stdin_data: str | None) -> None:
@@ -159,6 +166,7 @@ def _run_command_job(job_id: str, stdin_data: str | None) -> None:
         if not job:
             return
         job.status = "running"
+    buffer = job.buffer
 
     use_pty = bool(getattr(job, 'use_pty', False) and PTY_RUNTIME_SUPPORTED)
 
@@ -174,12 +182,12 @@ def _run_command_job(job_id: str, stdin_data: str | None) -> None:
             job.status = "error"
             job.error = "empty command"
             job.finished_at = time.time()
+        buffer.close()
         return
 
     # Stream output while the command is running so /ws/command-status can actually stream.
-    # Note: we run the command in its own process group so we can terminate the whole tree on timeout.
-    COMMAND_MAX_OUTPUT_CHARS = int(os.environ.get("XKEEN_COMMAND_MAX_OUTPUT_CHARS", "1048576"))  # 1 MiB
-
+    # Output goes to the job's append-only buffer (services.command_output): readers
+    # are woken per chunk and large outputs spill to disk instead of growing RAM.
     def _is_noise_line(line: str) -> bool:
         low = (line or "").lower()
         if "collected errors" in low:
@@ -191,30 +199,8 @@ def _run_command_job(job_id: str, stdin_data: str | None) -> None:
     def _append_output(chunk: str) -> None:
         if not chunk:
             return
-        restart_job = None
-        with JOBS_LOCK:
-            j = JOBS.get(job_id)
-            if not j:
-                return
-            # Prevent unbounded RAM usage on chatty commands.
-            if COMMAND_MAX_OUTPUT_CHARS > 0 and len(j.output) >= COMMAND_MAX_OUTPUT_CHARS:
-                # Mark once.
-                if "[output truncated]" not in j.output:
-                    j.output += "\n[output truncated]\n"
-                return
-            if COMMAND_MAX_OUTPUT_CHARS > 0:
-                room = COMMAND_MAX_OUTPUT_CHARS - len(j.output)
-                if room <= 0:
-                    return
-                if len(chunk) > room:
-                    j.output += chunk[:room]
-                    if "[output truncated]" not in j.output:
-                        j.output += "\n[output truncated]\n"
-                    restart_job = j if _should_sync_restart_log(j) else None
-                    return
-            j.output += chunk
-            restart_job = j if _should_sync_restart_log(j) else None
-        _sync_restart_log(restart_job)
+        if buffer.append(chunk):
+            _sync_restart_log(job if _should_sync_restart_log(job) else None)
 
     started = time.time()
     proc: subprocess.Popen | None = None
@@ -404,6 +390,8 @@ def _run_command_job(job_id: str, stdin_data: str | None) -> None:
             restart_job = job if _should_sync_restart_log(job) else None
         _sync_restart_log(restart_job)
     finally:
+        # Wake /ws/command-status readers waiting for more output.
+        buffer.close()
         try:
             if proc is not None:
                 try:
@@ -0,0 +1,171 @@
+"""Append-only output buffer for background command jobs.
+
+Output is stored as UTF-8 byte chunks with cumulative start offsets, so
+appending is O(len(chunk)) and readers resume from any byte offset they got
+back from :meth:`OutputBuffer.read` (``/ws/command-status?offset=N``,
+``/api/run-command/<id>?offset=N``) without rescanning what they already
+have.  A condition variable wakes waiting readers only when new output
+arrives or the job ends.
+
+Chunks beyond the in-memory cap are moved to a spill file (oldest first) and
+read back from disk on demand; output beyond the total cap is dropped with a
+single ``[output truncated]`` marker.
+"""
+
+from __future__ import annotations
+
+import bisect
+import codecs
+import os
+import tempfile
+import threading
+from typing import List, Optional, Tuple
+
+
+TRUNCATED_MARKER = b"\n[output truncated]\n"
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, str(default)) or default)
+    except Exception:
+        return default
+
+
+def memory_cap() -> int:
+    # Historical name: this used to be the hard cap of job.output.
+    return _env_int("XKEEN_COMMAND_MAX_OUTPUT_CHARS", 1024 * 1024)
+
+
+def total_cap() -> int:
+    return _env_int("XKEEN_COMMAND_MAX_OUTPUT_BYTES", 32 * 1024 * 1024)
+
+
+def _spill_dir() -> str:
+    return (os.environ.get("XKEEN_COMMAND_SPILL_DIR") or "").strip() or tempfile.gettempdir()
+
+
+class OutputBuffer:
+    def __init__(self, *, mem_cap: Optional[int] = None, max_total: Optional[int] = None) -> None:
+        self.mem_cap = memory_cap() if mem_cap is None else int(mem_cap)
+        self.max_total = total_cap() if max_total is None else int(max_total)
+        self.size = 0
+        self.truncated = False
+        self.closed = False
+        self._chunks: List[bytes] = []
+        self._starts: List[int] = []
+        self._mem_bytes = 0
+        self._spilled = 0
+        self._spill_path = ""
+        self._cond = threading.Condition(threading.Lock())
+
+    # -- writer ---------------------------------------------------------------
+
+    def _push(self, data: bytes) -> None:
+        self._chunks.append(data)
+        self._starts.append(self.size)
+        self.size += len(data)
+        self._mem_bytes += len(data)
+
+    def _spill(self) -> None:
+        if self.mem_cap <= 0 or self._mem_bytes <= self.mem_cap:
+            return
+        n = 0
+        moved = 0
+        while n < len(self._chunks) - 1 and self._mem_bytes - moved > self.mem_cap // 2:
+            moved += len(self._chunks[n])
+            n += 1
+        if not n:
+            return
+        try:
+            if not self._spill_path:
+                fd, self._spill_path = tempfile.mkstemp(prefix="xkeen-job-", suffix=".out", dir=_spill_dir())
+                os.close(fd)
+            with open(self._spill_path, "ab") as f:
+                f.write(b"".join(self._chunks[:n]))
+        except Exception:
+            # No room for a spill file: keep the output in memory.
+            return
+        del self._chunks[:n]
+        del self._starts[:n]
+        self._mem_bytes -= moved
+        self._spilled += moved
+
+    def append(self, text: str) -> int:
+        """Append ``text``; returns the number of bytes stored."""
+
+        if not text:
+            return 0
+        data = text.encode("utf-8", errors="replace")
+        with self._cond:
+            if self.closed or self.truncated:
+                return 0
+            if self.max_total > 0 and self.size + len(data) > self.max_total:
+                room = max(0, self.max_total - self.size)
+                data = data[:room].decode("utf-8", errors="ignore").encode("utf-8") + TRUNCATED_MARKER
+                self._push(data)
+                self.truncated = True
+            else:
+                self._push(data)
+            self._spill()
+            self._cond.notify_all()
+            return len(data)
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def discard(self) -> None:
+        with self._cond:
+            path, self._spill_path = self._spill_path, ""
+            self._chunks, self._starts = [], []
+            self._mem_bytes = 0
+        if path:
+            try:
+                os.remove(path)
+            except Exception:
+                pass
+
+    # -- readers ---------------------------------------------------------------
+
+    def read(self, offset: int = 0, limit: Optional[int] = None) -> Tuple[bytes, int]:
+        """Return ``(data, next_offset)`` for output from byte ``offset``."""
+
+        with self._cond:
+            offset = max(0, min(int(offset or 0), self.size))
+            end = self.size if limit is None else min(self.size, offset + max(0, int(limit)))
+            spilled, spill_path = self._spilled, self._spill_path
+            parts: List[bytes] = []
+            if offset < end and end > spilled:
+                i = max(0, bisect.bisect_right(self._starts, max(offset, spilled)) - 1)
+                while i < len(self._chunks) and self._starts[i] < end:
+                    start = self._starts[i]
+                    chunk = self._chunks[i]
+                    parts.append(chunk[max(0, offset - start): end - start])
+                    i += 1
+        if offset < min(end, spilled):
+            with open(spill_path, "rb") as f:
+                f.seek(offset)
+                parts.insert(0, f.read(min(end, spilled) - offset))
+        return b"".join(parts), end
+
+    def read_text(self, offset: int = 0, limit: Optional[int] = None) -> Tuple[str, int]:
+        """Like :meth:`read`, but never ends inside a multi-byte character."""
+
+        data, end = self.read(offset, limit)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        text = decoder.decode(data, final=False)
+        pending = len(decoder.getstate()[0])
+        if pending and end < self.size:
+            return text, end - pending
+        return text + decoder.decode(b"", final=True), end
+
+    def text(self) -> str:
+        return self.read_text(0)[0]
+
+    def wait(self, offset: int, timeout: Optional[float] = None) -> bool:
+        """Block until output beyond ``offset`` exists or the buffer is closed."""
+
+        with self._cond:
+            return self._cond.wait_for(lambda: self.size > offset or self.closed, timeout)
@@ -0,0 +1,188 @@
+"""Cached device identity for HWID subscriptions.
+
+Building the HWID headers used to spawn ``ndmc -c show version`` (up to
+twice) and ``mihomo -v``/``-V`` against up to three binaries on every probe,
+provider fetch and apply, which costs seconds on slow routers.
+
+Values derived from a binary are cached together with the identity of that
+binary (path, size, mtime, inode) and persisted in UI_STATE_DIR
+(``device-identity.json``):
+
+- ``ndmc``: model and OS title from ``show version``; keyed by the ndmc
+  binary and the kernel release, so a firmware update invalidates it;
+- ``mihomo_version``: keyed by every installed mihomo binary, so replacing
+  or upgrading mihomo invalidates it.
+
+A value is only cached when its binary exists (without one the probe fails
+immediately anyway) and when detection actually produced something, so a
+timeout under load is retried next time. :func:`refresh_device_identity`
+drops everything. The MAC and HWID overrides are cheap sysfs/env reads and
+stay live.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from services.io.atomic import _atomic_write_text
+
+
+STATE_FILENAME = "device-identity.json"
+_FORMAT_VERSION = 1
+_EXTRA_PATH = ("/opt/sbin", "/opt/bin", "/usr/sbin", "/usr/bin", "/sbin", "/bin")
+MIHOMO_BINARIES = ("mihomo", "/opt/sbin/mihomo", "/opt/bin/mihomo")
+
+
+def _which(name: str) -> Optional[str]:
+    if os.path.isabs(name):
+        return name if os.path.exists(name) else None
+    path = os.pathsep.join([os.environ.get("PATH", "")] + list(_EXTRA_PATH))
+    return shutil.which(name, path=path)
+
+
+def binary_identity(name: str) -> Optional[List[Any]]:
+    """``[realpath, size, mtime_ns, ino]`` of an executable, or None if missing."""
+
+    found = _which(name)
+    if not found:
+        return None
+    try:
+        real = os.path.realpath(found)
+        st = os.stat(real)
+    except OSError:
+        return None
+    return [real, int(st.st_size), int(st.st_mtime_ns), int(st.st_ino)]
+
+
+def ndmc_fingerprint() -> Optional[List[Any]]:
+    ident = binary_identity("ndmc")
+    if ident is None:
+        return None
+    try:
+        release = os.uname().release
+    except Exception:
+        release = ""
+    return ident + [release]
+
+
+def mihomo_fingerprint(binaries: Optional[tuple] = None) -> Optional[List[Any]]:
+    idents = []
+    for b in binaries or MIHOMO_BINARIES:
+        ident = binary_identity(b)
+        if ident is not None and ident not in idents:
+            idents.append(ident)
+    return idents or None
+
+
+def _default_state_path() -> str:
+    try:
+        from core.paths import UI_STATE_DIR
+
+        root = str(UI_STATE_DIR or "").strip()
+    except Exception:
+        root = ""
+    return os.path.join(root or "/opt/etc/xkeen-ui", STATE_FILENAME)
+
+
+class DeviceIdentityCache:
+    """Small persisted map ``key -> (fingerprint, value)``."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = _default_state_path() if path is None else str(path or "")
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        data: Any = None
+        if self.path:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception:
+                data = None
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if isinstance(data, dict) and data.get("v") == _FORMAT_VERSION and isinstance(data.get("entries"), dict):
+                self._entries = {str(k): v for k, v in data["entries"].items() if isinstance(v, dict)}
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            payload = {"v": _FORMAT_VERSION, "entries": dict(self._entries)}
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            _atomic_write_text(self.path, json.dumps(payload, ensure_ascii=False, separators=(",", ":")), mode=0o600)
+        except Exception:
+            pass
+
+    def get(
+        self,
+        key: str,
+        fingerprint: Optional[List[Any]],
+        compute: Callable[[], Any],
+        *,
+        refresh: bool = False,
+    ) -> Any:
+        """Return the cached value for ``key`` if its fingerprint still matches."""
+
+        if fingerprint is None:
+            return compute()
+        self._ensure_loaded()
+        if not refresh:
+            with self._lock:
+                ent = self._entries.get(key)
+                if ent is not None and ent.get("fp") == fingerprint:
+                    self.hits += 1
+                    return ent.get("value")
+        with self._lock:
+            self.misses += 1
+        value = compute()
+        if value:
+            with self._lock:
+                self._entries[key] = {"fp": fingerprint, "value": value, "ts": int(time.time())}
+            self._save()
+        return value
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        self._ensure_loaded()
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+        self._save()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"path": self.path, "keys": sorted(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_CACHE: Optional[DeviceIdentityCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_device_identity_cache() -> DeviceIdentityCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = DeviceIdentityCache()
+        return _CACHE
+
+
+def refresh_device_identity() -> None:
+    """Forget all cached identity values (next lookup re-runs the probes)."""
+
+    get_device_identity_cache().invalidate()
@@ -21,6 +21,9 @@ ENV_WHITELIST: Tuple[str, ...] = (
     "XKEEN_UI_ENV_FILE",  # read-only (path to devtools.env)
     "XKEEN_UI_SECRET_KEY",  # shown as "(set)" only
     "XKEEN_UI_PORT",
+    "XKEEN_UI_LAZY_BLUEPRINTS",
+    "XKEEN_UI_LAZY_WARMUP_DELAY",
+    "XKEEN_UI_STARTUP_PROFILE",
     "XKEEN_AUTH_LOGIN_WINDOW_SECONDS",
     "XKEEN_AUTH_LOGIN_MAX_ATTEMPTS",
     "XKEEN_AUTH_LOGIN_LOCKOUT_SECONDS",
@@ -29,9 +32,17 @@ ENV_WHITELIST: Tuple[str, ...] = (
     "XKEEN_JSON_HEAVY_MAX_BYTES",
     "XKEEN_MIHOMO_JSON_MAX_BYTES",
     "XKEEN_GEODAT_UPLOAD_MAX_BYTES",
+    "XKEEN_GEODAT_NATIVE",
+    "XKEEN_GEODAT_INDEX_DIR",
+    "XKEEN_EVENTS_QUEUE_MAX",
+    "XKEEN_RESOURCE_SAMPLER",
+    "XKEEN_RESOURCE_SAMPLE_SECONDS",
     "XKEEN_ROUTING_SAVE_MAX_BYTES",
     "XKEEN_CONFIG_EXCHANGE_MAX_BYTES",
     "XKEEN_MIHOMO_HWID",
+    "XKEEN_MIHOMO_PROVIDER_CACHE_TTL",
+    "XKEEN_MIHOMO_PROVIDER_CACHE_STALE_SECONDS",
+    "XKEEN_MIHOMO_PROVIDER_CACHE_MAX_BYTES",
     "XKEEN_HAPP_HELPER_CMD",
     "XKEEN_HAPP_DECRYPTOR_CMD",
     "XKEEN_HAPP_DECRYPTOR_REMOTE_URL",
@@ -44,6 +55,10 @@ ENV_WHITELIST: Tuple[str, ...] = (
     "XKEEN_DAT_ALLOW_HTTP",
     "XKEEN_DAT_ALLOW_CUSTOM_URLS",
     "XKEEN_DAT_ALLOW_PRIVATE_HOSTS",
+    "XKEEN_DAT_AUTO_UPDATE",
+    "XKEEN_DAT_UPDATE_WINDOW",
+    "XKEEN_DAT_UPDATE_INTERVAL_HOURS",
+    "XKEEN_DAT_VERIFY_SHA256",
     "XKEEN_GEODAT_ALLOW_HOSTS",
     "XKEEN_GEODAT_ALLOW_HTTP",
     "XKEEN_GEODAT_ALLOW_CUSTOM_URLS",
@@ -104,6 +119,11 @@ ENV_WHITELIST: Tuple[str, ...] = (
     "XKEEN_TRASH_WARN_RATIO",
     "XKEEN_TRASH_STATS_CACHE_SECONDS",
     "XKEEN_TRASH_PURGE_INTERVAL_SECONDS",
+    "XKEEN_FM_DIRSIZE_INDEX_FILE",
+    "XKEEN_FM_DIRSIZE_MAX_AGE",
+    "XKEEN_FM_DIRSIZE_MAX_DIRS",
+    "XKEEN_FM_CHECKSUM_CACHE_FILE",
+    "XKEEN_FM_CHECKSUM_CACHE_MAX",
     "XKEEN_FILEOPS_WORKERS",
     "XKEEN_FILEOPS_MAX_JOBS",
     "XKEEN_FILEOPS_JOB_TTL",
@@ -112,9 +132,11 @@ ENV_WHITELIST: Tuple[str, ...] = (
     "XKEEN_FILEOPS_SPOOL_DIR",
     "XKEEN_FILEOPS_SPOOL_MAX_MB",
     "XKEEN_FILEOPS_SPOOL_CLEANUP_AGE",
+    "XKEEN_FILEOPS_CHECKSUM_PARALLEL",
     # zip limits
     "XKEEN_MAX_ZIP_MB",
     "XKEEN_MAX_ZIP_ESTIMATE_ITEMS",
+    "XKEEN_FS_ARCHIVE_STREAM",
     # misc
     "XKEEN_ALLOW_SHELL",
     "XKEEN_XRAY_LOG_TZ_OFFSET",
@@ -281,12 +303,28 @@ def _default_effective_value(
         return str(4 * 1024 * 1024)
     if k == "XKEEN_GEODAT_UPLOAD_MAX_BYTES":
         return str(16 * 1024 * 1024)
+    if k == "XKEEN_GEODAT_NATIVE":
+        return "1"
+    if k == "XKEEN_GEODAT_INDEX_DIR":
+        return os.path.join(ui_state_dir, "geodat-index")
+    if k == "XKEEN_EVENTS_QUEUE_MAX":
+        return "64"
+    if k == "XKEEN_RESOURCE_SAMPLER":
+        return "1"
+    if k == "XKEEN_RESOURCE_SAMPLE_SECONDS":
+        return "5"
     if k == "XKEEN_ROUTING_SAVE_MAX_BYTES":
         return str(1024 * 1024)
     if k == "XKEEN_CONFIG_EXCHANGE_MAX_BYTES":
         return str(4 * 1024 * 1024)
     if k == "XKEEN_MIHOMO_HWID":
         return ""
+    if k == "XKEEN_MIHOMO_PROVIDER_CACHE_TTL":
+        return "300"
+    if k == "XKEEN_MIHOMO_PROVIDER_CACHE_STALE_SECONDS":
+        return "60"
+    if k == "XKEEN_MIHOMO_PROVIDER_CACHE_MAX_BYTES":
+        return str(8 * 1024 * 1024)
     if k == "XKEEN_HAPP_HELPER_CMD":
         try:
             from services import happ_links
@@ -324,6 +362,14 @@ def _default_effective_value(
         return "0"
     if k == "XKEEN_DAT_ALLOW_PRIVATE_HOSTS":
         return "0"
+    if k == "XKEEN_DAT_AUTO_UPDATE":
+        return "1"
+    if k == "XKEEN_DAT_UPDATE_WINDOW":
+        return "03:00-06:00"
+    if k == "XKEEN_DAT_UPDATE_INTERVAL_HOURS":
+        return "24"
+    if k == "XKEEN_DAT_VERIFY_SHA256":
+        return "1"
     if k == "XKEEN_GEODAT_ALLOW_HOSTS":
         return "github.com,raw.githubusercontent.com,objects.githubusercontent.com,release-assets.githubusercontent.com,codeload.github.com"
     if k == "XKEEN_GEODAT_ALLOW_HTTP":
@@ -445,6 +491,17 @@ def _default_effective_value(
     if k == "XKEEN_TRASH_PURGE_INTERVAL_SECONDS":
         return "3600"
 
+    if k == "XKEEN_FM_DIRSIZE_INDEX_FILE":
+        return os.path.join(ui_state_dir, "fm-dirsize-index.json")
+    if k == "XKEEN_FM_DIRSIZE_MAX_AGE":
+        return "300"
+    if k == "XKEEN_FM_DIRSIZE_MAX_DIRS":
+        return "50000"
+    if k == "XKEEN_FM_CHECKSUM_CACHE_FILE":
+        return os.path.join(ui_state_dir, "fm-checksum-cache.json")
+    if k == "XKEEN_FM_CHECKSUM_CACHE_MAX":
+        return "2000"
+
     if k == "XKEEN_FILEOPS_WORKERS":
         return "1"
     if k == "XKEEN_FILEOPS_MAX_JOBS":
@@ -467,12 +524,16 @@ def _default_effective_value(
         return str(max(16, max_upload))
     if k == "XKEEN_FILEOPS_SPOOL_CLEANUP_AGE":
         return "21600"
+    if k == "XKEEN_FILEOPS_CHECKSUM_PARALLEL":
+        return "2"
 
     # ZIP limits (routes_fs.py)
     if k == "XKEEN_MAX_ZIP_MB":
         return "0"
     if k == "XKEEN_MAX_ZIP_ESTIMATE_ITEMS":
         return "200000"
+    if k == "XKEEN_FS_ARCHIVE_STREAM":
+        return "1"
 
     # Misc
     if k == "XKEEN_ALLOW_SHELL":
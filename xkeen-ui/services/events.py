@@ -3,46 +3,190 @@
 `run_server.py` uses WebSocket subscribers for `/ws/events`.
 We keep the subscribers list in this module so `app.py` can re-export it and
 both modules share the *same* list object.
+
+Delivery is decoupled from the producer: every subscriber owns a bounded
+outbound queue, and `broadcast_event()` only encodes the event once and
+appends it to the queues of interested subscribers.  The `/ws/events`
+connection greenlet drains its own queue (`EventSubscriber.serve()`), so a
+stalled client on a lossy link only delays itself.
+
+When a queue is full the oldest event is dropped.  Events of topics in
+`COALESCED_TOPICS` (or published with `coalesce_key=`) replace a queued
+event with the same key instead of adding another one: a client that is
+behind only gets the latest state.  Subscribers may limit themselves to
+some topics (`/ws/events?topics=restart_log_appended,xkeen_*`).
 """
 
 from __future__ import annotations
 
 import json
+import os
 import threading
-from typing import Any, Dict, List
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
 
 from services.ws_debug import ws_debug
 
 
-# Global list of WebSocket subscribers.
+DEFAULT_QUEUE_MAX = 64
+
+# Topics where only the latest queued event matters (clients just reload).
+COALESCED_TOPICS = frozenset({"restart_log_appended", "core_changed", "xkeen_restarted"})
+
+
+def _queue_max() -> int:
+    try:
+        return max(1, int(os.environ.get("XKEEN_EVENTS_QUEUE_MAX", DEFAULT_QUEUE_MAX)))
+    except Exception:
+        return DEFAULT_QUEUE_MAX
+
+
+def event_topic(event: Dict[str, Any]) -> str:
+    return str(event.get("topic") or event.get("event") or "")
+
+
+class EventSubscriber:
+    """Bounded outbound queue of one `/ws/events` connection."""
+
+    def __init__(
+        self,
+        ws: Any,
+        *,
+        topics: Optional[Iterable[str]] = None,
+        max_queue: Optional[int] = None,
+        client: str = "",
+    ) -> None:
+        self.ws = ws
+        self.client = client
+        wanted = [str(t).strip() for t in (topics or []) if str(t).strip()]
+        self.topics = frozenset(t for t in wanted if not t.endswith("*")) if wanted else None
+        self.prefixes = tuple(t[:-1] for t in wanted if t.endswith("*"))
+        self.max_queue = int(max_queue or _queue_max())
+        self.created_at = time.time()
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.closed = False
+        self._queue: "OrderedDict[Any, str]" = OrderedDict()
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def wants(self, topic: str) -> bool:
+        if self.topics is None and not self.prefixes:
+            return True
+        if self.topics is not None and topic in self.topics:
+            return True
+        return any(topic.startswith(p) for p in self.prefixes)
+
+    def offer(self, data: str, key: Optional[str] = None) -> int:
+        """Queue an encoded event; returns the number of events dropped (0/1)."""
+
+        dropped = 0
+        with self._lock:
+            if self.closed:
+                return 0
+            if key is not None and key in self._queue:
+                self._queue[key] = data
+                self.coalesced += 1
+                return 0
+            if len(self._queue) >= self.max_queue:
+                self._queue.popitem(last=False)
+                self.dropped += 1
+                dropped = 1
+            if key is None:
+                self._seq += 1
+                self._queue[(self._seq,)] = data
+            else:
+                self._queue[key] = data
+        self._ready.set()
+        return dropped
+
+    def _take(self) -> List[str]:
+        with self._lock:
+            batch = list(self._queue.values())
+            self._queue.clear()
+            self._ready.clear()
+        return batch
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._queue)
+
+    def drain(self) -> int:
+        """Send everything queued so far; raises when the socket fails."""
+
+        batch = self._take()
+        for data in batch:
+            self.ws.send(data)
+            self.sent += 1
+        return len(batch)
+
+    def serve(self, *, idle_timeout: float = 60.0) -> None:
+        """Writer loop: wait for events and send them until closed or failed."""
+
+        while not self.closed:
+            self._ready.wait(idle_timeout)
+            self.drain()
+
+    def close(self) -> None:
+        with self._lock:
+            self.closed = True
+            self._queue.clear()
+        self._ready.set()
+
+    def stats(self) -> Dict[str, Any]:
+        topics = sorted(self.topics or []) + [p + "*" for p in self.prefixes]
+        return {
+            "client": self.client,
+            "topics": topics or None,
+            "queued": self.pending(),
+            "max_queue": self.max_queue,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "age_s": int(time.time() - self.created_at),
+        }
+
+
+# Global list of subscribers (EventSubscriber objects).
 # Filled in `run_server.py` when a client connects to /ws/events.
-EVENT_SUBSCRIBERS: List[Any] = []
+EVENT_SUBSCRIBERS: List[EventSubscriber] = []
 
 # Protects all mutations and iterations of EVENT_SUBSCRIBERS.
 # Use subscribe()/unsubscribe() instead of touching the list directly.
 _EVENT_SUBSCRIBERS_LOCK: threading.Lock = threading.Lock()
 
+_STATS = {"published": 0, "dropped": 0, "coalesced": 0}
+
 
-def subscribe(ws: Any) -> None:
-    """Register a WebSocket as an event subscriber. Thread-safe."""
+def subscribe(ws: Any, topics: Optional[Iterable[str]] = None, *, client: str = "") -> EventSubscriber:
+    """Register a WebSocket as an event subscriber. Thread-safe.
+
+    The caller should run `serve()` of the returned subscriber in the
+    connection's greenlet; until then events just queue up (bounded).
+    """
+    sub = EventSubscriber(ws, topics=topics, client=client)
     with _EVENT_SUBSCRIBERS_LOCK:
-        EVENT_SUBSCRIBERS.append(ws)
+        EVENT_SUBSCRIBERS.append(sub)
+    return sub
 
 
 def unsubscribe(ws: Any) -> None:
     """Remove a WebSocket subscriber. Thread-safe. No-op if already removed."""
     with _EVENT_SUBSCRIBERS_LOCK:
-        try:
-            EVENT_SUBSCRIBERS.remove(ws)
-        except ValueError:
-            pass
+        for sub in [s for s in EVENT_SUBSCRIBERS if s is ws or s.ws is ws]:
+            EVENT_SUBSCRIBERS.remove(sub)
+            _STATS["coalesced"] += sub.coalesced
+            sub.close()
 
 
-def broadcast_event(event: Dict[str, Any]) -> None:
-    """Send an event to all active WebSocket subscribers.
+def broadcast_event(event: Dict[str, Any], *, coalesce_key: Optional[str] = None) -> None:
+    """Queue an event for all interested WebSocket subscribers.
 
-    On systems without gevent/geventwebsocket the list will stay empty.
-    This function must never raise.
+    Never blocks on sockets and never raises.  On systems without
+    gevent/geventwebsocket the list will stay empty.
     """
     try:
         payload: Dict[str, Any] = {"type": "event", **(event or {})}
@@ -55,32 +199,42 @@ def broadcast_event(event: Dict[str, Any]) -> None:
         ws_debug("broadcast_event: failed to encode payload", error=str(e))
         return
 
-    # Snapshot under the lock so we iterate a stable list.
-    # We release the lock before calling ws.send() - a slow or blocking send
-    # must not stall subscribe/unsubscribe callers on other greenlets/threads.
+    topic = event_topic(payload)
+    key = coalesce_key
+    if key is None and topic in COALESCED_TOPICS:
+        key = topic
+
+    # Snapshot under the lock so we iterate a stable list; offer() only
+    # appends to in-memory queues, sockets are written by each subscriber.
     with _EVENT_SUBSCRIBERS_LOCK:
         snapshot = list(EVENT_SUBSCRIBERS)
+        _STATS["published"] += 1
 
-    dead: List[Any] = []
-    for ws in snapshot:
-        try:
-            ws.send(data)
-        except Exception as e:  # noqa: BLE001
-            dead.append(ws)
-            ws_debug("broadcast_event: failed to send to subscriber", error=str(e))
+    queued = 0
+    dropped = 0
+    for sub in snapshot:
+        if not sub.wants(topic):
+            continue
+        dropped += sub.offer(data, key)
+        queued += 1
 
-    if dead:
+    if dropped:
         with _EVENT_SUBSCRIBERS_LOCK:
-            for ws in dead:
-                try:
-                    EVENT_SUBSCRIBERS.remove(ws)
-                except ValueError:
-                    # Already removed by unsubscribe() racing with us - fine.
-                    pass
+            _STATS["dropped"] += dropped
 
     ws_debug(
-        "broadcast_event: dispatched",
+        "broadcast_event: queued",
         event=event,
         subscribers=len(snapshot),
-        removed=len(dead),
+        queued=queued,
+        dropped=dropped,
     )
+
+
+def event_bus_stats() -> Dict[str, Any]:
+    with _EVENT_SUBSCRIBERS_LOCK:
+        snapshot = list(EVENT_SUBSCRIBERS)
+        totals = dict(_STATS)
+    subs = [s.stats() for s in snapshot]
+    totals["coalesced"] += sum(s["coalesced"] for s in subs)
+    return {**totals, "queue_max": _queue_max(), "subscribers": subs}
@@ -0,0 +1,174 @@
+"""Shared file-change notifier for long-poll endpoints.
+
+Long-poll clients (the mobile logs endpoint, see ``routes/mobile.py``) park
+until a watched file grows, is truncated or rotated. Instead of every parked
+request stat()'ing the logs in its own loop, a single background poller
+samples each watched path at a fixed cadence and wakes waiters through one
+condition variable.
+
+The poller thread only runs while somebody is waiting. Under
+``gevent.monkey.patch_all()`` (run_server.py) threads and conditions are
+cooperative, so a parked request costs no OS thread.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+
+# (inode, size, mtime_ns); (0, -1, 0) means "missing".
+FileState = Tuple[int, int, int]
+MISSING: FileState = (0, -1, 0)
+
+
+def _poll_interval_default() -> float:
+    raw = str(os.environ.get("XKEEN_LOG_NOTIFY_INTERVAL", "") or "").strip()
+    try:
+        value = float(raw) if raw else 0.5
+    except Exception:
+        value = 0.5
+    return max(0.05, min(5.0, value))
+
+
+def stat_state(path: str) -> FileState:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return MISSING
+    return (
+        int(getattr(st, "st_ino", 0) or 0),
+        int(getattr(st, "st_size", 0) or 0),
+        int(getattr(st, "st_mtime_ns", 0) or 0),
+    )
+
+
+class FileChangeNotifier:
+    """Single poller for a dynamic set of paths, shared by all waiters."""
+
+    def __init__(self, *, interval: Optional[float] = None) -> None:
+        self.interval = _poll_interval_default() if interval is None else max(0.01, float(interval))
+        self._cond = threading.Condition(threading.Lock())
+        self._states: Dict[str, FileState] = {}
+        self._interest: Dict[str, int] = {}
+        self._generation = 0
+        self._poller: Optional[threading.Thread] = None
+        self.polls = 0
+
+    # -- poller -------------------------------------------------------------
+
+    def _ensure_poller_locked(self) -> None:
+        if self._poller is not None and self._poller.is_alive():
+            return
+        t = threading.Thread(target=self._poll_loop, name="xkeen-file-notifier", daemon=True)
+        self._poller = t
+        t.start()
+
+    def _poll_loop(self) -> None:
+        while True:
+            with self._cond:
+                paths = [p for p, n in self._interest.items() if n > 0]
+                if not paths:
+                    self._poller = None
+                    return
+            fresh = {p: stat_state(p) for p in paths}
+            with self._cond:
+                self.polls += 1
+                changed = False
+                for p, state in fresh.items():
+                    if self._states.get(p) != state:
+                        self._states[p] = state
+                        changed = True
+                if changed:
+                    self._generation += 1
+                    self._cond.notify_all()
+            time.sleep(self.interval)
+
+    # -- public API ---------------------------------------------------------
+
+    def current(self, path: str) -> FileState:
+        """Latest sampled state of ``path`` (stat()s directly when not watched)."""
+
+        with self._cond:
+            state = self._states.get(path)
+            watched = self._interest.get(path, 0) > 0
+        if state is not None and watched:
+            return state
+        return stat_state(path)
+
+    def wait(
+        self,
+        expected: Mapping[str, Tuple[int, int]],
+        timeout: float,
+    ) -> Optional[str]:
+        """Block until one path differs from its expected ``(inode, offset)``.
+
+        Returns the first changed path, or ``None`` on timeout. A file counts as
+        changed when its inode differs (rotation) or its size differs from the
+        offset the caller already consumed (append or truncation).
+        """
+
+        deadline = time.monotonic() + max(0.0, float(timeout))
+        paths = [str(p) for p in expected if p]
+        if not paths:
+            return None
+
+        def _changed() -> Optional[str]:
+            for p in paths:
+                state = self._states.get(p)
+                if state is None:
+                    continue
+                inode, offset = expected[p]
+                if state == MISSING:
+                    if offset >= 0:
+                        return p
+                    continue
+                if state[0] != int(inode) or state[1] != int(offset):
+                    return p
+            return None
+
+        # Prime the shared state so the first check does not wait one interval.
+        primed = {p: stat_state(p) for p in paths if p not in self._states}
+        with self._cond:
+            for p, state in primed.items():
+                self._states.setdefault(p, state)
+            for p in paths:
+                self._interest[p] = self._interest.get(p, 0) + 1
+            try:
+                self._ensure_poller_locked()
+                while True:
+                    hit = _changed()
+                    if hit is not None:
+                        return hit
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
+            finally:
+                for p in paths:
+                    left = self._interest.get(p, 0) - 1
+                    if left > 0:
+                        self._interest[p] = left
+                    else:
+                        self._interest.pop(p, None)
+                        self._states.pop(p, None)
+
+    def watched_paths(self) -> Iterable[str]:
+        with self._cond:
+            return sorted(p for p, n in self._interest.items() if n > 0)
+
+
+_NOTIFIER: Optional[FileChangeNotifier] = None
+_NOTIFIER_LOCK = threading.Lock()
+
+
+def get_file_change_notifier() -> FileChangeNotifier:
+    """Process-wide notifier shared by every long-poll endpoint."""
+
+    global _NOTIFIER
+    with _NOTIFIER_LOCK:
+        if _NOTIFIER is None:
+            _NOTIFIER = FileChangeNotifier()
+        return _NOTIFIER
@@ -16,7 +16,7 @@ from .local_ops import (
 from .transfer import save_stream_to_tmp, save_filestorage_to_tmp, stream_file_then_cleanup
 from .trash import soft_delete_local, remove_local, restore_local_from_trash, clear_local_trash
 from .perms import parse_mode_value, chmod_local, chown_local
-from .checksum import hash_stream, hash_file
+from .checksum import hash_stream, hash_file, hash_file_cached
 
 __all__ = [
     "apply_local_metadata_best_effort",
@@ -38,4 +38,5 @@ __all__ = [
     "chown_local",
     "hash_stream",
     "hash_file",
+    "hash_file_cached",
 ]
@@ -11,8 +11,6 @@ from __future__ import annotations
 import os
 import re
 import stat
-import time
-import tarfile
 import zipfile
 from typing import Any, Dict, List, Tuple
 
@@ -121,70 +119,13 @@ def zipinfo_is_symlink(zinfo: zipfile.ZipInfo) -> bool:
 
 
 def list_archive_contents(rp_arch: str, *, max_items: int = 2000) -> Tuple[List[Dict[str, Any]], bool]:
-    """List archive contents for .zip and .tar.* files."""
+    """List archive contents for .zip and .tar.* files.
+
+    Served from the cached member index (see ``archive_index``); only the
+    first ``max_items`` members are read when the archive is not indexed yet.
+    """
+    from services.filemanager.archive_index import list_archive_page
+
     max_items = max(1, min(int(max_items or 2000), 10000))
-    lower = str(rp_arch or "").lower()
-    items: List[Dict[str, Any]] = []
-    truncated = False
-
-    def _push(name: str, size: int, mtime: int, is_dir: bool, is_link: bool) -> None:
-        nonlocal truncated
-        if len(items) >= max_items:
-            truncated = True
-            return
-        items.append(
-            {
-                "name": name,
-                "size": int(size or 0),
-                "mtime": int(mtime or 0),
-                "is_dir": bool(is_dir),
-                "is_link": bool(is_link),
-            }
-        )
-
-    if lower.endswith(".zip"):
-        with zipfile.ZipFile(rp_arch, "r") as zf:
-            for zi in zf.infolist():
-                if truncated:
-                    break
-                nm = (zi.filename or "").replace("\\", "/")
-                while nm.startswith("./"):
-                    nm = nm[2:]
-                if not nm or nm in (".", "./"):
-                    continue
-                is_dir = nm.endswith("/")
-                is_link = zipinfo_is_symlink(zi)
-                mtime = 0
-                try:
-                    dt = zi.date_time
-                    mtime = int(time.mktime((dt[0], dt[1], dt[2], dt[3], dt[4], dt[5], 0, 0, -1)))
-                except Exception:
-                    mtime = 0
-                _push(nm.rstrip("/"), int(getattr(zi, "file_size", 0) or 0), mtime, is_dir, is_link)
-        return items, truncated
-
-    if (
-        lower.endswith(".tar")
-        or lower.endswith(".tar.gz")
-        or lower.endswith(".tgz")
-        or lower.endswith(".tar.xz")
-        or lower.endswith(".txz")
-        or lower.endswith(".tar.bz2")
-        or lower.endswith(".tbz")
-        or lower.endswith(".tbz2")
-    ):
-        with tarfile.open(rp_arch, "r:*") as tf:
-            for ti in tf.getmembers():
-                if truncated:
-                    break
-                nm = (ti.name or "").replace("\\", "/")
-                while nm.startswith("./"):
-                    nm = nm[2:]
-                if not nm or nm in (".", "./"):
-                    continue
-                is_dir = bool(ti.isdir() or nm.endswith("/"))
-                is_link = bool(ti.issym() or ti.islnk())
-                _push(nm.rstrip("/"), int(getattr(ti, "size", 0) or 0), int(getattr(ti, "mtime", 0) or 0), is_dir, is_link)
-        return items, truncated
-
-    raise ValueError("unsupported_archive")
+    page = list_archive_page(rp_arch, offset=0, limit=max_items)
+    return page["items"], bool(page["next_offset"] is not None or page["truncated"])
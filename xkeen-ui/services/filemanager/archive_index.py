@@ -0,0 +1,429 @@
+"""Lazy, cached member index for archive browsing.
+
+``tarfile.getmembers()`` reads a compressed tarball to the end before the
+first entry can be shown, and the UI repeated that on every open. Here:
+
+- members are read by streaming iteration and the scan stops as soon as the
+  requested page is filled; the full index is then completed in a background
+  thread and cached;
+- indexes are cached per archive identity (dev, inode, size, mtime_ns), so a
+  rewritten archive is re-read and an unchanged one never is;
+- listings can be paginated (offset/limit) and scoped to one directory of the
+  archive (implicit parent directories are synthesized);
+- a single member can be read without extracting the archive: ZIP members
+  are opened via the central directory (direct seek), plain .tar members via
+  the data offset recorded in the index, compressed tarballs by streaming up
+  to the member.
+"""
+
+from __future__ import annotations
+
+import os
+import tarfile
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from services.filemanager.checksum_cache import file_identity
+
+
+MAX_INDEX_MEMBERS = 200_000
+_CACHE_MAX_ARCHIVES = 8
+# Index scans are CPU-bound; under gevent they would hold the hub for the
+# whole archive, so they yield every this many members.
+_YIELD_EVERY = 1024
+
+_TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.xz", ".txz", ".tar.bz2", ".tbz", ".tbz2")
+
+
+class ArchiveMember(NamedTuple):
+    name: str
+    size: int
+    mtime: int
+    is_dir: bool
+    is_link: bool
+    # Data offset inside the (uncompressed) tar stream; -1 when unknown.
+    offset: int = -1
+
+    def as_item(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "size": int(self.size or 0),
+            "mtime": int(self.mtime or 0),
+            "is_dir": bool(self.is_dir),
+            "is_link": bool(self.is_link),
+        }
+
+
+def archive_kind(path: str) -> str:
+    lower = str(path or "").lower()
+    if lower.endswith(".zip"):
+        return "zip"
+    if lower.endswith(_TAR_SUFFIXES):
+        return "tar"
+    raise ValueError("unsupported_archive")
+
+
+def _clean_name(raw: str) -> str:
+    nm = str(raw or "").replace("\\", "/")
+    while nm.startswith("./"):
+        nm = nm[2:]
+    return nm
+
+
+def _iter_zip_members(path: str) -> Iterator[ArchiveMember]:
+    from services.filemanager.archive import zipinfo_is_symlink
+
+    with zipfile.ZipFile(path, "r") as zf:
+        for zi in zf.infolist():
+            nm = _clean_name(zi.filename)
+            if not nm or nm in (".", "./"):
+                continue
+            try:
+                dt = zi.date_time
+                mtime = int(time.mktime((dt[0], dt[1], dt[2], dt[3], dt[4], dt[5], 0, 0, -1)))
+            except Exception:
+                mtime = 0
+            yield ArchiveMember(nm.rstrip("/"), int(zi.file_size or 0), mtime, nm.endswith("/"), zipinfo_is_symlink(zi))
+
+
+def _iter_tar_members(path: str) -> Iterator[ArchiveMember]:
+    # Stream mode ("r|*") never seeks back and keeps no member list, so the
+    # first entries of a compressed tarball are available right away.
+    with tarfile.open(path, "r|*") as tf:
+        for ti in tf:
+            nm = _clean_name(ti.name)
+            if not nm or nm in (".", "./"):
+                continue
+            yield ArchiveMember(
+                nm.rstrip("/"),
+                int(ti.size or 0),
+                int(ti.mtime or 0),
+                bool(ti.isdir() or nm.endswith("/")),
+                bool(ti.issym() or ti.islnk()),
+                int(ti.offset_data) if ti.isfile() else -1,
+            )
+
+
+def iter_archive_members(path: str) -> Iterator[ArchiveMember]:
+    """Stream members of a .zip or .tar* archive in archive order."""
+
+    if archive_kind(path) == "zip":
+        return _iter_zip_members(path)
+    return _iter_tar_members(path)
+
+
+def _scan_members(path: str) -> Iterator[ArchiveMember]:
+    """:func:`iter_archive_members` that lets other greenlets/threads run."""
+
+    for n, m in enumerate(iter_archive_members(path), 1):
+        yield m
+        if n % _YIELD_EVERY == 0:
+            time.sleep(0)
+
+
+class ArchiveIndex:
+    """Complete member list of one archive version plus a directory map."""
+
+    def __init__(self, identity: Tuple[int, int, int, int], members: List[ArchiveMember], truncated: bool) -> None:
+        self.identity = identity
+        self.members = members
+        self.truncated = truncated
+        self._by_name: Optional[Dict[str, ArchiveMember]] = None
+        self._children: Optional[Dict[str, List[ArchiveMember]]] = None
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[ArchiveMember]:
+        with self._lock:
+            if self._by_name is None:
+                self._by_name = {m.name: m for m in self.members}
+            return self._by_name.get(name.rstrip("/"))
+
+    def children(self, directory: str) -> List[ArchiveMember]:
+        with self._lock:
+            if self._children is None:
+                self._children = _children_map(self.members)
+            return self._children.get(directory.strip("/"), [])
+
+
+def _children_map(members: List[ArchiveMember]) -> Dict[str, List[ArchiveMember]]:
+    out: Dict[str, List[ArchiveMember]] = {}
+    seen: set = set()
+    for m in members:
+        if m.name in seen:
+            continue
+        parts = m.name.split("/")
+        # Synthesize parent directories that have no entry of their own.
+        for i in range(1, len(parts)):
+            d = "/".join(parts[:i])
+            if d not in seen:
+                seen.add(d)
+                out.setdefault("/".join(parts[: i - 1]), []).append(ArchiveMember(d, 0, 0, True, False))
+        seen.add(m.name)
+        out.setdefault("/".join(parts[:-1]), []).append(m)
+    return out
+
+
+_CACHE: "OrderedDict[str, ArchiveIndex]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+_BUILDING: set = set()
+
+
+def _cached(path: str, ident: Tuple[int, int, int, int]) -> Optional[ArchiveIndex]:
+    with _CACHE_LOCK:
+        idx = _CACHE.get(path)
+        if idx is None:
+            return None
+        if idx.identity != ident:
+            _CACHE.pop(path, None)
+            return None
+        _CACHE.move_to_end(path)
+        return idx
+
+
+def _store(path: str, idx: ArchiveIndex) -> None:
+    with _CACHE_LOCK:
+        _CACHE[path] = idx
+        _CACHE.move_to_end(path)
+        while len(_CACHE) > _CACHE_MAX_ARCHIVES:
+            _CACHE.popitem(last=False)
+
+
+def build_archive_index(path: str, *, max_members: int = MAX_INDEX_MEMBERS) -> ArchiveIndex:
+    """Read the whole member list once and cache it (or return the cached one)."""
+
+    ident = file_identity(os.stat(path))
+    idx = _cached(path, ident)
+    if idx is not None:
+        return idx
+    members: List[ArchiveMember] = []
+    truncated = False
+    for m in _scan_members(path):
+        if len(members) >= max_members:
+            truncated = True
+            break
+        members.append(m)
+    idx = ArchiveIndex(ident, members, truncated)
+    # Only cache if the archive did not change while it was read.
+    if file_identity(os.stat(path)) == ident:
+        _store(path, idx)
+    return idx
+
+
+def _build_in_background(path: str) -> None:
+    with _CACHE_LOCK:
+        if path in _BUILDING:
+            return
+        _BUILDING.add(path)
+
+    def _run() -> None:
+        try:
+            build_archive_index(path)
+        except Exception:
+            pass
+        finally:
+            with _CACHE_LOCK:
+                _BUILDING.discard(path)
+
+    threading.Thread(target=_run, name="xkeen-archive-index", daemon=True).start()
+
+
+def _in_dir(directory: str) -> Callable[[str], Optional[str]]:
+    """Return a mapper name -> direct child name of ``directory`` (or None)."""
+
+    prefix = directory.strip("/")
+    prefix = prefix + "/" if prefix else ""
+
+    def _map(name: str) -> Optional[str]:
+        if prefix and not name.startswith(prefix):
+            return None
+        rest = name[len(prefix):]
+        if not rest:
+            return None
+        head = rest.split("/", 1)[0]
+        return prefix + head
+
+    return _map
+
+
+def _page(idx: ArchiveIndex, offset: int, limit: int, directory: Optional[str]) -> Dict[str, Any]:
+    pool = idx.members if directory is None else idx.children(directory)
+    page = pool[offset : offset + limit]
+    nxt = offset + len(page)
+    return {
+        "items": [m.as_item() for m in page],
+        "offset": offset,
+        "next_offset": nxt if nxt < len(pool) else None,
+        "total": len(pool),
+        "complete": True,
+        "truncated": bool(idx.truncated and nxt >= len(pool)),
+    }
+
+
+def list_archive_page(
+    path: str,
+    *,
+    offset: int = 0,
+    limit: int = 500,
+    directory: Optional[str] = None,
+    background: bool = True,
+) -> Dict[str, Any]:
+    """One page of archive members, optionally only direct children of ``directory``.
+
+    Returns ``{"items", "offset", "next_offset", "total", "complete", "truncated"}``;
+    ``total`` is None while the index is still being built.
+    """
+
+    archive_kind(path)
+    offset = max(0, int(offset or 0))
+    limit = max(1, int(limit or 1))
+    ident = file_identity(os.stat(path))
+    idx = _cached(path, ident)
+
+    if idx is not None:
+        return _page(idx, offset, limit, directory)
+
+    # Not indexed yet: stream just far enough to fill the page.
+    need = offset + limit + 1
+    matched: List[ArchiveMember] = []
+    all_members: List[ArchiveMember] = []
+    exhausted = True
+    capped = False
+    mapper = _in_dir(directory) if directory is not None else None
+    seen: set = set()
+    for m in _scan_members(path):
+        if len(all_members) >= MAX_INDEX_MEMBERS:
+            exhausted = False
+            capped = True
+            break
+        all_members.append(m)
+        if mapper is None:
+            matched.append(m)
+        else:
+            child = mapper(m.name)
+            if child is None or child in seen:
+                continue
+            seen.add(child)
+            matched.append(m if child == m.name else ArchiveMember(child, 0, 0, True, False))
+        if len(matched) >= need:
+            exhausted = False
+            break
+
+    if exhausted or capped:
+        # Hitting the member cap reads exactly what the full index would, so
+        # this is that (truncated) index; paging past it ends the listing.
+        idx = ArchiveIndex(ident, all_members, capped)
+        if file_identity(os.stat(path)) == ident:
+            _store(path, idx)
+        return _page(idx, offset, limit, directory)
+
+    if background:
+        _build_in_background(path)
+    page = matched[offset : offset + limit]
+    return {
+        "items": [m.as_item() for m in page],
+        "offset": offset,
+        "next_offset": offset + len(page),
+        "total": None,
+        "complete": False,
+        "truncated": False,
+    }
+
+
+class _TarSlice:
+    """read()/close() over ``size`` bytes at ``offset`` of a plain tar file."""
+
+    def __init__(self, path: str, offset: int, size: int) -> None:
+        self._fp = open(path, "rb")
+        self._fp.seek(offset)
+        self._left = int(size)
+
+    def read(self, n: int = -1) -> bytes:
+        if self._left <= 0:
+            return b""
+        n = self._left if n is None or n < 0 else min(int(n), self._left)
+        data = self._fp.read(n)
+        self._left -= len(data)
+        return data
+
+    def close(self) -> None:
+        self._fp.close()
+
+    def __enter__(self) -> "_TarSlice":
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        self.close()
+
+
+class _StreamedTarMember:
+    """Member of a compressed tarball, reached by streaming from the start."""
+
+    def __init__(self, tf: tarfile.TarFile, fobj: Any) -> None:
+        self._tf = tf
+        self._fobj = fobj
+
+    def read(self, n: int = -1) -> bytes:
+        return self._fobj.read(n)
+
+    def close(self) -> None:
+        try:
+            self._fobj.close()
+        finally:
+            self._tf.close()
+
+    def __enter__(self) -> "_StreamedTarMember":
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        self.close()
+
+
+def open_archive_member(path: str, name: str) -> Tuple[Any, int]:
+    """Open one regular member for reading. Returns (fileobj, size).
+
+    Raises KeyError if the member does not exist or is not a regular file.
+    """
+
+    member = _clean_name(name).rstrip("/")
+    if archive_kind(path) == "zip":
+        zf = zipfile.ZipFile(path, "r")
+        try:
+            zi = zf.getinfo(member)
+            if zi.is_dir():
+                raise KeyError(member)
+            fobj = zf.open(zi, "r")
+        except Exception:
+            zf.close()
+            raise
+        # ZipExtFile keeps the ZipFile's handle; closing the member is enough
+        # once the ZipFile itself is marked closed.
+        zf.close()
+        return fobj, int(zi.file_size or 0)
+
+    idx = _cached(path, file_identity(os.stat(path)))
+    if idx is not None:
+        m = idx.get(member)
+        if m is None or m.is_dir or m.is_link:
+            raise KeyError(member)
+        if m.offset >= 0 and path.lower().endswith(".tar"):
+            return _TarSlice(path, m.offset, m.size), int(m.size)
+
+    tf = tarfile.open(path, "r|*")
+    try:
+        for ti in tf:
+            if _clean_name(ti.name).rstrip("/") != member:
+                continue
+            if not ti.isfile():
+                break
+            fobj = tf.extractfile(ti)
+            if fobj is None:
+                break
+            return _StreamedTarMember(tf, fobj), int(ti.size or 0)
+    except Exception:
+        tf.close()
+        raise
+    tf.close()
+    raise KeyError(member)
@@ -0,0 +1,609 @@
+"""Streaming ZIP / tar.gz writers for archive downloads.
+
+The staged path (``services.fs_common.archive_zip``) builds the whole archive
+in TMP_DIR first. On routers /tmp is RAM, which is why ``XKEEN_MAX_ZIP_MB``
+exists, and remote sources were additionally mirrored into /tmp via lftp.
+
+The writers here are generators that produce archive bytes while source
+files are read, so they can be returned as a Flask response body directly:
+
+- ZIP is written through :mod:`zipfile` onto a non-seekable sink, which makes
+  zipfile emit data descriptors after each member (sizes/CRC are not known
+  when the local header is sent). ZIP64 is used for large or unknown sizes.
+- tar.gz is assembled block by block (PAX headers) and gzip-compressed with a
+  single ``zlib.compressobj``; tar needs each member size upfront, which both
+  ``os.stat`` and remote listings provide.
+
+Backpressure comes for free: the WSGI server pulls the next chunk only after
+the previous one was sent. A client disconnect closes the generator, which
+closes the current source (terminating an ``lftp cat``). Running streams are
+tracked in a small registry for progress and explicit cancellation.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import stat
+import tarfile
+import threading
+import time
+import uuid
+import zipfile
+import zlib
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+
+CHUNK_BYTES = 64 * 1024
+
+# Members that are already compressed are stored as-is (saves router CPU).
+_STORED_EXTS = frozenset(
+    (
+        ".zip", ".gz", ".tgz", ".xz", ".bz2", ".zst", ".7z", ".rar", ".ipk",
+        ".jpg", ".jpeg", ".png", ".gif", ".webp", ".mp3", ".mp4", ".mkv", ".avi",
+    )
+)
+_ZIP64_THRESHOLD = 1 << 30
+_ZIP_MIN_TS = 315532800  # 1980-01-01, earliest ZIP timestamp
+
+
+class ArchiveEntry(NamedTuple):
+    """One archive member. ``opener`` returns an object with read()/close()."""
+
+    arcname: str
+    is_dir: bool
+    size: Optional[int] = None
+    mtime: float = 0.0
+    mode: int = 0o644
+    opener: Optional[Callable[[], Any]] = None
+
+
+class ArchiveStream:
+    """Progress/cancel state of one running archive download."""
+
+    def __init__(self, *, fmt: str, name: str, target: str) -> None:
+        self.id = uuid.uuid4().hex[:16]
+        self.fmt = fmt
+        self.name = name
+        self.target = target
+        self.state = "running"
+        self.error = ""
+        self.started_ts = time.time()
+        self.finished_ts: Optional[float] = None
+        self.files_done = 0
+        self.files_skipped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.current = ""
+        self.cancel_flag = threading.Event()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "format": self.fmt,
+            "name": self.name,
+            "target": self.target,
+            "state": self.state,
+            "error": self.error or None,
+            "started_ts": self.started_ts,
+            "finished_ts": self.finished_ts,
+            "files_done": self.files_done,
+            "files_skipped": self.files_skipped,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "current": self.current,
+        }
+
+
+_STREAMS: Dict[str, ArchiveStream] = {}
+_STREAMS_LOCK = threading.Lock()
+_FINISHED_KEEP_SECONDS = 300.0
+
+
+def _register(st: ArchiveStream) -> None:
+    now = time.time()
+    with _STREAMS_LOCK:
+        for sid in [k for k, v in _STREAMS.items() if v.finished_ts and now - v.finished_ts > _FINISHED_KEEP_SECONDS]:
+            _STREAMS.pop(sid, None)
+        _STREAMS[st.id] = st
+
+
+def archive_streams() -> List[Dict[str, Any]]:
+    with _STREAMS_LOCK:
+        items = list(_STREAMS.values())
+    return [s.status() for s in sorted(items, key=lambda s: s.started_ts, reverse=True)]
+
+
+def cancel_archive_stream(stream_id: str) -> bool:
+    with _STREAMS_LOCK:
+        st = _STREAMS.get(str(stream_id or ""))
+    if st is None or st.state != "running":
+        return False
+    st.cancel_flag.set()
+    return True
+
+
+# ------------------------------------------------------------------ entries
+
+
+def _safe_arc(name: str) -> str:
+    """Relative member name; ``..`` segments are neutralized, ``file..txt`` is kept."""
+
+    parts = str(name or "").replace("\\", "/").split("/")
+    n = "/".join("_" if p == ".." else p for p in parts if p not in ("", "."))
+    return n or "item"
+
+
+def iter_local_entries(path_abs: str, arcname: str) -> Iterator[ArchiveEntry]:
+    """Entries for a local file or directory tree (symlinks are skipped)."""
+
+    arc_root = _safe_arc(arcname)
+    try:
+        st = os.lstat(path_abs)
+    except OSError:
+        return
+    if stat.S_ISLNK(st.st_mode):
+        return
+    if stat.S_ISREG(st.st_mode):
+        yield ArchiveEntry(arc_root, False, int(st.st_size), st.st_mtime, st.st_mode, _local_opener(path_abs))
+        return
+    if not stat.S_ISDIR(st.st_mode):
+        return
+
+    yield ArchiveEntry(arc_root + "/", True, 0, st.st_mtime, st.st_mode)
+    for dirpath, dirnames, filenames in os.walk(path_abs, topdown=True, followlinks=False):
+        dirnames[:] = sorted(d for d in dirnames if not os.path.islink(os.path.join(dirpath, d)))
+        rel = os.path.relpath(dirpath, path_abs)
+        arc_dir = arc_root if rel == "." else arc_root + "/" + rel.replace(os.sep, "/")
+        if rel != ".":
+            try:
+                dst = os.lstat(dirpath)
+                yield ArchiveEntry(arc_dir + "/", True, 0, dst.st_mtime, dst.st_mode)
+            except OSError:
+                continue
+        for fn in sorted(filenames):
+            fp = os.path.join(dirpath, fn)
+            try:
+                fst = os.lstat(fp)
+            except OSError:
+                continue
+            if not stat.S_ISREG(fst.st_mode):
+                continue
+            yield ArchiveEntry(arc_dir + "/" + fn, False, int(fst.st_size), fst.st_mtime, fst.st_mode, _local_opener(fp))
+
+
+def _local_opener(path: str) -> Callable[[], BinaryIO]:
+    return lambda: open(path, "rb")
+
+
+def _unique_arcs(names: Iterable[Tuple[Any, str]], root_name: str) -> Iterator[Tuple[Any, str]]:
+    used: set = set()
+    for obj, name in names:
+        base = _safe_arc(os.path.basename(str(name).rstrip("/"))).replace("/", "_")
+        arc = f"{root_name}/{base}"
+        if arc in used:
+            n = 2
+            while f"{arc}_{n}" in used:
+                n += 1
+            arc = f"{arc}_{n}"
+        used.add(arc)
+        yield obj, arc
+
+
+def iter_local_selection(resolved: List[Tuple[str, str]], *, root_name: str) -> Iterator[ArchiveEntry]:
+    """Entries for several local paths under one top-level folder.
+
+    ``resolved`` is a list of (real_path, display_name), like
+    ``_zip_selection_local``.
+    """
+
+    root = _safe_arc(root_name or "selection")
+    yield ArchiveEntry(root + "/", True, 0, time.time(), 0o755)
+    for rp, arc in _unique_arcs(((rp, name or rp) for rp, name in resolved), root):
+        yield from iter_local_entries(rp, arc)
+
+
+class _ProcReader:
+    """read()/close() over a child's stdout; close() terminates the child.
+
+    End of output from a child that exited non-zero (``lftp cat`` of a file
+    that vanished or is unreadable) raises ``read_failed`` instead of looking
+    like an empty or short file, which aborts the stream.
+    """
+
+    def __init__(self, proc: Any) -> None:
+        self.proc = proc
+
+    def read(self, n: int) -> bytes:
+        out = self.proc.stdout
+        chunk = out.read(n) if out is not None else b""
+        if not chunk:
+            try:
+                rc = self.proc.wait(timeout=5)
+            except Exception:
+                rc = None
+            if rc is None or int(rc) != 0:
+                raise RuntimeError("read_failed")
+        return chunk
+
+    def close(self) -> None:
+        for f in (self.proc.stdout, self.proc.stderr):
+            try:
+                if f:
+                    f.close()
+            except Exception:
+                pass
+        try:
+            if self.proc.poll() is None:
+                self.proc.terminate()
+        except Exception:
+            pass
+        try:
+            self.proc.wait(timeout=1)
+        except Exception:
+            pass
+
+
+def iter_remote_entries(
+    rpath: str,
+    arcname: str,
+    *,
+    is_dir: Optional[bool],
+    size: Optional[int],
+    list_dir: Callable[[str], List[Dict[str, Any]]],
+    popen_cat: Callable[[str], Any],
+    max_entries: int = 200_000,
+) -> Iterator[ArchiveEntry]:
+    """Entries for a remote file/tree, read straight from ``lftp cat``.
+
+    ``list_dir(path)`` returns parsed ``cls -l`` items (name/type/size/mtime);
+    ``popen_cat(path)`` starts a process whose stdout yields the file bytes.
+    Directories are listed one at a time, so the first member is sent before
+    the whole tree is known.
+    """
+
+    arc_root = _safe_arc(arcname)
+
+    def _opener(p: str) -> Callable[[], Any]:
+        return lambda: _ProcReader(popen_cat(p))
+
+    if not is_dir:
+        yield ArchiveEntry(arc_root, False, size, time.time(), 0o644, _opener(rpath))
+        return
+
+    seen = 0
+    stack: List[Tuple[str, str]] = [(rpath.rstrip("/") or "/", arc_root)]
+    while stack:
+        d, arc_dir = stack.pop()
+        yield ArchiveEntry(arc_dir + "/", True, 0, time.time(), 0o755)
+        subdirs: List[Tuple[str, str]] = []
+        for item in list_dir(d):
+            name = str(item.get("name") or "")
+            if not name or name in (".", ".."):
+                continue
+            seen += 1
+            if seen > max_entries:
+                raise RuntimeError("too_many_entries")
+            child = d.rstrip("/") + "/" + name
+            child_arc = arc_dir + "/" + _safe_arc(name).replace("/", "_")
+            kind = str(item.get("type") or "")
+            if kind == "dir":
+                subdirs.append((child, child_arc))
+            elif kind == "file":
+                try:
+                    csize: Optional[int] = int(item.get("size"))
+                except Exception:
+                    csize = None
+                mtime = float(item.get("mtime") or time.time())
+                yield ArchiveEntry(child_arc, False, csize, mtime, 0o644, _opener(child))
+        stack.extend(reversed(subdirs))
+
+
+def remote_list_dir(mgr: Any, sess: Any, quote: Callable[[str], str], parse_line: Callable[[str], Any]) -> Callable[[str], List[Dict[str, Any]]]:
+    """``list_dir`` callback for :func:`iter_remote_entries` based on ``cls -l``."""
+
+    def _list(path: str) -> List[Dict[str, Any]]:
+        rc, out, _err = mgr._run_lftp(sess, [f"cls -l {quote(path.rstrip('/') + '/')}"], capture=True)
+        if rc != 0:
+            raise RuntimeError("list_failed")
+        items: List[Dict[str, Any]] = []
+        for line in (out or b"").decode("utf-8", errors="replace").splitlines():
+            try:
+                item = parse_line(line)
+            except Exception:
+                item = None
+            if item:
+                items.append(item)
+        return items
+
+    return _list
+
+
+def remote_cat(mgr: Any, sess: Any, quote: Callable[[str], str]) -> Callable[[str], Any]:
+    """``popen_cat`` callback: one ``lftp cat`` process per remote file."""
+
+    return lambda path: mgr._popen_lftp(sess, [f"cat {quote(path)}"])
+
+
+def iter_remote_selection(
+    items: List[Dict[str, Any]],
+    *,
+    root_name: str,
+    list_dir: Callable[[str], List[Dict[str, Any]]],
+    popen_cat: Callable[[str], Any],
+) -> Iterator[ArchiveEntry]:
+    """Remote counterpart of :func:`iter_local_selection`.
+
+    ``items`` carry ``path``, ``name`` and the ``is_dir``/``size`` learned from
+    a listing.
+    """
+
+    root = _safe_arc(root_name or "selection")
+    yield ArchiveEntry(root + "/", True, 0, time.time(), 0o755)
+    named = ((it, str(it.get("name") or it.get("path") or "item")) for it in items)
+    for it, arc in _unique_arcs(named, root):
+        yield from iter_remote_entries(
+            str(it.get("path") or ""),
+            arc,
+            is_dir=it.get("is_dir"),
+            size=it.get("size"),
+            list_dir=list_dir,
+            popen_cat=popen_cat,
+        )
+
+
+# ------------------------------------------------------------------ writers
+
+
+class _Sink:
+    """Write-only, non-seekable buffer that zipfile/tar output is drained from."""
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self._pos = 0
+
+    def write(self, b: Any) -> int:
+        self._buf += b
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, *_a: Any) -> int:
+        raise io.UnsupportedOperation("seek")
+
+    def flush(self) -> None:
+        return None
+
+    def drain(self) -> bytes:
+        out = bytes(self._buf)
+        self._buf.clear()
+        return out
+
+
+def _zip_compression() -> int:
+    try:
+        import zlib as _z  # noqa: F401
+
+        return zipfile.ZIP_DEFLATED
+    except Exception:
+        return zipfile.ZIP_STORED
+
+
+def _run(
+    state: ArchiveStream,
+    entries: Iterable[ArchiveEntry],
+    write_member: Callable[[ArchiveEntry, Any], Iterator[bytes]],
+    finish: Callable[[], bytes],
+    on_finish: Optional[Callable[[ArchiveStream], None]],
+) -> Iterator[bytes]:
+    completed = False
+    try:
+        for ent in entries:
+            if state.cancel_flag.is_set():
+                raise RuntimeError("canceled")
+            state.current = ent.arcname
+            src = None
+            if not ent.is_dir:
+                try:
+                    src = ent.opener() if ent.opener is not None else None
+                except Exception:
+                    src = None
+                if src is None:
+                    # Best-effort like the staged writer: unreadable files are skipped.
+                    state.files_skipped += 1
+                    continue
+            try:
+                for out in write_member(ent, src):
+                    if out:
+                        state.bytes_out += len(out)
+                        yield out
+                    if state.cancel_flag.is_set():
+                        raise RuntimeError("canceled")
+            finally:
+                if src is not None:
+                    try:
+                        src.close()
+                    except Exception:
+                        pass
+            if not ent.is_dir:
+                state.files_done += 1
+        tail = finish()
+        if tail:
+            state.bytes_out += len(tail)
+            yield tail
+        completed = True
+        state.state = "done"
+    except GeneratorExit:
+        state.state = "canceled"
+        state.error = "client_disconnected"
+        raise
+    except RuntimeError as e:
+        state.state = "canceled" if str(e) == "canceled" else "error"
+        state.error = str(e)
+        raise
+    except Exception as e:
+        state.state = "error"
+        state.error = str(e) or "stream_failed"
+        raise
+    finally:
+        if not completed and state.state == "running":
+            state.state = "canceled"
+        state.current = ""
+        state.finished_ts = time.time()
+        if on_finish is not None:
+            try:
+                on_finish(state)
+            except Exception:
+                pass
+
+
+def stream_zip(
+    entries: Iterable[ArchiveEntry],
+    state: ArchiveStream,
+    *,
+    chunk_bytes: int = CHUNK_BYTES,
+    on_finish: Optional[Callable[[ArchiveStream], None]] = None,
+) -> Iterator[bytes]:
+    """Yield a ZIP archive (data descriptors, ZIP64 when needed) for ``entries``."""
+
+    _register(state)
+    sink = _Sink()
+    comp = _zip_compression()
+    zf = zipfile.ZipFile(sink, "w", compression=comp, allowZip64=True)  # type: ignore[arg-type]
+
+    def _zinfo(ent: ArchiveEntry) -> zipfile.ZipInfo:
+        zi = zipfile.ZipInfo(ent.arcname, date_time=time.localtime(max(_ZIP_MIN_TS, int(ent.mtime or 0)))[:6])
+        mode = int(ent.mode or 0) & 0xFFFF
+        if ent.is_dir:
+            zi.external_attr = ((mode or (stat.S_IFDIR | 0o755)) << 16) | 0x10
+            zi.compress_type = zipfile.ZIP_STORED
+        else:
+            zi.external_attr = (mode or (stat.S_IFREG | 0o644)) << 16
+            ext = os.path.splitext(ent.arcname)[1].lower()
+            zi.compress_type = zipfile.ZIP_STORED if ext in _STORED_EXTS else comp
+            zi.file_size = int(ent.size or 0)
+        return zi
+
+    def _member(ent: ArchiveEntry, src: Any) -> Iterator[bytes]:
+        zi = _zinfo(ent)
+        if ent.is_dir:
+            zf.writestr(zi, b"")
+            yield sink.drain()
+            return
+        force64 = ent.size is None or int(ent.size) >= _ZIP64_THRESHOLD
+        with zf.open(zi, "w", force_zip64=force64) as dest:
+            while True:
+                chunk = src.read(int(chunk_bytes))
+                if not chunk:
+                    break
+                state.bytes_in += len(chunk)
+                dest.write(chunk)
+                yield sink.drain()
+        yield sink.drain()
+
+    def _finish() -> bytes:
+        zf.close()
+        return sink.drain()
+
+    return _run(state, entries, _member, _finish, on_finish)
+
+
+def stream_tar_gz(
+    entries: Iterable[ArchiveEntry],
+    state: ArchiveStream,
+    *,
+    chunk_bytes: int = CHUNK_BYTES,
+    level: int = 6,
+    on_finish: Optional[Callable[[ArchiveStream], None]] = None,
+) -> Iterator[bytes]:
+    """Yield a gzip-compressed PAX tar archive for ``entries``.
+
+    Member sizes come from the entry; a source that turns out shorter is
+    zero-padded and a longer one is cut, so the tar stream stays valid.
+    Entries without a known size are skipped.
+    """
+
+    _register(state)
+    gz = zlib.compressobj(int(level), zlib.DEFLATED, 31)
+    written = 0
+
+    def _emit(b: bytes) -> bytes:
+        nonlocal written
+        written += len(b)
+        return gz.compress(b)
+
+    def _member(ent: ArchiveEntry, src: Any) -> Iterator[bytes]:
+        ti = tarfile.TarInfo(ent.arcname.rstrip("/") if ent.is_dir else ent.arcname)
+        ti.mtime = int(ent.mtime or 0)
+        ti.mode = int(ent.mode or (0o755 if ent.is_dir else 0o644)) & 0o7777
+        if ent.is_dir:
+            ti.type = tarfile.DIRTYPE
+            ti.size = 0
+            yield _emit(ti.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape"))
+            return
+        ti.type = tarfile.REGTYPE
+        ti.size = int(ent.size)
+        yield _emit(ti.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape"))
+        remaining = ti.size
+        while remaining > 0:
+            chunk = src.read(min(int(chunk_bytes), remaining))
+            if not chunk:
+                break
+            state.bytes_in += len(chunk)
+            remaining -= len(chunk)
+            yield _emit(chunk)
+        while remaining > 0:
+            pad = min(int(chunk_bytes), remaining)
+            remaining -= pad
+            yield _emit(b"\0" * pad)
+        rem = ti.size % tarfile.BLOCKSIZE
+        if rem:
+            yield _emit(b"\0" * (tarfile.BLOCKSIZE - rem))
+
+    def _finish() -> bytes:
+        out = _emit(b"\0" * (tarfile.BLOCKSIZE * 2))
+        rem = written % tarfile.RECORDSIZE
+        if rem:
+            out += _emit(b"\0" * (tarfile.RECORDSIZE - rem))
+        return out + gz.flush()
+
+    def _sized(src: Iterable[ArchiveEntry]) -> Iterator[ArchiveEntry]:
+        for ent in src:
+            if not ent.is_dir and ent.size is None:
+                state.files_skipped += 1
+                continue
+            yield ent
+
+    return _run(state, _sized(entries), _member, _finish, on_finish)
+
+
+def stream_requested(arg: Any = None) -> bool:
+    """Whether to stream archives (``?stream=`` overrides ``XKEEN_FS_ARCHIVE_STREAM``)."""
+
+    raw = str(arg if arg is not None else "").strip().lower()
+    if not raw:
+        raw = str(os.getenv("XKEEN_FS_ARCHIVE_STREAM", "1") or "1").strip().lower()
+    return raw not in ("0", "false", "no", "off")
+
+
+def normalize_stream_format(fmt: Any) -> str:
+    return "tar.gz" if str(fmt or "").strip().lower() in ("tgz", "tar.gz", "tar_gz", "targz") else "zip"
+
+
+def stream_archive(
+    entries: Iterable[ArchiveEntry],
+    *,
+    fmt: str,
+    name: str,
+    target: str,
+    on_finish: Optional[Callable[[ArchiveStream], None]] = None,
+) -> Tuple[ArchiveStream, Iterator[bytes], str]:
+    """Start a registered stream. Returns (state, body iterator, mimetype)."""
+
+    f = normalize_stream_format(fmt)
+    state = ArchiveStream(fmt=f, name=name, target=target)
+    if f == "tar.gz":
+        return state, stream_tar_gz(entries, state, on_finish=on_finish), "application/gzip"
+    return state, stream_zip(entries, state, on_finish=on_finish), "application/zip"
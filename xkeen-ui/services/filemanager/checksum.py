@@ -3,28 +3,88 @@
 from __future__ import annotations
 
 import hashlib
-from typing import BinaryIO, Tuple
+import os
+import time
+from typing import BinaryIO, Callable, Optional, Tuple
 
+from services.utils.offload import call_off_hub
 
-def hash_stream(fp: BinaryIO, *, chunk_bytes: int = 256 * 1024) -> Tuple[str, str, int]:
+
+class StreamDigest:
+    """Incremental md5 + sha256, fed chunk by chunk (e.g. while saving an upload)."""
+
+    def __init__(self) -> None:
+        self._md5 = hashlib.md5()
+        self._sha = hashlib.sha256()
+        self.total = 0
+
+    def update(self, chunk: bytes) -> None:
+        self.total += len(chunk)
+        self._md5.update(chunk)
+        self._sha.update(chunk)
+
+    def hexdigests(self) -> Tuple[str, str]:
+        return self._md5.hexdigest(), self._sha.hexdigest()
+
+
+def hash_stream(
+    fp: BinaryIO,
+    *,
+    chunk_bytes: int = 256 * 1024,
+    on_chunk: Optional[Callable[[int], None]] = None,
+) -> Tuple[str, str, int]:
     """Compute md5 and sha256 hashes for a binary stream.
 
+    ``on_chunk(bytes_done)`` is called after every chunk; it may raise to abort.
+
     Returns (md5_hex, sha256_hex, total_bytes_read).
     """
 
-    md5 = hashlib.md5()
-    sha = hashlib.sha256()
-    total = 0
+    digest = StreamDigest()
     while True:
         chunk = fp.read(int(chunk_bytes))
         if not chunk:
             break
-        total += len(chunk)
-        md5.update(chunk)
-        sha.update(chunk)
-    return md5.hexdigest(), sha.hexdigest(), int(total)
+        digest.update(chunk)
+        if on_chunk is not None:
+            on_chunk(digest.total)
+    md5_hex, sha_hex = digest.hexdigests()
+    return md5_hex, sha_hex, int(digest.total)
 
 
 def hash_file(path_abs: str, *, chunk_bytes: int = 256 * 1024) -> Tuple[str, str, int]:
     with open(path_abs, 'rb') as fp:
         return hash_stream(fp, chunk_bytes=chunk_bytes)
+
+
+def hash_file_cached(
+    path_abs: str,
+    *,
+    chunk_bytes: int = 256 * 1024,
+    on_chunk: Optional[Callable[[int], None]] = None,
+    on_wait: Optional[Callable[[], None]] = None,
+) -> Tuple[str, str, int, bool]:
+    """Like :func:`hash_file`, but served from the checksum cache when the file is unchanged.
+
+    A cache miss is hashed off the gevent hub (see
+    :func:`services.utils.offload.call_off_hub`): ``on_chunk`` then runs on
+    the hashing thread and must only record progress, while ``on_wait`` is
+    called periodically on the caller's greenlet to report it.
+
+    Returns (md5_hex, sha256_hex, size, cached).
+    """
+
+    from services.filemanager.checksum_cache import get_checksum_cache
+
+    cache = get_checksum_cache()
+    with open(path_abs, 'rb') as fp:
+        st0 = os.fstat(fp.fileno())
+        hit = cache.get(st0)
+        if hit is not None:
+            return hit[0], hit[1], int(st0.st_size), True
+        started_ns = time.time_ns()
+        md5_hex, sha_hex, total = call_off_hub(hash_stream, fp, chunk_bytes=chunk_bytes, on_chunk=on_chunk, on_wait=on_wait)
+        st1 = os.fstat(fp.fileno())
+    if total == int(st0.st_size):
+        cache.put_hashed(st0, st1, md5_hex, sha_hex, path=path_abs, started_ns=started_ns)
+    return md5_hex, sha_hex, int(total), False
@@ -0,0 +1,211 @@
+"""Persistent checksum cache keyed by file identity.
+
+Hashing a firmware image or a GeoSite/GeoIP DAT file on a router means
+reading tens of megabytes from a USB disk. The digests only change when the
+file does, so they are cached under the file identity
+
+    (st_dev, st_ino, st_size, st_mtime_ns) -> (md5, sha256)
+
+and reused by ``/api/fs/checksum``, checksum jobs, upload verification and
+DAT updates. A replaced or rewritten file gets a new inode, size or mtime and
+therefore simply misses the cache.
+
+Digests computed by reading a file are only stored when the file did not
+change while it was read and its mtime is not within the 2 s granularity of
+FAT/exFAT (same "racy" rule as ``dirsize_index``). Write paths that produced
+the content themselves (uploads, DAT downloads) record it directly.
+
+Persisted as compact JSON in UI_STATE_DIR (``XKEEN_FM_CHECKSUM_CACHE_FILE``,
+``off`` keeps it in memory only); at most ``XKEEN_FM_CHECKSUM_CACHE_MAX``
+entries, least recently used first out.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.io.atomic import _atomic_write_text
+from services.utils.env import _read_int_env
+
+
+CACHE_FILENAME = "fm-checksum-cache.json"
+_FORMAT_VERSION = 1
+
+_MAX_ENTRIES_DEFAULT = 2000
+_SAVE_INTERVAL_SECONDS = 30.0
+_RACY_NS = 2_000_000_000
+
+Identity = Tuple[int, int, int, int]
+
+
+def file_identity(st: os.stat_result) -> Identity:
+    return (
+        int(getattr(st, "st_dev", 0) or 0),
+        int(getattr(st, "st_ino", 0) or 0),
+        int(getattr(st, "st_size", 0) or 0),
+        int(getattr(st, "st_mtime_ns", 0) or 0),
+    )
+
+
+def _key(ident: Identity) -> str:
+    return "%d:%d:%d:%d" % ident
+
+
+def _default_cache_path() -> str:
+    raw = str(os.getenv("XKEEN_FM_CHECKSUM_CACHE_FILE", "") or "").strip()
+    if raw:
+        return "" if raw.lower() in ("off", "0", "none", "-") else raw
+    try:
+        from core.paths import UI_STATE_DIR
+
+        root = str(UI_STATE_DIR or "").strip()
+    except Exception:
+        root = ""
+    return os.path.join(root or "/opt/etc/xkeen-ui", CACHE_FILENAME)
+
+
+class ChecksumCache:
+    """LRU map of file identity -> (md5, sha256), persisted best-effort."""
+
+    def __init__(self, path: Optional[str] = None, *, max_entries: Optional[int] = None) -> None:
+        self.path = _default_cache_path() if path is None else str(path or "")
+        self.max_entries = max(16, int(max_entries if max_entries is not None else _read_int_env("XKEEN_FM_CHECKSUM_CACHE_MAX", _MAX_ENTRIES_DEFAULT)))
+        self._lock = threading.Lock()
+        # key -> [md5, sha256, path, stored_ts]
+        self._entries: "OrderedDict[str, List[Any]]" = OrderedDict()
+        self._loaded = False
+        self._dirty = False
+        self._last_save = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        data: Any = None
+        if self.path:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception:
+                data = None
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not isinstance(data, dict) or data.get("v") != _FORMAT_VERSION:
+                return
+            entries = data.get("entries")
+            if not isinstance(entries, dict):
+                return
+            for k, v in entries.items():
+                if isinstance(v, list) and len(v) >= 2 and all(isinstance(x, str) for x in v[:2]):
+                    self._entries[str(k)] = list(v[:4])
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def flush(self, *, force: bool = False) -> bool:
+        """Write the cache if it changed (at most every 30 s unless forced)."""
+
+        if not self.path:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if not self._dirty:
+                return False
+            if not force and self._last_save and (now - self._last_save) < _SAVE_INTERVAL_SECONDS:
+                return False
+            payload = {"v": _FORMAT_VERSION, "entries": dict(self._entries)}
+            self._dirty = False
+            self._last_save = now
+        try:
+            _atomic_write_text(self.path, json.dumps(payload, ensure_ascii=False, separators=(",", ":")), mode=0o600)
+            return True
+        except Exception:
+            with self._lock:
+                self._dirty = True
+            return False
+
+    def get(self, st: os.stat_result) -> Optional[Tuple[str, str]]:
+        """Return cached ``(md5, sha256)`` for the stat result, if any."""
+
+        self._ensure_loaded()
+        key = _key(file_identity(st))
+        with self._lock:
+            ent = self._entries.get(key)
+            if ent is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return str(ent[0]), str(ent[1])
+
+    def put(self, st: os.stat_result, md5_hex: str, sha256_hex: str, *, path: str = "") -> None:
+        self._ensure_loaded()
+        key = _key(file_identity(st))
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = [str(md5_hex), str(sha256_hex), str(path or ""), int(time.time())]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+        self.flush()
+
+    def put_hashed(
+        self,
+        st_before: os.stat_result,
+        st_after: os.stat_result,
+        md5_hex: str,
+        sha256_hex: str,
+        *,
+        path: str = "",
+        started_ns: Optional[int] = None,
+    ) -> bool:
+        """Store digests computed by reading the file, if they are safe to reuse."""
+
+        if file_identity(st_before) != file_identity(st_after):
+            return False
+        started = int(started_ns if started_ns is not None else time.time_ns())
+        if started - int(getattr(st_before, "st_mtime_ns", 0) or 0) < _RACY_NS:
+            return False
+        self.put(st_before, md5_hex, sha256_hex, path=path)
+        return True
+
+    def remember(self, path: str, md5_hex: str, sha256_hex: str) -> bool:
+        """Record digests of content the caller just wrote to ``path``."""
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        self.put(st, md5_hex, sha256_hex, path=path)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "path": self.path,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_CACHE: Optional[ChecksumCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_checksum_cache() -> ChecksumCache:
+    """Process-wide cache shared by the checksum endpoint, jobs and writers."""
+
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ChecksumCache()
+        return _CACHE
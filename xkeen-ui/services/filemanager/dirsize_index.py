@@ -0,0 +1,406 @@
+"""Persistent directory-size index for the local file manager.
+
+Deep-size requests (dirsize jobs, trash stats before a soft delete, archive
+size estimates) used to re-walk whole trees every time. On a USB HDD with
+Entware plus torrent data that is millions of ``stat`` calls per request.
+
+The index keeps one compact record per directory:
+
+    path -> (st_dev, st_ino, st_mtime_ns, own_bytes, own_items, scanned_ns, subdirs)
+
+``own_*`` cover the direct (non-directory) entries only, so a walk that finds
+a directory with unchanged dev/inode/mtime reuses its record and only
+``lstat``s the child directories instead of listing the directory again.
+Directories whose mtime changed (entries added/removed/renamed) are rescanned
+and their records replaced.
+
+Two cases are not visible through the directory mtime and are handled
+conservatively:
+
+- files growing in place (a download, a log; no entry added) -> records
+  expire ``XKEEN_FM_DIRSIZE_MAX_AGE`` seconds after their scan (default
+  300). Callers whose decision must not rest on a stale size pass
+  ``max_age=0``, which re-validates every directory now;
+- coarse mtime granularity (FAT/exFAT USB sticks: 2 s) -> a record is only
+  trusted when the scan happened well after the directory's mtime ("racy"
+  entries are rescanned, as git does for its index).
+
+The index is persisted as compact JSON in UI_STATE_DIR (override with
+``XKEEN_FM_DIRSIZE_INDEX_FILE``, ``off`` keeps it in memory only) and capped
+at ``XKEEN_FM_DIRSIZE_MAX_DIRS`` records, least recently used first out.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import stat
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from services.io.atomic import _atomic_write_text
+from services.utils.env import _read_int_env
+
+
+INDEX_FILENAME = "fm-dirsize-index.json"
+_FORMAT_VERSION = 1
+
+_MAX_AGE_DEFAULT = 300
+_MAX_DIRS_DEFAULT = 50_000
+_SAVE_INTERVAL_SECONDS = 30.0
+# Records scanned less than this after the directory mtime are not trusted.
+_RACY_NS = 2_000_000_000
+# Cancel/deadline checks inside one huge directory listing.
+_CHECK_EVERY = 2048
+
+
+class DirSizeResult(NamedTuple):
+    bytes: Optional[int]
+    items: int
+    truncated: bool
+    # "" when the walk completed, otherwise "canceled" or "timeout".
+    aborted: str = ""
+    scanned_dirs: int = 0
+    reused_dirs: int = 0
+
+
+class _Abort(Exception):
+    pass
+
+
+class _Rec:
+    __slots__ = ("dev", "ino", "mtime_ns", "own_bytes", "own_items", "scanned_ns", "subdirs")
+
+    def __init__(
+        self,
+        dev: int,
+        ino: int,
+        mtime_ns: int,
+        own_bytes: int,
+        own_items: int,
+        scanned_ns: int,
+        subdirs: Tuple[str, ...],
+    ) -> None:
+        self.dev = dev
+        self.ino = ino
+        self.mtime_ns = mtime_ns
+        self.own_bytes = own_bytes
+        self.own_items = own_items
+        self.scanned_ns = scanned_ns
+        self.subdirs = subdirs
+
+    def to_json(self) -> List[Any]:
+        return [self.dev, self.ino, self.mtime_ns, self.own_bytes, self.own_items, self.scanned_ns, list(self.subdirs)]
+
+    @classmethod
+    def from_json(cls, raw: Any) -> Optional["_Rec"]:
+        try:
+            dev, ino, mtime_ns, own_bytes, own_items, scanned_ns, subdirs = raw
+            return cls(
+                int(dev),
+                int(ino),
+                int(mtime_ns),
+                int(own_bytes),
+                int(own_items),
+                int(scanned_ns),
+                tuple(str(s) for s in subdirs),
+            )
+        except Exception:
+            return None
+
+
+def _default_index_path() -> str:
+    raw = str(os.getenv("XKEEN_FM_DIRSIZE_INDEX_FILE", "") or "").strip()
+    if raw:
+        return "" if raw.lower() in ("off", "0", "none", "-") else raw
+    try:
+        from core.paths import UI_STATE_DIR
+
+        root = str(UI_STATE_DIR or "").strip()
+    except Exception:
+        root = ""
+    return os.path.join(root or "/opt/etc/xkeen-ui", INDEX_FILENAME)
+
+
+class DirSizeIndex:
+    """Per-directory size records reused across walks (thread/greenlet safe)."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        *,
+        max_dirs: Optional[int] = None,
+        max_age: Optional[float] = None,
+    ) -> None:
+        self.path = _default_index_path() if path is None else str(path or "")
+        self.max_dirs = max(100, int(max_dirs if max_dirs is not None else _read_int_env("XKEEN_FM_DIRSIZE_MAX_DIRS", _MAX_DIRS_DEFAULT)))
+        self.max_age = max(0.0, float(max_age if max_age is not None else _read_int_env("XKEEN_FM_DIRSIZE_MAX_AGE", _MAX_AGE_DEFAULT)))
+        self._lock = threading.Lock()
+        self._recs: "OrderedDict[str, _Rec]" = OrderedDict()
+        self._loaded = False
+        self._dirty = False
+        self._last_save = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    # -- persistence --------------------------------------------------------
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        data: Any = None
+        if self.path:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception:
+                data = None
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not isinstance(data, dict) or data.get("v") != _FORMAT_VERSION:
+                return
+            dirs = data.get("dirs")
+            if not isinstance(dirs, dict):
+                return
+            for p, raw in dirs.items():
+                rec = _Rec.from_json(raw)
+                if rec is not None:
+                    self._recs[str(p)] = rec
+            while len(self._recs) > self.max_dirs:
+                self._recs.popitem(last=False)
+
+    def flush(self, *, force: bool = False) -> bool:
+        """Write the index if it changed (at most every 30 s unless forced)."""
+
+        if not self.path:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if not self._dirty:
+                return False
+            if not force and self._last_save and (now - self._last_save) < _SAVE_INTERVAL_SECONDS:
+                return False
+            payload = {"v": _FORMAT_VERSION, "dirs": {p: r.to_json() for p, r in self._recs.items()}}
+            self._dirty = False
+            self._last_save = now
+        try:
+            _atomic_write_text(self.path, json.dumps(payload, ensure_ascii=False, separators=(",", ":")), mode=0o600)
+            return True
+        except Exception:
+            with self._lock:
+                self._dirty = True
+            return False
+
+    # -- records ------------------------------------------------------------
+
+    def _lookup(self, path: str, st: os.stat_result, now_ns: int, max_age_ns: int) -> Optional[_Rec]:
+        with self._lock:
+            rec = self._recs.get(path)
+            if rec is None:
+                return None
+            if (
+                rec.dev != int(st.st_dev)
+                or rec.ino != int(st.st_ino)
+                or rec.mtime_ns != int(st.st_mtime_ns)
+                or (rec.scanned_ns - rec.mtime_ns) < _RACY_NS
+                or (now_ns - rec.scanned_ns) > max_age_ns
+            ):
+                return None
+            self._recs.move_to_end(path)
+            return rec
+
+    def _store(self, path: str, rec: _Rec) -> None:
+        with self._lock:
+            old = self._recs.pop(path, None)
+            self._recs[path] = rec
+            if old is not None:
+                # Drop records of child directories that are gone.
+                for name in set(old.subdirs).difference(rec.subdirs):
+                    self._recs.pop(os.path.join(path, name), None)
+            while len(self._recs) > self.max_dirs:
+                self._recs.popitem(last=False)
+            self._dirty = True
+
+    def _scan(
+        self,
+        path: str,
+        st: os.stat_result,
+        check: Callable[[], None],
+    ) -> Tuple[_Rec, Dict[str, os.stat_result]]:
+        own_bytes = 0
+        own_items = 0
+        subdirs: Dict[str, os.stat_result] = {}
+        scanned_ns = time.time_ns()
+        with os.scandir(path) as it:
+            for ent in it:
+                own_items += 1
+                if own_items % _CHECK_EVERY == 0:
+                    check()
+                try:
+                    est = ent.stat(follow_symlinks=False)
+                except Exception:
+                    continue
+                if stat.S_ISDIR(est.st_mode):
+                    subdirs[ent.name] = est
+                else:
+                    own_bytes += int(getattr(est, "st_size", 0) or 0)
+        rec = _Rec(
+            int(st.st_dev),
+            int(st.st_ino),
+            int(st.st_mtime_ns),
+            own_bytes,
+            own_items,
+            scanned_ns,
+            tuple(sorted(subdirs)),
+        )
+        return rec, subdirs
+
+    # -- public API ---------------------------------------------------------
+
+    def measure(
+        self,
+        root: str,
+        *,
+        max_items: int = 3_000_000,
+        skip_names: Iterable[str] = (),
+        max_age: Optional[float] = None,
+        deadline: Optional[float] = None,
+        cancel: Optional[Callable[[], bool]] = None,
+        progress: Optional[Callable[[int, int, str], None]] = None,
+    ) -> DirSizeResult:
+        """Return the recursive size of ``root`` without following symlinks.
+
+        Only ``root`` itself is resolved when it is a symlink (as
+        ``os.scandir(root)`` would); nothing below it is followed.
+
+        ``items`` counts every entry below ``root`` (files and directories),
+        like the scandir walkers this replaces; the walk stops once it exceeds
+        ``max_items`` (``truncated``). Directories named in ``skip_names`` are
+        pruned. ``deadline`` is a ``time.monotonic()`` value; ``cancel`` is
+        polled between directories. ``progress(items, bytes, dir_path)`` is
+        called after every directory. ``max_age`` overrides the record expiry
+        in seconds; ``0`` reuses nothing and refreshes every record.
+        """
+
+        root = os.path.abspath(str(root))
+        try:
+            st = os.stat(root)
+        except OSError:
+            return DirSizeResult(None, 0, True)
+        if not stat.S_ISDIR(st.st_mode):
+            return DirSizeResult(int(getattr(st, "st_size", 0) or 0), 1, False)
+
+        self._ensure_loaded()
+        skip = frozenset(str(s) for s in skip_names if s)
+        age = self.max_age if max_age is None else max(0.0, float(max_age))
+        max_age_ns = int(age * 1e9)
+        limit = int(max_items or 0)
+
+        def _check() -> None:
+            if cancel is not None and cancel():
+                raise _Abort("canceled")
+            if deadline is not None and time.monotonic() > deadline:
+                raise _Abort("timeout")
+
+        total = 0
+        items = 0
+        truncated = False
+        aborted = ""
+        scanned = 0
+        reused = 0
+        stack: List[Tuple[str, os.stat_result]] = [(root, st)]
+        try:
+            while stack:
+                _check()
+                d, dst = stack.pop()
+                now_ns = time.time_ns()
+                rec = self._lookup(d, dst, now_ns, max_age_ns)
+                child_stats: Optional[Dict[str, os.stat_result]] = None
+                if rec is None:
+                    try:
+                        rec, child_stats = self._scan(d, dst, _check)
+                    except _Abort:
+                        raise
+                    except Exception:
+                        # best-effort: an unreadable subtree makes the total unknown
+                        truncated = True
+                        continue
+                    self._store(d, rec)
+                    scanned += 1
+                else:
+                    reused += 1
+
+                total += rec.own_bytes
+                items += rec.own_items
+                for name in rec.subdirs:
+                    if name in skip:
+                        items -= 1
+                        continue
+                    p = os.path.join(d, name)
+                    cst = child_stats.get(name) if child_stats is not None else None
+                    if cst is None:
+                        try:
+                            cst = os.lstat(p)
+                        except OSError:
+                            continue
+                    if not stat.S_ISDIR(cst.st_mode):
+                        total += int(getattr(cst, "st_size", 0) or 0)
+                        continue
+                    stack.append((p, cst))
+
+                if progress is not None:
+                    try:
+                        progress(items, total, d)
+                    except Exception:
+                        pass
+                if items > limit:
+                    truncated = True
+                    break
+        except _Abort as e:
+            aborted = str(e)
+            truncated = True
+
+        with self._lock:
+            self.hits += reused
+            self.misses += scanned
+        self.flush()
+        return DirSizeResult(int(total), int(items), bool(truncated), aborted, scanned, reused)
+
+    def invalidate(self, path: str) -> None:
+        """Forget ``path`` and everything below it."""
+
+        ap = os.path.abspath(str(path))
+        prefix = ap.rstrip("/") + "/"
+        with self._lock:
+            for p in [p for p in self._recs if p == ap or p.startswith(prefix)]:
+                del self._recs[p]
+            self._dirty = True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "path": self.path,
+                "dirs": len(self._recs),
+                "max_dirs": self.max_dirs,
+                "max_age": self.max_age,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_INDEX: Optional[DirSizeIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_dirsize_index() -> DirSizeIndex:
+    """Process-wide index shared by dirsize jobs, trash stats and estimates."""
+
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = DirSizeIndex()
+        return _INDEX
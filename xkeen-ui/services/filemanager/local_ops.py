@@ -31,6 +31,10 @@ def tmp_free_bytes(tmp_dir: str) -> Optional[int]:
 def dir_walk_sum_bytes(root: str, *, max_items: int = 200_000) -> Tuple[Optional[int], int, bool]:
     """Best-effort recursive size estimate for local trees.
 
+    Directories are measured through the persistent size index
+    (``services.filemanager.dirsize_index``), so unchanged subtrees are not
+    re-listed on every estimate.
+
     Args:
         root: File or directory path.
         max_items: Hard cap on visited entries to avoid hanging on huge trees.
@@ -39,37 +43,6 @@ def dir_walk_sum_bytes(root: str, *, max_items: int = 200_000) -> Tuple[Optional
         (bytes|None, items_count, truncated)
     """
 
-    total = 0
-    items = 0
-    truncated = False
-
-    def _scan_dir(d: str) -> None:
-        nonlocal total, items, truncated
-        if truncated:
-            return
-        try:
-            with os.scandir(d) as it:
-                for entry in it:
-                    if truncated:
-                        return
-                    items += 1
-                    if items > int(max_items or 0):
-                        truncated = True
-                        return
-                    try:
-                        st = entry.stat(follow_symlinks=False)
-                    except Exception:
-                        continue
-                    try:
-                        if entry.is_dir(follow_symlinks=False):
-                            _scan_dir(os.path.join(d, entry.name))
-                        else:
-                            total += int(getattr(st, "st_size", 0) or 0)
-                    except Exception:
-                        continue
-        except Exception:
-            truncated = True
-
     try:
         if os.path.isfile(root):
             try:
@@ -78,19 +51,37 @@ def dir_walk_sum_bytes(root: str, *, max_items: int = 200_000) -> Tuple[Optional
                 return None, 1, True
         if not os.path.isdir(root):
             return None, 0, True
-        _scan_dir(root)
-        return int(total), int(items), bool(truncated)
+        from services.filemanager.dirsize_index import get_dirsize_index
+
+        res = get_dirsize_index().measure(root, max_items=int(max_items or 0))
+        return res.bytes, int(res.items), bool(res.truncated)
     except Exception:
-        return None, int(items), True
+        return None, 0, True
 
 
 def dir_size_bytes_best_effort(path_abs: str, *, timeout_s: float = 3.0) -> Tuple[Optional[int], Optional[str]]:
     """Return (bytes, error). Best-effort and time-bounded.
 
-    Prefer `du` if available (fast). Fallback to a Python scandir walk.
+    Prefer the persistent size index, then `du` if available (fast), then a
+    plain Python scandir walk.
     We do NOT follow symlinks to avoid loops.
     """
 
+    # 0) Persistent size index: only directories changed since the last walk
+    #    are listed again. A timeout keeps the records scanned so far, so the
+    #    next request resumes; this one still falls back to `du` below.
+    timed_out = False
+    try:
+        from services.filemanager.dirsize_index import get_dirsize_index
+
+        res = get_dirsize_index().measure(path_abs, deadline=time.monotonic() + float(timeout_s))
+        if res.aborted == "timeout":
+            timed_out = True
+        elif res.bytes is not None:
+            return int(res.bytes), None
+    except Exception:
+        pass
+
     # 1) Try du -sb (GNU/coreutils). Some busybox builds also support -b.
     try:
         cp = subprocess.run(
@@ -123,6 +114,10 @@ def dir_size_bytes_best_effort(path_abs: str, *, timeout_s: float = 3.0) -> Tupl
     except Exception:
         pass
 
+    # The index walk already spent the budget; a plain walk would not finish.
+    if timed_out:
+        return None, "timeout"
+
     # 3) Fallback: scandir walk with deadline.
     deadline = time.monotonic() + float(timeout_s)
     total = 0
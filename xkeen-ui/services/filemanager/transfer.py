@@ -10,7 +10,7 @@ from __future__ import annotations
 
 import os
 import uuid
-from typing import BinaryIO, Iterable, Optional
+from typing import BinaryIO, Callable, Iterable, Optional
 
 
 def save_stream_to_tmp(
@@ -20,6 +20,7 @@ def save_stream_to_tmp(
     prefix: str = "xkeen_upload_",
     max_bytes: Optional[int] = None,
     chunk_size: int = 64 * 1024,
+    on_chunk: Optional[Callable[[bytes], None]] = None,
 ) -> tuple[str, int]:
     """Save a binary stream into a temporary file.
 
@@ -29,6 +30,7 @@ def save_stream_to_tmp(
         prefix: file name prefix.
         max_bytes: optional hard limit; if exceeded raises ValueError('too_large').
         chunk_size: read size.
+        on_chunk: optional callback fed with every written chunk (e.g. a digest).
 
     Returns:
         (tmp_path, total_bytes)
@@ -49,6 +51,8 @@ def save_stream_to_tmp(
                 if max_bytes is not None and total > int(max_bytes):
                     raise ValueError("too_large")
                 outfp.write(chunk)
+                if on_chunk is not None:
+                    on_chunk(chunk)
         return tmp_path, total
     except Exception:
         try:
@@ -66,6 +70,7 @@ def save_filestorage_to_tmp(
     prefix: str = "xkeen_upload_",
     max_bytes: Optional[int] = None,
     chunk_size: int = 64 * 1024,
+    on_chunk: Optional[Callable[[bytes], None]] = None,
 ) -> tuple[str, int]:
     """Save a Werkzeug FileStorage (or similar) into a temp file.
 
@@ -77,7 +82,7 @@ def save_filestorage_to_tmp(
     stream = getattr(file_storage, "stream", None)
     if stream is None:
         raise ValueError("no_stream")
-    return save_stream_to_tmp(stream, tmp_dir=tmp_dir, prefix=prefix, max_bytes=max_bytes, chunk_size=chunk_size)
+    return save_stream_to_tmp(stream, tmp_dir=tmp_dir, prefix=prefix, max_bytes=max_bytes, chunk_size=chunk_size, on_chunk=on_chunk)
 
 
 def stream_file_then_cleanup(
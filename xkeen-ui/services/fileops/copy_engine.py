@@ -0,0 +1,451 @@
+"""Local copy/move engine with byte progress, cancellation and resume.
+
+Used by ``run_job_copy_move`` for local->local transfers (typically internal
+storage <-> USB), where the old recursive helpers copied whole trees with no
+progress inside large files and no way to stop or continue them.
+
+- The tree is planned first (files/dirs/bytes) so progress has a total.
+- File data is moved in chunks with ``os.copy_file_range`` (falls back to
+  ``os.sendfile`` and then plain read/write) and ``cancel`` is checked
+  between chunks.
+- Data goes to ``<dst>.part``. Files of at least ``JOURNAL_MIN_BYTES`` get a
+  ``<dst>.part.json`` journal holding the source identity, and an
+  interrupted copy (reboot, unplugged disk, failed entries) of the same
+  source is continued from the ``.part`` size as long as the source is
+  unchanged. Smaller files are cheaper to copy again than to journal. A
+  directory with a journal is a partial copy and completed files inside it
+  are skipped. ``discard_partial`` drops such leftovers (job canceled,
+  destination replaced).
+- Optional verification by size (default) or sha256.
+- Cross-device moves copy first and delete the source only after the whole
+  copy succeeded.
+
+Metadata stays best-effort like in ``local_backend``.
+"""
+
+from __future__ import annotations
+
+import errno
+import hashlib
+import json
+import os
+import shutil
+import stat
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+
+PART_SUFFIX = ".part"
+JOURNAL_SUFFIX = ".part.json"
+CHUNK_BYTES = 1024 * 1024
+# Files below this size are not journaled; an interrupted one is recopied.
+JOURNAL_MIN_BYTES = 8 * CHUNK_BYTES
+_MTIME_SLACK_NS = 2_000_000_000  # FAT/exFAT timestamp granularity
+
+
+class TreePlan(NamedTuple):
+    files: int
+    dirs: int
+    links: int
+    bytes: int
+
+
+def plan_tree(path: str, *, cancel: Optional[threading.Event] = None) -> TreePlan:
+    """Count files/dirs/symlinks and file bytes under ``path`` (not following links)."""
+
+    files = dirs = links = total = 0
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return TreePlan(0, 0, 0, 0)
+    if stat.S_ISLNK(st.st_mode):
+        return TreePlan(0, 0, 1, 0)
+    if not stat.S_ISDIR(st.st_mode):
+        return TreePlan(1, 0, 0, int(st.st_size or 0))
+
+    stack = [path]
+    while stack:
+        if cancel is not None and cancel.is_set():
+            raise RuntimeError("canceled")
+        d = stack.pop()
+        dirs += 1
+        try:
+            with os.scandir(d) as it:
+                for entry in it:
+                    try:
+                        if entry.is_symlink():
+                            links += 1
+                        elif entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            files += 1
+                            total += int(entry.stat(follow_symlinks=False).st_size or 0)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return TreePlan(files, dirs, links, total)
+
+
+class ThroughputMeter:
+    """Accumulates transferred bytes and reports speed/ETA at most every ``interval`` s."""
+
+    def __init__(
+        self,
+        total: int,
+        *,
+        done: int = 0,
+        report: Optional[Callable[..., None]] = None,
+        interval: float = 0.5,
+        now: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.total = max(0, int(total or 0))
+        self.done = max(0, int(done or 0))
+        self.report = report
+        self.interval = float(interval)
+        self._now = now
+        self._t0 = now()
+        self._done0 = self.done
+        self._last_report = 0.0
+        self._rate = 0.0
+        self._rate_t = self._t0
+        self._rate_done = self.done
+
+    def add(self, n: int) -> None:
+        self.done += int(n)
+        self.flush()
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = self._now()
+        dt = now - self._rate_t
+        if dt >= 0.5:
+            inst = (self.done - self._rate_done) / dt
+            # Exponential smoothing keeps the ETA from jumping on USB stalls.
+            self._rate = inst if self._rate <= 0 else (0.7 * self._rate + 0.3 * inst)
+            self._rate_t = now
+            self._rate_done = self.done
+        elif self._rate <= 0 and now > self._t0:
+            self._rate = (self.done - self._done0) / (now - self._t0)
+        left = max(0, self.total - self.done)
+        eta = int(left / self._rate) if self._rate > 0 and self.total else None
+        return {
+            "bytes_done": int(self.done),
+            "bytes_total": int(self.total),
+            "speed_bps": int(self._rate),
+            "eta_s": eta,
+        }
+
+    def flush(self, *, force: bool = False) -> None:
+        if self.report is None:
+            return
+        now = self._now()
+        if not force and (now - self._last_report) < self.interval:
+            return
+        self._last_report = now
+        self.report(**self.snapshot())
+
+
+def _identity(st: os.stat_result) -> Dict[str, int]:
+    return {"size": int(st.st_size), "mtime_ns": int(st.st_mtime_ns)}
+
+
+def _read_journal(dst: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(dst + JOURNAL_SUFFIX, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else None
+    except Exception:
+        return None
+
+
+def _write_journal(dst: str, data: Dict[str, Any]) -> None:
+    tmp = dst + JOURNAL_SUFFIX + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, dst + JOURNAL_SUFFIX)
+
+
+def _drop_journal(dst: str) -> None:
+    try:
+        os.remove(dst + JOURNAL_SUFFIX)
+    except FileNotFoundError:
+        pass
+
+
+def _same_content_meta(src_st: os.stat_result, dst_st: os.stat_result) -> bool:
+    return int(src_st.st_size) == int(dst_st.st_size) and abs(int(src_st.st_mtime_ns) - int(dst_st.st_mtime_ns)) <= _MTIME_SLACK_NS
+
+
+def _sha256_file(path: str, cancel: Optional[threading.Event]) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            if cancel is not None and cancel.is_set():
+                raise RuntimeError("canceled")
+            chunk = f.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class LocalCopier:
+    """Chunked, cancellable, resumable local copier.
+
+    ``verify`` is ``"none"``, ``"size"`` or ``"sha256"``. With ``resume``
+    disabled, leftover ``.part`` files are discarded instead of continued.
+    """
+
+    def __init__(
+        self,
+        *,
+        cancel: Optional[threading.Event] = None,
+        meter: Optional[ThroughputMeter] = None,
+        verify: str = "size",
+        resume: bool = True,
+        chunk_bytes: int = CHUNK_BYTES,
+        on_file: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.cancel = cancel
+        self.meter = meter
+        self.verify = verify if verify in ("none", "size", "sha256") else "size"
+        self.resume = bool(resume)
+        self.chunk_bytes = max(64 * 1024, int(chunk_bytes))
+        self.on_file = on_file
+        self.errors = 0
+        self.resumed_bytes = 0
+        self.skipped_files = 0
+        self._use_cfr = hasattr(os, "copy_file_range")
+        self._use_sendfile = hasattr(os, "sendfile")
+
+    # ------------------------------------------------------------- helpers
+
+    def _check_cancel(self) -> None:
+        if self.cancel is not None and self.cancel.is_set():
+            raise RuntimeError("canceled")
+
+    def _progress(self, n: int) -> None:
+        if self.meter is not None and n:
+            self.meter.add(n)
+
+    def is_partial(self, dst: str, src: Optional[str] = None) -> bool:
+        """True if ``dst`` is an interrupted copy made by this engine.
+
+        With ``src`` it must also have been a copy of that source; a partial
+        copy of another (same-named) source is an ordinary conflict.
+        """
+
+        if not self.resume:
+            return False
+        journal = _read_journal(dst)
+        if journal is None:
+            return False
+        return src is None or journal.get("src") == src
+
+    def _copy_range(self, fin: int, fout: int, pos: int, count: int) -> int:
+        if self._use_cfr:
+            try:
+                return os.copy_file_range(fin, fout, count, pos, pos)
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF):
+                    raise
+                self._use_cfr = False
+        if self._use_sendfile:
+            try:
+                os.lseek(fout, pos, os.SEEK_SET)
+                return os.sendfile(fout, fin, pos, count)
+            except OSError as e:
+                if e.errno not in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                    raise
+                self._use_sendfile = False
+        data = os.pread(fin, count, pos)
+        if not data:
+            return 0
+        os.lseek(fout, pos, os.SEEK_SET)
+        view = memoryview(data)
+        while view:
+            n = os.write(fout, view)
+            view = view[n:]
+        return len(data)
+
+    # --------------------------------------------------------------- files
+
+    def copy_file(self, src: str, dst: str) -> None:
+        self._check_cancel()
+        src_st = os.stat(src)
+        size = int(src_st.st_size)
+        part = dst + PART_SUFFIX
+        os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+        if self.on_file is not None:
+            self.on_file(src)
+
+        start = 0
+        journaled = self.resume and size >= JOURNAL_MIN_BYTES
+        journal = _read_journal(dst) if journaled else None
+        if journal and journal.get("src") == src and journal.get("size") == size and journal.get("mtime_ns") == int(src_st.st_mtime_ns):
+            try:
+                start = min(int(os.path.getsize(part)), size)
+            except OSError:
+                start = 0
+        else:
+            try:
+                os.remove(part)
+            except FileNotFoundError:
+                pass
+            else:
+                if not journaled:
+                    _drop_journal(dst)
+            if journaled:
+                _write_journal(dst, {"v": 1, "src": src, **_identity(src_st)})
+        if start:
+            self.resumed_bytes += start
+            self._progress(start)
+
+        fin = os.open(src, os.O_RDONLY)
+        try:
+            fout = os.open(part, os.O_WRONLY | os.O_CREAT, 0o644)
+            try:
+                os.ftruncate(fout, start)
+                pos = start
+                while pos < size:
+                    self._check_cancel()
+                    n = self._copy_range(fin, fout, pos, min(self.chunk_bytes, size - pos))
+                    if n <= 0:
+                        break  # source shrank while copying
+                    pos += n
+                    self._progress(n)
+            finally:
+                os.close(fout)
+        finally:
+            os.close(fin)
+
+        self._verify(src, part, src_st)
+        os.replace(part, dst)
+        try:
+            shutil.copystat(src, dst, follow_symlinks=False)
+        except Exception:
+            pass
+        if journaled or journal is not None:
+            _drop_journal(dst)
+
+    def _verify(self, src: str, part: str, src_st: os.stat_result) -> None:
+        if self.verify == "none":
+            return
+        if os.path.getsize(part) != int(src_st.st_size) or os.stat(src).st_mtime_ns != src_st.st_mtime_ns:
+            raise RuntimeError("verify_failed")
+        if self.verify == "sha256":
+            from services.filemanager.checksum import hash_file_cached
+
+            src_sha = hash_file_cached(src)[1]
+            if _sha256_file(part, self.cancel) != src_sha:
+                raise RuntimeError("verify_failed")
+
+    # --------------------------------------------------------------- trees
+
+    def copy_tree(self, src_dir: str, dst_dir: str) -> int:
+        """Copy a directory tree; returns the number of entries that failed."""
+
+        resuming = self.is_partial(dst_dir, src_dir)
+        os.makedirs(dst_dir, exist_ok=True)
+        if not resuming:
+            _write_journal(dst_dir, {"v": 1, "src": src_dir, "kind": "dir"})
+        errors_before = self.errors
+        dirs_done: List[tuple] = []
+        stack = [(src_dir, dst_dir)]
+        while stack:
+            sdir, ddir = stack.pop()
+            os.makedirs(ddir, exist_ok=True)
+            dirs_done.append((sdir, ddir))
+            try:
+                with os.scandir(sdir) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError:
+                self.errors += 1
+                continue
+            for entry in entries:
+                self._check_cancel()
+                sp = entry.path
+                dp = os.path.join(ddir, entry.name)
+                try:
+                    if entry.is_symlink():
+                        try:
+                            os.symlink(os.readlink(sp), dp)
+                        except FileExistsError:
+                            pass
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((sp, dp))
+                        continue
+                    if resuming and not os.path.exists(dp + JOURNAL_SUFFIX):
+                        try:
+                            if _same_content_meta(entry.stat(follow_symlinks=False), os.stat(dp)):
+                                self.skipped_files += 1
+                                self._progress(int(entry.stat(follow_symlinks=False).st_size))
+                                continue
+                        except FileNotFoundError:
+                            pass
+                    self.copy_file(sp, dp)
+                except RuntimeError as e:
+                    if str(e) == "canceled":
+                        raise
+                    self.errors += 1
+                except Exception:
+                    # Best-effort like _copytree_no_stat: continue with other entries.
+                    self.errors += 1
+        for sdir, ddir in reversed(dirs_done):
+            try:
+                shutil.copystat(sdir, ddir, follow_symlinks=False)
+            except Exception:
+                pass
+        failed = self.errors - errors_before
+        if not failed:
+            _drop_journal(dst_dir)
+        return failed
+
+    def copy(self, src: str, dst: str) -> int:
+        st = os.lstat(src)
+        if stat.S_ISLNK(st.st_mode):
+            os.symlink(os.readlink(src), dst)
+            return 0
+        if stat.S_ISDIR(st.st_mode):
+            return self.copy_tree(src, dst)
+        self.copy_file(src, dst)
+        return 0
+
+    def move(self, src: str, dst: str) -> None:
+        """rename(), or copy + delete when crossing devices."""
+
+        if not self.is_partial(dst, src):
+            try:
+                os.rename(src, dst)
+                return
+            except OSError as e:
+                if e.errno != errno.EXDEV and (os.path.lexists(dst) or not os.path.lexists(src)):
+                    raise
+        # Only now is it known that bytes have to be copied.
+        if self.meter is not None:
+            self.meter.total += plan_tree(src, cancel=self.cancel).bytes
+        if self.copy(src, dst):
+            raise RuntimeError("copy_incomplete")
+        if os.path.isdir(src) and not os.path.islink(src):
+            shutil.rmtree(src, ignore_errors=True)
+        else:
+            os.unlink(src)
+
+
+def discard_partial(dst: str) -> None:
+    """Remove leftovers of an interrupted copy to ``dst``.
+
+    Drops the ``.part`` data and the journal; a partial directory copy is
+    removed as a whole, since nothing but this engine wrote into it.
+    """
+
+    journal = _read_journal(dst)
+    if journal is not None and journal.get("kind") == "dir" and os.path.isdir(dst) and not os.path.islink(dst):
+        shutil.rmtree(dst, ignore_errors=True)
+    for p in (dst + PART_SUFFIX, dst + JOURNAL_SUFFIX):
+        try:
+            os.remove(p)
+        except (FileNotFoundError, IsADirectoryError):
+            pass
@@ -2,13 +2,26 @@ from __future__ import annotations
 
 import hashlib
 import os
-from typing import Any, Dict, Tuple
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
 
+from services.filemanager.checksum import hash_file_cached
+from services.filemanager.checksum_cache import get_checksum_cache
 from services.fileops.job_models import FileOpJob
 from services.fileops.runtime import FileOpsRuntime
+from services.utils.env import _read_int_env
+from services.utils.offload import gevent_active
 
 
 CHUNK_BYTES = 256 * 1024
+MAX_SELECTION_FILES = 500
+
+
+def _parallel_devices() -> int:
+    """How many physical devices a selection checksum reads at the same time."""
+    return max(1, min(8, _read_int_env('XKEEN_FILEOPS_CHECKSUM_PARALLEL', 2)))
 
 
 def normalize_checksum(spec: Dict[str, Any], rt: FileOpsRuntime) -> Dict[str, Any]:
@@ -18,11 +31,19 @@ def normalize_checksum(spec: Dict[str, Any], rt: FileOpsRuntime) -> Dict[str, An
       {op:'checksum', src:{target, path, sid?}}
     or legacy-style:
       {op:'checksum', target, path, sid?}
+    or a local selection:
+      {op:'checksum', src:{target:'local', cwd?, paths:[...]}}
 
     Returns runner spec:
       {src:{target, path, sid?}, size_total:int|0}
+    or, for a selection:
+      {src:{target:'local'}, items:[{path, size, dev}], size_total:int}
     """
 
+    src0 = spec.get('src') if isinstance(spec.get('src'), dict) else {}
+    if isinstance(src0.get('paths'), list):
+        return _normalize_checksum_selection(src0, rt)
+
     src = spec.get('src') if isinstance(spec.get('src'), dict) else {}
     target = str((src.get('target') if src else None) or spec.get('target') or '').strip().lower()
     path = str((src.get('path') if src else None) or spec.get('path') or '').strip()
@@ -80,6 +101,47 @@ def normalize_checksum(spec: Dict[str, Any], rt: FileOpsRuntime) -> Dict[str, An
     }
 
 
+def _normalize_checksum_selection(src: Dict[str, Any], rt: FileOpsRuntime) -> Dict[str, Any]:
+    target = str(src.get('target') or '').strip().lower()
+    if target != 'local':
+        raise RuntimeError('only_local_supported')
+    ensure_follow = rt.ensure_local_follow
+    if not callable(ensure_follow):
+        raise RuntimeError('local_helpers_missing')
+
+    cwd = str(src.get('cwd') or '').strip()
+    items: List[Dict[str, Any]] = []
+    seen = set()
+    for n in src.get('paths') or []:
+        nm = str(n or '').strip()
+        if not nm:
+            continue
+        try:
+            rp = ensure_follow(os.path.join(cwd, nm) if cwd else nm)
+        except PermissionError as e:
+            raise RuntimeError(str(e))
+        if rp in seen:
+            continue
+        seen.add(rp)
+        try:
+            st = os.stat(rp)
+        except OSError:
+            raise RuntimeError('not_found')
+        if os.path.isdir(rp):
+            raise RuntimeError('not_a_file')
+        items.append({'path': rp, 'size': int(st.st_size), 'dev': int(st.st_dev)})
+        if len(items) > MAX_SELECTION_FILES:
+            raise RuntimeError('too_many_files')
+
+    if not items:
+        raise RuntimeError('no_sources')
+    return {
+        'src': {'target': 'local'},
+        'items': items,
+        'size_total': sum(int(it['size']) for it in items),
+    }
+
+
 def _hash_stream(job: FileOpJob, fp: Any, *, rt: FileOpsRuntime, size_total: int = 0) -> Tuple[str, str, int]:
     md5 = hashlib.md5()
     sha = hashlib.sha256()
@@ -103,10 +165,150 @@ def _hash_stream(job: FileOpJob, fp: Any, *, rt: FileOpsRuntime, size_total: int
     return md5.hexdigest(), sha.hexdigest(), done
 
 
+def _run_checksum_selection(job: FileOpJob, spec: Dict[str, Any], rt: FileOpsRuntime) -> None:
+    """Hash a local selection: cached files first, then one reader per device.
+
+    Files whose identity is in the checksum cache are answered up front
+    without opening them. The rest are grouped by device: files on the same
+    disk are hashed sequentially (parallel reads only make a USB HDD seek)
+    and each device gets its own worker, bounded by
+    XKEEN_FILEOPS_CHECKSUM_PARALLEL.
+
+    Under gevent (run_server.py) the workers are greenlets, so each file is
+    hashed on gevent's native thread pool instead (hashlib and file reads
+    release the GIL): device groups really run in parallel and the server
+    keeps serving. Progress is then reported from the waiting greenlet.
+    """
+
+    items: List[Dict[str, Any]] = list(spec.get('items') or [])
+    size_total = int(spec.get('size_total') or 0)
+    results: List[Dict[str, Any]] = [{} for _ in items]
+    lock = threading.Lock()
+    state = {'files_done': 0, 'bytes_done': 0, 'last_report': 0}
+    # Bytes read so far of the files currently being hashed (per item index).
+    inflight: Dict[int, int] = {}
+
+    def _canceled() -> bool:
+        return job.cancel_flag is not None and job.cancel_flag.is_set()
+
+    def _report_locked(**kw: Any) -> None:
+        rt.progress_set(job, bytes_done=int(state['bytes_done'] + sum(inflight.values())), **kw)
+
+    def _report() -> None:
+        with lock:
+            _report_locked()
+
+    offloaded = gevent_active()
+
+    def _hash_group(indices: List[int]) -> None:
+        for i in indices:
+            if _canceled():
+                return
+            it = items[i]
+            path = str(it.get('path') or '')
+            with lock:
+                inflight[i] = 0
+                _report_locked(current={'path': path, 'name': os.path.basename(path.rstrip('/')) or path, 'phase': 'checksum', 'is_dir': False})
+
+            def _on_chunk(done: int, i: int = i) -> None:
+                if _canceled():
+                    raise RuntimeError('canceled')
+                if offloaded:
+                    # Hashing thread: no gevent locks here, _report() runs on the greenlet.
+                    inflight[i] = int(done)
+                    return
+                with lock:
+                    inflight[i] = int(done)
+                    total = state['bytes_done'] + sum(inflight.values())
+                    # Throttle progress updates
+                    if total - state['last_report'] >= 512 * 1024:
+                        state['last_report'] = total
+                        _report_locked()
+
+            try:
+                md5_hex, sha_hex, done, cached = hash_file_cached(path, chunk_bytes=CHUNK_BYTES, on_chunk=_on_chunk, on_wait=_report)
+                res = {'path': path, 'size': int(done), 'md5': md5_hex, 'sha256': sha_hex, 'cached': bool(cached)}
+            except RuntimeError as e:
+                if str(e) == 'canceled':
+                    return
+                res = {'path': path, 'error': str(e) or 'read_failed'}
+                done = int(it.get('size') or 0)
+            except Exception:
+                res = {'path': path, 'error': 'read_failed'}
+                done = int(it.get('size') or 0)
+            with lock:
+                inflight.pop(i, None)
+                results[i] = res
+                state['files_done'] += 1
+                state['bytes_done'] += int(done)
+                _report_locked(files_done=state['files_done'])
+
+    rt.progress_set(job, files_total=len(items), files_done=0, bytes_total=size_total, bytes_done=0)
+
+    cache = get_checksum_cache()
+    groups: Dict[int, List[int]] = {}
+    for i, it in enumerate(items):
+        if _canceled():
+            raise RuntimeError('canceled')
+        path = str(it.get('path') or '')
+        try:
+            st = os.stat(path)
+            hit = cache.get(st) if stat.S_ISREG(st.st_mode) else None
+        except OSError:
+            hit = None
+        if hit is None:
+            groups.setdefault(int(it.get('dev') or 0), []).append(i)
+            continue
+        results[i] = {'path': path, 'size': int(st.st_size), 'md5': hit[0], 'sha256': hit[1], 'cached': True}
+        state['files_done'] += 1
+        state['bytes_done'] += int(st.st_size)
+    if state['files_done']:
+        rt.progress_set(job, files_done=state['files_done'], bytes_done=int(state['bytes_done']))
+
+    workers = min(len(groups), _parallel_devices())
+    if workers <= 1:
+        for indices in groups.values():
+            _hash_group(indices)
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='xkeen-checksum') as ex:
+            for fut in [ex.submit(_hash_group, indices) for indices in groups.values()]:
+                fut.result()
+
+    if _canceled():
+        raise RuntimeError('canceled')
+    rt.progress_set(
+        job,
+        files_done=len(items),
+        bytes_done=int(state['bytes_done']),
+        result={
+            'target': 'local',
+            'items': results,
+            'cached': sum(1 for r in results if r.get('cached')),
+            'errors': sum(1 for r in results if r.get('error')),
+        },
+    )
+    rt.job_set_state(job, 'done')
+    job.finished_ts = rt.now_fn()
+
+
 def run_job_checksum(job: FileOpJob, spec: Dict[str, Any], rt: FileOpsRuntime) -> None:
     rt.job_set_state(job, 'running')
     job.started_ts = rt.now_fn()
 
+    if isinstance(spec.get('items'), list):
+        try:
+            _run_checksum_selection(job, spec, rt)
+        except RuntimeError as e:
+            if str(e) == 'canceled' or (job.cancel_flag is not None and job.cancel_flag.is_set()):
+                rt.job_set_state(job, 'canceled', error=None)
+            else:
+                rt.job_set_state(job, 'error', error=str(e))
+            job.finished_ts = rt.now_fn()
+        except Exception:
+            rt.job_set_state(job, 'error', error='unexpected_error')
+            job.finished_ts = rt.now_fn()
+        return
+
     src = spec.get('src') or {}
     target = str(src.get('target') or '').strip().lower()
     path = str(src.get('path') or '').strip()
@@ -128,14 +330,30 @@ def run_job_checksum(job: FileOpJob, spec: Dict[str, Any], rt: FileOpsRuntime) -
         )
 
         if target == 'local':
-            with open(path, 'rb') as fp:
-                md5_hex, sha_hex, done = _hash_stream(job, fp, rt=rt, size_total=size_total)
+            offloaded = gevent_active()
+            last_report = 0
+            read = 0
+
+            def _on_chunk(done: int) -> None:
+                nonlocal last_report, read
+                if job.cancel_flag is not None and job.cancel_flag.is_set():
+                    raise RuntimeError('canceled')
+                read = done
+                # Throttle progress updates (reported by _on_wait when hashing off the hub)
+                if not offloaded and done - last_report >= 512 * 1024:
+                    last_report = done
+                    rt.progress_set(job, bytes_done=done, bytes_total=int(size_total or 0))
+
+            def _on_wait() -> None:
+                rt.progress_set(job, bytes_done=int(read), bytes_total=int(size_total or 0))
+
+            md5_hex, sha_hex, done, cached = hash_file_cached(path, chunk_bytes=CHUNK_BYTES, on_chunk=_on_chunk, on_wait=_on_wait)
             rt.progress_set(
                 job,
                 files_done=1,
                 bytes_done=int(done),
                 bytes_total=int(size_total or done),
-                result={'target': 'local', 'path': path, 'size': int(size_total or done), 'md5': md5_hex, 'sha256': sha_hex},
+                result={'target': 'local', 'path': path, 'size': int(size_total or done), 'md5': md5_hex, 'sha256': sha_hex, 'cached': bool(cached)},
             )
             rt.job_set_state(job, 'done')
             job.finished_ts = rt.now_fn()
@@ -10,7 +10,7 @@ from typing import Any, Dict
 
 from services.fileops.runtime import FileOpsRuntime
 from services.fileops.job_models import FileOpJob
-from services.fileops.local_backend import _copyfile_no_stat, _copytree_no_stat, _safe_move_no_stat
+from services.fileops.copy_engine import LocalCopier, ThroughputMeter, discard_partial, plan_tree
 
 
 def run_job_copy_move(job: FileOpJob, spec: Dict[str, Any], rt: FileOpsRuntime) -> None:
@@ -141,6 +141,26 @@ def run_job_copy_move(job: FileOpJob, spec: Dict[str, Any], rt: FileOpsRuntime)
         return action_s
 
     try:
+        # local->local goes through the chunked copy engine: planned byte total,
+        # speed/ETA, cancel inside large files, resumable .part files.
+        copier = None
+        if src_target == 'local' and dst_target == 'local':
+            plan_bytes = 0
+            if job.op == 'copy':
+                for ent in sources:
+                    plan_bytes += plan_tree(ensure_follow(ent['path']), cancel=job.cancel_flag).bytes
+            rt.progress_set(job, bytes_total=int(plan_bytes), bytes_done=0)
+            copier = LocalCopier(
+                cancel=job.cancel_flag,
+                meter=ThroughputMeter(plan_bytes, report=lambda **kw: rt.progress_set(job, **kw)),
+                verify=str(opts.get('verify') or 'size').strip().lower(),
+                resume=bool(opts.get('resume', True)),
+                on_file=lambda p: rt.progress_set(
+                    job,
+                    current={'path': p, 'name': os.path.basename(p), 'phase': 'copy', 'is_dir': False},
+                ),
+            )
+
         for ent in sources:
             if job.cancel_flag.is_set():
                 raise RuntimeError('canceled')
@@ -201,11 +221,13 @@ def run_job_copy_move(job: FileOpJob, spec: Dict[str, Any], rt: FileOpsRuntime)
                         mark_done();
                         continue
 
-                    if os.path.exists(dp):
+                    # An interrupted cross-device move of this source is continued, not replaced.
+                    if os.path.exists(dp) and not copier.is_partial(dp, sp):
                         action = _decide_overwrite_action(spath=sp, sname=sname, dpath=dp)
                         if action == 'skip':
                             mark_done();
                             continue
+                        discard_partial(dp)
                         try:
                             rt.local_remove_entry(dp, rt.local_roots, recursive=True)
                         except PermissionError as e:
@@ -213,9 +235,11 @@ def run_job_copy_move(job: FileOpJob, spec: Dict[str, Any], rt: FileOpsRuntime)
                         except Exception:
                             pass
                     try:
-                        # Robust across different mounts/FS types (EXDEV, copystat failures).
-                        _safe_move_no_stat(sp, dp)
+                        # rename(), or copy + delete across mounts (internal storage <-> USB).
+                        copier.move(sp, dp)
                     except Exception as e:
+                        if job.cancel_flag.is_set():
+                            discard_partial(dp)
                         raise RuntimeError(str(e) or 'move_failed')
                     mark_done();
                     continue
@@ -381,49 +405,30 @@ def run_job_copy_move(job: FileOpJob, spec: Dict[str, Any], rt: FileOpsRuntime)
                 if rt.local_is_protected_entry_abs(dp):
                     raise RuntimeError('protected_path')
 
-                if os.path.exists(dp):
+                if os.path.exists(dp) and not copier.is_partial(dp, sp):
                     action = _decide_overwrite_action(spath=str(spath), sname=str(sname), dpath=str(dp))
                     if action == 'skip':
                         mark_done();
                         continue
+                    discard_partial(dp)
                     try:
                         rt.local_remove_entry(dp, rt.local_roots, recursive=True)
                     except PermissionError as e:
                         raise RuntimeError(str(e))
                     except Exception:
                         pass
-                if is_dir:
-                    try:
-                        _copytree_no_stat(sp, dp)
-                    except Exception as e:
-                        raise RuntimeError(str(e) or 'copy_failed')
-                    mark_done();
-                else:
-                    os.makedirs(os.path.dirname(dp) or '/tmp', exist_ok=True)
-                    size_total = 0
-                    try:
-                        size_total = os.stat(sp).st_size
-                    except Exception:
-                        pass
-                    if (job.progress.get('bytes_total', 0) or 0) == 0 and size_total:
-                        rt.progress_set(job, bytes_total=int(size_total or 0))
-                    with open(sp, 'rb') as r, open(dp + '.part.' + uuid.uuid4().hex[:6], 'wb') as w:
-                        tmp = w.name
-                        while True:
-                            if job.cancel_flag.is_set():
-                                raise RuntimeError('canceled')
-                            chunk = r.read(64*1024)
-                            if not chunk:
-                                break
-                            w.write(chunk)
-                            rt.progress_set(job, bytes_done=(job.progress.get('bytes_done', 0) or 0) + len(chunk))
-                    os.rename(tmp, dp)
-                    try:
-                        if os.path.exists(tmp):
-                            os.remove(tmp)
-                    except Exception:
-                        pass
-                    mark_done();
+                os.makedirs(os.path.dirname(dp) or '/tmp', exist_ok=True)
+                try:
+                    failed = copier.copy(sp, dp)
+                except Exception as e:
+                    if job.cancel_flag.is_set():
+                        discard_partial(dp)
+                    if isinstance(e, RuntimeError):
+                        raise
+                    raise RuntimeError(str(e) or 'copy_failed')
+                if failed:
+                    rt.progress_set(job, copy_errors=(job.progress.get('copy_errors', 0) or 0) + int(failed))
+                mark_done();
 
             elif src_target == 'remote' and dst_target == 'remote':
                 ss = rt.mgr.get(src['sid'])
@@ -733,6 +738,9 @@ def run_job_copy_move(job: FileOpJob, spec: Dict[str, Any], rt: FileOpsRuntime)
                     if ss:
                         rt.mgr._run_lftp(ss, [f"rm -r {rt.lftp_quote(spath)}"], capture=True)
 
+        if copier is not None:
+            copier.meter.flush(force=True)
+            rt.progress_set(job, resumed_bytes=int(copier.resumed_bytes), skipped_files=int(copier.skipped_files))
         rt.job_set_state(job, 'done')
         job.finished_ts = rt.now_fn()
         job._proc = None
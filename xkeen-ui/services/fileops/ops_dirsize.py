@@ -4,6 +4,7 @@ import os
 import time
 from typing import Any, Dict, Tuple
 
+from services.filemanager.dirsize_index import get_dirsize_index
 from services.fileops.job_models import FileOpJob
 from services.fileops.runtime import FileOpsRuntime
 
@@ -49,59 +50,36 @@ def normalize_dirsize(spec: Dict[str, Any], rt: FileOpsRuntime) -> Dict[str, Any
 def _scan_dir_size(job: FileOpJob, root: str, *, rt: FileOpsRuntime, max_items: int = 3_000_000) -> Tuple[int, int, bool]:
     """Return (bytes, items_count, truncated) without following symlinks.
 
-    Reports progress as it walks.
+    Walks through the shared persistent size index, so only directories
+    modified since the previous walk are listed again. Reports progress as it
+    walks.
     """
 
-    total = 0
-    items = 0
-    truncated = False
-    stack = [root]
-
     last_report = time.monotonic()
 
-    while stack:
-        if job.cancel_flag is not None and job.cancel_flag.is_set():
-            raise RuntimeError('canceled')
-
-        d = stack.pop()
-        try:
-            with os.scandir(d) as it:
-                for ent in it:
-                    if job.cancel_flag is not None and job.cancel_flag.is_set():
-                        raise RuntimeError('canceled')
-                    items += 1
-                    if items > int(max_items or 0):
-                        truncated = True
-                        stack.clear()
-                        break
-                    try:
-                        st = ent.stat(follow_symlinks=False)
-                    except Exception:
-                        continue
-                    try:
-                        if ent.is_dir(follow_symlinks=False):
-                            stack.append(os.path.join(d, ent.name))
-                        else:
-                            total += int(getattr(st, 'st_size', 0) or 0)
-                    except Exception:
-                        continue
-
-                    # Throttle UI updates
-                    now = time.monotonic()
-                    if (now - last_report) >= 0.25:
-                        last_report = now
-                        rt.progress_set(
-                            job,
-                            files_done=int(items),
-                            bytes_done=int(total),
-                            current={'path': os.path.join(d, ent.name), 'name': ent.name, 'phase': 'dirsize', 'is_dir': bool(ent.is_dir(follow_symlinks=False))},
-                        )
-        except Exception:
-            # best-effort: treat inaccessible subtree as truncated
-            truncated = True
-            continue
-
-    return int(total), int(items), bool(truncated)
+    def _canceled() -> bool:
+        return job.cancel_flag is not None and job.cancel_flag.is_set()
+
+    def _progress(items: int, total: int, d: str) -> None:
+        nonlocal last_report
+        # Throttle UI updates
+        now = time.monotonic()
+        if (now - last_report) < 0.25:
+            return
+        last_report = now
+        rt.progress_set(
+            job,
+            files_done=int(items),
+            bytes_done=int(total),
+            current={'path': d, 'name': os.path.basename(d.rstrip('/')) or d, 'phase': 'dirsize', 'is_dir': True},
+        )
+
+    index = get_dirsize_index()
+    res = index.measure(root, max_items=int(max_items or 0), cancel=_canceled, progress=_progress)
+    index.flush(force=True)
+    if res.aborted == 'canceled' or _canceled():
+        raise RuntimeError('canceled')
+    return int(res.bytes or 0), int(res.items), bool(res.truncated)
 
 
 def run_job_dirsize(job: FileOpJob, spec: Dict[str, Any], rt: FileOpsRuntime) -> None:
@@ -374,6 +374,9 @@ def _trash_cfg() -> Dict[str, Any]:
 def _tree_size_bytes(path: str, *, max_items: int = 250_000) -> tuple[int | None, bool]:
     """Best-effort size for a local entry (no symlink following).
 
+    Directories go through the persistent size index shared with dirsize jobs,
+    with ``max_age=0``: the result decides between trash and hard delete, so
+    it must not come from records of files that have grown since.
     Returns (bytes|None, truncated). If truncated=True or bytes is None, treat as unknown.
     """
     try:
@@ -381,57 +384,22 @@ def _tree_size_bytes(path: str, *, max_items: int = 250_000) -> tuple[int | None
     except Exception:
         return None, True
 
-    try:
-        if stat.S_ISREG(st.st_mode) or stat.S_ISLNK(st.st_mode) or stat.S_ISCHR(st.st_mode) or stat.S_ISBLK(st.st_mode) or stat.S_ISFIFO(st.st_mode) or stat.S_ISSOCK(st.st_mode):
-            return int(getattr(st, 'st_size', 0) or 0), False
-    except Exception:
-        pass
-
     if not stat.S_ISDIR(st.st_mode):
         try:
             return int(getattr(st, 'st_size', 0) or 0), False
         except Exception:
             return None, True
 
-    total = 0
-    items = 0
-    truncated = False
-
-    def _scan_dir(d: str) -> None:
-        nonlocal total, items, truncated
-        if truncated:
-            return
-        try:
-            with os.scandir(d) as it:
-                for entry in it:
-                    if truncated:
-                        return
-                    items += 1
-                    if items > max_items:
-                        truncated = True
-                        return
-                    try:
-                        st2 = entry.stat(follow_symlinks=False)
-                    except Exception:
-                        continue
-                    try:
-                        if entry.is_dir(follow_symlinks=False):
-                            _scan_dir(entry.path)
-                        else:
-                            total += int(getattr(st2, 'st_size', 0) or 0)
-                    except Exception:
-                        continue
-        except Exception:
-            truncated = True
-
     try:
-        _scan_dir(path)
+        from services.filemanager.dirsize_index import get_dirsize_index
+
+        res = get_dirsize_index().measure(path, max_items=max_items, max_age=0)
     except Exception:
-        truncated = True
+        return None, True
 
-    if truncated:
+    if res.truncated or res.bytes is None:
         return None, True
-    return int(total), False
+    return int(res.bytes), False
 
 def _trash_item_deleted_ts(meta_dir: str, name: str, entry_path: str) -> int | None:
     """Best-effort deleted timestamp for a trash entry."""
@@ -531,60 +499,26 @@ def _local_trash_purge_expired(roots: List[str], *, ttl_days: int) -> Dict[str,
     return {'purged': int(purged), 'meta_purged': int(meta_purged), 'errors': errors}
 
 def _local_trash_used_bytes(roots: List[str], *, max_items: int = 500_000) -> tuple[int | None, bool]:
-    """Compute total bytes currently stored in trash (excluding metadata dir)."""
+    """Compute total bytes currently stored in trash (excluding metadata dir).
+
+    Uses the persistent size index: moving one entry into the trash only
+    changes the trash root, so earlier entries are not walked again.
+    """
     try:
         trash_root, _meta = _local_trash_dirs(roots)
     except Exception:
         return None, True
 
-    total = 0
-    items = 0
-    truncated = False
-
-    def _scan(p: str) -> None:
-        nonlocal total, items, truncated
-        if truncated:
-            return
-        try:
-            st = os.lstat(p)
-        except Exception:
-            truncated = True
-            return
-        try:
-            if stat.S_ISDIR(st.st_mode) and not os.path.islink(p):
-                with os.scandir(p) as it:
-                    for e in it:
-                        if truncated:
-                            return
-                        # skip metadata dir anywhere (just in case)
-                        if e.name == _TRASH_META_DIRNAME:
-                            continue
-                        items += 1
-                        if items > max_items:
-                            truncated = True
-                            return
-                        _scan(e.path)
-            else:
-                total += int(getattr(st, 'st_size', 0) or 0)
-        except Exception:
-            truncated = True
-
     try:
-        with os.scandir(trash_root) as it:
-            for entry in it:
-                if entry.name == _TRASH_META_DIRNAME:
-                    continue
-                items += 1
-                if items > max_items:
-                    truncated = True
-                    break
-                _scan(entry.path)
+        from services.filemanager.dirsize_index import get_dirsize_index
+
+        res = get_dirsize_index().measure(trash_root, max_items=max_items, skip_names=(_TRASH_META_DIRNAME,))
     except Exception:
-        truncated = True
+        return None, True
 
-    if truncated:
+    if res.truncated or res.bytes is None:
         return None, True
-    return int(total), False
+    return int(res.bytes), False
 
 def _local_trash_stats(roots: List[str], *, force_refresh: bool = False, force_purge: bool = False) -> Dict[str, Any]:
     """Return cached trash stats and run periodic maintenance (auto-purge)."""
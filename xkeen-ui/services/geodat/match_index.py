@@ -0,0 +1,492 @@
+"""Reverse-lookup index for GeoSite/GeoIP DAT files.
+
+Answers "which tags contain this domain / IP" without scanning the file per
+query (the xk-geodat ``lookup`` command walks every rule of every tag).
+
+GeoSite rules are split by type, mirroring xk-geodat's matchDomainRule:
+
+- ``full`` / ``domain`` rules are stored as sorted 64-bit hashes of the rule
+  value with a parallel array of tag ids.  A domain lookup hashes the query
+  and each of its parent suffixes (``a.b.c`` -> ``b.c`` -> ``c``), which is
+  the reversed-label suffix-trie walk without materialising the trie;
+- ``plain`` (keyword) rules are prefiltered by their first trigram, so only
+  keywords whose trigram occurs in the query are tested;
+- ``regex`` rules are prefiltered by a literal every match must contain
+  (when one can be derived safely) and compiled lazily.
+
+GeoIP CIDRs are stored the same way, hashed by ``(family, prefix, masked
+network)``; a lookup probes each prefix length present in the file (at most
+33 / 129 probes), i.e. a level-compressed radix walk.
+
+Counts per tag equal the number of rules that matched, like xk-geodat.
+The compiled index is persisted as a binary sidecar in UI_STATE_DIR keyed
+by the DAT file identity and rebuilt when the DAT changes.
+"""
+
+from __future__ import annotations
+
+import bisect
+import hashlib
+import ipaddress
+import json
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.filemanager.checksum_cache import file_identity
+from services.geodat.reader import get_dat_index
+from services.io.atomic import _atomic_write_bytes
+
+
+_MAGIC = b"XKGIDX1\n"
+_FORMAT_VERSION = 1
+_CACHE_MAX = 4
+_KEYWORD_GRAM = 3
+MAX_BATCH = 256
+# Compiling is CPU-bound (seconds for a 1M-rule geosite); under gevent the
+# build would hold the hub, so it yields every this many rules.
+_YIELD_EVERY = 4096
+
+
+def _h(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def _domain_key(kind: bytes, value: str) -> int:
+    return _h(kind + value.encode("utf-8", "replace"))
+
+
+def _ip_key(version: int, prefix: int, net: int) -> int:
+    width = 4 if version == 4 else 16
+    return _h(bytes((version, prefix)) + net.to_bytes(width, "big"))
+
+
+def _mask(bits: int, prefix: int) -> int:
+    return ((1 << bits) - 1) ^ ((1 << (bits - prefix)) - 1)
+
+
+_REGEX_META = set(".^$*+?{}[]()|\\")
+
+
+def regex_required_literal(pattern: str) -> str:
+    """Longest literal that every match of ``pattern`` must contain ('' if unsure).
+
+    Conservative: gives up on top-level alternation and inline flags, and
+    only looks at top-level runs outside groups and character classes.
+    """
+
+    if "(?" in pattern:
+        return ""
+    best = ""
+    run: List[str] = []
+    depth = 0
+    i = 0
+    n = len(pattern)
+
+    def _close(next_ch: str) -> None:
+        nonlocal best
+        lit = run[:-1] if next_ch in ("?", "*", "{") and run else run
+        s = "".join(lit)
+        if depth == 0 and len(s) > len(best):
+            best = s
+        run.clear()
+
+    while i < n:
+        ch = pattern[i]
+        if ch == "\\" and i + 1 < n:
+            nxt = pattern[i + 1]
+            if not nxt.isalnum():
+                run.append(nxt)
+                i += 2
+                continue
+            _close("")
+            i += 2
+            continue
+        if ch == "[":
+            _close("")
+            j = i + 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 2 if pattern[j] == "\\" else 1
+            i = j + 1
+            continue
+        if ch == "{":
+            # ``{m,n}`` repeats the previous atom; its digits are not literal text.
+            _close(ch)
+            j = pattern.find("}", i + 1)
+            i = (j if j >= 0 else i) + 1
+            continue
+        if ch in _REGEX_META:
+            if ch == "|" and depth == 0:
+                return ""
+            _close(ch)
+            if ch == "(":
+                depth += 1
+            elif ch == ")":
+                depth = max(0, depth - 1)
+            i += 1
+            continue
+        run.append(ch)
+        i += 1
+    _close("")
+    return best.lower() if best == best.lower() else ""
+
+
+class MatchIndex:
+    """Compiled lookup tables for one DAT file."""
+
+    def __init__(self, kind: str, identity: Tuple[int, ...], tags: List[str]) -> None:
+        self.kind = kind
+        self.identity = tuple(identity)
+        self.tags = tags
+        self.arrays: Dict[str, array] = {}
+        self.keywords: List[Tuple[str, int]] = []
+        self.regexes: List[Tuple[str, int]] = []
+        self.prefixes: Dict[int, List[int]] = {4: [], 6: []}
+        self._kw_by_gram: Dict[str, List[int]] = {}
+        self._kw_short: List[int] = []
+        self._compiled: Optional[List[Tuple[Any, str, int]]] = None
+
+    # -- build -------------------------------------------------------------
+
+    def _set_pairs(self, name: str, pairs: List[int]) -> None:
+        pairs.sort()
+        self.arrays[name + "_h"] = array("Q", (p >> 32 for p in pairs))
+        self.arrays[name + "_t"] = array("I", (p & 0xFFFFFFFF for p in pairs))
+
+    def _prepare(self) -> None:
+        self._kw_by_gram = {}
+        self._kw_short = []
+        for i, (kw, _tid) in enumerate(self.keywords):
+            if len(kw) < _KEYWORD_GRAM:
+                self._kw_short.append(i)
+            else:
+                self._kw_by_gram.setdefault(kw[:_KEYWORD_GRAM], []).append(i)
+        self._compiled = None
+
+    # -- lookup ------------------------------------------------------------
+
+    def _hits(self, name: str, key: int, counts: Dict[int, int]) -> None:
+        hs = self.arrays.get(name + "_h")
+        if not hs:
+            return
+        ts = self.arrays[name + "_t"]
+        i = bisect.bisect_left(hs, key)
+        n = len(hs)
+        while i < n and hs[i] == key:
+            tid = ts[i]
+            counts[tid] = counts.get(tid, 0) + 1
+            i += 1
+
+    def _regexes(self) -> List[Tuple[Any, str, int]]:
+        if self._compiled is None:
+            out = []
+            for pat, tid in self.regexes:
+                try:
+                    out.append((re.compile(pat), regex_required_literal(pat), tid))
+                except re.error:
+                    continue
+            self._compiled = out
+        return self._compiled
+
+    def match_domain(self, domain: str) -> Dict[int, int]:
+        d = str(domain or "").strip().rstrip(".").lower()
+        counts: Dict[int, int] = {}
+        if not d:
+            return counts
+        self._hits("full", _domain_key(b"f", d), counts)
+        s = d
+        while True:
+            self._hits("dom", _domain_key(b"d", s), counts)
+            dot = s.find(".")
+            if dot < 0:
+                break
+            s = s[dot + 1:]
+        if self.keywords:
+            cand = list(self._kw_short)
+            grams = {d[i:i + _KEYWORD_GRAM] for i in range(len(d) - _KEYWORD_GRAM + 1)}
+            for g in grams:
+                cand.extend(self._kw_by_gram.get(g, ()))
+            for i in cand:
+                kw, tid = self.keywords[i]
+                if kw in d:
+                    counts[tid] = counts.get(tid, 0) + 1
+        for rx, lit, tid in self._regexes():
+            if lit and lit not in d:
+                continue
+            if rx.search(d):
+                counts[tid] = counts.get(tid, 0) + 1
+        return counts
+
+    def match_ip(self, value: str) -> Dict[int, int]:
+        counts: Dict[int, int] = {}
+        try:
+            addr = ipaddress.ip_address(str(value or "").strip())
+        except ValueError:
+            return counts
+        probes: List[Tuple[int, int]] = []
+        if addr.version == 4:
+            probes.append((4, int(addr)))
+            probes.append((6, int(ipaddress.IPv6Address("::ffff:" + str(addr)))))
+        else:
+            probes.append((6, int(addr)))
+            if addr.ipv4_mapped is not None:
+                probes.append((4, int(addr.ipv4_mapped)))
+        for version, ip_int in probes:
+            bits = 32 if version == 4 else 128
+            for p in self.prefixes[version]:
+                self._hits("ip", _ip_key(version, p, ip_int & _mask(bits, p)), counts)
+        return counts
+
+    def lookup(self, value: str, max_tags: int = 50) -> List[Dict[str, Any]]:
+        counts = self.match_domain(value) if self.kind == "geosite" else self.match_ip(value)
+        out = [{"tag": self.tags[tid], "count": c} for tid, c in counts.items() if c > 0]
+        out.sort(key=lambda it: (-it["count"], it["tag"].lower()))
+        if max_tags > 0:
+            out = out[:max_tags]
+        return out
+
+    # -- persistence ---------------------------------------------------------
+
+    def to_bytes(self) -> bytes:
+        names = sorted(self.arrays)
+        header = {
+            "v": _FORMAT_VERSION,
+            "kind": self.kind,
+            "identity": list(self.identity),
+            "byteorder": sys.byteorder,
+            "tags": self.tags,
+            "keywords": self.keywords,
+            "regexes": self.regexes,
+            "prefixes": {str(k): v for k, v in self.prefixes.items()},
+            "arrays": [[n, self.arrays[n].typecode, len(self.arrays[n])] for n in names],
+        }
+        raw = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        parts = [_MAGIC, struct.pack("<I", len(raw)), raw]
+        for n in names:
+            parts.append(self.arrays[n].tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "MatchIndex":
+        if not data.startswith(_MAGIC):
+            raise ValueError("bad_magic")
+        pos = len(_MAGIC)
+        (hlen,) = struct.unpack_from("<I", data, pos)
+        pos += 4
+        header = json.loads(data[pos:pos + hlen].decode("utf-8"))
+        pos += hlen
+        if header.get("v") != _FORMAT_VERSION or header.get("byteorder") != sys.byteorder:
+            raise ValueError("incompatible_index")
+        idx = cls(str(header["kind"]), tuple(header["identity"]), list(header["tags"]))
+        idx.keywords = [(str(k), int(t)) for k, t in header.get("keywords") or []]
+        idx.regexes = [(str(p), int(t)) for p, t in header.get("regexes") or []]
+        idx.prefixes = {int(k): [int(p) for p in v] for k, v in (header.get("prefixes") or {}).items()}
+        idx.prefixes.setdefault(4, [])
+        idx.prefixes.setdefault(6, [])
+        for name, typecode, count in header["arrays"]:
+            arr = array(typecode)
+            nbytes = arr.itemsize * int(count)
+            arr.frombytes(data[pos:pos + nbytes])
+            if len(arr) != int(count):
+                raise ValueError("truncated_index")
+            idx.arrays[str(name)] = arr
+            pos += nbytes
+        idx._prepare()
+        return idx
+
+
+def compile_match_index(kind: str, path: str) -> MatchIndex:
+    """Build a :class:`MatchIndex` from the DAT contents (walks every rule once)."""
+
+    dat = get_dat_index(kind, path)
+    idx = MatchIndex(dat.kind, dat.identity, [e.tag for e in dat.entries])
+    n = 0
+    if dat.kind == "geosite":
+        full: List[int] = []
+        dom: List[int] = []
+        for tid, e in enumerate(dat.entries):
+            for dtype, raw in dat.iter_raw(e):
+                n += 1
+                if n % _YIELD_EVERY == 0:
+                    time.sleep(0)
+                v = raw.decode("utf-8", "replace").strip()
+                if not v:
+                    continue
+                if dtype == 1:
+                    idx.regexes.append((v, tid))
+                    continue
+                v = v.lower()
+                if dtype == 0:
+                    idx.keywords.append((v, tid))
+                elif dtype == 3:
+                    full.append(_domain_key(b"f", v) << 32 | tid)
+                else:
+                    dom.append(_domain_key(b"d", v) << 32 | tid)
+        idx._set_pairs("full", full)
+        idx._set_pairs("dom", dom)
+    else:
+        nets: List[int] = []
+        prefixes: Dict[int, set] = {4: set(), 6: set()}
+        for tid, e in enumerate(dat.entries):
+            for raw, prefix in dat.iter_raw(e):
+                n += 1
+                if n % _YIELD_EVERY == 0:
+                    time.sleep(0)
+                if len(raw) == 16 and raw[:12] == b"\0" * 10 + b"\xff\xff":
+                    raw = raw[12:]
+                if len(raw) == 4:
+                    version, bits = 4, 32
+                elif len(raw) == 16:
+                    version, bits = 6, 128
+                else:
+                    continue
+                if prefix > bits:
+                    continue
+                net = int.from_bytes(raw, "big") & _mask(bits, prefix)
+                prefixes[version].add(prefix)
+                nets.append(_ip_key(version, prefix, net) << 32 | tid)
+        idx._set_pairs("ip", nets)
+        idx.prefixes = {v: sorted(p) for v, p in prefixes.items()}
+    idx._prepare()
+    return idx
+
+
+def _index_dir() -> str:
+    raw = str(os.getenv("XKEEN_GEODAT_INDEX_DIR", "") or "").strip()
+    if raw:
+        return "" if raw.lower() in ("off", "0", "none", "-") else raw
+    try:
+        from core.paths import UI_STATE_DIR
+
+        root = str(UI_STATE_DIR or "").strip()
+    except Exception:
+        root = ""
+    return os.path.join(root or "/opt/etc/xkeen-ui", "geodat-index")
+
+
+def sidecar_path(kind: str, path: str) -> str:
+    root = _index_dir()
+    if not root:
+        return ""
+    digest = hashlib.sha1(("%s\0%s" % (kind, os.path.realpath(path))).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(root, "%s-%s.idx" % (kind, digest))
+
+
+def _load_sidecar(kind: str, path: str, identity: Tuple[int, ...]) -> Optional[MatchIndex]:
+    sp = sidecar_path(kind, path)
+    if not sp:
+        return None
+    try:
+        with open(sp, "rb") as f:
+            idx = MatchIndex.from_bytes(f.read())
+    except Exception:
+        return None
+    if idx.kind != kind or idx.identity != tuple(identity):
+        return None
+    return idx
+
+
+def _save_sidecar(kind: str, path: str, idx: MatchIndex) -> None:
+    sp = sidecar_path(kind, path)
+    if not sp:
+        return
+    try:
+        _atomic_write_bytes(sp, idx.to_bytes(), mode=0o600)
+    except Exception:
+        pass
+
+
+_CACHE: "OrderedDict[Tuple[str, str], MatchIndex]" = OrderedDict()
+_LOCK = threading.Lock()
+_BUILD_LOCKS: Dict[Tuple[str, str], threading.Lock] = {}
+_BUILDING: set = set()
+
+
+def _cached(key: Tuple[str, str], identity: Tuple[int, ...]) -> Optional[MatchIndex]:
+    with _LOCK:
+        idx = _CACHE.get(key)
+        if idx is not None and idx.identity == identity:
+            _CACHE.move_to_end(key)
+            return idx
+    return None
+
+
+def _remember(key: Tuple[str, str], idx: MatchIndex) -> None:
+    with _LOCK:
+        _CACHE[key] = idx
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > _CACHE_MAX:
+            old, _ = _CACHE.popitem(last=False)
+            _BUILD_LOCKS.pop(old, None)
+
+
+def get_match_index(kind: str, path: str, *, build: bool = True) -> Optional[MatchIndex]:
+    """Return the match index for ``path`` (memory, then sidecar, then compile).
+
+    With ``build=False`` a missing index is scheduled for a background build
+    and ``None`` is returned so the caller can fall back to xk-geodat.
+    """
+
+    k = str(kind or "").strip().lower()
+    rp = os.path.realpath(path)
+    key = (k, rp)
+    ident = file_identity(os.stat(rp))
+    idx = _cached(key, ident)
+    if idx is not None:
+        return idx
+    idx = _load_sidecar(k, rp, ident)
+    if idx is not None:
+        _remember(key, idx)
+        return idx
+    if not build:
+        _build_in_background(k, rp)
+        return None
+    with _LOCK:
+        build_lock = _BUILD_LOCKS.setdefault(key, threading.Lock())
+    with build_lock:
+        idx = _cached(key, ident)
+        if idx is not None:
+            return idx
+        idx = compile_match_index(k, rp)
+        _save_sidecar(k, rp, idx)
+        _remember(key, idx)
+        return idx
+
+
+def index_building(kind: str, path: str) -> bool:
+    """True while a background build for ``path`` is running."""
+
+    key = (str(kind or "").strip().lower(), os.path.realpath(path))
+    with _LOCK:
+        return key in _BUILDING
+
+
+def _build_in_background(kind: str, path: str) -> None:
+    key = (kind, path)
+    with _LOCK:
+        if key in _BUILDING:
+            return
+        _BUILDING.add(key)
+
+    def _run() -> None:
+        try:
+            get_match_index(kind, path, build=True)
+        except Exception:
+            pass
+        finally:
+            with _LOCK:
+                _BUILDING.discard(key)
+
+    threading.Thread(target=_run, name="xkeen-geodat-index", daemon=True).start()
+
+
+def lookup_many(idx: MatchIndex, values: Iterable[str], max_tags: int = 50) -> List[Dict[str, Any]]:
+    return [{"value": v, "matches": idx.lookup(v, max_tags)} for v in values]
@@ -0,0 +1,337 @@
+"""Native GeoSite/GeoIP DAT reader (protobuf wire format over mmap).
+
+Serves the DAT modal (tags / dump / in-tag search) without spawning
+xk-geodat.  The file is mapped read-only and scanned once per file identity
+to build a compact index::
+
+    tag -> (offset, length, count, checkpoints)
+
+where ``offset``/``length`` locate the GeoSite/GeoIP entry message and
+``checkpoints`` are byte offsets of every ``CHECKPOINT_EVERY``-th item inside
+it, so a page deep inside a 500k-CIDR tag starts decoding next to the
+requested item instead of at the beginning.  Items are decoded lazily and
+produce the same ``{t, v}`` dicts as ``xk-geodat dump``.
+
+Schema (field numbers, same subset as tools/xk-geodat/internal/geodat):
+  GeoSiteList.entry=1  GeoSite.country_code=1 domain=2  Domain.type=1 value=2
+  GeoIPList.entry=1    GeoIP.country_code=1 cidr=2      CIDR.ip=1 prefix=2
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, NamedTuple, Tuple
+
+from services.filemanager.checksum_cache import Identity, file_identity
+
+
+CHECKPOINT_EVERY = 512
+_CACHE_MAX = 4
+# Scans are CPU-bound; under gevent they would hold the hub for the whole
+# file, so they yield every this many items (a multiple of CHECKPOINT_EVERY).
+_YIELD_EVERY = 8 * CHECKPOINT_EVERY
+
+_WT_VARINT = 0
+_WT_FIXED64 = 1
+_WT_BYTES = 2
+_WT_FIXED32 = 5
+
+_DOMAIN_TYPES = {0: "plain", 1: "regex", 2: "domain", 3: "full"}
+
+
+class GeodatFormatError(ValueError):
+    """Raised when a DAT file is not valid protobuf of the expected shape."""
+
+
+def native_enabled() -> bool:
+    raw = str(os.getenv("XKEEN_GEODAT_NATIVE", "1") or "1").strip().lower()
+    return raw not in ("0", "false", "no", "off")
+
+
+def _varint(buf: Any, i: int, end: int) -> Tuple[int, int]:
+    if i >= end:
+        raise GeodatFormatError("unexpected_eof")
+    b = buf[i]
+    if b < 0x80:
+        return b, i + 1
+    x = b & 0x7F
+    shift = 7
+    i += 1
+    while True:
+        if i >= end or shift >= 64:
+            raise GeodatFormatError("bad_varint")
+        b = buf[i]
+        i += 1
+        x |= (b & 0x7F) << shift
+        if b < 0x80:
+            return x, i
+        shift += 7
+
+
+def _skip(buf: Any, i: int, end: int, wt: int) -> int:
+    if wt == _WT_VARINT:
+        return _varint(buf, i, end)[1]
+    if wt == _WT_BYTES:
+        ln, i = _varint(buf, i, end)
+        j = i + ln
+    elif wt == _WT_FIXED64:
+        j = i + 8
+    elif wt == _WT_FIXED32:
+        j = i + 4
+    else:
+        raise GeodatFormatError("bad_wire_type:%d" % wt)
+    if j > end:
+        raise GeodatFormatError("unexpected_eof")
+    return j
+
+
+def _fields(buf: Any, i: int, end: int) -> Iterator[Tuple[int, int, int, int]]:
+    """Yield ``(field, wire_type, start, stop)``; for bytes fields start/stop bound the payload."""
+
+    while i < end:
+        key, i = _varint(buf, i, end)
+        fn, wt = key >> 3, key & 7
+        if fn <= 0:
+            raise GeodatFormatError("bad_field_number")
+        if wt == _WT_BYTES:
+            ln, i = _varint(buf, i, end)
+            stop = i + ln
+            if stop > end:
+                raise GeodatFormatError("unexpected_eof")
+            yield fn, wt, i, stop
+            i = stop
+        else:
+            stop = _skip(buf, i, end, wt)
+            yield fn, wt, i, stop
+            i = stop
+
+
+class TagEntry(NamedTuple):
+    tag: str
+    offset: int
+    length: int
+    count: int
+    checkpoints: Tuple[int, ...]
+
+
+def _decode_domain_raw(buf: Any, i: int, end: int) -> Tuple[int, bytes]:
+    dtype = 0
+    value = b""
+    for fn, wt, a, b in _fields(buf, i, end):
+        if fn == 1 and wt == _WT_VARINT:
+            dtype = _varint(buf, a, b)[0]
+        elif fn == 2 and wt == _WT_BYTES:
+            value = bytes(buf[a:b])
+    return dtype, value
+
+
+def _decode_cidr_raw(buf: Any, i: int, end: int) -> Tuple[bytes, int]:
+    raw = b""
+    prefix = 0
+    for fn, wt, a, b in _fields(buf, i, end):
+        if fn == 1 and wt == _WT_BYTES:
+            raw = bytes(buf[a:b])
+        elif fn == 2 and wt == _WT_VARINT:
+            prefix = _varint(buf, a, b)[0]
+    return raw, prefix
+
+
+def _decode_domain(buf: Any, i: int, end: int) -> Dict[str, Any]:
+    dtype, value = _decode_domain_raw(buf, i, end)
+    return {"t": _DOMAIN_TYPES.get(dtype, "domain"), "v": value.decode("utf-8", "replace")}
+
+
+def _decode_cidr(buf: Any, i: int, end: int) -> Dict[str, Any]:
+    raw, prefix = _decode_cidr_raw(buf, i, end)
+    ip = ""
+    if len(raw) in (4, 16):
+        addr = ipaddress.ip_address(raw)
+        if addr.version == 6 and addr.ipv4_mapped is not None:
+            addr = addr.ipv4_mapped
+        ip = str(addr)
+    cidr = "%s/%d" % (ip, prefix) if ip else ""
+    item: Dict[str, Any] = {"t": "cidr", "v": cidr, "ip": ip, "cidr": cidr}
+    if prefix:
+        item["prefix"] = prefix
+    return item
+
+
+class DatIndex:
+    """Tag index over one mapped DAT file."""
+
+    def __init__(self, kind: str, path: str, identity: Identity, buf: Any, entries: List[TagEntry]) -> None:
+        self.kind = kind
+        self.path = path
+        self.identity = identity
+        self._buf = buf
+        self.entries = entries
+        self._by_tag: Dict[str, TagEntry] = {}
+        for e in entries:
+            self._by_tag.setdefault(e.tag.lower(), e)
+
+    def tags(self) -> List[Dict[str, Any]]:
+        out = [{"tag": e.tag, "count": e.count} for e in self.entries]
+        out.sort(key=lambda it: it["tag"].lower())
+        return out
+
+    def entry(self, tag: str) -> TagEntry:
+        e = self._by_tag.get(str(tag or "").strip().lower())
+        if e is None:
+            raise KeyError("tag_not_found")
+        return e
+
+    def iter_items(self, tag: str, offset: int = 0) -> Iterator[Dict[str, Any]]:
+        """Decode items of ``tag`` starting at item ``offset``."""
+
+        e = self.entry(tag)
+        offset = max(0, int(offset or 0))
+        if offset >= e.count:
+            return
+        buf = self._buf
+        end = e.offset + e.length
+        cp = min(offset // CHECKPOINT_EVERY, len(e.checkpoints) - 1) if e.checkpoints else -1
+        i = e.checkpoints[cp] if cp >= 0 else e.offset
+        idx = cp * CHECKPOINT_EVERY if cp >= 0 else 0
+        decode = _decode_domain if self.kind == "geosite" else _decode_cidr
+        for fn, wt, a, b in _fields(buf, i, end):
+            if fn != 2 or wt != _WT_BYTES:
+                continue
+            if idx >= offset:
+                yield decode(buf, a, b)
+            idx += 1
+            if idx % _YIELD_EVERY == 0:
+                time.sleep(0)
+
+    def iter_raw(self, e: TagEntry) -> Iterator[Tuple[Any, ...]]:
+        """Yield ``(type, value_bytes)`` (geosite) or ``(ip_bytes, prefix)`` (geoip) for every item."""
+
+        buf = self._buf
+        decode = _decode_domain_raw if self.kind == "geosite" else _decode_cidr_raw
+        for fn, wt, a, b in _fields(buf, e.offset, e.offset + e.length):
+            if fn == 2 and wt == _WT_BYTES:
+                yield decode(buf, a, b)
+
+    def dump(self, tag: str, offset: int = 0, limit: int = 200) -> Tuple[List[Dict[str, Any]], int]:
+        e = self.entry(tag)
+        items: List[Dict[str, Any]] = []
+        if limit > 0:
+            for it in self.iter_items(tag, offset):
+                items.append(it)
+                if len(items) >= limit:
+                    break
+        return items, e.count
+
+
+def _scan_entries(buf: Any, size: int) -> List[TagEntry]:
+    entries: List[TagEntry] = []
+    for fn, wt, a, b in _fields(buf, 0, size):
+        if fn != 1 or wt != _WT_BYTES:
+            continue
+        tag = ""
+        count = 0
+        checkpoints: List[int] = []
+        i = a
+        # Inlined _fields() loop: this walks every domain/CIDR of the file once.
+        while i < b:
+            key, j = _varint(buf, i, b)
+            wt2 = key & 7
+            if wt2 == _WT_BYTES:
+                ln, k = _varint(buf, j, b)
+                stop = k + ln
+                if stop > b:
+                    raise GeodatFormatError("unexpected_eof")
+                fn2 = key >> 3
+                if fn2 == 2:
+                    if count % CHECKPOINT_EVERY == 0:
+                        checkpoints.append(i)
+                        if count and count % _YIELD_EVERY == 0:
+                            time.sleep(0)
+                    count += 1
+                elif fn2 == 1:
+                    tag = bytes(buf[k:stop]).decode("utf-8", "replace").strip()
+                i = stop
+            else:
+                i = _skip(buf, j, b, wt2)
+        if tag:
+            entries.append(TagEntry(tag, a, b - a, count, tuple(checkpoints)))
+    return entries
+
+
+def build_dat_index(kind: str, path: str) -> DatIndex:
+    k = str(kind or "").strip().lower()
+    if k not in ("geosite", "geoip"):
+        raise ValueError("bad_kind")
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if st.st_size <= 0:
+            return DatIndex(k, path, file_identity(st), b"", [])
+        # The map outlives the file object and is released with the index.
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return DatIndex(k, path, file_identity(st), buf, _scan_entries(buf, st.st_size))
+
+
+_CACHE: "OrderedDict[Tuple[str, str], DatIndex]" = OrderedDict()
+_LOCK = threading.Lock()
+_BUILD_LOCKS: Dict[Tuple[str, str], threading.Lock] = {}
+
+
+def get_dat_index(kind: str, path: str) -> DatIndex:
+    """Return a cached index for ``path``, rebuilding it when the file changed.
+
+    Evicted indexes are not closed explicitly: a reader still paging through
+    one keeps its map alive until it is done.
+    """
+
+    k = str(kind or "").strip().lower()
+    key = (k, os.path.realpath(path))
+    ident = file_identity(os.stat(key[1]))
+    with _LOCK:
+        idx = _CACHE.get(key)
+        if idx is not None and idx.identity == ident:
+            _CACHE.move_to_end(key)
+            return idx
+        build_lock = _BUILD_LOCKS.setdefault(key, threading.Lock())
+    with build_lock:
+        with _LOCK:
+            idx = _CACHE.get(key)
+            if idx is not None and idx.identity == ident:
+                return idx
+        idx = build_dat_index(k, key[1])
+        with _LOCK:
+            _CACHE[key] = idx
+            _CACHE.move_to_end(key)
+            while len(_CACHE) > _CACHE_MAX:
+                old, _ = _CACHE.popitem(last=False)
+                _BUILD_LOCKS.pop(old, None)
+        return idx
+
+
+
+def adopt_dat_index(idx: DatIndex, path: str) -> bool:
+    """Install an index built from a staged copy as the index of ``path``.
+
+    Used after ``os.replace(staged, path)``: the rename keeps the file
+    identity, so the index stays valid and the first request after an update
+    does not pay for a rescan.
+    """
+
+    key = (idx.kind, os.path.realpath(path))
+    try:
+        ident = file_identity(os.stat(key[1]))
+    except OSError:
+        return False
+    if ident != idx.identity:
+        return False
+    idx.path = key[1]
+    with _LOCK:
+        _CACHE[key] = idx
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > _CACHE_MAX:
+            old, _ = _CACHE.popitem(last=False)
+            _BUILD_LOCKS.pop(old, None)
+    return True
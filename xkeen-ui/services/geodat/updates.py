@@ -0,0 +1,450 @@
+"""Conditional, verified and scheduled GeoIP/GeoSite DAT updates.
+
+Every DAT downloaded from a URL becomes a *source* in UI_STATE_DIR
+(``dat-updates.json``) with its URL, ETag/Last-Modified validators, SHA-256
+and the identity of the installed file.  The next update of an untouched
+file is a conditional request, so a daily check usually costs one small
+``304``.
+
+A fresh download is staged in ``<path>.tmp`` and
+
+- verified against ``<url>.sha256sum`` when the mirror publishes one
+  (Loyalsoldier/v2fly releases do); a mismatch keeps the old file;
+- dropped when its bytes equal the installed file (mtime and caches stay);
+- indexed by the native reader *before* ``os.replace()``, and the index is
+  adopted for the new file right after the swap, so the DAT modal never
+  rescans a file that just changed; the reverse-lookup match index is then
+  rebuilt in the background from that adopted index.
+
+Sources with ``auto`` enabled are refreshed by a background scheduler inside
+the off-peak window ``XKEEN_DAT_UPDATE_WINDOW`` (local time, default
+03:00-06:00) once per ``XKEEN_DAT_UPDATE_INTERVAL_HOURS``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.filemanager.checksum import hash_file, hash_file_cached
+from services.filemanager.checksum_cache import file_identity, get_checksum_cache
+from services.filemanager.metadata import _apply_local_metadata_best_effort
+from services.io.atomic import _atomic_write_json
+from services.url_policy import (
+    NotModifiedError,
+    URLPolicy,
+    download_to_file_with_policy,
+    env_flag,
+    get_policy_from_env,
+)
+
+from .reader import adopt_dat_index, build_dat_index, native_enabled
+
+
+STATE_FILENAME = "dat-updates.json"
+DEFAULT_WINDOW = "03:00-06:00"
+DEFAULT_INTERVAL_HOURS = 24
+RETRY_AFTER_ERROR_S = 3600
+_SHA256SUM_MAX_BYTES = 64 * 1024
+_SHA256_RE = re.compile(r"^[0-9a-fA-F]{64}$")
+
+Downloader = Callable[..., int]
+LogFn = Callable[[str], None]
+
+_STATE_LOCK = threading.Lock()
+_PATH_LOCKS: Dict[str, threading.Lock] = {}
+_SCHEDULER_LOCK = threading.Lock()
+_SCHEDULER_STARTED = False
+
+
+def state_path() -> str:
+    try:
+        from core.paths import UI_STATE_DIR
+
+        root = str(UI_STATE_DIR or "").strip()
+    except Exception:
+        root = ""
+    return os.path.join(root or "/opt/etc/xkeen-ui", STATE_FILENAME)
+
+
+def _load_state() -> Dict[str, Any]:
+    try:
+        with open(state_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return {"v": 1, "sources": {}}
+    if not isinstance(data, dict) or not isinstance(data.get("sources"), dict):
+        return {"v": 1, "sources": {}}
+    return data
+
+
+def _update_source(path: str, **fields: Any) -> Dict[str, Any]:
+    with _STATE_LOCK:
+        state = _load_state()
+        entry = dict(state["sources"].get(path) or {})
+        entry.update(fields)
+        state["sources"][path] = entry
+        try:
+            _atomic_write_json(state_path(), state, mode=0o600)
+        except Exception:
+            pass
+        return entry
+
+
+def get_source(path: str) -> Dict[str, Any]:
+    with _STATE_LOCK:
+        return dict(_load_state()["sources"].get(path) or {})
+
+
+def list_sources() -> List[Dict[str, Any]]:
+    with _STATE_LOCK:
+        sources = _load_state()["sources"]
+    return [dict(entry, path=path) for path, entry in sorted(sources.items())]
+
+
+def set_auto_update(path: str, auto: bool) -> Dict[str, Any]:
+    return _update_source(path, auto=bool(auto))
+
+
+def forget_source(path: str) -> bool:
+    with _STATE_LOCK:
+        state = _load_state()
+        if state["sources"].pop(path, None) is None:
+            return False
+        try:
+            _atomic_write_json(state_path(), state, mode=0o600)
+        except Exception:
+            pass
+        return True
+
+
+def dat_max_mb() -> int:
+    raw = str(os.getenv("XKEEN_MAX_DAT_MB", "128") or "128").strip()
+    try:
+        return int(float(raw))
+    except Exception:
+        return 128
+
+
+def guess_kind(path: str) -> str:
+    return "geoip" if "geoip" in os.path.basename(path).lower() else "geosite"
+
+
+def _path_lock(path: str) -> threading.Lock:
+    with _STATE_LOCK:
+        return _PATH_LOCKS.setdefault(path, threading.Lock())
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        if os.path.exists(path):
+            os.remove(path)
+    except Exception:
+        pass
+
+
+def parse_sha256sum(text: str, filename: str) -> str:
+    """Digest for ``filename`` from ``sha256sum`` output (or a bare digest)."""
+
+    lines = [ln.split() for ln in str(text or "").splitlines() if ln.strip()]
+    for parts in lines:
+        if not _SHA256_RE.match(parts[0]):
+            continue
+        if len(parts) == 1 or len(lines) == 1 or parts[1].lstrip("*") == filename:
+            return parts[0].lower()
+    return ""
+
+
+def _published_sha256(url: str, tmp_path: str, *, policy: URLPolicy, download: Downloader) -> str:
+    sum_path = tmp_path + ".sha256sum"
+    try:
+        download(url + ".sha256sum", sum_path, _SHA256SUM_MAX_BYTES, policy=policy, timeout=15)
+        with open(sum_path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+    except Exception:
+        return ""
+    finally:
+        _remove_quietly(sum_path)
+    name = url.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+    return parse_sha256sum(text, name)
+
+
+def _sync_xray_assets(path: str, log: Optional[LogFn]) -> None:
+    # Keep Xray asset lookup working for `ext:*.dat:*` rules by ensuring
+    # DAT files from /opt/etc/xray/dat are reachable via /opt/sbin.
+    dat_dir = os.environ.get("XRAY_DAT_DIR") or "/opt/etc/xray/dat"
+    if not path.startswith(dat_dir.rstrip("/") + "/"):
+        return
+    from services.xray_assets import ensure_xray_dat_assets
+
+    ensure_xray_dat_assets(
+        dat_dir=dat_dir,
+        asset_dir=os.environ.get("XRAY_ASSET_DIR") or "/opt/sbin",
+        log=log or (lambda _line: None),
+    )
+
+
+def _prewarm_match_index(kind: str, path: str) -> None:
+    try:
+        from .match_index import get_match_index
+
+        # build=False schedules the compile in the background when neither
+        # memory nor the sidecar has an index for the new file identity.
+        get_match_index(kind, path, build=False)
+    except Exception:
+        pass
+
+
+def update_dat_file(
+    path: str,
+    url: str,
+    *,
+    kind: str = "",
+    policy: Optional[URLPolicy] = None,
+    max_bytes: Optional[int] = None,
+    download: Downloader = download_to_file_with_policy,
+    force: bool = False,
+    log: Optional[LogFn] = None,
+) -> Dict[str, Any]:
+    """Update ``path`` from ``url``; returns the outcome.
+
+    Raises the downloader's errors (``RuntimeError("size_limit")``,
+    ``RuntimeError("url_blocked:...")``, URLError) and
+    ``RuntimeError("checksum_mismatch")``; the installed file is untouched
+    in every error case.
+    """
+
+    kind = str(kind or "").strip().lower() or guess_kind(path)
+    policy = policy or get_policy_from_env("XKEEN_DAT")
+    with _path_lock(path):
+        entry = get_source(path)
+        try:
+            st0: Optional[os.stat_result] = os.stat(path)
+        except OSError:
+            st0 = None
+
+        headers: Dict[str, str] = {}
+        if (
+            not force
+            and st0 is not None
+            and entry.get("url") == url
+            and entry.get("identity") == list(file_identity(st0))
+        ):
+            headers["If-None-Match"] = str(entry.get("etag") or "")
+            headers["If-Modified-Since"] = str(entry.get("last_modified") or "")
+
+        tmp_path = path + ".tmp"
+        now = int(time.time())
+        meta: Dict[str, str] = {}
+        try:
+            size = download(url, tmp_path, max_bytes, policy=policy, headers=headers, response_meta=meta)
+        except NotModifiedError:
+            _remove_quietly(tmp_path)
+            _update_source(path, url=url, kind=kind, checked_at=now, status="not_modified", error="")
+            return {
+                "path": path,
+                "size": int(st0.st_size) if st0 is not None else 0,
+                "sha256": str(entry.get("sha256") or ""),
+                "unchanged": True,
+                "not_modified": True,
+            }
+        except Exception as e:
+            _remove_quietly(tmp_path)
+            _update_source(path, url=url, kind=kind, checked_at=now, status="error", error=str(e) or type(e).__name__)
+            raise
+
+        verified = "off"
+        prewarmed = False
+        try:
+            md5_hex, sha_hex, _n = hash_file(tmp_path)
+            if env_flag("XKEEN_DAT_VERIFY_SHA256", True):
+                published = _published_sha256(url, tmp_path, policy=policy, download=download)
+                if published and published != sha_hex:
+                    raise RuntimeError("checksum_mismatch")
+                verified = "ok" if published else "unavailable"
+
+            # Same bytes as the installed file (its digest usually comes from
+            # the checksum cache): keep the file and its mtime, so geodat
+            # caches and Xray asset links stay valid.
+            unchanged = False
+            if st0 is not None and int(st0.st_size) == int(size):
+                try:
+                    unchanged = hash_file_cached(path)[1] == sha_hex
+                except Exception:
+                    unchanged = False
+
+            if unchanged:
+                _remove_quietly(tmp_path)
+            else:
+                staged = None
+                if native_enabled():
+                    try:
+                        staged = build_dat_index(kind, tmp_path)
+                    except Exception:
+                        staged = None
+                os.replace(tmp_path, path)
+                _apply_local_metadata_best_effort(path, st0)
+                get_checksum_cache().remember(path, md5_hex, sha_hex)
+                if staged is not None:
+                    prewarmed = adopt_dat_index(staged, path)
+                    _prewarm_match_index(kind, path)
+        except Exception as e:
+            _remove_quietly(tmp_path)
+            _update_source(path, url=url, kind=kind, checked_at=now, status="error", error=str(e) or type(e).__name__)
+            raise
+
+        try:
+            identity = list(file_identity(os.stat(path)))
+        except OSError:
+            identity = []
+        fields: Dict[str, Any] = {
+            "url": url,
+            "kind": kind,
+            "etag": meta.get("etag", ""),
+            "last_modified": meta.get("last_modified", ""),
+            "sha256": sha_hex,
+            "size": int(size),
+            "identity": identity,
+            "checked_at": now,
+            "status": "unchanged" if unchanged else "updated",
+            "verified": verified,
+            "error": "",
+        }
+        if not unchanged:
+            fields["updated_at"] = now
+        _update_source(path, **fields)
+
+    if not unchanged:
+        try:
+            _sync_xray_assets(path, log)
+        except Exception as e:  # noqa: BLE001
+            if log is not None:
+                log("xray_assets_sync_failed: %s" % e)
+
+    return {
+        "path": path,
+        "size": int(size),
+        "sha256": sha_hex,
+        "unchanged": unchanged,
+        "not_modified": False,
+        "verified": verified,
+        "prewarmed": prewarmed,
+    }
+
+
+def _parse_window(raw: str) -> Tuple[int, int]:
+    try:
+        a, b = str(raw or "").split("-", 1)
+        ah, am = a.strip().split(":", 1)
+        bh, bm = b.strip().split(":", 1)
+        start, end = int(ah) * 60 + int(am), int(bh) * 60 + int(bm)
+        if 0 <= start < 1440 and 0 <= end <= 1440:
+            return start, end
+    except Exception:
+        pass
+    return 180, 360
+
+
+def in_update_window(now: Optional[float] = None) -> bool:
+    start, end = _parse_window(os.environ.get("XKEEN_DAT_UPDATE_WINDOW") or DEFAULT_WINDOW)
+    lt = time.localtime(now if now is not None else time.time())
+    minute = lt.tm_hour * 60 + lt.tm_min
+    if start <= end:
+        return start <= minute < end
+    return minute >= start or minute < end
+
+
+def _interval_s() -> int:
+    try:
+        hours = float(os.environ.get("XKEEN_DAT_UPDATE_INTERVAL_HOURS") or DEFAULT_INTERVAL_HOURS)
+    except Exception:
+        hours = DEFAULT_INTERVAL_HOURS
+    return max(3600, int(hours * 3600))
+
+
+def is_due(entry: Dict[str, Any], now: Optional[float] = None) -> bool:
+    if not entry.get("auto") or not entry.get("url"):
+        return False
+    now = time.time() if now is None else now
+    checked = float(entry.get("checked_at") or 0)
+    if entry.get("status") == "error":
+        return now - checked >= RETRY_AFTER_ERROR_S
+    # Checks drift by a tick every day; allow an hour of slack so a daily
+    # update stays inside the window instead of creeping past its end.
+    return now - checked >= _interval_s() - 3600
+
+
+def run_due_updates(now: Optional[float] = None, *, log: Optional[LogFn] = None) -> List[Dict[str, Any]]:
+    if not in_update_window(now):
+        return []
+    policy = get_policy_from_env("XKEEN_DAT")
+    max_mb = dat_max_mb()
+    results: List[Dict[str, Any]] = []
+    for src in list_sources():
+        if not is_due(src, now):
+            continue
+        path = src["path"]
+        try:
+            res = update_dat_file(
+                path,
+                str(src["url"]),
+                kind=str(src.get("kind") or ""),
+                policy=policy,
+                max_bytes=None if max_mb <= 0 else max_mb * 1024 * 1024,
+                log=log,
+            )
+            results.append(dict(res, ok=True))
+        except Exception as e:
+            results.append({"ok": False, "path": path, "error": str(e) or type(e).__name__})
+    return results
+
+
+def start_dat_update_scheduler() -> bool:
+    global _SCHEDULER_STARTED
+
+    if not env_flag("XKEEN_DAT_AUTO_UPDATE", True):
+        return False
+
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER_STARTED:
+            return False
+        _SCHEDULER_STARTED = True
+
+    try:
+        tick = int(os.environ.get("XKEEN_DAT_UPDATE_SCHEDULER_TICK", "300") or "300")
+    except Exception:
+        tick = 300
+    tick = max(60, min(3600, tick))
+
+    def _log(level: str, msg: str, **extra: Any) -> None:
+        try:
+            from core.logging import core_log
+
+            core_log(level, msg, **extra)
+        except Exception:
+            pass
+
+    def _loop() -> None:
+        time.sleep(min(60, tick))
+        while True:
+            try:
+                results = run_due_updates(log=lambda line: _log("info", line))
+                if results:
+                    _log(
+                        "info",
+                        "dat auto-update",
+                        total=len(results),
+                        ok=sum(1 for r in results if r.get("ok")),
+                        updated=sum(1 for r in results if r.get("ok") and not r.get("unchanged")),
+                    )
+            except Exception as exc:
+                _log("warning", "dat auto-update failed", error=str(exc))
+            time.sleep(tick)
+
+    thread = threading.Thread(target=_loop, name="xkeen-dat-updates", daemon=True)
+    thread.start()
+    return True
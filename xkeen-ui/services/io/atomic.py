@@ -24,6 +24,18 @@ def _atomic_write_text(path: str, text: str, mode: int = 0o644, *, newline: str
     os.replace(tmp, path)
 
 
+def _atomic_write_bytes(path: str, data: bytes, mode: int = 0o644) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    try:
+        os.chmod(tmp, mode)
+    except Exception:
+        pass
+    os.replace(tmp, path)
+
+
 def _atomic_write_json(
     path: str,
     obj: Any,
@@ -0,0 +1,236 @@
+"""In-memory cache for small JSON state files.
+
+Services keep their state in small JSON documents under ``UI_STATE_DIR``
+(ui settings, subscription state, device names) and used to re-read,
+re-parse and re-normalize them on every API call.  A :class:`JsonStateStore`
+keeps the parsed and normalized document per path and revalidates it with a
+single ``os.stat()`` against the file identity ``(dev, ino, size,
+mtime_ns)``, so a file changed behind our back (manual edit, restore from
+backup) is picked up on the next load.
+
+* ``load()`` returns a private copy; callers may mutate it freely.
+* Writers of the same path are serialized and go through
+  :func:`services.io.atomic._atomic_write_json`.
+* ``write(..., delay=s)`` defers the write: readers see the new document
+  right away and a burst of writes within ``delay`` seconds ends up as one
+  atomic write.  A later non-deferred write of the same path supersedes it.
+"""
+
+from __future__ import annotations
+
+import atexit
+import copy
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.io.atomic import _atomic_write_json
+
+
+Identity = Tuple[int, int, int, int]
+
+MAX_ENTRIES = 64
+
+_PATH_LOCKS: Dict[str, threading.RLock] = {}
+_PATH_LOCKS_GUARD = threading.Lock()
+_STORES: List["JsonStateStore"] = []
+
+
+def path_lock(path: str) -> threading.RLock:
+    """Return the writer lock shared by every store for ``path``."""
+
+    key = os.path.abspath(path)
+    with _PATH_LOCKS_GUARD:
+        lock = _PATH_LOCKS.get(key)
+        if lock is None:
+            lock = _PATH_LOCKS[key] = threading.RLock()
+        return lock
+
+
+def _identity(path: str) -> Optional[Identity]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (int(st.st_dev), int(st.st_ino), int(st.st_size), int(st.st_mtime_ns))
+
+
+def clone(obj: Any) -> Any:
+    """Copy a JSON-like tree (faster than ``copy.deepcopy`` for dict/list)."""
+
+    if isinstance(obj, dict):
+        return {k: clone(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [clone(v) for v in obj]
+    if isinstance(obj, tuple):
+        return tuple(clone(v) for v in obj)
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    return copy.deepcopy(obj)
+
+
+class _Entry:
+    __slots__ = ("identity", "raw", "value", "normalized", "dirty", "mode", "timer")
+
+    def __init__(self) -> None:
+        self.identity: Optional[Identity] = None
+        self.raw: Any = None
+        self.value: Any = None
+        self.normalized = False
+        self.dirty = False
+        self.mode = 0o644
+        self.timer: Optional[threading.Timer] = None
+
+
+class JsonStateStore:
+    """Cache of parsed + normalized JSON documents keyed by path.
+
+    ``parse`` turns file text into an object (``json.loads`` by default),
+    ``normalize`` maps the parsed object (or ``default`` when the file is
+    missing or invalid) to the value handed out by :meth:`load`.
+    """
+
+    def __init__(
+        self,
+        normalize: Optional[Callable[[Any], Any]] = None,
+        *,
+        parse: Optional[Callable[[str], Any]] = None,
+        max_entries: int = MAX_ENTRIES,
+    ) -> None:
+        self.normalize = normalize
+        self.parse = parse or json.loads
+        self.max_entries = max(1, int(max_entries))
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "coalesced": 0}
+        _STORES.append(self)
+
+    # -- internals --------------------------------------------------------------
+
+    def _entry(self, path: str) -> _Entry:
+        with self._lock:
+            ent = self._entries.get(path)
+            if ent is None:
+                ent = self._entries[path] = _Entry()
+                while len(self._entries) > self.max_entries:
+                    victim = next((k for k, e in self._entries.items() if not e.dirty), None)
+                    if victim is None:
+                        break
+                    del self._entries[victim]
+            else:
+                self._entries.move_to_end(path)
+            return ent
+
+    def _read(self, path: str, default: Any) -> Any:
+        try:
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                text = f.read()
+        except Exception:
+            return clone(default)
+        try:
+            parsed = self.parse(text)
+        except Exception:
+            parsed = None
+        return clone(default) if parsed is None else parsed
+
+    def _value(self, ent: _Entry) -> Any:
+        if not ent.normalized:
+            ent.value = self.normalize(ent.raw) if self.normalize else ent.raw
+            ent.normalized = True
+        return ent.value
+
+    def _write_now(self, path: str, ent: _Entry) -> None:
+        if ent.timer is not None:
+            ent.timer.cancel()
+            ent.timer = None
+        _atomic_write_json(path, ent.raw, mode=ent.mode)
+        ent.dirty = False
+        ent.identity = _identity(path)
+        self.stats["writes"] += 1
+
+    # -- API ------------------------------------------------------------------------
+
+    def load(self, path: str, default: Any = None) -> Any:
+        """Return a copy of the normalized document at ``path``."""
+
+        with path_lock(path):
+            ent = self._entry(path)
+            if not ent.dirty:
+                ident = _identity(path)
+                if ent.raw is None or ident != ent.identity:
+                    self.stats["misses"] += 1
+                    ent.raw = self._read(path, default) if ident is not None else clone(default)
+                    ent.identity = ident
+                    ent.normalized = False
+                else:
+                    self.stats["hits"] += 1
+            return clone(self._value(ent))
+
+    def write(self, path: str, obj: Any, *, mode: int = 0o644, delay: float = 0.0) -> None:
+        """Store ``obj`` at ``path``; with ``delay`` > 0 the disk write is deferred."""
+
+        raw = clone(obj)
+        with path_lock(path):
+            ent = self._entry(path)
+            ent.raw = raw
+            ent.normalized = False
+            ent.mode = mode
+            if delay <= 0:
+                try:
+                    self._write_now(path, ent)
+                except Exception:
+                    # Not on disk: forget it so the next load re-reads the file.
+                    ent.raw = None
+                    raise
+                return
+            if ent.dirty:
+                self.stats["coalesced"] += 1
+            ent.dirty = True
+            if ent.timer is None:
+                ent.timer = threading.Timer(float(delay), self._flush_path, args=(path,))
+                ent.timer.daemon = True
+                ent.timer.start()
+
+    def _flush_path(self, path: str) -> None:
+        with path_lock(path):
+            ent = self._entries.get(path)
+            if ent is None:
+                return
+            ent.timer = None
+            if ent.dirty:
+                try:
+                    self._write_now(path, ent)
+                except Exception:
+                    # Keep the document dirty; the next write/flush retries.
+                    pass
+
+    def flush(self, path: Optional[str] = None) -> None:
+        """Write pending deferred documents now (all paths by default)."""
+
+        with self._lock:
+            paths = [path] if path is not None else [p for p, e in self._entries.items() if e.dirty]
+        for p in paths:
+            self._flush_path(p)
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drop cached documents (pending writes are flushed first)."""
+
+        self.flush(path)
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+
+
+def flush_all() -> None:
+    for store in list(_STORES):
+        try:
+            store.flush()
+        except Exception:
+            pass
+
+
+atexit.register(flush_all)
@@ -12,6 +12,7 @@ import http.client
 import json
 import select
 import socket
+import threading
 import time
 from dataclasses import dataclass
 from types import MappingProxyType
@@ -30,6 +31,11 @@ DEFAULT_RESPONSE_LIMIT = 2 * 1024 * 1024
 DEFAULT_STREAM_FRAME_LIMIT = 2 * 1024 * 1024
 READ_CHUNK_BYTES = 64 * 1024
 MAX_OPERATION_NAME_BYTES = 1024
+POOL_MAX_IDLE_PER_TARGET = 4
+POOL_IDLE_SECONDS = 15.0
+# Methods that may be replayed once when a pooled keep-alive connection turns
+# out to have been closed by Mihomo before it answered.
+_REPLAYABLE_METHODS = frozenset({"GET", "PUT", "DELETE"})
 
 
 @dataclass(frozen=True)
@@ -175,18 +181,108 @@ class _UnixHTTPConnection(http.client.HTTPConnection):
         self.sock = sock
 
 
+def _connection_alive(connection: http.client.HTTPConnection) -> bool:
+    """An idle keep-alive socket must not be readable (EOF or stray bytes)."""
+
+    sock = getattr(connection, "sock", None)
+    if sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+    except (OSError, ValueError):
+        return False
+    return not readable
+
+
+class _ConnectionPool:
+    """Idle HTTP/1.1 keep-alive connections per Mihomo target.
+
+    A connection is owned by exactly one request between :meth:`acquire` and
+    :meth:`release`, so clients may be used from several greenlets/threads.
+    Idle connections are health-checked before reuse and dropped after
+    ``idle_seconds``; at most ``max_idle`` are kept per target.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_idle: int = POOL_MAX_IDLE_PER_TARGET,
+        idle_seconds: float = POOL_IDLE_SECONDS,
+    ) -> None:
+        self.max_idle = max(0, int(max_idle))
+        self.idle_seconds = float(idle_seconds)
+        self._idle: dict[tuple, list[tuple[http.client.HTTPConnection, float]]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "reused": 0, "discarded": 0}
+
+    def acquire(self, key: tuple) -> http.client.HTTPConnection | None:
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    return None
+                connection, released_at = idle.pop()
+            if now - released_at <= self.idle_seconds and _connection_alive(connection):
+                self.stats["reused"] += 1
+                return connection
+            self.discard(connection)
+
+    def release(self, key: tuple, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append((connection, time.monotonic()))
+                return
+        self.discard(connection)
+
+    def discard(self, connection: http.client.HTTPConnection) -> None:
+        self.stats["discarded"] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def clear(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for items in idle.values():
+            for connection, _released_at in items:
+                self.discard(connection)
+
+    def idle_count(self, key: tuple | None = None) -> int:
+        with self._lock:
+            if key is not None:
+                return len(self._idle.get(key) or [])
+            return sum(len(items) for items in self._idle.values())
+
+
+CONNECTION_POOL = _ConnectionPool()
+
+
 class MihomoClashClient:
-    """Small synchronous client intended for Flask worker calls."""
+    """Small synchronous client intended for Flask worker calls.
+
+    Plain requests reuse keep-alive connections from :data:`CONNECTION_POOL`;
+    streams always use a dedicated connection that is closed afterwards.
+    """
 
     def __init__(
         self,
         target: MihomoClashTarget,
         *,
         endpoints: Mapping[str, MihomoClashEndpoint] | None = None,
+        pool: _ConnectionPool | None = CONNECTION_POOL,
     ):
         if target.transport not in {"tcp", "unix"}:
             raise ValueError("unsupported Mihomo transport")
         self._target = target
+        self._pool = pool
+        self._pool_key = (
+            target.transport,
+            str(target.socket_path or target.loopback_host or ""),
+            target.port,
+        )
         supplied = MIHOMO_CLASH_ENDPOINTS if endpoints is None else endpoints
         validated: dict[str, MihomoClashEndpoint] = {}
         for raw_name, spec in supplied.items():
@@ -447,15 +543,15 @@ class MihomoClashClient:
         started = time.monotonic()
         connection: http.client.HTTPConnection | None = None
         response: http.client.HTTPResponse | None = None
+        reusable = False
         try:
-            connection = self._open_connection(spec.timeout_seconds)
-            headers = self._headers()
+            headers = self._headers(keep_alive=self._pool is not None)
             if body is not None:
                 headers["Content-Type"] = "application/json"
-            connection.request(spec.method, path, body=body, headers=headers)
-            response = connection.getresponse()
+            connection, response = self._send(spec, path, body, headers)
             self._validate_response(response, require_json=expect_json)
             raw = self._read_bounded(response, spec.max_response_bytes)
+            reusable = not response.will_close
             payload = (
                 parse_bounded_json(raw, max_bytes=spec.max_response_bytes)
                 if expect_json
@@ -492,7 +588,47 @@ class MihomoClashClient:
                 except Exception:
                     pass
             if connection is not None:
+                if reusable and self._pool is not None:
+                    self._pool.release(self._pool_key, connection)
+                else:
+                    connection.close()
+
+    def _send(
+        self,
+        spec: MihomoClashEndpoint,
+        path: str,
+        body: bytes | None,
+        headers: Mapping[str, str],
+    ) -> tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        """Send one request, preferring an idle pooled connection.
+
+        A pooled connection that Mihomo already closed fails before any
+        response; idempotent requests are then replayed once on a fresh one.
+        """
+
+        connection = self._pool.acquire(self._pool_key) if self._pool is not None else None
+        if connection is not None:
+            connection.timeout = spec.timeout_seconds
+            try:
+                connection.sock.settimeout(spec.timeout_seconds)
+                connection.request(spec.method, path, body=body, headers=dict(headers))
+                return connection, connection.getresponse()
+            except (ConnectionError, http.client.BadStatusLine, http.client.CannotSendRequest):
+                connection.close()
+                if spec.method not in _REPLAYABLE_METHODS:
+                    raise
+            except BaseException:
                 connection.close()
+                raise
+        connection = self._open_connection(spec.timeout_seconds)
+        if self._pool is not None:
+            self._pool.stats["created"] += 1
+        try:
+            connection.request(spec.method, path, body=body, headers=dict(headers))
+            return connection, connection.getresponse()
+        except BaseException:
+            connection.close()
+            raise
 
     def iter_json_frames(
         self,
@@ -648,10 +784,10 @@ class MihomoClashClient:
             timeout=timeout,
         )
 
-    def _headers(self) -> dict[str, str]:
+    def _headers(self, *, keep_alive: bool = False) -> dict[str, str]:
         headers = {
             "Accept": "application/json, application/x-ndjson",
-            "Connection": "close",
+            "Connection": "keep-alive" if keep_alive else "close",
             "User-Agent": "Xkeen-UI-Mihomo-Clash/1",
         }
         authorization = self._target.authorization_header()
@@ -0,0 +1,292 @@
+"""Per-stream connection tracking for the Mihomo Clash connections WebSocket.
+
+The connections stream polls Mihomo once a second.  Between two frames most
+connections are unchanged apart from their byte counters, so re-normalizing
+and re-sending the whole list is wasted router CPU and bandwidth.
+:class:`ConnectionsDeltaTracker` keeps the normalized rows by connection id
+for the lifetime of one stream and turns every upstream snapshot into:
+
+* a full ``snapshot`` frame on the first poll and after the view changes;
+* ``delta`` frames afterwards: rows that entered the view (``added``), ids
+  that left it (``removed``) or disappeared upstream (``closed``), changed
+  counters (``updated``) and the new row ``order`` when it moved.
+
+Per-connection speed is derived from counter differences between frames.
+The browser-selected :class:`ConnectionsView` (device / rule / chain / host
+filters, sort by speed, bytes or age, top-N) is applied on the server over
+every tracked connection, so the visible rows are no longer just the first
+``MAX_CONNECTION_ROWS`` Mihomo happened to return.
+"""
+
+from __future__ import annotations
+
+import heapq
+import time
+from collections.abc import Mapping, Sequence
+from dataclasses import asdict, dataclass
+from typing import Any, Callable
+
+from services.mihomo_clash_dto import (
+    MAX_CONNECTION_ROWS,
+    MIHOMO_CLASH_SCHEMA_VERSION,
+    _connection_dto,
+    _device_name,
+    _mapping,
+    _nonnegative_int,
+    _text,
+)
+
+
+MAX_TRACKED_CONNECTIONS = 4096
+MAX_VIEW_ROWS = 1000
+CONNECTION_SORT_KEYS = ("speed", "bytes", "age")
+
+
+def _param(params: Mapping[str, Any], name: str, limit: int) -> str:
+    value = params.get(name)
+    # parse_qs() values are lists; JSON view messages carry plain scalars.
+    if isinstance(value, Sequence) and not isinstance(value, (str, bytes, bytearray)):
+        value = value[0] if value else ""
+    return _text(value, limit)
+
+
+@dataclass(frozen=True)
+class ConnectionsView:
+    """Server-side filter, sort and page size selected by the browser."""
+
+    device: str = ""
+    rule: str = ""
+    chain: str = ""
+    host: str = ""
+    sort: str = "bytes"
+    direction: str = "desc"
+    limit: int = MAX_CONNECTION_ROWS
+
+    @classmethod
+    def from_params(cls, params: Mapping[str, Any] | None) -> "ConnectionsView":
+        raw = params if isinstance(params, Mapping) else {}
+        sort = _param(raw, "sort", 16).lower()
+        direction = _param(raw, "dir", 8).lower()
+        try:
+            limit = int(_param(raw, "limit", 8) or MAX_CONNECTION_ROWS)
+        except ValueError:
+            limit = MAX_CONNECTION_ROWS
+        return cls(
+            device=_param(raw, "device", 160),
+            rule=_param(raw, "rule", 1024),
+            chain=_param(raw, "chain", 256),
+            host=_param(raw, "host", 512),
+            sort=sort if sort in CONNECTION_SORT_KEYS else "bytes",
+            direction=direction if direction in {"asc", "desc"} else "desc",
+            limit=max(1, min(MAX_VIEW_ROWS, limit)),
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class _Tracked:
+    __slots__ = ("row", "upload", "download", "upload_speed", "download_speed", "dirty")
+
+    def __init__(self, row: dict[str, Any]) -> None:
+        self.row = row
+        self.upload = int(row.get("upload") or 0)
+        self.download = int(row.get("download") or 0)
+        self.upload_speed = 0
+        self.download_speed = 0
+        self.dirty = False
+
+    @property
+    def counters(self) -> tuple[int, int, int, int]:
+        return (self.upload, self.download, self.upload_speed, self.download_speed)
+
+    def public_row(self) -> dict[str, Any]:
+        row = dict(self.row)
+        row["upload"] = self.upload
+        row["download"] = self.download
+        row["upload_speed"] = self.upload_speed
+        row["download_speed"] = self.download_speed
+        return row
+
+
+def _matches(view: ConnectionsView, row: Mapping[str, Any]) -> bool:
+    metadata = _mapping(row.get("metadata"))
+    if view.device:
+        wanted = view.device.casefold()
+        if wanted not in {
+            str(metadata.get("source_ip") or "").casefold(),
+            str(metadata.get("source_name") or "").casefold(),
+        }:
+            return False
+    if view.rule:
+        wanted = view.rule.casefold()
+        if wanted not in {str(row.get("rule") or "").casefold(), str(row.get("rule_payload") or "").casefold()}:
+            return False
+    if view.chain:
+        wanted = view.chain.casefold()
+        if not any(str(hop).casefold() == wanted for hop in row.get("chains") or ()):
+            return False
+    if view.host:
+        wanted = view.host.casefold()
+        haystack = (
+            metadata.get("host"),
+            metadata.get("sniff_host"),
+            metadata.get("destination_ip"),
+            metadata.get("remote_destination"),
+        )
+        if not any(wanted in str(value or "").casefold() for value in haystack):
+            return False
+    return True
+
+
+def _sort_key(view: ConnectionsView) -> Callable[[tuple[str, _Tracked]], tuple[Any, str]]:
+    if view.sort == "speed":
+        return lambda item: (item[1].upload_speed + item[1].download_speed, item[0])
+    if view.sort == "age":
+        return lambda item: (str(item[1].row.get("start") or ""), item[0])
+    return lambda item: (item[1].upload + item[1].download, item[0])
+
+
+class ConnectionsDeltaTracker:
+    """Turn successive Mihomo connection snapshots into snapshot/delta DTOs."""
+
+    def __init__(
+        self,
+        view: ConnectionsView | None = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.view = view or ConnectionsView()
+        self.clock = clock
+        self._entries: dict[str, _Tracked] = {}
+        self._last_at: float | None = None
+        self._sent: dict[str, tuple[int, int, int, int]] | None = None
+        self._order: list[str] = []
+
+    def set_view(self, view: ConnectionsView) -> None:
+        """Switch the view; the next frame is a full snapshot of it."""
+
+        if view != self.view:
+            self.view = view
+            self._sent = None
+
+    def _track(self, source: list[Any], devices: Mapping[str, Any]) -> set[str]:
+        now = self.clock()
+        elapsed = now - self._last_at if self._last_at is not None else 0.0
+        self._last_at = now
+        previous = self._entries
+        entries: dict[str, _Tracked] = {}
+        for raw in source[:MAX_TRACKED_CONNECTIONS]:
+            connection = _mapping(raw)
+            connection_id = _text(connection.get("id"), 160)
+            if not connection_id or connection_id in entries:
+                continue
+            entry = previous.get(connection_id)
+            if entry is None:
+                row = _connection_dto(connection, devices)
+                if row is None:
+                    continue
+                entries[connection_id] = _Tracked(row)
+                continue
+            upload = _nonnegative_int(connection.get("upload"))
+            download = _nonnegative_int(connection.get("download"))
+            if elapsed > 0:
+                entry.upload_speed = int(max(0, upload - entry.upload) / elapsed)
+                entry.download_speed = int(max(0, download - entry.download) / elapsed)
+            entry.upload = upload
+            entry.download = download
+            # Device names can be edited while the stream is open; everything
+            # else in a normalized row is fixed for the connection's lifetime.
+            metadata = entry.row["metadata"]
+            name = _device_name(devices, metadata.get("source_ip") or "")
+            if name != metadata.get("source_name"):
+                entry.row["metadata"] = {**metadata, "source_name": name}
+                entry.dirty = True
+            entries[connection_id] = entry
+        self._entries = entries
+        return set(previous) - set(entries)
+
+    def _visible(self) -> tuple[list[str], int]:
+        view = self.view
+        matched = [item for item in self._entries.items() if _matches(view, item[1].row)]
+        descending = view.direction == "desc"
+        if view.sort == "age":
+            # Mihomo formats every ``start`` the same way (RFC 3339, one zone),
+            # so the text orders chronologically; the oldest connection has the
+            # smallest start, i.e. "largest age first" is ascending start.
+            descending = not descending
+        select = heapq.nlargest if descending else heapq.nsmallest
+        top = select(view.limit, matched, key=_sort_key(view))
+        return [connection_id for connection_id, _entry in top], len(matched)
+
+    def frame(
+        self,
+        connections_payload: Any,
+        *,
+        device_map: Mapping[str, Any] | None = None,
+        memory: Any | None = None,
+    ) -> dict[str, Any]:
+        payload = _mapping(connections_payload)
+        raw_connections = payload.get("connections")
+        source = (
+            list(raw_connections)
+            if isinstance(raw_connections, Sequence) and not isinstance(raw_connections, (str, bytes, bytearray))
+            else []
+        )
+        devices = device_map if isinstance(device_map, Mapping) else {}
+        gone = self._track(source, devices)
+        visible, matched = self._visible()
+
+        result: dict[str, Any] = {
+            "schema_version": MIHOMO_CLASH_SCHEMA_VERSION,
+            "mode": "snapshot" if self._sent is None else "delta",
+            "download_total": _nonnegative_int(payload.get("downloadTotal")),
+            "upload_total": _nonnegative_int(payload.get("uploadTotal")),
+            "memory": _nonnegative_int(payload.get("memory") if memory is None else memory),
+            "total_connections": len(source),
+            "matched_connections": matched,
+            "truncated": matched > len(visible) or len(source) > MAX_TRACKED_CONNECTIONS,
+            "view": self.view.as_dict(),
+        }
+        entries = self._entries
+        if self._sent is None:
+            result["connections"] = [entries[connection_id].public_row() for connection_id in visible]
+        else:
+            sent = self._sent
+            visible_set = set(visible)
+            added: list[dict[str, Any]] = []
+            updated: list[dict[str, Any]] = []
+            for connection_id in visible:
+                entry = entries[connection_id]
+                if connection_id not in sent or entry.dirty:
+                    added.append(entry.public_row())
+                elif sent[connection_id] != entry.counters:
+                    updated.append(
+                        {
+                            "id": connection_id,
+                            "upload": entry.upload,
+                            "download": entry.download,
+                            "upload_speed": entry.upload_speed,
+                            "download_speed": entry.download_speed,
+                        }
+                    )
+            left = [connection_id for connection_id in sent if connection_id not in visible_set]
+            result["added"] = added
+            result["updated"] = updated
+            result["removed"] = [connection_id for connection_id in left if connection_id not in gone]
+            result["closed"] = [connection_id for connection_id in left if connection_id in gone]
+            if visible != self._order:
+                result["order"] = visible
+        for connection_id in visible:
+            entries[connection_id].dirty = False
+        self._sent = {connection_id: entries[connection_id].counters for connection_id in visible}
+        self._order = visible
+        return result
+
+
+__all__ = [
+    "CONNECTION_SORT_KEYS",
+    "ConnectionsDeltaTracker",
+    "ConnectionsView",
+    "MAX_TRACKED_CONNECTIONS",
+]
@@ -13,6 +13,8 @@ import json
 import os
 import re
 import stat
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Callable, Mapping
@@ -33,6 +35,16 @@ _SENSITIVE_TOP_LEVEL_KEYS = {
     "secret",
 }
 _TOP_LEVEL_KEY_RE = re.compile(r"^([A-Za-z0-9_.-]+)\s*:\s*(.*)$")
+# Whole-text scans (multiline): the sensitive keys at column 0, the first
+# content line and YAML document markers/directives.
+_SENSITIVE_LINE_RE = re.compile(r"^(external-controller-unix|external-controller|secret)[ \t]*:(.*)$", re.M)
+_FIRST_CONTENT_RE = re.compile(r"^[ \t]*[^\s#]", re.M)
+_ROOT_KEY_RE = re.compile(r"[A-Za-z0-9_.-]+[ \t]*:(?:[ \t]|$)")
+_DOC_MARKER_RE = re.compile(r"^(?:---|\.\.\.|%)", re.M)
+
+_DISCOVERY_CACHE_MAX = 8
+_DISCOVERY_CACHE: "OrderedDict[tuple, tuple]" = OrderedDict()
+_DISCOVERY_CACHE_LOCK = threading.Lock()
 
 
 @dataclass(frozen=True)
@@ -201,18 +213,73 @@ def _parse_top_level_fallback(text: str) -> dict[str, Any]:
 
 def _duplicate_sensitive_keys(text: str) -> set[str]:
     counts: dict[str, int] = {}
-    for line in text.splitlines():
-        if not line or line[0].isspace() or line.lstrip().startswith("#"):
-            continue
-        match = _TOP_LEVEL_KEY_RE.match(line)
-        if not match:
-            continue
+    for match in _SENSITIVE_LINE_RE.finditer(text):
         key = match.group(1)
-        if key in _SENSITIVE_TOP_LEVEL_KEYS:
-            counts[key] = counts.get(key, 0) + 1
+        counts[key] = counts.get(key, 0) + 1
     return {key for key, count in counts.items() if count > 1}
 
 
+def _next_line_indented(text: str, end: int) -> bool:
+    """Whether the first content line after offset ``end`` is indented."""
+
+    pos = text.find("\n", end)
+    while pos != -1:
+        start = pos + 1
+        pos = text.find("\n", start)
+        line = text[start:] if pos == -1 else text[start:pos]
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        return line[0] in " \t"
+    return False
+
+
+def _scan_top_level(text: str) -> dict[str, Any] | None:
+    """Extract the sensitive keys without parsing the whole document.
+
+    Only the (one-line) sensitive entries are fed to YAML, so multi-MB rule
+    lists are never parsed.  Returns ``None`` when the layout is anything but
+    a plain block mapping with single-line sensitive values; the caller then
+    parses the full document.
+    """
+
+    first = _FIRST_CONTENT_RE.search(text)
+    if first is None:
+        return {}
+    body_start = first.start()
+    if text.startswith("---", body_start):
+        line_end = text.find("\n", body_start)
+        if line_end == -1 or _strip_inline_comment(text[body_start + 3 : line_end]):
+            return None
+        first = _FIRST_CONTENT_RE.search(text, line_end + 1)
+        if first is None:
+            return None
+        body_start = line_end + 1
+    if first.start() != first.end() - 1 or not _ROOT_KEY_RE.match(text, first.start()):
+        return None
+    if _DOC_MARKER_RE.search(text, body_start):
+        return None
+
+    result: dict[str, Any] = {}
+    for match in _SENSITIVE_LINE_RE.finditer(text, body_start):
+        raw = match.group(2)
+        if raw and raw[0] not in " \t\r":
+            return None
+        value = _strip_inline_comment(raw)
+        if not value or value[0] in "|>*&!{[" or _next_line_indented(text, match.end()):
+            return None
+        if value[0] in "\"'" and (len(value) < 2 or value[-1] != value[0]):
+            return None
+        try:
+            parsed = _yaml.safe_load(match.group(0))
+        except Exception:
+            return None
+        if not isinstance(parsed, Mapping) or match.group(1) not in parsed:
+            return None
+        result[match.group(1)] = parsed[match.group(1)]
+    return result
+
+
 def parse_mihomo_clash_config(text: str) -> dict[str, Any]:
     """Parse only the top-level values needed for Clash API discovery."""
 
@@ -222,6 +289,10 @@ def parse_mihomo_clash_config(text: str) -> dict[str, Any]:
     if _yaml is None:
         return _parse_top_level_fallback(text)
 
+    quick = _scan_top_level(text)
+    if quick is not None:
+        return quick
+
     parsed = _yaml.safe_load(text)
     if parsed is None:
         return {}
@@ -334,26 +405,27 @@ def _default_socket_probe(path: Path) -> bool:
         return False
 
 
-def discover_mihomo_clash_target(
+def _discover(
     config_path: str | os.PathLike[str],
     mihomo_root: str | os.PathLike[str],
     *,
     environ: Mapping[str, Any] | None = None,
     socket_probe: Callable[[Path], bool] | None = None,
-) -> MihomoClashDiscovery:
-    """Resolve the active config to a safe backend-only Clash API target."""
+) -> tuple[MihomoClashDiscovery, Path | None]:
+    """Uncached discovery; also returns the resolved unix socket path."""
 
+    socket_path: Path | None = None
     diagnostics: list[MihomoClashDiagnostic] = []
     text, read_error = _read_config(Path(config_path), Path(mihomo_root))
     if read_error:
         diagnostics.append(MihomoClashDiagnostic(read_error))
-        return MihomoClashDiscovery(configured=False, diagnostics=tuple(diagnostics))
+        return MihomoClashDiscovery(configured=False, diagnostics=tuple(diagnostics)), None
 
     try:
         config = parse_mihomo_clash_config(text or "")
     except Exception:
         diagnostics.append(MihomoClashDiagnostic("config_parse_failed"))
-        return MihomoClashDiscovery(configured=False, diagnostics=tuple(diagnostics))
+        return MihomoClashDiscovery(configured=False, diagnostics=tuple(diagnostics)), None
 
     try:
         secret = _scalar_text(config.get("secret"))
@@ -373,7 +445,7 @@ def discover_mihomo_clash_target(
             configured=configured,
             diagnostics=tuple(diagnostics),
             secret_configured=bool(secret),
-        )
+        ), None
 
     unix_target: MihomoClashTarget | None = None
     if unix_configured:
@@ -423,9 +495,79 @@ def discover_mihomo_clash_target(
         target=target,
         diagnostics=tuple(diagnostics),
         secret_configured=bool(secret),
+    ), socket_path
+
+
+def _socket_identity(path: Path | None) -> tuple[int, int, bool] | None:
+    if path is None:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (int(st.st_dev), int(st.st_ino), stat.S_ISSOCK(st.st_mode))
+
+
+def _discovery_cache_key(
+    config_path: str | os.PathLike[str],
+    mihomo_root: str | os.PathLike[str],
+    environ: Mapping[str, Any] | None,
+) -> tuple | None:
+    try:
+        root = Path(mihomo_root).expanduser().resolve(strict=True)
+        resolved = Path(config_path).expanduser().resolve(strict=True)
+        st = resolved.stat()
+    except (OSError, RuntimeError):
+        return None
+    source = os.environ if environ is None else environ
+    return (
+        str(resolved),
+        str(root),
+        int(st.st_dev),
+        int(st.st_ino),
+        int(st.st_size),
+        int(st.st_mtime_ns),
+        str(source.get(CLASH_API_ALLOWED_PORTS_ENV) or ""),
     )
 
 
+def discover_mihomo_clash_target(
+    config_path: str | os.PathLike[str],
+    mihomo_root: str | os.PathLike[str],
+    *,
+    environ: Mapping[str, Any] | None = None,
+    socket_probe: Callable[[Path], bool] | None = None,
+) -> MihomoClashDiscovery:
+    """Resolve the active config to a safe backend-only Clash API target.
+
+    Results are memoized per config realpath/size/mtime, allowed ports and
+    the identity of the unix socket, so Clash API requests (and the
+    once-per-second stream polls) only pay a couple of ``stat()`` calls.
+    A custom ``socket_probe`` disables the cache.
+    """
+
+    key = _discovery_cache_key(config_path, mihomo_root, environ) if socket_probe is None else None
+    if key is not None:
+        with _DISCOVERY_CACHE_LOCK:
+            cached = _DISCOVERY_CACHE.get(key)
+        if cached is not None and _socket_identity(cached[1]) == cached[2]:
+            return cached[0]
+
+    result, socket_path = _discover(config_path, mihomo_root, environ=environ, socket_probe=socket_probe)
+    ident = _socket_identity(socket_path)
+    unix_ready = result.target is not None and result.target.transport == "unix"
+    if socket_path is not None and unix_ready != bool(ident and ident[2]):
+        # The socket appeared/vanished while probing; do not pin that state.
+        key = None
+    if key is not None:
+        with _DISCOVERY_CACHE_LOCK:
+            _DISCOVERY_CACHE[key] = (result, socket_path, ident)
+            _DISCOVERY_CACHE.move_to_end(key)
+            while len(_DISCOVERY_CACHE) > _DISCOVERY_CACHE_MAX:
+                _DISCOVERY_CACHE.popitem(last=False)
+    return result
+
+
 __all__ = [
     "CLASH_API_ALLOWED_PORTS_ENV",
     "DEFAULT_CLASH_API_PORT",
@@ -10,6 +10,7 @@ from typing import Any, Callable
 from urllib.parse import parse_qs, urlsplit
 
 from services.mihomo_clash_client import MihomoClashClient, MihomoClashClientError
+from services.mihomo_clash_connections import ConnectionsDeltaTracker, ConnectionsView
 from services.mihomo_clash_dto import (
     build_mihomo_clash_connections_dto,
     build_mihomo_clash_log_entry_dto,
@@ -47,6 +48,7 @@ class _StreamLease:
 
 _ACTIVE_STREAMS: dict[str, _StreamLease] = {}
 MAX_ACTIVE_STREAMS = 8
+MAX_VIEW_MESSAGE_BYTES = 4096
 
 
 def _request_host(environ: dict[str, Any]) -> str:
@@ -101,6 +103,48 @@ def _log_envelope(
     return message
 
 
+class _ViewInbox:
+    """Latest browser-selected view, handed from the reader to the stream loop."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._view: ConnectionsView | None = None
+        self.closed = threading.Event()
+
+    def put(self, view: ConnectionsView) -> None:
+        with self._lock:
+            self._view = view
+
+    def take(self) -> ConnectionsView | None:
+        with self._lock:
+            view, self._view = self._view, None
+        return view
+
+
+def _read_view_messages(ws: Any, inbox: _ViewInbox) -> None:
+    """Collect ``{"type": "view", ...}`` messages until the browser closes."""
+
+    try:
+        while True:
+            raw = ws.receive()
+            if raw is None:
+                break
+            if isinstance(raw, (bytes, bytearray)):
+                raw = bytes(raw).decode("utf-8", "replace")
+            if len(raw) > MAX_VIEW_MESSAGE_BYTES:
+                continue
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                continue
+            if isinstance(message, dict) and message.get("type") == "view":
+                inbox.put(ConnectionsView.from_params(message))
+    except Exception:
+        pass
+    finally:
+        inbox.closed.set()
+
+
 def _stream_key(client_key: str, stream_kind: str) -> str:
     client = str(client_key or "unknown")[:96]
     kind = str(stream_kind or "default").strip().lower()[:24] or "default"
@@ -156,7 +200,12 @@ def handle_mihomo_clash_connections_request(
     client_factory=MihomoClashClient,
     device_map_factory=get_mihomo_clash_device_map,
 ):
-    """Stream bounded, normalized connection DTOs until either side closes."""
+    """Stream bounded, normalized connection DTOs until either side closes.
+
+    With ``delta=1`` in the query string the first frame is a full snapshot of
+    the requested view and later frames only carry changes; the browser may
+    switch the view at any time with a ``{"type": "view", ...}`` message.
+    """
 
     if environ.get("wsgi.websocket") is None:
         return fallback_app(environ, start_response)
@@ -181,12 +230,24 @@ def handle_mihomo_clash_connections_request(
         _close_ws(ws)
         return []
 
+    # ``delta=1`` opts into snapshot+delta frames over a server-side view; the
+    # plain bounded snapshot per frame stays the default for older clients.
+    tracker = None
+    inbox = None
+    if str((params.get("delta") or [""])[0] or "").strip() == "1":
+        tracker = ConnectionsDeltaTracker(ConnectionsView.from_params(params))
+        if callable(getattr(ws, "receive", None)):
+            inbox = _ViewInbox()
+            threading.Thread(target=_read_view_messages, args=(ws, inbox), daemon=True).start()
+
     sequence = 0
     ws_debug("mihomo clash connections stream opened", client=environ.get("REMOTE_ADDR", "unknown"))
     try:
         while True:
             if lease.cancelled.is_set():
                 break
+            if inbox is not None and inbox.closed.is_set():
+                break
             # The official GET endpoint is a bounded snapshot. Polling it inside
             # this one browser stream also works for Unix sockets and avoids a
             # second WebSocket implementation/credential path on the router.
@@ -205,11 +266,18 @@ def handle_mihomo_clash_connections_request(
             raw_frame = client.request_json("connections_snapshot").payload
             memory_frame = client.request_memory().payload
             sequence += 1
-            payload = build_mihomo_clash_connections_dto(
-                raw_frame,
-                device_map=device_map_factory(),
-                memory=memory_frame.get("inuse") if isinstance(memory_frame, dict) else 0,
-            )
+            memory = memory_frame.get("inuse") if isinstance(memory_frame, dict) else 0
+            if tracker is not None:
+                view = inbox.take() if inbox is not None else None
+                if view is not None:
+                    tracker.set_view(view)
+                payload = tracker.frame(raw_frame, device_map=device_map_factory(), memory=memory)
+            else:
+                payload = build_mihomo_clash_connections_dto(
+                    raw_frame,
+                    device_map=device_map_factory(),
+                    memory=memory,
+                )
             if not _send(ws, _envelope(sequence=sequence, state="live", payload=payload)):
                 break
             _cooperative_sleep(1.0)
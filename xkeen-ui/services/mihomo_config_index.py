@@ -0,0 +1,641 @@
+"""Structural line index of a Mihomo ``config.yaml`` text.
+
+The text patch helpers (insert / rename / replace a proxy, subscription
+block refresh) only need to know *where* things are: top-level section line
+ranges, proxy blocks under ``proxies:`` by name and the member lines of each
+proxy-group.  :class:`ConfigIndex` records that in one pass over the lines
+and indexes are cached per content hash.
+
+:class:`ConfigDocument` applies edits to the line list in batches: every
+batch is spliced in one pass, sections that were not touched are shifted and
+only the touched ``proxies:`` / ``proxy-groups:`` section is re-indexed.  So
+replacing a few hundred subscription proxies stays linear in the size of the
+config instead of rescanning it once per proxy.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+INDEX_CACHE_MAX = 16
+
+_NAME_ITEM_RE = re.compile(r"^(\s*)-\s+name\s*:\s*(.*?)\s*$")
+_NAME_LINE_RE = re.compile(r"^(\s*)-\s+name:\s*(.+?)(\s*(#.*)?)$")
+_INLINE_LIST_RE = re.compile(r"^(\s*proxies\s*:\s*\[)(.*?)(\]\s*(#.*)?)$")
+_EMPTY_PROXIES_RE = re.compile(r"^(proxies\s*:)\s*(?:\[\]|\{\}|null|~)?\s*(#.*)?$")
+_TRUE_VALUES = {"true", "yes", "on", "1"}
+
+Edit = Tuple[int, int, List[str]]
+
+
+def _strip_comment(text: str) -> str:
+    in_single = in_double = escaped = False
+    for idx, ch in enumerate(text):
+        if in_double:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_double = False
+            continue
+        if in_single:
+            if ch == "'":
+                in_single = False
+            continue
+        if ch == '"':
+            in_double = True
+        elif ch == "'":
+            in_single = True
+        elif ch == "#" and (idx == 0 or text[idx - 1] in " \t"):
+            return text[:idx].rstrip()
+    return text.rstrip()
+
+
+def yaml_scalar(raw: str) -> str:
+    """Plain value of a one-line YAML scalar (comment stripped, unquoted)."""
+
+    text = _strip_comment(str(raw or "").strip()).strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        inner = text[1:-1]
+        if text[0] == "'":
+            return inner.replace("''", "'")
+        return re.sub(r"\\(.)", r"\1", inner)
+    return text
+
+
+def quote_list_item(name: str) -> str:
+    value = str(name or "").strip()
+    if value.startswith('"') or value.startswith("'"):
+        return value
+    return f'"{value}"'
+
+
+def quote_name(value: str) -> str:
+    text = str(value or "").replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+class Section:
+    __slots__ = ("key", "start", "end")
+
+    def __init__(self, key: str, start: int, end: int) -> None:
+        self.key = key
+        self.start = start
+        self.end = end
+
+
+class ProxyBlock:
+    """``- name:`` item under ``proxies:``; ``end`` is the next item (exclusive)."""
+
+    __slots__ = ("name", "start", "end")
+
+    def __init__(self, name: str, start: int, end: int) -> None:
+        self.name = name
+        self.start = start
+        self.end = end
+
+
+class ProxyGroup:
+    """One proxy-group item and the lines of its ``proxies`` members."""
+
+    __slots__ = (
+        "name",
+        "start",
+        "end",
+        "include_all",
+        "include_indent",
+        "proxies_line",
+        "proxies_indent",
+        "inline",
+        "members",
+    )
+
+    def __init__(self, name: str, start: int, end: int) -> None:
+        self.name = name
+        self.start = start
+        self.end = end
+        self.include_all: Optional[bool] = None
+        self.include_indent = ""
+        self.proxies_line: Optional[int] = None
+        self.proxies_indent = 0
+        self.inline = False
+        self.members: List[Tuple[int, str]] = []
+
+    def copy(self) -> "ProxyGroup":
+        other = ProxyGroup(self.name, self.start, self.end)
+        other.include_all = self.include_all
+        other.include_indent = self.include_indent
+        other.proxies_line = self.proxies_line
+        other.proxies_indent = self.proxies_indent
+        other.inline = self.inline
+        other.members = list(self.members)
+        return other
+
+    def shift(self, delta: int) -> None:
+        self.start += delta
+        self.end += delta
+        if self.proxies_line is not None:
+            self.proxies_line += delta
+        self.members = [(pos + delta, name) for pos, name in self.members]
+
+
+class ConfigIndex:
+    """Line ranges of a config text (see module docstring)."""
+
+    __slots__ = ("sections", "proxies_section", "proxy_indent", "proxies", "groups_section", "groups")
+
+    def __init__(self) -> None:
+        self.sections: List[Section] = []
+        self.proxies_section: Optional[Section] = None
+        self.proxy_indent: Optional[int] = None
+        self.proxies: List[ProxyBlock] = []
+        self.groups_section: Optional[Section] = None
+        self.groups: List[ProxyGroup] = []
+
+    @classmethod
+    def build(cls, lines: Sequence[str]) -> "ConfigIndex":
+        index = cls()
+        current: Optional[Section] = None
+        for pos, line in enumerate(lines):
+            if not line or line[0] in " \t#-":
+                continue
+            if current is not None:
+                current.end = pos
+            current = Section(line.split(":", 1)[0].strip(), pos, len(lines))
+            index.sections.append(current)
+        index.proxies_section = index.section("proxies")
+        index.groups_section = index.section("proxy-groups")
+        index._index_proxies(lines)
+        index._index_groups(lines)
+        return index
+
+    def copy(self) -> "ConfigIndex":
+        other = ConfigIndex()
+        mapping: Dict[int, Section] = {}
+        for sec in self.sections:
+            mapping[id(sec)] = dup = Section(sec.key, sec.start, sec.end)
+            other.sections.append(dup)
+        if self.proxies_section is not None:
+            other.proxies_section = mapping[id(self.proxies_section)]
+        if self.groups_section is not None:
+            other.groups_section = mapping[id(self.groups_section)]
+        other.proxy_indent = self.proxy_indent
+        other.proxies = [ProxyBlock(b.name, b.start, b.end) for b in self.proxies]
+        other.groups = [g.copy() for g in self.groups]
+        return other
+
+    # -- lookups ----------------------------------------------------------------
+
+    def section(self, key: str) -> Optional[Section]:
+        for sec in self.sections:
+            if sec.key == key:
+                return sec
+        return None
+
+    def proxy(self, name: str) -> Optional[ProxyBlock]:
+        for block in self.proxies:
+            if block.name == name:
+                return block
+        return None
+
+    def proxy_names(self) -> List[str]:
+        return [block.name for block in self.proxies]
+
+    def group(self, name: str) -> Optional[ProxyGroup]:
+        for group in self.groups:
+            if group.name == name:
+                return group
+        return None
+
+    # -- section parsers --------------------------------------------------------
+
+    def _index_proxies(self, lines: Sequence[str]) -> None:
+        self.proxies = []
+        self.proxy_indent = None
+        sec = self.proxies_section
+        if sec is None or yaml_scalar(lines[sec.start].partition(":")[2]):
+            return
+        for pos in range(sec.start + 1, sec.end):
+            match = _NAME_ITEM_RE.match(lines[pos])
+            if not match:
+                continue
+            indent = len(match.group(1))
+            if self.proxy_indent is None:
+                self.proxy_indent = indent
+            if indent != self.proxy_indent:
+                continue
+            if self.proxies:
+                self.proxies[-1].end = pos
+            self.proxies.append(ProxyBlock(yaml_scalar(match.group(2)), pos, sec.end))
+
+    def _index_groups(self, lines: Sequence[str]) -> None:
+        self.groups = []
+        sec = self.groups_section
+        if sec is None:
+            return
+        item_indent: Optional[int] = None
+        current: Optional[ProxyGroup] = None
+        list_indent = -1
+        for pos in range(sec.start + 1, sec.end):
+            line = lines[pos]
+            stripped = line.lstrip()
+            if not stripped or stripped.startswith("#"):
+                continue
+            indent = len(line) - len(stripped)
+            match = _NAME_ITEM_RE.match(line)
+            if match and (item_indent is None or indent == item_indent):
+                item_indent = indent
+                if current is not None:
+                    current.end = pos
+                current = ProxyGroup(yaml_scalar(match.group(2)), pos, sec.end)
+                self.groups.append(current)
+                list_indent = -1
+                continue
+            if current is None:
+                continue
+            if list_indent >= 0:
+                # PyYAML's safe_dump writes members at the indent of the
+                # ``proxies:`` key itself ("  proxies:" / "  - x").
+                is_item = stripped == "-" or stripped.startswith("- ")
+                if indent > list_indent or (indent == list_indent and is_item):
+                    if stripped.startswith("-"):
+                        current.members.append((pos, yaml_scalar(stripped[1:])))
+                    continue
+                list_indent = -1
+            if stripped.startswith("proxies:"):
+                current.proxies_line = pos
+                current.proxies_indent = indent
+                current.inline = stripped[len("proxies:"):].lstrip().startswith("[")
+                if not current.inline:
+                    list_indent = indent
+            elif stripped.startswith("include-all:"):
+                current.include_all = yaml_scalar(stripped.split(":", 1)[1]).lower() in _TRUE_VALUES
+                current.include_indent = line[:indent]
+
+
+_INDEX_CACHE: "OrderedDict[bytes, ConfigIndex]" = OrderedDict()
+_INDEX_CACHE_LOCK = threading.Lock()
+
+
+def _text_key(text: str) -> bytes:
+    return hashlib.sha1(text.encode("utf-8", "surrogatepass")).digest()
+
+
+def normalize_newlines(text: str) -> str:
+    return str(text or "").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def config_index(text: str) -> ConfigIndex:
+    """Index of ``text`` (newline-normalized), cached per content hash.
+
+    The returned index is shared; copy it before mutating.
+    """
+
+    text = normalize_newlines(text)
+    key = _text_key(text)
+    with _INDEX_CACHE_LOCK:
+        cached = _INDEX_CACHE.get(key)
+        if cached is not None:
+            _INDEX_CACHE.move_to_end(key)
+            return cached
+    index = ConfigIndex.build(text.splitlines())
+    _remember(key, index)
+    return index
+
+
+def _remember(key: bytes, index: ConfigIndex) -> None:
+    with _INDEX_CACHE_LOCK:
+        _INDEX_CACHE[key] = index
+        _INDEX_CACHE.move_to_end(key)
+        while len(_INDEX_CACHE) > INDEX_CACHE_MAX:
+            _INDEX_CACHE.popitem(last=False)
+
+
+def _inline_items(line: str) -> Optional[Tuple[str, List[str], str]]:
+    match = _INLINE_LIST_RE.match(line)
+    if not match:
+        return None
+    inner = (match.group(2) or "").strip()
+    items = [item.strip() for item in inner.split(",")] if inner else []
+    return match.group(1), items, match.group(3)
+
+
+def _inline_append(line: str, names: Sequence[str]) -> str:
+    stripped = line.lstrip()
+    indent = line[: len(line) - len(stripped)]
+    rest = stripped[len("proxies:"):].lstrip()
+    if not (rest.startswith("[") and rest.endswith("]")):
+        return line
+    inner = rest[1:-1].strip()
+    items = [item.strip() for item in inner.split(",")] if inner else []
+    existing = {yaml_scalar(item) for item in items if item}
+    changed = False
+    for name in names:
+        if yaml_scalar(name) in existing:
+            continue
+        existing.add(yaml_scalar(name))
+        item = name
+        if not (item.startswith('"') or item.startswith("'")) and re.search(r"[\s,]", item):
+            item = f'"{item}"'
+        items.append(item)
+        changed = True
+    if not changed:
+        return line
+    return f"{indent}proxies: [{', '.join(items)}]"
+
+
+class ConfigDocument:
+    """Editable config text that keeps its :class:`ConfigIndex` up to date."""
+
+    def __init__(self, text: str) -> None:
+        text = normalize_newlines(text)
+        self.trailing_newline = text.endswith("\n")
+        self.lines: List[str] = text.splitlines()
+        self.index = config_index(text).copy()
+
+    def text(self, *, trailing_newline: Optional[bool] = None) -> str:
+        if trailing_newline is None:
+            trailing_newline = self.trailing_newline
+        out = "\n".join(self.lines) + ("\n" if trailing_newline else "")
+        if trailing_newline or not self.lines or self.lines[-1]:
+            # Feed the cache: clients usually send the patched text back.
+            _remember(_text_key(out), self.index.copy())
+        return out
+
+    # -- batch splice -------------------------------------------------------------
+
+    def _apply(self, edits: List[Edit], *, rebuild: bool = False) -> bool:
+        """Apply non-overlapping ``(start, end, new_lines)`` edits in one pass."""
+
+        if not edits:
+            return False
+        edits = sorted(edits, key=lambda e: (e[0], e[1]))
+        lines = self.lines
+        out: List[str] = []
+        ends: List[int] = []
+        deltas: List[int] = []
+        pos = 0
+        total = 0
+        for start, end, new_lines in edits:
+            out.extend(lines[pos:start])
+            out.extend(new_lines)
+            pos = end
+            total += len(new_lines) - (end - start)
+            ends.append(end)
+            deltas.append(total)
+        out.extend(lines[pos:])
+        self.lines = out
+
+        index = self.index
+        if rebuild:
+            self.index = ConfigIndex.build(out)
+            return True
+
+        def move(p: int) -> int:
+            k = bisect_right(ends, p)
+            return p + (deltas[k - 1] if k else 0)
+
+        def touched(sec: Optional[Section]) -> bool:
+            return sec is not None and any(sec.start < e and s <= sec.end for s, e, _ in edits)
+
+        proxies_touched = touched(index.proxies_section)
+        groups_touched = touched(index.groups_section)
+        proxies_delta = groups_delta = 0
+        if index.proxies_section is not None:
+            proxies_delta = move(index.proxies_section.start) - index.proxies_section.start
+        if index.groups_section is not None:
+            groups_delta = move(index.groups_section.start) - index.groups_section.start
+        for sec in index.sections:
+            sec.start = move(sec.start)
+            sec.end = move(sec.end)
+
+        if proxies_touched:
+            index._index_proxies(out)
+        elif proxies_delta:
+            for block in index.proxies:
+                block.start += proxies_delta
+                block.end += proxies_delta
+        if groups_touched:
+            index._index_groups(out)
+        elif groups_delta:
+            for group in index.groups:
+                group.shift(groups_delta)
+        return True
+
+    # -- proxies ------------------------------------------------------------------
+
+    def replace_proxy(self, name: str, block_lines: Sequence[str]) -> bool:
+        """Replace the block of proxy ``name`` (lines are relative to the item indent)."""
+
+        block = self.index.proxy(name)
+        if block is None:
+            return False
+        line = self.lines[block.start]
+        indent = line[: len(line) - len(line.lstrip())]
+        return self._apply([(block.start, block.end, [indent + ln for ln in block_lines])])
+
+    def remove_proxies(self, names: Iterable[str]) -> bool:
+        """Drop proxy blocks by name together with the blank lines before them."""
+
+        targets = set(names)
+        sec = self.index.proxies_section
+        if not targets or sec is None:
+            return False
+        edits: List[Edit] = []
+        floor = sec.start + 1
+        for block in self.index.proxies:
+            if block.name not in targets:
+                continue
+            start = block.start
+            while start > floor and not self.lines[start - 1].strip():
+                start -= 1
+            if edits and edits[-1][1] == start:
+                edits[-1] = (edits[-1][0], block.end, [])
+            else:
+                edits.append((start, block.end, []))
+            floor = block.end
+        return self._apply(edits)
+
+    def insert_proxies(self, blocks: Sequence[Sequence[str]]) -> bool:
+        """Append proxy blocks (item-relative lines) at the end of ``proxies:``.
+
+        Without a block ``proxies:`` section one is created; the comment
+        markers of the bundled templates decide where.
+        """
+
+        blocks = [[ln for ln in block if ln.strip()] for block in blocks]
+        blocks = [block for block in blocks if block]
+        if not blocks:
+            return False
+        lines = self.lines
+        sec = self.index.proxies_section
+        if sec is not None and _EMPTY_PROXIES_RE.match(lines[sec.start]):
+            match = _EMPTY_PROXIES_RE.match(lines[sec.start])
+            fixed = f"proxies:{(' ' + match.group(2).strip()) if match.group(2) else ''}"
+            if fixed != lines[sec.start]:
+                self._apply([(sec.start, sec.start + 1, [fixed])])
+                lines = self.lines
+                sec = self.index.proxies_section
+        if sec is None or yaml_scalar(lines[sec.start].partition(":")[2]):
+            return self._insert_proxies_section(blocks)
+
+        insert_at = sec.end
+        while insert_at > sec.start + 1 and not lines[insert_at - 1].strip():
+            insert_at -= 1
+        while insert_at > sec.start + 1 and lines[insert_at - 1].lstrip().startswith("#"):
+            insert_at -= 1
+        has_items = any(
+            line.strip() and not line.lstrip().startswith("#")
+            for line in lines[sec.start + 1 : insert_at]
+        )
+        pad = " " * (self.index.proxy_indent if self.index.proxy_indent is not None else 2)
+        new_lines: List[str] = []
+        for block in blocks:
+            if new_lines or (has_items and insert_at > sec.start + 1 and lines[insert_at - 1].strip()):
+                new_lines.append("")
+            new_lines.extend(pad + ln for ln in block)
+        if insert_at < len(lines) and lines[insert_at].strip():
+            new_lines.append("")
+        return self._apply([(insert_at, insert_at, new_lines)])
+
+    def _insert_proxies_section(self, blocks: List[List[str]]) -> bool:
+        lines = self.lines
+        first = [f"  {ln}" for ln in blocks[0]]
+        rest: List[str] = []
+        for block in blocks[1:]:
+            rest.append("")
+            rest.extend(f"  {ln}" for ln in block)
+        markers = ("подключение с использованием подписки", "подписки")
+        for pos, line in enumerate(lines):
+            lower = line.lower()
+            if "пример vless" in lower:
+                continue
+            if any(marker in lower for marker in markers):
+                insert_at = pos
+                if pos > 0 and lines[pos - 1].strip().startswith("#") and "Пример VLESS" not in lines[pos - 1]:
+                    insert_at = pos - 1
+                new_lines = ["proxies:"] + first + rest
+                following = lines[insert_at].strip() if insert_at < len(lines) else ""
+                if following.startswith("#") or (rest and following):
+                    new_lines.append("")
+                return self._apply([(insert_at, insert_at, new_lines)], rebuild=True)
+        return self._apply([(len(lines), len(lines), ["proxies:"] + first + rest)], rebuild=True)
+
+    def rename_proxy(self, old_name: str, new_name: str) -> bool:
+        """Rename a proxy block and its proxy-group references."""
+
+        edits: List[Edit] = []
+        for block in self.index.proxies:
+            if block.name != old_name:
+                continue
+            match = _NAME_LINE_RE.match(self.lines[block.start])
+            if match:
+                comment = match.group(3) if match.group(4) else ""
+                edits.append((block.start, block.start + 1, [f"{match.group(1)}- name: {quote_name(new_name)}{comment}"]))
+        for group in self.index.groups:
+            if group.inline and group.proxies_line is not None:
+                line = self.lines[group.proxies_line]
+                parsed = _inline_items(line)
+                if parsed and any(yaml_scalar(item) == old_name for item in parsed[1]):
+                    items = [quote_list_item(new_name) if yaml_scalar(item) == old_name else item for item in parsed[1]]
+                    edits.append((group.proxies_line, group.proxies_line + 1, [f"{parsed[0]}{', '.join(items)}{parsed[2]}"]))
+            for pos, name in group.members:
+                if name == old_name:
+                    line = self.lines[pos]
+                    indent = line[: len(line) - len(line.lstrip())]
+                    edits.append((pos, pos + 1, [f"{indent}- {quote_list_item(new_name)}"]))
+        return self._apply(edits)
+
+    # -- proxy-groups ---------------------------------------------------------------
+
+    def remove_group_references(self, names: Iterable[str]) -> bool:
+        """Drop ``names`` from the proxies of every proxy-group."""
+
+        targets = set(names)
+        if not targets:
+            return False
+        edits: List[Edit] = []
+        for group in self.index.groups:
+            if group.inline and group.proxies_line is not None:
+                line = self.lines[group.proxies_line]
+                parsed = _inline_items(line)
+                if parsed and parsed[1]:
+                    kept = [item for item in parsed[1] if yaml_scalar(item) not in targets]
+                    if len(kept) != len(parsed[1]):
+                        edits.append((group.proxies_line, group.proxies_line + 1, [f"{parsed[0]}{', '.join(kept)}{parsed[2]}"]))
+            for pos, name in group.members:
+                if name in targets:
+                    edits.append((pos, pos + 1, []))
+        return self._apply(edits)
+
+    def add_to_groups(self, names: Sequence[str], groups: Iterable[str]) -> bool:
+        """Append proxy ``names`` to the selected proxy-groups.
+
+        Groups with ``include-all: true`` pick proxies up by themselves and
+        are left alone; a group with only ``include-all: false`` gets an
+        explicit ``proxies:`` list.
+        """
+
+        wanted = {group.strip() for group in groups if group and group.strip()}
+        names = [str(name or "").strip() for name in names]
+        names = [name for name in names if name]
+        if not wanted or not names:
+            return False
+        edits: List[Edit] = []
+        for group in self.index.groups:
+            if group.name not in wanted or group.include_all:
+                continue
+            if group.proxies_line is not None and group.inline:
+                line = self.lines[group.proxies_line]
+                patched = _inline_append(line, names)
+                if patched != line:
+                    edits.append((group.proxies_line, group.proxies_line + 1, [patched]))
+                continue
+            if group.proxies_line is not None:
+                present = {name for _pos, name in group.members}
+                missing: List[str] = []
+                for name in names:
+                    plain = yaml_scalar(name)
+                    if plain not in present:
+                        present.add(plain)
+                        missing.append(plain)
+                if not missing:
+                    continue
+                if group.members:
+                    after = group.members[-1][0]
+                    last = self.lines[after]
+                    indent = last[: len(last) - len(last.lstrip())]
+                else:
+                    after = group.proxies_line
+                    indent = " " * (group.proxies_indent + 2)
+                edits.append((after + 1, after + 1, [f"{indent}- {quote_list_item(n)}" for n in missing]))
+                continue
+            if group.include_all is not None:
+                end = group.end
+                while end > group.start + 1 and not self.lines[end - 1].strip():
+                    end -= 1
+                indent = group.include_indent or "    "
+                plain = list(OrderedDict.fromkeys(yaml_scalar(n) for n in names))
+                edits.append((end, end, [f"{indent}proxies:"] + [f"{indent}  - {quote_list_item(n)}" for n in plain]))
+        return self._apply(edits)
+
+
+__all__ = [
+    "ConfigDocument",
+    "ConfigIndex",
+    "ProxyBlock",
+    "ProxyGroup",
+    "Section",
+    "config_index",
+    "normalize_newlines",
+    "quote_list_item",
+    "quote_name",
+    "yaml_scalar",
+]
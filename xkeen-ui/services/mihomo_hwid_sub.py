@@ -29,8 +29,14 @@ from typing import Any, Dict
 from urllib.parse import urlparse
 
 from services import happ_links
+from services.device_identity import (
+    MIHOMO_BINARIES,
+    get_device_identity_cache,
+    mihomo_fingerprint,
+    ndmc_fingerprint,
+)
 from services.net import net_call
-from services.url_policy import URLPolicy, env_flag, is_url_allowed
+from services.url_policy import NotModifiedError, URLPolicy, env_flag, is_url_allowed
 
 
 _B64_RE = re.compile(r"^[A-Za-z0-9+/=]+$")
@@ -366,7 +372,10 @@ def _detect_device_model() -> str:
     model = _sanitize_model_for_header(model_raw) or (model_raw or "").strip()
     if model:
         return model
+    return _device_model_fallback()
+
 
+def _device_model_fallback() -> str:
     m = _read_text("/proc/device-tree/model")
     if m:
         return m
@@ -389,7 +398,7 @@ def _detect_device_model() -> str:
 
 
 def _detect_mihomo_version() -> str | None:
-    binaries = ("mihomo", "/opt/sbin/mihomo", "/opt/bin/mihomo")
+    binaries = MIHOMO_BINARIES
     flags = ("-v", "-V")
     seen: set[tuple[str, str]] = set()
     for binary in binaries:
@@ -441,8 +450,39 @@ def _mihomo_hwid_user_agent(version: str | None = None) -> str:
     return f"ClashMeta/{ua_ver}; mihomo/{ua_ver}"
 
 
-def get_device_info() -> Dict[str, Any]:
-    """Collect best-effort device info + headers used by HWID subscriptions."""
+def _cached_ndmc_identity(refresh: bool = False) -> Dict[str, str]:
+    """Model/OS title from ``ndmc``, cached until ndmc or the kernel changes."""
+
+    def compute() -> Dict[str, str]:
+        ndm = _ndmc_show_version()
+        out: Dict[str, str] = {}
+        model_raw = _parse_ndmc_model_raw(ndm)
+        os_ver = _parse_ndmc_os_ver(ndm)
+        if model_raw:
+            out["model_raw"] = model_raw
+        if os_ver:
+            out["os_ver"] = os_ver
+        return out
+
+    value = get_device_identity_cache().get("ndmc", ndmc_fingerprint(), compute, refresh=refresh)
+    return value if isinstance(value, dict) else {}
+
+
+def _cached_mihomo_version(refresh: bool = False) -> str | None:
+    """``mihomo -v`` result, cached until any mihomo binary changes."""
+
+    value = get_device_identity_cache().get(
+        "mihomo_version", mihomo_fingerprint(), lambda: _detect_mihomo_version(), refresh=refresh
+    )
+    return value if isinstance(value, str) and value else None
+
+
+def get_device_info(*, refresh: bool = False) -> Dict[str, Any]:
+    """Collect best-effort device info + headers used by HWID subscriptions.
+
+    ndmc/mihomo probes are served from the device identity cache; pass
+    ``refresh=True`` to re-run them.
+    """
     # MAC displayed for UX + HWID normalized for headers (upstream-compatible).
     env_hwid, env_source = _env_hwid_override()
     mac = _pick_mac_address_keenetic() or ""
@@ -461,9 +501,9 @@ def get_device_info() -> Dict[str, Any]:
         hwid = hwid or ""
         hwid_source = hwid_source or "none"
 
-    ndm = _ndmc_show_version()
-    os_ver = _parse_ndmc_os_ver(ndm)
-    model_raw = _parse_ndmc_model_raw(ndm)
+    ndm = _cached_ndmc_identity(refresh)
+    os_ver = ndm.get("os_ver")
+    model_raw = ndm.get("model_raw")
     model_hdr = _sanitize_model_for_header(model_raw)
 
     # Keenetic OS version is preferable for HWID subscriptions.
@@ -475,8 +515,8 @@ def get_device_info() -> Dict[str, Any]:
     os_release = os_ver or kernel_release
 
     # For headers we use sanitized model (to match upstream install.sh).
-    device_model = model_hdr or _detect_device_model()
-    mh_ver_raw = _detect_mihomo_version()
+    device_model = model_hdr or (model_raw or "").strip() or _device_model_fallback()
+    mh_ver_raw = _cached_mihomo_version(refresh)
     mh_ver = _normalize_mihomo_version_for_ua(mh_ver_raw)
     ua = _mihomo_hwid_user_agent(mh_ver_raw)
     hwid_format = _hwid_format_kind(hwid)
@@ -997,12 +1037,21 @@ def _fetch_provider_subscription_text(
         handlers.append(urllib.request.HTTPSHandler(context=ctx))
 
     opener = urllib.request.build_opener(*handlers)
-    with opener.open(req, timeout=float(timeout)) as resp:
+    try:
+        resp_cm = opener.open(req, timeout=float(timeout))
+    except urllib.error.HTTPError as exc:
+        # Only conditional requests (If-None-Match / If-Modified-Since) get a 304.
+        if exc.code == 304:
+            raise NotModifiedError("not_modified") from exc
+        raise
+    with resp_cm as resp:
         raw = resp.read(max(1, int(max_bytes)) + 1)
         if len(raw) > max_bytes:
             raise ValueError("subscription_too_large")
         content_type = resp.headers.get("Content-Type") or ""
         hwid_response_headers = _extract_hwid_response_headers(resp.headers)
+        etag = str(resp.headers.get("ETag") or "")
+        last_modified = str(resp.headers.get("Last-Modified") or "")
 
     charset = "utf-8"
     m = re.search(r"charset=([A-Za-z0-9._-]+)", content_type, flags=re.I)
@@ -1017,6 +1066,8 @@ def _fetch_provider_subscription_text(
         "content_type": content_type,
         "bytes": len(raw),
         "hwid_response_headers": hwid_response_headers,
+        "etag": etag,
+        "last_modified": last_modified,
     }
 
 
@@ -0,0 +1,239 @@
+"""Stale-while-revalidate cache for the loopback provider adapters.
+
+``/mihomo/provider.yaml`` and ``/mihomo/hwid/provider.yaml`` are pulled by
+Mihomo itself on every provider refresh.  Fetching the upstream subscription
+inline makes that pull as slow as the provider (up to the 20 s timeout) and
+an upstream outage turns into an empty provider.  :class:`ProviderPayloadCache`
+keeps the converted payload per upstream request:
+
+* within ``ttl`` the cached payload is served as is;
+* for ``stale_while_revalidate`` seconds after that it is still served
+  immediately while one background refresh revalidates it
+  (``If-None-Match`` / ``If-Modified-Since``; a ``304`` just renews the
+  entry);
+* later the request waits up to ``revalidate_timeout`` for that refresh and
+  falls back to the last good payload only when it fails or is too slow, up
+  to ``stale_if_error`` seconds past ``ttl``; older entries are refetched
+  inline;
+* concurrent misses for the same key share one upstream fetch;
+* entries are evicted least-recently-used to stay under ``max_bytes``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from services.url_policy import NotModifiedError
+
+
+DEFAULT_TTL_SECONDS = 300.0
+DEFAULT_STALE_WHILE_REVALIDATE_SECONDS = 60.0
+DEFAULT_REVALIDATE_TIMEOUT_SECONDS = 5.0
+DEFAULT_STALE_IF_ERROR_SECONDS = 7 * 86400.0
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+# fetch(conditional_headers) -> (payload, meta); raises NotModifiedError on 304.
+Fetcher = Callable[[Dict[str, str]], Tuple[str, Dict[str, Any]]]
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        value = float(str(os.environ.get(name) or "").strip())
+    except ValueError:
+        return default
+    return value if value >= 0 else default
+
+
+def cache_key(url: str, *, insecure: bool, headers: Optional[Dict[str, str]] = None) -> str:
+    digest = hashlib.sha256()
+    digest.update(str(url or "").encode("utf-8", "surrogatepass"))
+    digest.update(b"\0insecure" if insecure else b"\0secure")
+    for name, value in sorted((headers or {}).items()):
+        digest.update(f"\0{name.lower()}={value}".encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+class _Entry:
+    __slots__ = ("payload", "meta", "size", "fetched_at", "etag", "last_modified", "error")
+
+    def __init__(self, payload: str, meta: Dict[str, Any], now: float) -> None:
+        self.payload = payload
+        self.meta = meta
+        self.size = len(payload.encode("utf-8", "surrogatepass"))
+        self.fetched_at = now
+        self.etag = str(meta.get("etag") or "")
+        self.last_modified = str(meta.get("last_modified") or "")
+        self.error = ""
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class _Flight:
+    __slots__ = ("done", "error", "result")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+        self.result: Optional[Tuple[str, Dict[str, Any]]] = None
+
+
+class ProviderPayloadCache:
+    def __init__(
+        self,
+        *,
+        ttl: Optional[float] = None,
+        stale_while_revalidate: Optional[float] = None,
+        revalidate_timeout: Optional[float] = None,
+        stale_if_error: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = DEFAULT_TTL_SECONDS if ttl is None else float(ttl)
+        self.stale_while_revalidate = (
+            DEFAULT_STALE_WHILE_REVALIDATE_SECONDS if stale_while_revalidate is None else float(stale_while_revalidate)
+        )
+        self.revalidate_timeout = (
+            DEFAULT_REVALIDATE_TIMEOUT_SECONDS if revalidate_timeout is None else float(revalidate_timeout)
+        )
+        self.stale_if_error = DEFAULT_STALE_IF_ERROR_SECONDS if stale_if_error is None else float(stale_if_error)
+        self.max_bytes = DEFAULT_MAX_BYTES if max_bytes is None else int(max_bytes)
+        self.clock = clock
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight: Dict[str, _Flight] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "revalidated": 0, "refresh_errors": 0}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    # -- internals --------------------------------------------------------------
+
+    def _store(self, key: str, entry: _Entry) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            if entry.size > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes and self._entries:
+                _key, victim = self._entries.popitem(last=False)
+                self._bytes -= victim.size
+
+    def _refresh(self, key: str, fetch: Fetcher, flight: _Flight) -> None:
+        try:
+            with self._lock:
+                current = self._entries.get(key)
+            conditional = current.conditional_headers() if current is not None else {}
+            try:
+                payload, meta = fetch(conditional)
+            except NotModifiedError:
+                if current is None:
+                    raise
+                with self._lock:
+                    current.fetched_at = self.clock()
+                    current.error = ""
+                    self.stats["revalidated"] += 1
+                flight.result = (current.payload, current.meta)
+                return
+            except BaseException as exc:
+                if current is not None:
+                    # Keep serving the last good payload; remember why it is stale.
+                    current.error = str(exc) or exc.__class__.__name__
+                    self.stats["refresh_errors"] += 1
+                raise
+            entry = _Entry(payload, dict(meta or {}), self.clock())
+            self._store(key, entry)
+            flight.result = (entry.payload, entry.meta)
+        except BaseException as exc:
+            flight.error = exc
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def _start(self, key: str, fetch: Fetcher, *, background: bool) -> _Flight:
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None:
+                return flight
+            flight = self._inflight[key] = _Flight()
+        if background:
+            t = threading.Thread(target=self._refresh, args=(key, fetch, flight), daemon=True)
+            t.start()
+        else:
+            self._refresh(key, fetch, flight)
+        return flight
+
+    # -- API ------------------------------------------------------------------------
+
+    def get(self, key: str, fetch: Fetcher) -> Tuple[str, Dict[str, Any], str]:
+        """Return ``(payload, meta, state)``; state is hit / stale / miss.
+
+        ``miss`` means the payload was fetched (or revalidated) upstream during
+        this call. Raises the fetch error only when nothing usable is cached.
+        """
+
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None:
+            age = now - entry.fetched_at
+            if age < self.ttl:
+                self.stats["hits"] += 1
+                return entry.payload, entry.meta, "hit"
+            if age < self.ttl + self.stale_while_revalidate:
+                self.stats["stale"] += 1
+                self._start(key, fetch, background=True)
+                return entry.payload, entry.meta, "stale"
+            if age < self.ttl + self.stale_if_error:
+                # Too old to serve blindly while upstream may be healthy.
+                flight = self._start(key, fetch, background=True)
+                flight.done.wait(self.revalidate_timeout)
+                if flight.done.is_set() and flight.error is None and flight.result is not None:
+                    self.stats["misses"] += 1
+                    return flight.result[0], flight.result[1], "miss"
+                self.stats["stale"] += 1
+                return entry.payload, entry.meta, "stale"
+
+        self.stats["misses"] += 1
+        flight = self._start(key, fetch, background=False)
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        if flight.result is None:
+            raise RuntimeError("provider_payload_not_cached")
+        return flight.result[0], flight.result[1], "miss"
+
+
+PROVIDER_PAYLOAD_CACHE = ProviderPayloadCache(
+    ttl=_env_float("XKEEN_MIHOMO_PROVIDER_CACHE_TTL", DEFAULT_TTL_SECONDS),
+    stale_while_revalidate=_env_float(
+        "XKEEN_MIHOMO_PROVIDER_CACHE_STALE_SECONDS", DEFAULT_STALE_WHILE_REVALIDATE_SECONDS
+    ),
+    max_bytes=int(_env_float("XKEEN_MIHOMO_PROVIDER_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+)
+
+
+__all__ = [
+    "PROVIDER_PAYLOAD_CACHE",
+    "ProviderPayloadCache",
+    "cache_key",
+]
@@ -6,16 +6,20 @@ logic separate from filesystem layout, backups and process lifecycle helpers.
 
 from __future__ import annotations
 
+import hashlib
 import os
 import re
 import shlex
 import shutil
 import subprocess
 import sys
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from services.xkeen_commands_catalog import build_xkeen_cmd
 
@@ -364,9 +368,135 @@ def restart_mihomo_and_get_log(new_content: Optional[str] = None) -> str:
     return "\n".join(log)
 
 
+# ``mihomo -t`` is slow and memory-hungry on routers, so results are memoized
+# by config hash + the identities of everything else the check reads
+# (provider/rule files referenced via ``path:``, geodata, the binary, the
+# command template).  Concurrent checks of the same content share one run.
+VALIDATE_CACHE_MAX = 16
+VALIDATE_OK_TTL_SECONDS = 3600.0
+VALIDATE_FAIL_TTL_SECONDS = 15.0
+_GEODATA_FILES = (
+    "geoip.dat",
+    "geosite.dat",
+    "geoip.metadb",
+    "country.mmdb",
+    "Country.mmdb",
+    "GeoLite2-ASN.mmdb",
+    "ASN.mmdb",
+)
+_PATH_KEY_RE = re.compile(r"^\s*path\s*:\s*(.+?)\s*$", re.M)
+_EXIT_CODE_RE = re.compile(r"\[exit code:\s*(-?\d+)\]")
+
+_VALIDATE_CACHE: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+_VALIDATE_INFLIGHT: Dict[str, "_ValidationFlight"] = {}
+_VALIDATE_LOCK = threading.Lock()
+# One checker process at a time: it is heavy and shares the temp file below.
+_VALIDATE_RUN_LOCK = threading.Lock()
+
+
+class _ValidationFlight:
+    __slots__ = ("done", "result")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[str] = None
+
+
+def _file_identity(path: Path) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (int(st.st_ino), int(st.st_size), int(st.st_mtime_ns))
+
+
+def _validate_binary(cmd_tpl: str) -> Optional[Path]:
+    try:
+        head = shlex.split(cmd_tpl)[0]
+    except (ValueError, IndexError):
+        return None
+    found = shutil.which(head)
+    return Path(found) if found else None
+
+
+def _validation_key(content: str, cmd_tpl: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(cmd_tpl.encode("utf-8", "surrogatepass"))
+    digest.update(b"\0")
+    digest.update(content.encode("utf-8", "surrogatepass"))
+    deps: List[Path] = [MIHOMO_ROOT / name for name in _GEODATA_FILES]
+    binary = _validate_binary(cmd_tpl)
+    if binary is not None:
+        deps.append(binary)
+    for match in _PATH_KEY_RE.finditer(content):
+        raw = match.group(1).split(" #", 1)[0].strip().strip("'\"")
+        if raw:
+            dep = Path(raw).expanduser()
+            deps.append(dep if dep.is_absolute() else MIHOMO_ROOT / dep)
+    for dep in deps:
+        digest.update(f"\0{dep}={_file_identity(dep)}".encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+def _cache_validation(key: str, log: str) -> None:
+    match = _EXIT_CODE_RE.search(log or "")
+    if not match:
+        # The runner itself failed (not configured / could not start): retry next time.
+        return
+    ttl = VALIDATE_OK_TTL_SECONDS if int(match.group(1)) == 0 else VALIDATE_FAIL_TTL_SECONDS
+    with _VALIDATE_LOCK:
+        _VALIDATE_CACHE[key] = (time.monotonic() + ttl, log)
+        _VALIDATE_CACHE.move_to_end(key)
+        while len(_VALIDATE_CACHE) > VALIDATE_CACHE_MAX:
+            _VALIDATE_CACHE.popitem(last=False)
+
+
+def clear_validation_cache() -> None:
+    with _VALIDATE_LOCK:
+        _VALIDATE_CACHE.clear()
+
+
 def validate_config(new_content: Optional[str] = None) -> str:
     ensure_mihomo_layout()
 
+    cmd_tpl = os.environ.get("MIHOMO_VALIDATE_CMD") or ""
+    if new_content is not None:
+        content = new_content
+    else:
+        try:
+            content = _active_profile_path().read_text(encoding="utf-8")
+        except OSError:
+            return _run_validation(None)
+    key = _validation_key(content, cmd_tpl)
+
+    with _VALIDATE_LOCK:
+        cached = _VALIDATE_CACHE.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            _VALIDATE_CACHE.move_to_end(key)
+            return cached[1]
+        flight = _VALIDATE_INFLIGHT.get(key)
+        leader = flight is None
+        if leader:
+            flight = _VALIDATE_INFLIGHT[key] = _ValidationFlight()
+
+    if not leader:
+        flight.done.wait()
+        if flight.result is not None:
+            return flight.result
+        return _run_validation(new_content)
+
+    try:
+        with _VALIDATE_RUN_LOCK:
+            flight.result = _run_validation(new_content)
+        _cache_validation(key, flight.result)
+        return flight.result
+    finally:
+        with _VALIDATE_LOCK:
+            _VALIDATE_INFLIGHT.pop(key, None)
+        flight.done.set()
+
+
+def _run_validation(new_content: Optional[str]) -> str:
     validate_cmd_tpl = os.environ.get("MIHOMO_VALIDATE_CMD")
     root = MIHOMO_ROOT
     tmp_path: Optional[Path] = None
@@ -440,4 +570,5 @@ __all__ = [
     "save_config",
     "restart_mihomo_and_get_log",
     "validate_config",
+    "clear_validation_cache",
 ]
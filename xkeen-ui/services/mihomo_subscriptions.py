@@ -10,7 +10,6 @@ from __future__ import annotations
 
 import copy
 import hashlib
-import json
 import os
 import re
 import threading
@@ -19,8 +18,9 @@ from typing import Any, Callable, Dict, List, Sequence, Tuple
 from urllib.parse import urlparse
 
 from mihomo_config_generator import build_full_config
-from services.io.atomic import _atomic_write_json, _atomic_write_text
-from services.mihomo_proxy_config import apply_proxy_insert
+from services.io.atomic import _atomic_write_text
+from services.io.state_store import JsonStateStore
+from services.mihomo_config_index import ConfigDocument, normalize_newlines
 from services.mihomo_xray_json import convert_subscription_text
 from services.url_policy import env_flag
 from services.xray_subscriptions import fetch_subscription_body_for_xray as fetch_subscription_body
@@ -70,20 +70,8 @@ def _hash_text(text: Any) -> str:
     return hashlib.sha256(normalised.encode("utf-8", errors="ignore")).hexdigest()
 
 
-def _read_json_file(path: str, default: Any) -> Any:
-    try:
-        text = load_text(path, default=None)
-        if text is None:
-            return default
-        return json.loads(text)
-    except Exception:
-        return default
-
-
 def _write_state(ui_state_dir: str, state: Dict[str, Any]) -> None:
-    path = subscription_state_path(ui_state_dir)
-    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-    _atomic_write_json(path, state)
+    _STATE_STORE.write(subscription_state_path(ui_state_dir), state)
 
 
 def _clean_id(value: Any) -> str:
@@ -180,8 +168,11 @@ def _normalise_saved_state(raw: Any) -> Dict[str, Any]:
     }
 
 
+_STATE_STORE = JsonStateStore(_normalise_saved_state)
+
+
 def load_subscription_state(ui_state_dir: str) -> Dict[str, Any]:
-    return _normalise_saved_state(_read_json_file(subscription_state_path(ui_state_dir), {}))
+    return _STATE_STORE.load(subscription_state_path(ui_state_dir), {})
 
 
 def list_subscriptions(ui_state_dir: str) -> List[Dict[str, Any]]:
@@ -736,154 +727,30 @@ def _format_proxy_yaml_blocks(proxies: Any) -> str:
     return "\n\n".join(blocks)
 
 
-def _normalise_proxy_block_name(raw: Any) -> str:
-    value = str(raw or "").strip()
-    if not value:
-        return ""
-    value = re.sub(r"\s+#.*$", "", value).strip()
-    if len(value) >= 2 and ((value.startswith('"') and value.endswith('"')) or (value.startswith("'") and value.endswith("'"))):
-        value = value[1:-1]
-    return value.replace("''", "'").strip()
-
-
 def _all_proxy_names_from_config(config_text: str) -> List[str]:
     return _extract_proxy_names_from_yaml(config_text)
 
 
+def _clean_targets(proxy_names: Sequence[str]) -> set[str]:
+    return {str(name or "").strip() for name in proxy_names if str(name or "").strip()}
+
+
 def _remove_group_references(content: str, proxy_names: Sequence[str]) -> str:
-    targets = {str(name or "").strip() for name in proxy_names if str(name or "").strip()}
+    targets = _clean_targets(proxy_names)
     if not targets:
         return content
-
-    def _inline_item_name(raw: str) -> str:
-        return _normalise_proxy_block_name(raw)
-
-    def _filter_inline(line: str) -> str:
-        match = re.match(r"^(\s*proxies\s*:\s*\[)(.*?)(\]\s*(#.*)?)$", line)
-        if not match:
-            return line
-        inner = (match.group(2) or "").strip()
-        if not inner:
-            return line
-        items = [item.strip() for item in inner.split(",")]
-        kept = [item for item in items if _inline_item_name(item) not in targets]
-        if len(kept) == len(items):
-            return line
-        return f"{match.group(1)}{', '.join(kept)}{match.group(3)}"
-
-    lines = str(content or "").replace("\r\n", "\n").replace("\r", "\n").splitlines()
-    out: List[str] = []
-    in_groups = False
-    in_group_proxies = False
-    proxies_indent = -1
-
-    for line in lines:
-        stripped = line.lstrip()
-        indent = len(line) - len(stripped)
-
-        if indent == 0 and stripped.startswith("proxy-groups:"):
-            in_groups = True
-            in_group_proxies = False
-            proxies_indent = -1
-            out.append(line)
-            continue
-
-        if in_groups and indent == 0 and stripped and not stripped.startswith("#"):
-            in_groups = False
-            in_group_proxies = False
-            proxies_indent = -1
-
-        if in_groups and in_group_proxies and stripped and not stripped.startswith("#") and indent <= proxies_indent:
-            in_group_proxies = False
-            proxies_indent = -1
-
-        if in_groups and stripped.startswith("proxies:"):
-            if "[" in stripped and "]" in stripped:
-                out.append(_filter_inline(line))
-            else:
-                in_group_proxies = True
-                proxies_indent = indent
-                out.append(line)
-            continue
-
-        if in_groups and in_group_proxies:
-            match = re.match(r"^(\s*)-\s*(.+?)\s*$", line)
-            if match and len(match.group(1)) > proxies_indent:
-                if _normalise_proxy_block_name(match.group(2)) in targets:
-                    continue
-
-        out.append(line)
-
-    return "\n".join(out) + ("\n" if str(content or "").endswith("\n") else "")
+    doc = ConfigDocument(content)
+    doc.remove_group_references(targets)
+    return doc.text()
 
 
 def _remove_proxy_blocks(content: str, proxy_names: Sequence[str]) -> str:
-    targets = {str(name or "").strip() for name in proxy_names if str(name or "").strip()}
+    targets = _clean_targets(proxy_names)
     if not targets:
         return content
-
-    content_n = str(content or "").replace("\r\n", "\n").replace("\r", "\n")
-    had_trailing_newline = content_n.endswith("\n")
-    lines = content_n.splitlines()
-
-    proxies_idx = None
-    for idx, line in enumerate(lines):
-        if line.strip() == "proxies:" and (len(line) - len(line.lstrip()) == 0):
-            proxies_idx = idx
-            break
-    if proxies_idx is None:
-        return content_n if had_trailing_newline else content_n.rstrip("\n")
-
-    end_idx = len(lines)
-    for idx in range(proxies_idx + 1, len(lines)):
-        line = lines[idx]
-        stripped = line.lstrip()
-        if not stripped or stripped.startswith("#"):
-            continue
-        if (len(line) - len(stripped) == 0) and not stripped.startswith("-"):
-            end_idx = idx
-            break
-
-    name_line_re = re.compile(r"^(\s*)-\s+name:\s*(.+?)\s*$")
-    item_indent_len = None
-    for idx in range(proxies_idx + 1, end_idx):
-        match = name_line_re.match(lines[idx])
-        if match:
-            item_indent_len = len(match.group(1))
-            break
-    if item_indent_len is None:
-        return content_n
-
-    remove_ranges: List[Tuple[int, int]] = []
-    idx = proxies_idx + 1
-    while idx < end_idx:
-        match = name_line_re.match(lines[idx])
-        if not match or len(match.group(1)) != item_indent_len:
-            idx += 1
-            continue
-        block_start = idx
-        block_end = end_idx
-        for nxt in range(idx + 1, end_idx):
-            match2 = name_line_re.match(lines[nxt])
-            if match2 and len(match2.group(1)) == item_indent_len:
-                block_end = nxt
-                break
-        if _normalise_proxy_block_name(match.group(2)) in targets:
-            remove_ranges.append((block_start, block_end))
-        idx = block_end
-
-    if not remove_ranges:
-        return content_n
-
-    keep = [True] * len(lines)
-    for start, end in remove_ranges:
-        while start > proxies_idx + 1 and not lines[start - 1].strip():
-            start -= 1
-        for pos in range(start, end):
-            keep[pos] = False
-
-    out = "\n".join(line for pos, line in enumerate(lines) if keep[pos]).rstrip("\n")
-    return out + ("\n" if had_trailing_newline else "")
+    doc = ConfigDocument(content)
+    doc.remove_proxies(targets)
+    return doc.text()
 
 
 def _replace_config_subscription_blocks(
@@ -893,17 +760,25 @@ def _replace_config_subscription_blocks(
     new_proxy_blocks: Sequence[str],
     groups: Sequence[Any],
 ) -> str:
-    patched = _remove_group_references(content, old_proxy_names)
-    patched = _remove_proxy_blocks(patched, old_proxy_names)
+    doc = ConfigDocument(content)
+    targets = _clean_targets(old_proxy_names)
+    doc.remove_group_references(targets)
+    doc.remove_proxies(targets)
+
+    blocks: List[List[str]] = []
+    names: List[str] = []
     for block in new_proxy_blocks:
         block_text = str(block or "").strip()
-        if not block_text:
-            continue
-        names = _extract_proxy_names_from_yaml(block_text)
-        proxy_name = names[0] if names else ""
-        if proxy_name:
-            patched = apply_proxy_insert(patched, block_text, proxy_name, groups)
-    return patched
+        found = _extract_proxy_names_from_yaml(block_text) if block_text else []
+        if found:
+            blocks.append([line for line in normalize_newlines(block_text).splitlines() if line.strip()])
+            names.append(found[0])
+    if not blocks:
+        return doc.text()
+    # One splice for all blocks and one per group instead of a full rescan per proxy.
+    doc.insert_proxies(blocks)
+    doc.add_to_groups(names, [str(group) for group in groups])
+    return doc.text(trailing_newline=True)
 
 
 def _schedule_next(entry: Dict[str, Any], now_ts: float) -> None:
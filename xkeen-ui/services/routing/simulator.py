@@ -0,0 +1,526 @@
+"""Offline Xray routing decision simulator.
+
+Compiles ``routing.rules`` into in-memory matchers and answers, for a batch
+of connection tuples (domain, IP, port, inbound tag, protocol, ...), which
+rule would be selected and which outbound/balancer it points to -- without
+restarting Xray or running ``xray -test``.
+
+Supported rule fields follow Xray's field rules: ``domain`` (``full:``,
+``domain:``, ``keyword:``/plain, ``regexp:``, ``dotless:``, ``geosite:``,
+``ext:file.dat:tag``), ``ip``/``source`` (CIDR, IP, ``geoip:[!]tag``,
+``ext:file.dat:tag``), ``port``/``sourcePort``, ``network``,
+``inboundTag``, ``protocol`` and ``user``.  Unknown fields make the rule
+"inexact": it never matches here and is reported in ``warnings``.
+GeoSite/GeoIP references are answered from the compiled DAT match index
+(services.geodat.match_index).  The index is never compiled inside a request:
+while it is built in the background, rules that need it are listed in the
+result's ``not_simulated`` and reported in ``warnings``.  No DNS is done: IP
+rules only see the IP given in the query.
+
+Compilation is incremental: compiled rules are cached by their canonical
+JSON, so editing one rule recompiles only that rule.  :meth:`shadows` lists
+later rules that can never match because an earlier rule covers them.
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from services.geodat.match_index import get_match_index, index_building
+
+
+MAX_QUERIES = 256
+_RULE_CACHE_MAX = 2048
+_NON_CONDITION_KEYS = {"type", "outboundTag", "balancerTag", "ruleTag", "domainMatcher"}
+
+GeoLookup = Callable[[str, str, str], Optional[Set[str]]]
+
+
+def _as_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [p.strip() for p in str(value).split(",") if p.strip()]
+
+
+def _parse_ports(value: Any) -> List[Tuple[int, int]]:
+    ranges: List[Tuple[int, int]] = []
+    items = value if isinstance(value, (list, tuple)) else str(value).split(",")
+    for item in items:
+        s = str(item).strip()
+        if not s:
+            continue
+        if "-" in s:
+            a, b = s.split("-", 1)
+            lo, hi = int(a), int(b)
+        else:
+            lo = hi = int(s)
+        if lo > hi:
+            lo, hi = hi, lo
+        ranges.append((lo, hi))
+    if not ranges:
+        raise ValueError("empty port list")
+    return ranges
+
+
+def _split_ext(value: str) -> Tuple[str, str]:
+    """``ext:file.dat:tag`` -> (file, tag)."""
+
+    body = value[4:]
+    file, _, tag = body.rpartition(":")
+    if not file or not tag:
+        raise ValueError("bad ext reference: %s" % value)
+    return file, tag
+
+
+class _Cond:
+    field = ""
+
+    def match(self, q: Dict[str, Any], geo: GeoLookup) -> bool:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    def covers(self, other: "_Cond") -> bool:
+        return False
+
+
+class _SetCond(_Cond):
+    def __init__(self, field: str, values: Iterable[str], *, fold: bool = False) -> None:
+        self.field = field
+        self.fold = fold
+        self.values = frozenset(v.lower() if fold else v for v in values)
+        if not self.values:
+            raise ValueError("empty %s" % field)
+
+    def match(self, q: Dict[str, Any], geo: GeoLookup) -> bool:
+        v = q.get(self.field)
+        if v is None or v == "":
+            return False
+        return (str(v).lower() if self.fold else str(v)) in self.values
+
+    def covers(self, other: _Cond) -> bool:
+        return isinstance(other, _SetCond) and other.field == self.field and other.values <= self.values
+
+
+class _PortCond(_Cond):
+    def __init__(self, field: str, value: Any) -> None:
+        self.field = field
+        self.ranges = _parse_ports(value)
+
+    def match(self, q: Dict[str, Any], geo: GeoLookup) -> bool:
+        p = q.get(self.field)
+        if p is None:
+            return False
+        return any(lo <= p <= hi for lo, hi in self.ranges)
+
+    def covers(self, other: _Cond) -> bool:
+        if not isinstance(other, _PortCond) or other.field != self.field:
+            return False
+        return all(any(lo <= olo and ohi <= hi for lo, hi in self.ranges) for olo, ohi in other.ranges)
+
+
+class _DomainCond(_Cond):
+    field = "domain"
+
+    def __init__(self, values: List[str]) -> None:
+        self.matchers: List[Tuple[str, Any, Any]] = []
+        for raw in values:
+            low = raw.lower()
+            if low.startswith("regexp:"):
+                self.matchers.append(("regexp", raw[7:], re.compile(raw[7:])))
+            elif low.startswith("full:"):
+                self.matchers.append(("full", low[5:], None))
+            elif low.startswith("domain:"):
+                self.matchers.append(("domain", low[7:].strip("."), None))
+            elif low.startswith("keyword:"):
+                self.matchers.append(("keyword", low[8:], None))
+            elif low.startswith("dotless:"):
+                self.matchers.append(("dotless", low[8:], None))
+            elif low.startswith("geosite:"):
+                tag = raw[8:]
+                if "@" in tag:
+                    raise ValueError("geosite attributes are not supported: %s" % raw)
+                self.matchers.append(("geo", ("geosite.dat", tag.lower()), None))
+            elif low.startswith("ext:"):
+                file, tag = _split_ext(raw)
+                if "@" in tag:
+                    raise ValueError("geosite attributes are not supported: %s" % raw)
+                self.matchers.append(("geo", (file, tag.lower()), None))
+            else:
+                self.matchers.append(("keyword", low, None))
+        if not self.matchers:
+            raise ValueError("empty domain")
+
+    def match(self, q: Dict[str, Any], geo: GeoLookup) -> bool:
+        d = q.get("domain")
+        if not d:
+            return False
+        for kind, v, rx in self.matchers:
+            if kind == "full":
+                if d == v:
+                    return True
+            elif kind == "domain":
+                if d == v or d.endswith("." + v):
+                    return True
+            elif kind == "keyword":
+                if v in d:
+                    return True
+            elif kind == "dotless":
+                if "." not in d and v in d:
+                    return True
+            elif kind == "regexp":
+                if rx.search(d):
+                    return True
+            else:
+                tags = geo("geosite", v[0], d)
+                if tags and v[1] in tags:
+                    return True
+        return False
+
+    @staticmethod
+    def _covers_one(s: Tuple[str, Any, Any], o: Tuple[str, Any, Any]) -> bool:
+        sk, sv, _ = s
+        ok, ov, _ = o
+        if sk == ok and sv == ov:
+            return True
+        if ok not in ("full", "domain", "keyword"):
+            return False
+        if sk == "domain":
+            return ok in ("full", "domain") and (ov == sv or ov.endswith("." + sv))
+        if sk == "keyword":
+            return sv in ov
+        return False
+
+    def covers(self, other: _Cond) -> bool:
+        if not isinstance(other, _DomainCond):
+            return False
+        return all(any(self._covers_one(s, o) for s in self.matchers) for o in other.matchers)
+
+
+class _IPCond(_Cond):
+    def __init__(self, field: str, values: List[str]) -> None:
+        self.field = field
+        self.nets: List[Any] = []
+        self.geo: List[Tuple[str, str, bool]] = []
+        for raw in values:
+            low = raw.lower()
+            if low.startswith("geoip:"):
+                tag = low[6:]
+                neg = tag.startswith("!")
+                self.geo.append(("geoip.dat", tag.lstrip("!"), neg))
+            elif low.startswith("ext:"):
+                file, tag = _split_ext(raw)
+                neg = tag.startswith("!")
+                self.geo.append((file, tag.lstrip("!").lower(), neg))
+            else:
+                self.nets.append(ipaddress.ip_network(raw, strict=False))
+        if not self.nets and not self.geo:
+            raise ValueError("empty %s" % field)
+
+    def match(self, q: Dict[str, Any], geo: GeoLookup) -> bool:
+        ip = q.get(self.field)
+        if ip is None:
+            return False
+        for net in self.nets:
+            if ip.version == net.version and ip in net:
+                return True
+        for file, tag, neg in self.geo:
+            tags = geo("geoip", file, str(ip))
+            if tags is None:
+                continue
+            if (tag in tags) != neg:
+                return True
+        return False
+
+    def covers(self, other: _Cond) -> bool:
+        if not isinstance(other, _IPCond) or other.field != self.field:
+            return False
+        for onet in other.nets:
+            if not any(n.version == onet.version and onet.subnet_of(n) for n in self.nets):
+                return False
+        return all(g in self.geo for g in other.geo)
+
+
+class _Unsupported(_Cond):
+    def __init__(self, field: str) -> None:
+        self.field = field
+
+    def match(self, q: Dict[str, Any], geo: GeoLookup) -> bool:
+        return False
+
+
+def _compile_cond(key: str, value: Any) -> _Cond:
+    if key == "domain" or key == "domains":
+        return _DomainCond(_as_list(value))
+    if key in ("ip", "source"):
+        return _IPCond(key, _as_list(value))
+    if key in ("port", "sourcePort"):
+        return _PortCond(key, value)
+    if key == "network":
+        return _SetCond("network", _as_list(value), fold=True)
+    if key == "inboundTag":
+        return _SetCond("inboundTag", _as_list(value))
+    if key == "protocol":
+        return _SetCond("protocol", _as_list(value), fold=True)
+    if key == "user":
+        return _SetCond("user", _as_list(value))
+    return _Unsupported(key)
+
+
+class CompiledRule:
+    """Matcher for one routing rule (position independent, cacheable)."""
+
+    def __init__(self, rule: Dict[str, Any]) -> None:
+        self.outbound = str(rule.get("outboundTag") or "") or None
+        self.balancer = str(rule.get("balancerTag") or "") or None
+        self.rule_tag = str(rule.get("ruleTag") or "") or None
+        self.conds: List[_Cond] = []
+        self.warnings: List[str] = []
+        for key, value in rule.items():
+            if key in _NON_CONDITION_KEYS:
+                continue
+            try:
+                cond = _compile_cond(key, value)
+            except Exception as e:
+                cond = _Unsupported(key)
+                self.warnings.append("%s: %s" % (key, e))
+            else:
+                if isinstance(cond, _Unsupported):
+                    self.warnings.append("%s: field is not simulated" % key)
+            self.conds.append(cond)
+        if not self.conds:
+            self.warnings.append("rule has no conditions")
+        self.exact = bool(self.conds) and not any(isinstance(c, _Unsupported) for c in self.conds)
+
+    def match(self, q: Dict[str, Any], geo: GeoLookup) -> bool:
+        if not self.exact:
+            return False
+        for c in self.conds:
+            if not c.match(q, geo):
+                return False
+        return True
+
+    def covers(self, other: "CompiledRule") -> bool:
+        """True when every connection matched by ``other`` is matched by self."""
+
+        if not self.exact:
+            return False
+        for c in self.conds:
+            if not any(c.covers(oc) for oc in other.conds):
+                return False
+        return True
+
+
+_RULE_CACHE: "OrderedDict[str, CompiledRule]" = OrderedDict()
+_RULE_CACHE_LOCK = threading.Lock()
+
+
+def _rule_key(rule: Any) -> str:
+    return json.dumps(rule, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+def compile_rule(rule: Dict[str, Any]) -> Tuple[CompiledRule, bool]:
+    """Return ``(compiled, reused)`` using the process-wide rule cache."""
+
+    key = _rule_key(rule)
+    with _RULE_CACHE_LOCK:
+        hit = _RULE_CACHE.get(key)
+        if hit is not None:
+            _RULE_CACHE.move_to_end(key)
+            return hit, True
+    compiled = CompiledRule(rule)
+    with _RULE_CACHE_LOCK:
+        _RULE_CACHE[key] = compiled
+        while len(_RULE_CACHE) > _RULE_CACHE_MAX:
+            _RULE_CACHE.popitem(last=False)
+    return compiled, False
+
+
+def normalize_query(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize one query tuple; raises ValueError on malformed values."""
+
+    q: Dict[str, Any] = {}
+    domain = str(raw.get("domain") or "").strip().rstrip(".").lower()
+    if domain:
+        q["domain"] = domain
+    for field in ("ip", "source"):
+        v = str(raw.get(field) or "").strip()
+        if v:
+            q[field] = ipaddress.ip_address(v)
+    for field in ("port", "sourcePort"):
+        v = raw.get(field)
+        if v not in (None, ""):
+            p = int(v)
+            if not 0 <= p <= 65535:
+                raise ValueError("bad %s" % field)
+            q[field] = p
+    q["network"] = str(raw.get("network") or "tcp").strip().lower()
+    inbound = raw.get("inboundTag", raw.get("inbound"))
+    if inbound:
+        q["inboundTag"] = str(inbound).strip()
+    for field in ("protocol", "user"):
+        v = str(raw.get(field) or "").strip()
+        if v:
+            q[field] = v
+    if "domain" not in q and "ip" not in q:
+        raise ValueError("domain or ip is required")
+    return q
+
+
+class RoutingSimulator:
+    """Compiled view of one ``routing`` object."""
+
+    def __init__(
+        self,
+        routing: Dict[str, Any],
+        *,
+        asset_dir: str = "",
+        outbound_tags: Optional[List[str]] = None,
+    ) -> None:
+        t0 = time.perf_counter()
+        self.asset_dir = str(asset_dir or "")
+        self.outbound_tags = list(outbound_tags or [])
+        self.domain_strategy = str(routing.get("domainStrategy") or "AsIs")
+        self.balancers: Dict[str, List[str]] = {}
+        for b in routing.get("balancers") or []:
+            if isinstance(b, dict) and b.get("tag"):
+                self.balancers[str(b["tag"])] = _as_list(b.get("selector"))
+        self.rules: List[CompiledRule] = []
+        self.reused = 0
+        for rule in routing.get("rules") or []:
+            compiled, reused = compile_rule(rule if isinstance(rule, dict) else {})
+            self.rules.append(compiled)
+            self.reused += int(reused)
+        self.compile_ms = round((time.perf_counter() - t0) * 1000.0, 3)
+        self._geo_missing: Set[str] = set()
+        self._geo_building: Set[str] = set()
+
+    # -- geodata -------------------------------------------------------------
+
+    def _geo_tags(self, kind: str, file: str, value: str) -> Optional[Set[str]]:
+        path = os.path.join(self.asset_dir, os.path.basename(file)) if self.asset_dir else ""
+        if path and os.path.isfile(path):
+            try:
+                idx = get_match_index(kind, path, build=False)
+                if idx is None:
+                    if index_building(kind, path):
+                        self._geo_building.add(file)
+                        return None
+                else:
+                    counts = idx.match_domain(value) if kind == "geosite" else idx.match_ip(value)
+                    return {idx.tags[tid].lower() for tid in counts}
+            except Exception:
+                pass
+        self._geo_missing.add(file)
+        return None
+
+    def _geo_lookup(self, cache: Dict[Tuple[str, str, str], Optional[Set[str]]], pending: List[str]) -> GeoLookup:
+        """Cached DAT lookups; files whose index is still building are appended to ``pending``."""
+
+        def lookup(kind: str, file: str, value: str) -> Optional[Set[str]]:
+            key = (kind, file, value)
+            if key not in cache:
+                cache[key] = self._geo_tags(kind, file, value)
+            tags = cache[key]
+            if tags is None and file in self._geo_building:
+                pending.append(file)
+            return tags
+
+        return lookup
+
+    # -- queries -------------------------------------------------------------
+
+    def _target(self, rule: Optional[CompiledRule]) -> Dict[str, Any]:
+        if rule is None:
+            return {"outbound": self.outbound_tags[0] if self.outbound_tags else None, "balancer": None}
+        if rule.balancer:
+            selectors = self.balancers.get(rule.balancer, [])
+            candidates = [t for t in self.outbound_tags if any(t.startswith(s) for s in selectors)]
+            return {"outbound": None, "balancer": rule.balancer, "candidates": candidates}
+        return {"outbound": rule.outbound, "balancer": None}
+
+    def simulate(self, queries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        cache: Dict[Tuple[str, str, str], Optional[Set[str]]] = {}
+        pending: List[str] = []
+        geo = self._geo_lookup(cache, pending)
+        out: List[Dict[str, Any]] = []
+        for raw in queries:
+            t0 = time.perf_counter()
+            try:
+                q = normalize_query(raw if isinstance(raw, dict) else {})
+            except (TypeError, ValueError) as e:
+                out.append({"query": raw, "ok": False, "error": str(e)})
+                continue
+            hit: Optional[int] = None
+            not_simulated: List[int] = []
+            for i, rule in enumerate(self.rules):
+                del pending[:]
+                if rule.match(q, geo):
+                    hit = i
+                    break
+                if pending:
+                    not_simulated.append(i)
+            res: Dict[str, Any] = {
+                "query": raw,
+                "ok": True,
+                "rule_index": hit,
+                "rule_tag": self.rules[hit].rule_tag if hit is not None else None,
+                "default": hit is None,
+            }
+            if not_simulated:
+                res["not_simulated"] = not_simulated
+            res.update(self._target(self.rules[hit] if hit is not None else None))
+            res["elapsed_us"] = int((time.perf_counter() - t0) * 1_000_000)
+            out.append(res)
+        return out
+
+    # -- static analysis -------------------------------------------------------
+
+    def shadows(self) -> List[Dict[str, Any]]:
+        """Rules that fully cover at least one later rule (which can never match)."""
+
+        out: List[Dict[str, Any]] = []
+        for i, ri in enumerate(self.rules):
+            if not ri.exact:
+                continue
+            hidden = [j for j in range(i + 1, len(self.rules)) if ri.covers(self.rules[j])]
+            if hidden:
+                out.append({"rule_index": i, "shadows": hidden, "count": len(hidden)})
+        return out
+
+    def warnings(self) -> List[Dict[str, Any]]:
+        out = [{"rule_index": i, "message": w} for i, r in enumerate(self.rules) for w in r.warnings]
+        for file in sorted(self._geo_missing):
+            out.append({"rule_index": None, "message": "DAT not available: %s" % file})
+        for file in sorted(self._geo_building - self._geo_missing):
+            out.append({"rule_index": None, "message": "DAT index building, rules using %s are not simulated yet" % file})
+        return out
+
+
+def collect_outbound_tags(confdir: str) -> List[str]:
+    """Outbound tags in Xray merge order (fragments sorted by name)."""
+
+    tags: List[str] = []
+    try:
+        names = sorted(os.listdir(confdir))
+    except Exception:
+        return tags
+    for name in names:
+        if not name.lower().endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(confdir, name), "r", encoding="utf-8") as f:
+                obj = json.load(f)
+        except Exception:
+            continue
+        for ob in (obj.get("outbounds") if isinstance(obj, dict) else None) or []:
+            if isinstance(ob, dict) and ob.get("tag"):
+                tags.append(str(ob["tag"]))
+    return tags
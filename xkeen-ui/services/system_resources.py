@@ -1,18 +1,28 @@
 """Small, dependency-free router resource sampler.
 
-The panel polls this sampler at a deliberately low frequency.  Linux procfs is
-used instead of spawning utilities so the feature also works on constrained
-Entware router builds.
+Linux procfs is used instead of spawning utilities so the feature also works
+on constrained Entware router builds.
+
+A background :class:`ResourceSampler` (``start_resource_sampler()``) samples
+at a fixed cadence, so CPU and network deltas no longer depend on how often
+(and how many) panels poll.  Each sample is stored in ``array``-backed rings:
+1 h at the sample interval and 24 h of one-minute averages.  The panel reads
+the latest sample and windowed, downsampled series from memory.
 """
 
 from __future__ import annotations
 
+import copy
+import math
 import os
 import shutil
 import threading
 import time
+from array import array
 from pathlib import Path
-from typing import Any, Callable
+from typing import Any, Callable, Iterable, Mapping
+
+from services.url_policy import env_flag
 
 
 PROC_STAT = Path("/proc/stat")
@@ -43,11 +53,12 @@ def _cpu_counters(text: str) -> tuple[int, int]:
     return total, idle
 
 
-def _cpu_percent(current: tuple[int, int]) -> float:
+def _cpu_percent(current: tuple[int, int], *, update: bool = True) -> float:
     global _previous_cpu
     with _cpu_lock:
         previous = _previous_cpu
-        _previous_cpu = current
+        if update:
+            _previous_cpu = current
     if previous is None or current[0] <= previous[0]:
         total_delta, idle_delta = current
     else:
@@ -107,7 +118,7 @@ def _network_counters(text: str) -> dict[str, tuple[int, int]]:
     return counters
 
 
-def _network(text: str, *, now: float) -> dict[str, Any]:
+def _network(text: str, *, now: float, update: bool = True) -> dict[str, Any]:
     global _previous_network
     counters = _network_counters(text)
     visible = {name: value for name, value in counters.items() if name != "lo"}
@@ -116,7 +127,8 @@ def _network(text: str, *, now: float) -> dict[str, Any]:
 
     with _network_lock:
         previous = _previous_network
-        _previous_network = (now, counters)
+        if update:
+            _previous_network = (now, counters)
 
     elapsed = max(0.0, now - previous[0]) if previous else 0.0
     previous_counters = previous[1] if previous else {}
@@ -184,8 +196,14 @@ def sample_system_resources(
     reader: Callable[[Path], str] = _read_text,
     clock: Callable[[], float] = time.time,
     disk_usage: Callable[[str], Any] = shutil.disk_usage,
+    update_baseline: bool = True,
 ) -> dict[str, Any]:
-    """Return one bounded resource snapshot or raise ``OSError``/``ValueError``."""
+    """Return one bounded resource snapshot or raise ``OSError``/``ValueError``.
+
+    CPU and network rates are deltas against the previous sample. With
+    ``update_baseline=False`` that baseline is only read, so an out-of-band
+    sample does not shorten the background sampler's next interval.
+    """
 
     now = clock()
     cpu = _cpu_counters(reader(PROC_STAT))
@@ -209,7 +227,7 @@ def sample_system_resources(
         "schema_version": 1,
         "sampled_at": int(now),
         "cpu": {
-            "percent": _cpu_percent(cpu),
+            "percent": _cpu_percent(cpu, update=update_baseline),
             "cores": max(1, int(os.cpu_count() or 1)),
             "load_1m": loads[0],
             "load_5m": loads[1],
@@ -223,7 +241,7 @@ def sample_system_resources(
 
     network_text = _optional_read(reader, PROC_NET_DEV)
     if network_text:
-        payload["network"] = _network(network_text, now=now)
+        payload["network"] = _network(network_text, now=now, update=update_baseline)
     try:
         payload["storage"] = _storage(disk_usage)
     except (OSError, ValueError, TypeError, AttributeError):
@@ -242,3 +260,271 @@ def reset_system_resource_sampler() -> None:
         _previous_cpu = None
     with _network_lock:
         _previous_network = None
+
+
+# -- background sampler and history ---------------------------------------------
+
+DEFAULT_SAMPLE_SECONDS = 5
+FINE_HISTORY_SECONDS = 3600
+COARSE_STEP_SECONDS = 60
+COARSE_HISTORY_SECONDS = 24 * 3600
+MAX_HISTORY_POINTS = 720
+MAX_HISTORY_INTERFACES = 8
+
+_NAN = float("nan")
+
+
+class _Ring:
+    """Fixed-capacity ring of timestamps plus float32 series columns."""
+
+    def __init__(self, capacity: int, *, max_series: int = 64) -> None:
+        self.capacity = max(1, int(capacity))
+        self.max_series = max_series
+        self.times = array("d", [0.0]) * self.capacity
+        self.series: dict[str, array] = {}
+        self.count = 0
+        self.head = 0
+
+    def append(self, ts: float, values: Mapping[str, float]) -> None:
+        i = self.head
+        self.times[i] = ts
+        for name, column in self.series.items():
+            column[i] = values.get(name, _NAN)
+        for name, value in values.items():
+            if name not in self.series and len(self.series) < self.max_series:
+                column = array("f", [_NAN]) * self.capacity
+                column[i] = value
+                self.series[name] = column
+        self.head = (i + 1) % self.capacity
+        self.count = min(self.capacity, self.count + 1)
+
+    def window(self, since: float) -> tuple[list[float], dict[str, list[float]]]:
+        start = (self.head - self.count) % self.capacity
+        index = [
+            i
+            for i in ((start + k) % self.capacity for k in range(self.count))
+            if self.times[i] >= since
+        ]
+        return (
+            [self.times[i] for i in index],
+            {name: [column[i] for i in index] for name, column in self.series.items()},
+        )
+
+
+def _history_values(payload: Mapping[str, Any]) -> dict[str, float]:
+    cpu = payload.get("cpu") or {}
+    memory = payload.get("memory") or {}
+    values = {
+        "cpu_percent": float(cpu.get("percent") or 0.0),
+        "load_1m": float(cpu.get("load_1m") or 0.0),
+        "memory_percent": float(memory.get("percent") or 0.0),
+        "memory_used_bytes": float(memory.get("used_bytes") or 0),
+    }
+    network = payload.get("network")
+    if isinstance(network, Mapping):
+        values["rx_bytes_per_second"] = float(network.get("receive_bytes_per_second") or 0.0)
+        values["tx_bytes_per_second"] = float(network.get("send_bytes_per_second") or 0.0)
+        for item in (network.get("interfaces") or [])[:MAX_HISTORY_INTERFACES]:
+            name = str(item.get("name") or "")
+            if name:
+                values["rx:" + name] = float(item.get("receive_bytes_per_second") or 0.0)
+                values["tx:" + name] = float(item.get("send_bytes_per_second") or 0.0)
+    if payload.get("temperature_celsius") is not None:
+        values["temperature_celsius"] = float(payload["temperature_celsius"])
+    return values
+
+
+def _mean(values: Iterable[float]) -> float:
+    total = 0.0
+    count = 0
+    for value in values:
+        if not math.isnan(value):
+            total += value
+            count += 1
+    return total / count if count else _NAN
+
+
+def _wanted(name: str, metrics: set[str] | None) -> bool:
+    if not metrics:
+        return True
+    if name in metrics:
+        return True
+    return "interfaces" in metrics and name[:3] in ("rx:", "tx:")
+
+
+class ResourceSampler:
+    """Fixed-cadence sampler keeping the latest snapshot and history rings."""
+
+    def __init__(
+        self,
+        *,
+        interval: int = DEFAULT_SAMPLE_SECONDS,
+        sample: Callable[[], dict[str, Any]] = sample_system_resources,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.interval = max(1, int(interval))
+        self._sample = sample
+        self._clock = clock
+        self.fine = _Ring(FINE_HISTORY_SECONDS // self.interval)
+        self.coarse = _Ring(COARSE_HISTORY_SECONDS // COARSE_STEP_SECONDS)
+        self.latest: dict[str, Any] | None = None
+        self.latest_at = 0.0
+        self._minute: int | None = None
+        self._sums: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def sample_once(self) -> dict[str, Any]:
+        payload = self._sample()
+        now = self._clock()
+        values = _history_values(payload)
+        with self._lock:
+            self.latest = payload
+            self.latest_at = now
+            self.fine.append(now, values)
+            self._fold_minute(now, values)
+        return payload
+
+    def _fold_minute(self, now: float, values: Mapping[str, float]) -> None:
+        minute = int(now // COARSE_STEP_SECONDS)
+        if self._minute is not None and minute != self._minute and self._sums:
+            self.coarse.append(
+                float(self._minute * COARSE_STEP_SECONDS),
+                {name: total / count for name, (total, count) in self._sums.items() if count},
+            )
+            self._sums = {}
+        self._minute = minute
+        for name, value in values.items():
+            if not math.isnan(value):
+                acc = self._sums.setdefault(name, [0.0, 0])
+                acc[0] += value
+                acc[1] += 1
+
+    def snapshot(self, *, max_age: float | None = None) -> dict[str, Any] | None:
+        """Copy of the latest sample, or ``None`` when missing/too old."""
+
+        limit = 3 * self.interval if max_age is None else max_age
+        with self._lock:
+            if self.latest is None or self._clock() - self.latest_at > limit:
+                return None
+            return copy.deepcopy(self.latest)
+
+    def history(
+        self,
+        *,
+        window_seconds: int = FINE_HISTORY_SECONDS,
+        points: int | None = None,
+        metrics: Iterable[str] | None = None,
+    ) -> dict[str, Any]:
+        window = max(self.interval, min(COARSE_HISTORY_SECONDS, int(window_seconds)))
+        if window <= self.fine.capacity * self.interval:
+            ring, resolution = self.fine, self.interval
+        else:
+            ring, resolution = self.coarse, COARSE_STEP_SECONDS
+        wanted = {str(m).strip() for m in (metrics or []) if str(m).strip()} or None
+        with self._lock:
+            times, columns = ring.window(self._clock() - window)
+        columns = {name: column for name, column in columns.items() if _wanted(name, wanted)}
+
+        limit = max(1, min(MAX_HISTORY_POINTS, int(points or MAX_HISTORY_POINTS)))
+        group = max(1, math.ceil(len(times) / limit))
+        if group > 1:
+            spans = [(k, min(len(times), k + group)) for k in range(0, len(times), group)]
+            times = [times[end - 1] for _start, end in spans]
+            columns = {
+                name: [_mean(column[start:end]) for start, end in spans]
+                for name, column in columns.items()
+            }
+        return {
+            "schema_version": 1,
+            "window_seconds": window,
+            "resolution_seconds": resolution,
+            "step_seconds": resolution * group,
+            "timestamps": [int(t) for t in times],
+            "series": {
+                name: [None if math.isnan(v) else round(v, 1) for v in column]
+                for name, column in sorted(columns.items())
+            },
+        }
+
+
+_SAMPLER: ResourceSampler | None = None
+_SAMPLER_LOCK = threading.Lock()
+
+
+def _sample_interval() -> int:
+    try:
+        value = int(os.environ.get("XKEEN_RESOURCE_SAMPLE_SECONDS", DEFAULT_SAMPLE_SECONDS))
+    except Exception:
+        value = DEFAULT_SAMPLE_SECONDS
+    return max(1, min(60, value))
+
+
+def start_resource_sampler() -> bool:
+    """Start the background sampler thread once; returns True when started."""
+
+    global _SAMPLER
+
+    if not env_flag("XKEEN_RESOURCE_SAMPLER", True):
+        return False
+
+    with _SAMPLER_LOCK:
+        if _SAMPLER is not None:
+            return False
+        sampler = _SAMPLER = ResourceSampler(interval=_sample_interval())
+
+    def _loop() -> None:
+        next_at = time.monotonic()
+        while True:
+            try:
+                sampler.sample_once()
+            except Exception as exc:  # noqa: BLE001 - procfs may be missing
+                try:
+                    from core.logging import core_log_once
+
+                    core_log_once("warning", "resource_sampler_failed", "resource sampler failed", error=str(exc))
+                except Exception:
+                    pass
+            next_at += sampler.interval
+            delay = next_at - time.monotonic()
+            if delay < 0:
+                # Fell behind (suspend, long GC): keep the cadence, skip missed ticks.
+                next_at = time.monotonic()
+                delay = 0.0
+            time.sleep(delay)
+
+    thread = threading.Thread(target=_loop, name="xkeen-resource-sampler", daemon=True)
+    thread.start()
+    return True
+
+
+def latest_system_resources() -> dict[str, Any] | None:
+    """Latest background sample (a copy) or ``None`` when the sampler is not running.
+
+    A sample older than the freshness limit is still returned, marked
+    ``stale``. Before the first sample a read-only one is taken: the sampler
+    owns the CPU/network delta baseline.
+    """
+
+    sampler = _SAMPLER
+    if sampler is None:
+        return None
+    payload = sampler.snapshot()
+    if payload is not None:
+        return payload
+    payload = sampler.snapshot(max_age=math.inf)
+    if payload is not None:
+        payload["stale"] = True
+        return payload
+    return sample_system_resources(update_baseline=False)
+
+
+def system_resource_history(
+    *,
+    window_seconds: int = FINE_HISTORY_SECONDS,
+    points: int | None = None,
+    metrics: Iterable[str] | None = None,
+) -> dict[str, Any] | None:
+    sampler = _SAMPLER
+    if sampler is None:
+        return None
+    return sampler.history(window_seconds=window_seconds, points=points, metrics=metrics)
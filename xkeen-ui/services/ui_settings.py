@@ -22,7 +22,7 @@ from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 
 from core.paths import UI_STATE_DIR
-from services.io import read_json, safe_write_text
+from services.io.state_store import JsonStateStore
 from utils.deep_merge import deep_merge
 
 
@@ -945,18 +945,25 @@ def _settings_path(ui_state_dir: str) -> str:
     return os.path.join(ui_state_dir, "ui-settings.json")
 
 
+def _sanitize_loaded(raw: Any) -> Tuple[Dict[str, Any], bool]:
+    cfg, rep = _sanitize_full(raw)
+    return cfg, rep.changed
+
+
+# Sanitized settings are cached until ui-settings.json changes on disk.
+_STATE_STORE = JsonStateStore(_sanitize_loaded)
+
+
 def load_settings(ui_state_dir: str = UI_STATE_DIR) -> Dict[str, Any]:
     """Load UI settings from disk and merge with defaults.
 
     Returns defaults if file is missing/corrupted.
     """
     path = _settings_path(ui_state_dir)
-    raw: Any = read_json(path, default={}) if os.path.isfile(path) else {}
-
-    cfg, rep = _sanitize_full(raw)
+    cfg, changed = _STATE_STORE.load(path, {})
 
     # If file exists and needed normalization/migration, persist back.
-    if os.path.isfile(path) and rep.changed:
+    if changed and os.path.isfile(path):
         try:
             save_settings(cfg, ui_state_dir)
         except Exception:
@@ -976,8 +983,9 @@ def save_settings(cfg_in: Any, ui_state_dir: str = UI_STATE_DIR) -> Dict[str, An
     # canonical schema ordering.
     cfg, rep = _sanitize_full(cfg_in)
 
-    # Keep output identical to previous implementation: utf-8, ensure_ascii=False,
-    # indent=2, trailing newline. Do NOT sort keys: we keep stable canonical order.
+    # The store writes utf-8, ensure_ascii=False, indent=2 and a trailing
+    # newline (same bytes as this text). Do NOT sort keys: we keep stable
+    # canonical order.
     txt = json.dumps(cfg, ensure_ascii=False, indent=2) + "\n"
     if len(txt) > _MAX_FILE_CHARS:
         raise UISettingsValidationError(
@@ -985,8 +993,7 @@ def save_settings(cfg_in: Any, ui_state_dir: str = UI_STATE_DIR) -> Dict[str, An
             errors=[{"path": "<root>", "error": "settings too large"}],
         )
 
-    path = _settings_path(ui_state_dir)
-    safe_write_text(path, txt, mode=0o644)
+    _STATE_STORE.write(_settings_path(ui_state_dir), cfg, mode=0o644)
 
     # Log normalization only when it matters for support.
     if rep.warnings or rep.errors:
@@ -5,7 +5,7 @@ import os
 import urllib.error
 import urllib.request
 from dataclasses import dataclass
-from typing import Iterable, List, Optional, Sequence, Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 from urllib.parse import urlparse
 
 
@@ -31,6 +31,10 @@ class URLPolicy:
     allow_custom_urls: bool = False
 
 
+class NotModifiedError(RuntimeError):
+    """Raised by conditional downloads when the server answers 304."""
+
+
 def env_flag(name: str, default: bool = False) -> bool:
     raw = str(os.environ.get(name) or "").strip().lower()
     if not raw:
@@ -172,7 +176,16 @@ def download_to_file_with_policy(
     policy: URLPolicy,
     user_agent: str = "Xkeen-UI",
     timeout: int = 45,
+    headers: Optional[Dict[str, str]] = None,
+    response_meta: Optional[Dict[str, str]] = None,
 ) -> int:
+    """Download ``url`` into ``tmp_path`` and return the number of bytes.
+
+    ``headers`` are sent as-is (e.g. ``If-None-Match``); a ``304`` reply raises
+    :class:`NotModifiedError` without touching ``tmp_path``.  When
+    ``response_meta`` is given it receives the ``etag``/``last_modified``
+    validators of the response.
+    """
     ok, reason = is_url_allowed(url, policy)
     if not ok:
         raise RuntimeError("url_blocked:" + reason)
@@ -185,12 +198,17 @@ def download_to_file_with_policy(
             return super().redirect_request(req, fp, code, msg, headers, newurl)
 
     opener = urllib.request.build_opener(SafeRedirect)
-    req = urllib.request.Request(url, headers={"User-Agent": user_agent})
+    req_headers = {"User-Agent": user_agent}
+    req_headers.update({k: v for k, v in (headers or {}).items() if v})
+    req = urllib.request.Request(url, headers=req_headers)
     try:
         with opener.open(req, timeout=timeout) as resp:
             status = getattr(resp, "status", None)
             if isinstance(status, int) and status >= 400:
                 raise RuntimeError(f"http_{status}")
+            if response_meta is not None:
+                response_meta["etag"] = str(resp.headers.get("ETag") or "")
+                response_meta["last_modified"] = str(resp.headers.get("Last-Modified") or "")
             try:
                 length = resp.headers.get("Content-Length")
                 if length is not None and max_bytes is not None and int(length) > max_bytes:
@@ -209,6 +227,10 @@ def download_to_file_with_policy(
                         raise RuntimeError("size_limit")
                     f.write(chunk)
         return total
+    except urllib.error.HTTPError as exc:
+        if exc.code == 304:
+            raise NotModifiedError("not_modified") from exc
+        raise
     except urllib.error.URLError as exc:
         reason_text = str(getattr(exc, "reason", "") or exc or "").strip()
         if reason_text.startswith("url_blocked:"):
@@ -0,0 +1,60 @@
+"""Run blocking CPU/disk work off the gevent hub.
+
+Under ``gevent.monkey.patch_all()`` (run_server.py) ``threading.Thread`` and
+``ThreadPoolExecutor`` workers are greenlets: hashing a large file in one of
+them stalls every other request. :func:`call_off_hub` hands such work to
+gevent's pool of real OS threads (hashlib and file reads release the GIL) and
+keeps the calling greenlet responsive; without gevent it is a plain call.
+
+The offloaded callable runs on a foreign thread, so it must not take
+gevent-patched locks or touch job state; let it record progress in plain
+attributes and report from ``on_wait``, which runs on the caller's greenlet.
+"""
+
+from __future__ import annotations
+
+import functools
+from typing import Any, Callable, Optional
+
+
+def gevent_active() -> bool:
+    """True when threading has been monkey-patched by gevent."""
+
+    try:
+        from gevent import monkey
+    except Exception:
+        return False
+    try:
+        return bool(monkey.is_module_patched("threading"))
+    except Exception:
+        return False
+
+
+def call_off_hub(
+    fn: Callable[..., Any],
+    *args: Any,
+    on_wait: Optional[Callable[[], None]] = None,
+    wait_interval: float = 0.5,
+    **kwargs: Any,
+) -> Any:
+    """Return ``fn(*args, **kwargs)``, computed on a native thread under gevent.
+
+    ``on_wait()`` is called every ``wait_interval`` seconds while the native
+    thread is busy. Exceptions raised by ``fn`` propagate to the caller.
+    """
+
+    if not gevent_active():
+        return fn(*args, **kwargs)
+
+    import gevent
+
+    result = gevent.get_hub().threadpool.spawn(functools.partial(fn, *args, **kwargs))
+    while True:
+        try:
+            return result.get(timeout=float(wait_interval))
+        except gevent.Timeout:
+            if on_wait is not None:
+                on_wait()
+
+
+__all__ = ["call_off_hub", "gevent_active"]
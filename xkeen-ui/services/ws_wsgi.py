@@ -260,6 +260,9 @@ def handle_xray_logs2_request(
     return []
 
 
+_CMD_CHUNK_MAX_BYTES = 256 * 1024
+
+
 def handle_command_status_request(
     environ,
     start_response,
@@ -303,7 +306,12 @@ def handle_command_status_request(
         _close_ws(ws)
         return []
 
-    last_len = 0
+    # Byte offset into the job output; reconnecting clients pass the last
+    # "offset" they received to resume without replaying everything.
+    try:
+        offset = max(0, int(params.get("offset", ["0"])[0] or 0))
+    except Exception:
+        offset = 0
     try:
         while True:
             job = get_command_job(job_id)
@@ -314,28 +322,27 @@ def handle_command_status_request(
                     ws_debug("ws_cmd: failed to send 'job not found'", error=str(e))
                 break
 
-            output = job.output or ""
             status = job.status
             exit_code = job.exit_code
             error_msg = getattr(job, "error", None)
 
-            if len(output) > last_len:
-                chunk = output[last_len:]
-                last_len = len(output)
-                if chunk:
-                    try:
-                        ws.send(json.dumps({"type": "chunk", "data": chunk}, ensure_ascii=False))
-                    except WebSocketError as e:
-                        ws_debug(
-                            "ws_cmd: WebSocketError while sending chunk, client probably closed",
-                            error=str(e),
-                        )
-                        break
-                    except Exception as e:
-                        ws_debug("ws_cmd: unexpected error while sending chunk", error=str(e))
-                        break
+            chunk, offset = job.buffer.read_text(offset, _CMD_CHUNK_MAX_BYTES)
+            if chunk:
+                try:
+                    ws.send(json.dumps({"type": "chunk", "data": chunk, "offset": offset}, ensure_ascii=False))
+                except WebSocketError as e:
+                    ws_debug(
+                        "ws_cmd: WebSocketError while sending chunk, client probably closed",
+                        error=str(e),
+                    )
+                    break
+                except Exception as e:
+                    ws_debug("ws_cmd: unexpected error while sending chunk", error=str(e))
+                    break
 
             if status in ("finished", "error"):
+                if offset < job.buffer.size:
+                    continue
                 try:
                     ws.send(
                         json.dumps(
@@ -344,6 +351,7 @@ def handle_command_status_request(
                                 "status": status,
                                 "exit_code": exit_code,
                                 "error": error_msg,
+                                "offset": offset,
                             },
                             ensure_ascii=False,
                         )
@@ -354,7 +362,8 @@ def handle_command_status_request(
                     ws_debug("ws_cmd: unexpected error while sending done", error=str(e))
                 break
 
-            _gevent_sleep(0.2)
+            # Sleep until the job appends output or finishes (no polling).
+            job.buffer.wait(offset, timeout=15.0)
     except WebSocketError as e:
         ws_debug("ws_cmd: WebSocketError in main loop, client probably closed", error=str(e))
     except Exception as e:
@@ -374,7 +383,7 @@ def handle_events_request(
     qs_safe: str,
     ws_debug: Callable[..., Any],
     validate_ws_token: Callable[[str, str], bool],
-    subscribe_ws: Callable[[Any], None],
+    subscribe_ws: Callable[..., Any],
     unsubscribe_ws: Callable[[Any], None],
     event_subscribers: Sequence[Any],
 ):
@@ -402,12 +411,17 @@ def handle_events_request(
         _close_ws(ws)
         return []
 
-    subscribe_ws(ws)
-    ws_debug("ws_events: subscriber added", total=len(event_subscribers), client=client_ip)
+    topics = [t for t in ",".join(params.get("topics", [])).split(",") if t.strip()]
+    sub = subscribe_ws(ws, topics or None, client=client_ip)
+    ws_debug("ws_events: subscriber added", total=len(event_subscribers), client=client_ip, topics=topics)
 
     try:
-        while True:
-            _gevent_sleep(60.0)
+        # This greenlet is the subscriber's writer: producers only queue.
+        if sub is not None and hasattr(sub, "serve"):
+            sub.serve(idle_timeout=60.0)
+        else:
+            while True:
+                _gevent_sleep(60.0)
     except WebSocketError as e:
         ws_debug("ws_events: WebSocketError in main loop, client probably closed", error=str(e))
     except Exception as e:
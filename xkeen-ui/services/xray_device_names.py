@@ -16,7 +16,7 @@ import urllib.request
 from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
 
 from core.paths import UI_STATE_DIR
-from services.io.atomic import _atomic_write_json
+from services.io.state_store import JsonStateStore
 from services.keenetic_rci import build_rci_request
 
 
@@ -117,14 +117,6 @@ def normalize_device_name(value: Any) -> str:
     return name
 
 
-def _read_json_file(path: str, default: Any) -> Any:
-    try:
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            return json.load(f)
-    except Exception:
-        return default
-
-
 def _entry(ip: str, name: str, source: str, **extra: Any) -> DeviceEntry:
     item: DeviceEntry = {"ip": ip, "name": name, "source": source}
     for key, value in extra.items():
@@ -197,9 +189,7 @@ def discover_router_device_names(
         return {}, str(exc)
 
 
-def load_manual_device_names(ui_state_dir: Optional[str] = None) -> DeviceMap:
-    path = _state_path(ui_state_dir)
-    raw = _read_json_file(path, {})
+def _normalize_manual_device_names(raw: Any) -> DeviceMap:
     items = raw.get("items") if isinstance(raw, Mapping) else raw
     if not isinstance(items, Mapping):
         return {}
@@ -232,6 +222,13 @@ def load_manual_device_names(ui_state_dir: Optional[str] = None) -> DeviceMap:
     return out
 
 
+_STATE_STORE = JsonStateStore(_normalize_manual_device_names)
+
+
+def load_manual_device_names(ui_state_dir: Optional[str] = None) -> DeviceMap:
+    return _STATE_STORE.load(_state_path(ui_state_dir), {})
+
+
 def _write_manual_device_names(ui_state_dir: Optional[str], devices: DeviceMap) -> None:
     items: Dict[str, Dict[str, Any]] = {}
     for ip in sorted(devices.keys(), key=_ip_sort_key):
@@ -242,7 +239,7 @@ def _write_manual_device_names(ui_state_dir: Optional[str], devices: DeviceMap)
         updated_at = entry.get("updated_at") or _now_ts()
         items[ip] = {"name": name, "updated_at": int(updated_at)}
 
-    _atomic_write_json(_state_path(ui_state_dir), {"version": 1, "items": items}, mode=0o600)
+    _STATE_STORE.write(_state_path(ui_state_dir), {"version": 1, "items": items}, mode=0o600)
 
 
 def set_manual_device_name(ui_state_dir: Optional[str], raw_ip: Any, raw_name: Any) -> DeviceEntry:
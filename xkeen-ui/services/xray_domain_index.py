@@ -0,0 +1,375 @@
+"""Incremental domain <-> IP correlation index for Xray logs.
+
+Xray's error log reports the requested domain (``sniffed domain: example.com``
+or ``for [tcp:example.com:443]``) and the destination IP (``dialing TCP to
+tcp:203.0.113.7:443``, ``tunneling request to ...``) on separate lines that
+share a connection id (``[Info] [3868264735]``). Clients used to rebuild that
+pairing from up to 1 MB of log history on every open.
+
+This module keeps one server-side index fed by the error-log tail:
+
+- the first refresh seeds from the tail of the file, later refreshes resume
+  from the last consumed offset (rotation/truncation restarts at the top);
+- bounded LRU maps keep IP -> recent domains and domain -> recent IPs with
+  last-seen timestamps, plus a small connection-id -> domain map;
+- lookups by IP/domain and batch annotation are O(1) per token.
+
+Parsing rules mirror ``static/js/features/xray_log_domain_hints.js`` and the
+Android ``XrayLogEnrichment.kt`` helper so all clients label the same lines.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+MAX_IPS = 2000
+MAX_DOMAINS = 2000
+MAX_CONNECTIONS = 2000
+MAX_PER_KEY = 8
+SEED_MAX_BYTES = 1024 * 1024
+SEED_MAX_LINES = 5000
+FOLLOW_MAX_BYTES = 512 * 1024
+
+
+_DESTINATION_PATTERNS = tuple(
+    re.compile(p, re.IGNORECASE)
+    for p in (
+        r"\baccepted\s+(?:tcp|udp):((?:\d{1,3}\.){3}\d{1,3})(?::(\d{1,5}))?",
+        r"\btunneling request to\s+(?:tcp|udp):((?:\d{1,3}\.){3}\d{1,3})(?::(\d{1,5}))?",
+        r"\bprocessing from\s+(?:tcp|udp):\S+\s+to\s+(?:tcp|udp):((?:\d{1,3}\.){3}\d{1,3})(?::(\d{1,5}))?",
+        r"\bdialing\s+(?:tcp|udp)\s+to\s+(?:tcp|udp):((?:\d{1,3}\.){3}\d{1,3})(?::(\d{1,5}))?",
+        r"\bfor\s+\[(?:tcp|udp):((?:\d{1,3}\.){3}\d{1,3})(?::(\d{1,5}))?]",
+    )
+)
+_DOMAIN_TARGET_PATTERNS = tuple(
+    re.compile(p, re.IGNORECASE)
+    for p in (
+        r"\b(?:accepted|to|for)\s+\[(?:tcp|udp):([A-Za-z0-9.-]+\.[A-Za-z0-9-]+)(?::\d{1,5})?]",
+        r"\b(?:accepted|to|for)\s+(?:tcp|udp):([A-Za-z0-9.-]+\.[A-Za-z0-9-]+)(?::\d{1,5})?",
+    )
+)
+_IPV4_TOKEN_RE = re.compile(r"\b((?:\d{1,3}\.){3}\d{1,3})(?::(\d{1,5}))?\b")
+_SNIFFED_DOMAIN_RE = re.compile(r"\bsniffed domain:\s*([A-Za-z0-9.-]+\.[A-Za-z0-9-]+)(?=$|[\s,\]])", re.IGNORECASE)
+_OUTBOUND_ENDPOINT_DIAL_RE = re.compile(
+    r"\btransport/internet(?:/[A-Za-z0-9_.-]+)?:\s+dialing(?:\s+(?:tcp|udp))?\s+to\s+(?:tcp|udp):",
+    re.IGNORECASE,
+)
+_CONNECTION_ID_RE = re.compile(r"\[(?:debug|info|warning|error)]\s+\[([0-9]{3,})]", re.IGNORECASE)
+_SCHEME_PREFIX_RE = re.compile(r"^[a-z][a-z0-9+.-]*://", re.IGNORECASE)
+_HOST_PORT_RE = re.compile(r"^(.+):(\d{1,5})$")
+_TLD_RE = re.compile(r"^(?:[a-z]{2,63}|xn--[a-z0-9-]{2,59})$")
+_LABEL_RE = re.compile(r"^[a-z0-9-]{1,63}$")
+_EXCLUDED_DOMAINS = frozenset(("access.log", "error.log", "localhost"))
+
+
+def normalize_ip(raw: str) -> str:
+    parts = str(raw or "").strip().split(".")
+    if len(parts) != 4:
+        return ""
+    out = []
+    for part in parts:
+        if not (1 <= len(part) <= 3) or not part.isdigit():
+            return ""
+        n = int(part)
+        if n > 255:
+            return ""
+        out.append(str(n))
+    if all(p == "0" for p in out):
+        return ""
+    return ".".join(out)
+
+
+def normalize_domain(raw: str) -> str:
+    value = str(raw or "").strip()
+    if not value:
+        return ""
+    value = _SCHEME_PREFIX_RE.sub("", value)
+    for sep in ("/", "?", "#"):
+        value = value.split(sep, 1)[0]
+    value = value.rstrip(")],;'\"`.")
+    if value.startswith("[") and value.endswith("]"):
+        return ""
+    if normalize_ip(value):
+        return ""
+    m = _HOST_PORT_RE.match(value)
+    if m:
+        value = m.group(1)
+    value = value.lower()
+    if value in _EXCLUDED_DOMAINS or len(value) > 253 or ".." in value:
+        return ""
+    labels = value.split(".")
+    if len(labels) < 2 or not _TLD_RE.match(labels[-1]):
+        return ""
+    for label in labels:
+        if not _LABEL_RE.match(label) or label.startswith("-") or label.endswith("-"):
+            return ""
+    return value
+
+
+def extract_connection_id(line: str) -> str:
+    m = _CONNECTION_ID_RE.search(line or "")
+    return m.group(1) if m else ""
+
+
+def collect_destination_ips(line: str) -> List[str]:
+    if not line or not line.strip():
+        return []
+    seen: List[str] = []
+    for regex in _DESTINATION_PATTERNS:
+        for m in regex.finditer(line):
+            ip = normalize_ip(m.group(1) or "")
+            if ip and ip not in seen:
+                seen.append(ip)
+    return seen
+
+
+def collect_domain_candidates(line: str) -> List[str]:
+    if not line or not line.strip():
+        return []
+    result: List[str] = []
+    m = _SNIFFED_DOMAIN_RE.search(line)
+    if m:
+        domain = normalize_domain(m.group(1))
+        if domain:
+            result.append(domain)
+    # A transport endpoint is the proxy server, not the destination requested by the client.
+    if _OUTBOUND_ENDPOINT_DIAL_RE.search(line):
+        return result
+    for regex in _DOMAIN_TARGET_PATTERNS:
+        for m in regex.finditer(line):
+            domain = normalize_domain(m.group(1) or "")
+            if domain and domain not in result:
+                result.append(domain)
+    return result
+
+
+def _touch(table: "OrderedDict[str, OrderedDict[str, float]]", key: str, value: str, ts: float, max_keys: int) -> None:
+    inner = table.get(key)
+    if inner is None:
+        inner = OrderedDict()
+        table[key] = inner
+    else:
+        table.move_to_end(key)
+    inner[value] = ts
+    inner.move_to_end(value)
+    while len(inner) > MAX_PER_KEY:
+        inner.popitem(last=False)
+    while len(table) > max_keys:
+        table.popitem(last=False)
+
+
+class XrayDomainIndex:
+    """Bounded, incrementally fed IP <-> domain correlation index."""
+
+    def __init__(
+        self,
+        *,
+        resolve_path: Optional[Callable[[], Optional[str]]] = None,
+        max_ips: int = MAX_IPS,
+        max_domains: int = MAX_DOMAINS,
+        max_connections: int = MAX_CONNECTIONS,
+    ) -> None:
+        self._resolve_path = resolve_path
+        self.max_ips = int(max_ips)
+        self.max_domains = int(max_domains)
+        self.max_connections = int(max_connections)
+        self._lock = threading.RLock()
+        self._by_ip: "OrderedDict[str, OrderedDict[str, float]]" = OrderedDict()
+        self._by_domain: "OrderedDict[str, OrderedDict[str, float]]" = OrderedDict()
+        self._by_connection: "OrderedDict[str, str]" = OrderedDict()
+        self._path = ""
+        self._inode = 0
+        self._offset = -1
+        self._carry = b""
+        self.lines_ingested = 0
+        self.bytes_read = 0
+
+    # -- feeding --------------------------------------------------------------
+
+    def ingest_line(self, line: str, *, ts: Optional[float] = None) -> None:
+        text = str(line or "")
+        if not text.strip():
+            return
+        now = time.time() if ts is None else float(ts)
+        with self._lock:
+            self.lines_ingested += 1
+            conn_id = extract_connection_id(text)
+            domains = collect_domain_candidates(text)
+            first_domain = domains[0] if domains else ""
+            if conn_id and first_domain:
+                self._by_connection[conn_id] = first_domain
+                self._by_connection.move_to_end(conn_id)
+                while len(self._by_connection) > self.max_connections:
+                    self._by_connection.popitem(last=False)
+
+            ips = collect_destination_ips(text)
+            if not ips:
+                return
+            domain = (self._by_connection.get(conn_id) if conn_id else "") or first_domain
+            if not domain:
+                return
+            for ip in ips:
+                _touch(self._by_ip, ip, domain, now, self.max_ips)
+                _touch(self._by_domain, domain, ip, now, self.max_domains)
+
+    def ingest_lines(self, lines: Iterable[str], *, ts: Optional[float] = None) -> None:
+        now = time.time() if ts is None else float(ts)
+        for line in lines:
+            self.ingest_line(line, ts=now)
+
+    def refresh(self, path: Optional[str] = None) -> Dict[str, Any]:
+        """Consume new error-log bytes since the last refresh.
+
+        The first call (or a rotated/truncated file, or a backlog larger than
+        ``SEED_MAX_BYTES``) seeds from the last ``SEED_MAX_BYTES`` of the
+        file; later calls read only appended bytes.
+        """
+
+        from services.xray_logs import read_new_lines, tail_lines_fast
+
+        target = path or (self._resolve_path() if self._resolve_path else None) or ""
+        with self._lock:
+            if not target or not os.path.isfile(target):
+                return {"available": False, "mode": "none"}
+            try:
+                st = os.stat(target)
+            except OSError:
+                return {"available": False, "mode": "none"}
+            inode = int(getattr(st, "st_ino", 0) or 0)
+            size = int(getattr(st, "st_size", 0) or 0)
+
+            # A backlog larger than the seed window (long idle, busy log) is
+            # cheaper to reseed from the tail than to replay in full.
+            resumable = (
+                target == self._path
+                and inode == self._inode
+                and 0 <= self._offset <= size
+                and size - self._offset <= SEED_MAX_BYTES
+            )
+            if not resumable:
+                lines = tail_lines_fast(target, max_lines=SEED_MAX_LINES, max_bytes=SEED_MAX_BYTES)
+                self.ingest_lines(lines)
+                self._path = target
+                self._inode = inode
+                self._offset = size
+                self._carry = b""
+                self.bytes_read += min(size, SEED_MAX_BYTES)
+                return {"available": True, "mode": "seed", "lines": len(lines)}
+
+            if self._offset == size:
+                return {"available": True, "mode": "idle", "lines": 0}
+
+            total = 0
+            while self._offset < size:
+                lines, next_offset, carry = read_new_lines(
+                    target, self._offset, carry=self._carry, max_bytes=FOLLOW_MAX_BYTES
+                )
+                if next_offset <= self._offset:
+                    break
+                self.bytes_read += next_offset - self._offset
+                self._offset = next_offset
+                self._carry = carry
+                self.ingest_lines(lines)
+                total += len(lines)
+            return {"available": True, "mode": "append", "lines": total}
+
+    # -- queries --------------------------------------------------------------
+
+    def domains_for_ip(self, ip: str) -> List[Dict[str, Any]]:
+        key = normalize_ip(ip)
+        with self._lock:
+            inner = self._by_ip.get(key)
+            if not inner:
+                return []
+            return [{"domain": d, "seen": ts} for d, ts in reversed(inner.items())]
+
+    def ips_for_domain(self, domain: str) -> List[Dict[str, Any]]:
+        key = normalize_domain(domain)
+        with self._lock:
+            inner = self._by_domain.get(key)
+            if not inner:
+                return []
+            return [{"ip": ip, "seen": ts} for ip, ts in reversed(inner.items())]
+
+    def latest_domain(self, ip: str) -> str:
+        with self._lock:
+            inner = self._by_ip.get(normalize_ip(ip))
+            if not inner:
+                return ""
+            return next(reversed(inner))
+
+    def annotate_lines(self, lines: Iterable[str]) -> Dict[str, str]:
+        """Return ``{ip: latest domain}`` for destination IPs mentioned in ``lines``."""
+
+        hints: Dict[str, str] = {}
+        for line in lines:
+            for ip in collect_destination_ips(str(line or "")):
+                if ip in hints:
+                    continue
+                domain = self.latest_domain(ip)
+                if domain:
+                    hints[ip] = domain
+        return hints
+
+    def snapshot(self, limit: int = 500) -> Dict[str, str]:
+        """Most recent ``{ip: domain}`` pairs (newest last), capped at ``limit``."""
+
+        with self._lock:
+            items = list(self._by_ip.items())[-max(0, int(limit)):]
+            return {ip: next(reversed(inner)) for ip, inner in items if inner}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ips": len(self._by_ip),
+                "domains": len(self._by_domain),
+                "connections": len(self._by_connection),
+                "offset": self._offset,
+                "lines_ingested": self.lines_ingested,
+                "bytes_read": self.bytes_read,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._by_ip.clear()
+            self._by_domain.clear()
+            self._by_connection.clear()
+            self._path = ""
+            self._inode = 0
+            self._offset = -1
+            self._carry = b""
+
+
+def _default_error_log_path() -> Optional[str]:
+    from services.xray_log_api import resolve_xray_log_path_for_ws
+
+    return resolve_xray_log_path_for_ws("error")
+
+
+_INDEX: Optional[XrayDomainIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_xray_domain_index() -> XrayDomainIndex:
+    """Process-wide index over the active Xray error log."""
+
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = XrayDomainIndex(resolve_path=_default_error_log_path)
+        return _INDEX
+
+
+def refreshed_xray_domain_index(path: Optional[str] = None) -> Tuple[XrayDomainIndex, Dict[str, Any]]:
+    index = get_xray_domain_index()
+    try:
+        info = index.refresh(path)
+    except Exception as e:  # noqa: BLE001 - enrichment is best-effort
+        info = {"available": False, "mode": "error", "error": str(e)}
+    return index, info
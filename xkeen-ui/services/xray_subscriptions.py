@@ -23,11 +23,12 @@ import threading
 import time
 import urllib.error
 import urllib.request
-from typing import Any, Callable, Dict, Iterable, List, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
 from urllib.parse import parse_qs, unquote, urlparse
 
 from services import happ_links, happ_payloads
 from services.io.atomic import _atomic_write_json, _atomic_write_text
+from services.io.state_store import JsonStateStore
 from services.url_policy import URLPolicy, env_flag, is_url_allowed
 from services.xray_config_files import OUTBOUNDS_FILE, ROUTING_FILE, ensure_xray_jsonc_dir, jsonc_path_for
 from services.xray_outbounds import (
@@ -92,9 +93,14 @@ RESERVED_TAGS = {
     "metrics",
 }
 
-_SUPPORTED_LINK_RE = re.compile(
-    r"(?i)\b(?:vless|trojan|vmess|ss|shadowsocks|hy2|hysteria2|hysteria)://[^\s\"'<>]+"
+# One scanner for both link shapes: a whole line starting with a supported
+# scheme (group 1) or a link embedded in other text (JSON, HTML).  A line
+# match consumes the line, so links inside it are never reported twice.
+_LINK_SCAN_RE = re.compile(
+    r"(?im)^[^\S\n]*((?:vless|trojan|vmess|ss|shadowsocks|hy2|hysteria2|hysteria)://[^\n]*)"
+    r"|\b(?:vless|trojan|vmess|ss|shadowsocks|hy2|hysteria2|hysteria)://[^\s\"'<>]+"
 )
+_BASE64_BODY_RE = re.compile(r"[A-Za-z0-9+/=_\-\s]+")
 
 _STATE_LOCK = threading.RLock()
 _SCHEDULER_LOCK = threading.Lock()
@@ -121,6 +127,7 @@ LAST_RUNTIME_ACTIVE_KEYS = ("last_runtime_active", "lastRuntimeActive")
 DEFAULT_PROBE_URL = "https://www.gstatic.com/generate_204"
 DEFAULT_PROBE_FALLBACK_URLS = ("https://cp.cloudflare.com/generate_204",)
 DEFAULT_PROBE_TIMEOUT_SECONDS = 8.0
+LATENCY_WRITE_DELAY_SECONDS = 2.0
 PROBE_REQUEST_ATTEMPTS = 2
 PROBE_PROCESS_START_TIMEOUT_SECONDS = 4.0
 PROBE_PROCESS_START_ATTEMPTS = 3
@@ -215,10 +222,15 @@ def _read_routing_file_for_update(path: str) -> Dict[str, Any]:
     return obj
 
 
-def _write_state(ui_state_dir: str, state: Dict[str, Any]) -> None:
-    path = subscription_state_path(ui_state_dir)
-    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-    _atomic_write_json(path, state)
+def _parse_state_text(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except Exception:
+        return _load_jsonc_text(text)
+
+
+def _write_state(ui_state_dir: str, state: Dict[str, Any], *, delay: float = 0.0) -> None:
+    _STATE_STORE.write(subscription_state_path(ui_state_dir), state, delay=delay)
 
 
 def _clamp_interval(value: Any) -> int:
@@ -840,9 +852,12 @@ def _normalize_state(obj: Any) -> Dict[str, Any]:
     return state
 
 
+_STATE_STORE = JsonStateStore(_normalize_state, parse=_parse_state_text)
+
+
 def load_subscription_state(ui_state_dir: str) -> Dict[str, Any]:
     with _STATE_LOCK:
-        return _normalize_state(_read_json_file(subscription_state_path(ui_state_dir), {"subscriptions": []}))
+        return _STATE_STORE.load(subscription_state_path(ui_state_dir), {"subscriptions": []})
 
 
 def list_subscriptions(ui_state_dir: str) -> List[Dict[str, Any]]:
@@ -1655,10 +1670,12 @@ def _decode_subscription_base64_text(text: str) -> str | None:
     raw = str(text or "").strip()
     if not raw:
         return None
-    compact = re.sub(r"\s+", "", raw)
-    if not compact:
+    # Plain link lists and JSON fail on their first ":" / "{", long before
+    # the whole body would have been compacted and decoded.
+    if not _BASE64_BODY_RE.fullmatch(raw):
         return None
-    if not re.fullmatch(r"[A-Za-z0-9+/=_-]+", compact):
+    compact = "".join(raw.split())
+    if not compact:
         return None
     try:
         padded = compact.replace("-", "+").replace("_", "/")
@@ -1677,40 +1694,44 @@ def _decode_subscription_base64(text: str) -> str | None:
     return None
 
 
-def parse_subscription_links(body: str) -> List[str]:
+def iter_subscription_links(body: str) -> Iterator[str]:
+    """Yield supported links of a subscription body in one pass.
+
+    Whole-line links come first, in body order, as they are found; links
+    embedded in other text (JSON bodies, HTML) follow.  Duplicates are
+    dropped by value, and a link that only occurs inside an already reported
+    line is never reported on its own.
+    """
+
     text = str(body or "").strip().lstrip("\ufeff")
     if not text:
-        return []
+        return
 
     decoded = _decode_subscription_base64(text)
     if decoded:
         text = decoded
 
-    search_text = text.replace("\\/", "/")
-    links: List[str] = []
-    seen: set[str] = set()
-
-    def add_link(value: str) -> None:
-        value = str(value or "").strip()
-        if not value:
-            return
-        value_l = value.lower()
-        if not any(value_l.startswith(s) for s in SUPPORTED_SCHEMES):
-            return
-        if value in seen:
-            return
-        seen.add(value)
-        links.append(value)
+    search_text = text.replace("\\/", "/").replace("\r", "\n")
+    line_links: set[str] = set()
+    embedded: Dict[str, None] = {}
+    for match in _LINK_SCAN_RE.finditer(search_text):
+        line_link = match.group(1)
+        if line_link is not None:
+            value = line_link.strip()
+            if value in line_links:
+                continue
+            line_links.add(value)
+            embedded.pop(value, None)
+            yield value
+            continue
+        value = match.group(0).strip().rstrip("]})")
+        if value and value not in line_links:
+            embedded.setdefault(value, None)
+    yield from embedded
 
-    for line in search_text.replace("\r", "\n").split("\n"):
-        add_link(line)
 
-    for match in _SUPPORTED_LINK_RE.finditer(search_text):
-        value = match.group(0).strip().rstrip("]})")
-        if any(value and value in existing for existing in seen):
-            continue
-        add_link(value)
-    return links
+def parse_subscription_links(body: str) -> List[str]:
+    return list(iter_subscription_links(body))
 
 
 def _load_subscription_json(body: str) -> Any | None:
@@ -2325,7 +2346,7 @@ def _unique_tag(prefix: str, node: str, used: set[str]) -> str:
 
 
 def build_subscription_outbounds(
-    links: List[str],
+    links: Iterable[str],
     *,
     tag_prefix: str,
     name_filter: str = "",
@@ -6336,7 +6357,8 @@ def _save_subscription_latency_entries(
             saved += 1
         current["node_latency"] = node_latency
         state["subscriptions"][idx] = current
-        _write_state(ui_state_dir, _normalize_state(state))
+        # Probes of many nodes finish in bursts: coalesce them into one write.
+        _write_state(ui_state_dir, _normalize_state(state), delay=LATENCY_WRITE_DELAY_SECONDS)
     return saved
 
 
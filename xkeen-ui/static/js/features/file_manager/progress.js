@@ -1,5 +1,5 @@
-import { getFileManagerNamespace } from '../file_manager_namespace.js';
-
+import { getFileManagerNamespace } from '../file_manager_namespace.js';
+
 (() => {
   'use strict';
 
@@ -380,9 +380,19 @@ import { getFileManagerNamespace } from '../file_manager_namespace.js';
         if (bytesTotal > 0) parts.push(`bytes: ${fmtSize(bytesDone)} / ${fmtSize(bytesTotal)} (${pct}%)`);
         else if (bytesDone > 0) parts.push(`bytes: ${fmtSize(bytesDone)}`);
 
-        // Speed + ETA (best-effort)
+        // Speed + ETA: reported by the job when it measures them itself
+        // (local copy/move), otherwise estimated from polled bytes_done.
+        const srvSpeed = Number(job && job.progress && job.progress.speed_bps);
+        const srvEta = job && job.progress ? job.progress.eta_s : null;
         try {
-          if (jobId && bytesTotal > 0 && (stLower === 'running' || stLower === 'queued')) {
+          if (stLower === 'running' && Number.isFinite(srvSpeed) && srvSpeed > 0) {
+            const sp = _fmtSpeed(srvSpeed);
+            if (sp) parts.push(sp);
+            if (typeof srvEta === 'number' && srvEta >= 0) {
+              const et = _fmtEta(srvEta);
+              if (et) parts.push('ETA ' + et);
+            }
+          } else if (jobId && bytesTotal > 0 && (stLower === 'running' || stLower === 'queued')) {
             const now = nowMs();
             const prev = P._jobStats[jobId] || { lastTsMs: 0, lastBytes: 0, speed: 0 };
             const dt = Math.max(1, now - (prev.lastTsMs || now));
@@ -260,10 +260,17 @@ export async function requestMihomoClashWsToken(options = {}) {
   return payload && typeof payload.token === 'string' ? payload.token : '';
 }
 
-export function mihomoClashConnectionsWsUrl(token) {
+export function mihomoClashConnectionsWsUrl(token, view = null) {
   const scheme = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
   const url = new URL('/ws/mihomo-clash/connections', `${scheme}//${window.location.host}`);
   url.searchParams.set('token', String(token || ''));
+  if (view) {
+    // Opt into snapshot + delta frames computed over a server-side view.
+    url.searchParams.set('delta', '1');
+    for (const [key, value] of Object.entries(view)) {
+      if (value !== '' && value !== null && value !== undefined) url.searchParams.set(key, String(value));
+    }
+  }
   return url.toString();
 }
 
@@ -14,6 +14,7 @@ const HTTP_FALLBACK_INTERVAL_MS = 2000;
 const MAX_RECONNECT_DELAY_MS = 15000;
 const PAGE_SIZE = 100;
 const MAX_CLOSED_CONNECTIONS = 300;
+const SERVER_FILTER_KINDS = new Set(['device', 'rule', 'chain', 'host']);
 
 let root = null;
 let active = false;
@@ -22,6 +23,7 @@ let snapshot = null;
 let previousTotals = null;
 let rates = { download: 0, upload: 0 };
 let filterText = '';
+let serverFilter = { kind: '', value: '' };
 let networkFilter = 'all';
 let sortMode = 'traffic';
 let sortDirection = 'desc';
@@ -182,6 +184,7 @@ function sortValue(row, mode) {
   if (mode === 'source') return `${source(row).name} ${source(row).address}`.trim();
   if (mode === 'destination') return destination(row);
   if (mode === 'route') return routeText(row);
+  if (mode === 'speed') return (Number(row?.upload_speed) || 0) + (Number(row?.download_speed) || 0);
   return (Number(row?.upload) || 0) + (Number(row?.download) || 0);
 }
 
@@ -225,10 +228,16 @@ function setStreamState(state, copy) {
   setText('mihomo-clash-stream-state', copy);
 }
 
+function boundedNotice() {
+  if (!snapshot?.truncated) return '';
+  const shown = Array.isArray(snapshot.connections) ? snapshot.connections.length : 0;
+  return snapshot.view
+    ? `Показаны ${shown} соединений из ${snapshot.matched_connections ?? snapshot.total_connections} по выбранной сортировке.`
+    : `Показаны первые ${shown} соединений из ${snapshot.total_connections}.`;
+}
+
 function setFallbackNotice() {
-  const bounded = snapshot?.truncated
-    ? ` Показаны первые ${snapshot.connections.length} соединений из ${snapshot.total_connections}.`
-    : '';
+  const bounded = snapshot?.truncated ? ` ${boundedNotice()}` : '';
   setNotice(`HTTP fallback активен: обновление каждые 2 секунды.${bounded}`, 'warning');
 }
 
@@ -258,9 +267,10 @@ function renderSummary() {
   if (disconnectAll) disconnectAll.disabled = pendingAll || !(snapshot?.total_connections > 0) || capabilities.connection_disconnect === false;
 }
 
-function filterButton(value, label, content, className = '') {
+function filterButton(value, label, content, className = '', kind = '') {
   if (!value) return escapeHtml(content || '—');
-  return `<button type="button" class="xk-mihomo-connection-value ${className}" data-mihomo-connection-filter="${escapeHtml(value)}" aria-label="Фильтровать по ${escapeHtml(label)}">${content || escapeHtml(value)}</button>`;
+  const kindAttr = kind ? ` data-mihomo-connection-filter-kind="${escapeHtml(kind)}"` : '';
+  return `<button type="button" class="xk-mihomo-connection-value ${className}" data-mihomo-connection-filter="${escapeHtml(value)}"${kindAttr} aria-label="Фильтровать по ${escapeHtml(label)}">${content || escapeHtml(value)}</button>`;
 }
 
 function copyButton(value, label) {
@@ -273,15 +283,18 @@ function rowMarkup(row) {
   const metadata = row?.metadata || {};
   const network = String(metadata.network || '—').toUpperCase();
   const traffic = `${formatBytes(row?.download || 0)} ↓ · ${formatBytes(row?.upload || 0)} ↑`;
+  const speed = row?.download_speed || row?.upload_speed
+    ? `${formatBytes(row.download_speed, '/с')} ↓ · ${formatBytes(row.upload_speed, '/с')} ↑`
+    : '';
   const route = routeText(row);
   const rule = [row?.rule, row?.rule_payload].filter(Boolean).join(' · ') || 'Правило —';
   const sourceFilter = origin.name || metadata.source_ip;
   const closed = connectionView === 'closed';
   return `<tr data-connection-id="${escapeHtml(row.id)}" data-connection-state="${closed ? 'closed' : 'active'}" tabindex="0" aria-label="Открыть детали соединения ${escapeHtml(destination(row))}">
-    <td data-label="Источник"><strong>${filterButton(sourceFilter, 'источнику', `${escapeHtml(origin.address)}${deviceNameMarkup(origin.name, metadata.source_ip)}`)}</strong><small>${filterButton(metadata.network, 'протоколу', escapeHtml(network))}</small></td>
-    <td data-label="Назначение"><strong>${filterButton(destinationHost(row), 'назначению', escapeHtml(destination(row)))}</strong><small>${escapeHtml(metadata.destination_ip || '')}</small></td>
-    <td data-label="Маршрут"><strong>${filterButton((row?.chains || [])[0] || route, 'маршруту', routeMarkup(row), 'xk-mihomo-connection-route-filter')}</strong><small>${filterButton(row?.rule_payload || row?.rule, 'правилу', escapeHtml(rule))}</small></td>
-    <td data-label="Трафик"><strong>${escapeHtml(traffic)}</strong></td>
+    <td data-label="Источник"><strong>${filterButton(sourceFilter, 'источнику', `${escapeHtml(origin.address)}${deviceNameMarkup(origin.name, metadata.source_ip)}`, '', 'device')}</strong><small>${filterButton(metadata.network, 'протоколу', escapeHtml(network))}</small></td>
+    <td data-label="Назначение"><strong>${filterButton(destinationHost(row), 'назначению', escapeHtml(destination(row)), '', 'host')}</strong><small>${escapeHtml(metadata.destination_ip || '')}</small></td>
+    <td data-label="Маршрут"><strong>${filterButton((row?.chains || [])[0] || route, 'маршруту', routeMarkup(row), 'xk-mihomo-connection-route-filter', (row?.chains || []).length ? 'chain' : '')}</strong><small>${filterButton(row?.rule_payload || row?.rule, 'правилу', escapeHtml(rule), '', 'rule')}</small></td>
+    <td data-label="Трафик"><strong>${escapeHtml(traffic)}</strong>${speed ? `<small>${escapeHtml(speed)}</small>` : ''}</td>
     <td data-label="Возраст"><strong>${escapeHtml(formatAge(row))}</strong></td>
     <td data-label="Действие">${closed ? '<span class="xk-mihomo-closed-mark">Закрыто</span>' : `<button type="button" class="btn-secondary btn-icon xk-mihomo-connection-close" data-mihomo-connection-close="${escapeHtml(row.id)}" aria-label="Завершить соединение" title="Завершить соединение" ${pendingId ? 'disabled' : ''}>${pendingId === row.id ? iconHtml('loading') : iconHtml('close')}</button>`}</td>
   </tr>`;
@@ -297,7 +310,7 @@ function renderRows() {
   if (!visibleRows.length) empty.textContent = filterText.trim()
     ? 'Соединения по текущему фильтру не найдены.'
     : (connectionView === 'closed' ? 'Недавно закрытых соединений нет.' : 'Активных соединений нет.');
-  if (connectionView === 'active' && snapshot?.truncated) setNotice(`Показаны первые ${snapshot.connections.length} соединений из ${snapshot.total_connections}.`, 'warning');
+  if (connectionView === 'active' && snapshot?.truncated) setNotice(boundedNotice(), 'warning');
   root?.querySelectorAll('[data-mihomo-connection-sort]').forEach((button) => {
     const activeSort = button.dataset.mihomoConnectionSort === sortMode;
     button.classList.toggle('is-active', activeSort);
@@ -429,13 +442,72 @@ function applySnapshot(next, receivedAt = Date.now()) {
   if (!next || Number(next.schema_version) !== 1) return false;
   updateRates(next, receivedAt);
   // A missing ID in a truncated snapshot is not proof that the connection
-  // closed; it may simply have moved outside the bounded first page.
-  rememberClosedConnections(Array.isArray(next.connections) ? next.connections : [], receivedAt, next.truncated !== true);
+  // closed; it may simply have moved outside the bounded first page. Stream
+  // snapshots of a filtered view are never authoritative for the same reason:
+  // the stream reports real closures explicitly in its delta frames.
+  rememberClosedConnections(Array.isArray(next.connections) ? next.connections : [], receivedAt, next.truncated !== true && !next.view);
   snapshot = next;
   render();
   return true;
 }
 
+function applyDelta(next, receivedAt = Date.now()) {
+  if (!next || Number(next.schema_version) !== 1 || !Array.isArray(snapshot?.connections)) return false;
+  updateRates(next, receivedAt);
+  const current = new Map(snapshot.connections.map((row) => [row.id, row]));
+  const closedAt = new Date(receivedAt).toISOString();
+  for (const id of Array.isArray(next.closed) ? next.closed : []) {
+    const row = current.get(id);
+    current.delete(id);
+    if (!row) continue;
+    closedConnections.delete(id);
+    closedConnections.set(id, { ...row, closed_at: closedAt });
+  }
+  for (const id of Array.isArray(next.removed) ? next.removed : []) current.delete(id);
+  for (const change of Array.isArray(next.updated) ? next.updated : []) {
+    const row = current.get(change?.id);
+    if (row) current.set(row.id, { ...row, ...change });
+  }
+  for (const row of Array.isArray(next.added) ? next.added : []) {
+    if (!row?.id) continue;
+    closedConnections.delete(row.id);
+    current.set(row.id, row);
+  }
+  while (closedConnections.size > MAX_CLOSED_CONNECTIONS) {
+    closedConnections.delete(closedConnections.keys().next().value);
+  }
+  const connections = Array.isArray(next.order)
+    ? next.order.map((id) => current.get(id)).filter(Boolean)
+    : Array.from(current.values());
+  const { added, updated, removed, closed, order, ...totals } = next;
+  snapshot = { ...snapshot, ...totals, connections };
+  render();
+  return true;
+}
+
+function applyStreamPayload(next, receivedAt) {
+  return next?.mode === 'delta' ? applyDelta(next, receivedAt) : applySnapshot(next, receivedAt);
+}
+
+function streamView() {
+  // The table shows at most PAGE_SIZE rows, so the server only needs to ship
+  // that many. Local-only sorts (source, destination, route) re-order the
+  // busiest rows; age is inverted because the server sorts by age, the table
+  // by start time.
+  const sort = sortMode === 'speed' || sortMode === 'age' ? sortMode : 'bytes';
+  const sameOrder = sortMode === 'speed' || sortMode === 'age' || sortMode === 'traffic';
+  let dir = sameOrder ? sortDirection : 'desc';
+  if (sortMode === 'age') dir = sortDirection === 'asc' ? 'desc' : 'asc';
+  const view = { sort, dir, limit: PAGE_SIZE, device: '', rule: '', chain: '', host: '' };
+  if (SERVER_FILTER_KINDS.has(serverFilter.kind)) view[serverFilter.kind] = serverFilter.value;
+  return view;
+}
+
+function sendStreamView() {
+  if (!ws || ws.readyState !== 1) return;
+  try { ws.send(JSON.stringify({ type: 'view', ...streamView() })); } catch (error) {}
+}
+
 function clearScheduled() { if (timer) window.clearTimeout(timer); timer = 0; }
 
 function abortRequest() {
@@ -507,7 +579,7 @@ async function openSocket(runGeneration) {
     // nearly the same time. Replace the older socket before assigning the new
     // one so there is still exactly one live browser stream.
     closeSocket();
-    const socket = new WebSocket(mihomoClashConnectionsWsUrl(token));
+    const socket = new WebSocket(mihomoClashConnectionsWsUrl(token, streamView()));
     ws = socket;
     socket.onopen = () => { if (ws === socket) { reconnectAttempt = 0; setStreamState('live', 'Live'); setNotice('Live stream активен.', 'positive'); } };
     socket.onmessage = (event) => {
@@ -515,7 +587,7 @@ async function openSocket(runGeneration) {
       let message = null;
       try { message = JSON.parse(event.data); } catch (error) { return; }
       if (message?.type !== 'mihomo-clash-connections' || Number(message.schema_version) !== 1) return;
-      if (message.state === 'live' && applySnapshot(message.payload, Number(message.received_at_ms) || Date.now())) return;
+      if (message.state === 'live' && applyStreamPayload(message.payload, Number(message.received_at_ms) || Date.now())) return;
       if (message.state === 'error') {
         const code = String(message.error?.code || 'stream_failed');
         if (code === 'stream_busy') {
@@ -627,10 +699,14 @@ function inspectorCopyText(row) {
   ].filter(Boolean).join('\n');
 }
 
-function setQuickFilter(value) {
+function setQuickFilter(value, kind = '') {
   filterText = String(value || '');
+  // Device, host, chain and rule filters are also applied by the stream so
+  // the matching rows are picked from every connection, not the current page.
+  serverFilter = SERVER_FILTER_KINDS.has(kind) && filterText ? { kind, value: filterText } : { kind: '', value: '' };
   const input = byId('mihomo-clash-connections-filter');
   if (input) { input.value = filterText; input.focus(); }
+  sendStreamView();
   renderRows();
 }
 
@@ -643,7 +719,11 @@ function switchConnectionView(nextView) {
 function bind() {
   if (!root || root.dataset.bound === '1') return;
   root.dataset.bound = '1';
-  byId('mihomo-clash-connections-filter')?.addEventListener('input', (event) => { filterText = event.target.value || ''; renderRows(); });
+  byId('mihomo-clash-connections-filter')?.addEventListener('input', (event) => {
+    filterText = event.target.value || '';
+    if (serverFilter.kind) { serverFilter = { kind: '', value: '' }; sendStreamView(); }
+    renderRows();
+  });
   byId('mihomo-clash-connections-network')?.addEventListener('change', (event) => { networkFilter = event.target.value || 'all'; renderRows(); });
   byId('mihomo-clash-connections-refresh')?.addEventListener('click', () => {
     if (active) activateMihomoClashConnections(capabilities);
@@ -661,10 +741,10 @@ function bind() {
       const nextMode = sort.dataset.mihomoConnectionSort || 'traffic';
       if (sortMode === nextMode) sortDirection = sortDirection === 'asc' ? 'desc' : 'asc';
       else { sortMode = nextMode; sortDirection = nextMode === 'source' || nextMode === 'destination' || nextMode === 'route' ? 'asc' : 'desc'; }
-      renderRows(); return;
+      sendStreamView(); renderRows(); return;
     }
     const filter = event.target.closest?.('[data-mihomo-connection-filter]');
-    if (filter) { event.stopPropagation(); setQuickFilter(filter.dataset.mihomoConnectionFilter); return; }
+    if (filter) { event.stopPropagation(); setQuickFilter(filter.dataset.mihomoConnectionFilter, filter.dataset.mihomoConnectionFilterKind); return; }
     const copy = event.target.closest?.('[data-mihomo-connection-copy]');
     if (copy) { event.stopPropagation(); void copyText(copy.dataset.mihomoConnectionCopy, 'Значение'); return; }
     if (event.target.closest?.('[data-mihomo-connection-copy-all]')) {